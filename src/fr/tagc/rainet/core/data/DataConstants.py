@@ -27,6 +27,11 @@ PROTEIN_CROSS_REFERENCE_HEADERS = ["ACC", "DB","X_REFERENCE"]
 PROTEIN_CROSS_REFERENCE_PARAMS = ["ACC","DB","X_REFERENCE"]
 PROTEIN_CROSS_REFERENCE_COMMENT_CHAR = "#"
 
+# DataManager keywords of the data used to resolve the cross references in memory:
+# the uniprotAC of the Proteins per accession (uniprotAC or uniprotID) and the keys of the inserted cross references
+PROTEIN_ACCESSION_KW = "ProteinAccessions"
+PROTEIN_CROSS_REFERENCE_KEYS_KW = "ProteinCrossReferenceKeys"
+
 # Regular expression and parameters for Isoforms
 #===============================================================================
 
@@ -350,6 +355,9 @@ RNA_HEADERS = ["transcript_ID","parent_gene","peptide_ID","transcript_biotype","
 RNA_PARAMS = ["transcript_ID","parent_gene","peptide_ID","transcript_biotype","transcript_length","transcript_source","transcript_status","transcript_tsl","transcript_gencode_basic","transcript_start","transcript_end","transcript_strand","chromosome_name","percentage_GC_content","description","external_gene_name","external_gene_source","external_transcript_name","external_transcript_source_name"]
 RNA_COMMENT_CHAR = "#"
 
+# DataManager keyword of the set of Gene IDs already inserted
+GENE_ALL_KW = "allGenes"
+
 # RNA types which will reflect the different RNA subtables
 RNA_BROAD_TYPES = ["MRNA", "OtherRNA", "LncRNA"]
 
@@ -396,6 +404,9 @@ PROTEIN_RNA_INTERACTION_CATRAPID_COMMENT_CHAR = "#"
 PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_PROT_KW = "Proteins_not_found"
 PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_RNA_KW = "RNAs_not_found"
 
+# Number of interactions inserted in a single batch (and commit) by the streaming catRAPID loader
+PROTEIN_RNA_INTERACTION_CATRAPID_BATCH_SIZE = 100000
+
 # Headers and Parameters for InteractingRNA
 #===============================================================================
 
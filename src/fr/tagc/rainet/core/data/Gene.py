@@ -24,6 +24,9 @@ class Gene( Base ):
     # The base RNA
     transcriptList = relationship( 'RNA' , backref="Gene")
 
+    # The DataManager keywords of the data built from this table during insertion (to be reset when the table is cleaned)
+    INSERTION_CACHE_KEYWORDS = [ DataConstants.GENE_ALL_KW]
+
 
     # #
     # The Gene constructor
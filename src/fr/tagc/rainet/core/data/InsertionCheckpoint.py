@@ -0,0 +1,30 @@
+
+from sqlalchemy.sql.schema import Column
+from sqlalchemy.sql.sqltypes import String, Integer
+
+from fr.tagc.rainet.core.util.sql.Base import Base
+
+# #
+# This class represent the progress of the insertion of a DB table from a file: the position in the file
+# up to which the data were committed and the number of rows committed. It is updated with each batch commit
+# and used to resume an interrupted insertion from that position.
+# 
+class InsertionCheckpoint( Base ):
+    __tablename__ = "InsertionCheckpoint"
+    
+    # The name of the table (with its extension if any)
+    tableName = Column( String, primary_key = True )
+    # The table source (file used to fill the table)
+    tableSource = Column( String )
+    # The byte offset in the file of the first line not yet committed
+    byteOffset = Column( Integer )
+    # The number of rows committed
+    rowNumber = Column( Integer )
+    
+    
+    def __init__(self, name, source, byte_offset, row_number):
+        
+        self.tableName = name
+        self.tableSource = source
+        self.byteOffset = byte_offset
+        self.rowNumber = row_number
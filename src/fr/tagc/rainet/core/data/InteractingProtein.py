@@ -15,7 +15,20 @@ class InteractingProtein( Base ):
     
     uniprotAC = Column( String, ForeignKey('Protein.uniprotAC'), primary_key=True)
 
+    # The ordered list of columns filled by the values returned by bulk_row
+    BULK_COLUMNS = [ "uniprotAC"]
+
     def __init__( self, protein_id ):
+
+        self.uniprotAC = InteractingProtein.bulk_row( protein_id)[0]
+
+    # #
+    # Validate the provided value and convert it to a plain row, in the order of BULK_COLUMNS.
+    # Used by the constructor and by the bulk insertion mode.
+    #
+    # @raise NotRequiredInstantiationException if the identifier is not in the database
+    @staticmethod
+    def bulk_row( protein_id ):
         
         #=======================================================================
         # Query Protein uniprotAC in respective DataManager object
@@ -26,7 +39,7 @@ class InteractingProtein( Base ):
         allProteins = DataManager.get_instance().get_data(DataConstants.PROT_ALL_KW)
                 
         if protein_id in allProteins:
-            self.uniprotAC = protein_id
+            return ( protein_id, )
         else:
             Logger.get_instance().warning( "\n InteractingProtein.init : Protein ID not found:\t" + str( protein_id) )
             raise NotRequiredInstantiationException( "InteractingProtein.init : no insertion needed, Protein object not found.")
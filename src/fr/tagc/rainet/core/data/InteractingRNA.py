@@ -15,7 +15,20 @@ class InteractingRNA( Base ):
     
     transcriptID = Column( String, ForeignKey('RNA.transcriptID'), primary_key=True)
 
+    # The ordered list of columns filled by the values returned by bulk_row
+    BULK_COLUMNS = [ "transcriptID"]
+
     def __init__( self, transcript_id ):
+
+        self.transcriptID = InteractingRNA.bulk_row( transcript_id)[0]
+
+    # #
+    # Validate the provided value and convert it to a plain row, in the order of BULK_COLUMNS.
+    # Used by the constructor and by the bulk insertion mode.
+    #
+    # @raise NotRequiredInstantiationException if the identifier is not in the database
+    @staticmethod
+    def bulk_row( transcript_id ):
         
         #=======================================================================
         # Query RNA transcript ID in respective DataManager object
@@ -26,7 +39,7 @@ class InteractingRNA( Base ):
         allRNAs = DataManager.get_instance().get_data(DataConstants.RNA_ALL_KW)
                 
         if transcript_id in allRNAs:
-            self.transcriptID = transcript_id
+            return ( transcript_id, )
         else:
             Logger.get_instance().warning( "\n InteractingRNA.init : Transcript ID not found:\t" + str( transcript_id) )
             raise NotRequiredInstantiationException( "InteractingRNA.init : no insertion needed, RNA object not found.")
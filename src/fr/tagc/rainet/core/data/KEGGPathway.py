@@ -20,6 +20,9 @@ class KEGGPathway( Base ):
     # Define the N-to-N relationship between KEGGPathway and Protein
     annotatedProteins = relationship('Protein', secondary=ProteinKEGGAnnotation.__table__, backref="keggAnnotations")
     
+    # The columns of the rows built by bulk_row
+    BULK_COLUMNS = [ "keggID", "keggName"]
+    
     #
     # The constructor of the class
     #
@@ -27,15 +30,27 @@ class KEGGPathway( Base ):
     # @param kegg_name : string - The name of the pathway
     def __init__(self, kegg_id, kegg_name):
         
-        #  
-        self.keggID = kegg_id
+        self.keggID, kegg_name = KEGGPathway.bulk_row( kegg_id, kegg_name)
+        if kegg_name != None:
+            self.keggName = kegg_name
+    
+    # #
+    # Convert the provided values to a plain row, in the order of BULK_COLUMNS
+    # (used by the update of the table by difference)
+    #
+    # @param kegg_id : string - The ID of the KEGG Pathway
+    # @param kegg_name : string - The name of the pathway
+    #
+    # @return tuple( string, string) - The pathway ID and name
+    @staticmethod
+    def bulk_row( kegg_id, kegg_name):
         
         # The real pathway name is the first part of the name (in the file the
         # organism is added like :"Glycolysis / Gluconeogenesis - Homo sapiens (human)"
         if kegg_name != None:
-            token_list = kegg_name.split("-")
-            if token_list != None and len(token_list) >= 1:
-                self.keggName = token_list[0]
+            kegg_name = kegg_name.split("-")[0]
+        
+        return ( kegg_id, kegg_name)
     
     ##
     # Add the object to SQLAlchemy session if it is linked to a protein
@@ -53,6 +53,9 @@ class Protein( Base ):
     # The list of ProteinInteractions
     proteinInteractions = relationship( 'ProteinInteraction')
     
+    # The DataManager keywords of the data built from this table during insertion (to be reset when the table is cleaned)
+    INSERTION_CACHE_KEYWORDS = [ DataConstants.PROTEIN_ACCESSION_KW]
+    
     # #
     # The Protein constructor
     # 
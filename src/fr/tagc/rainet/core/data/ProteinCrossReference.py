@@ -1,9 +1,9 @@
 
 from sqlalchemy import Column, String, Integer, ForeignKey, PrimaryKeyConstraint
-from sqlalchemy import or_
 
 from fr.tagc.rainet.core.util.sql.Base import Base
 from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
+from fr.tagc.rainet.core.data import DataConstants
 from fr.tagc.rainet.core.util.exception.RainetException import RainetException
 from fr.tagc.rainet.core.util.exception.NotRequiredInstantiationException import NotRequiredInstantiationException
 
@@ -25,6 +25,12 @@ class ProteinCrossReference( Base ):
         PrimaryKeyConstraint('protein_id', 'sourceDB', "crossReferenceID"),
     )
     
+    # The DataManager keywords of the data built from this table during insertion (to be reset when the table is cleaned)
+    INSERTION_CACHE_KEYWORDS = [ DataConstants.PROTEIN_CROSS_REFERENCE_KEYS_KW]
+    
+    # The columns of the rows built by bulk_row
+    BULK_COLUMNS = [ "protein_id", "sourceDB", "crossReferenceID"]
+    
     #
     # The constructor of the class
     #
@@ -33,9 +39,28 @@ class ProteinCrossReference( Base ):
     # @param cross_reference : string - The cross reference ID
     def __init__(self, protein_acc, db_source, cross_reference):
         
-        # Get a SQLalchemy session
-        sql_session = SQLManager.get_instance().get_session()
-
+        cross_reference_key = ProteinCrossReference.bulk_row( protein_acc, db_source, cross_reference)
+        
+        # Check if a similar cross reference exists in the database (may be true due to protein isoform uniprotACC which is cut) 
+        # If the cross reference does not exist, a new ProteinCrossReferenceObject with the right value is linked to the Protein
+        cross_reference_keys = ProteinCrossReference.get_cross_reference_keys()
+        if cross_reference_key in cross_reference_keys:
+            raise NotRequiredInstantiationException( "ProteinCrossReference.init : Cross Reference already present in database.")
+        cross_reference_keys.add( cross_reference_key)
+        self.protein_id, self.sourceDB, self.crossReferenceID = cross_reference_key
+    
+    # #
+    # Validate the provided values and convert them to a plain row, in the order of BULK_COLUMNS.
+    # Used by the constructor and by the update of the table by difference. The existence of the
+    # cross reference in the database is not checked.
+    #
+    # @return tuple( string, string, string) - The uniprotAC of the protein, the database name and the cross reference ID
+    #
+    # @raise NotRequiredInstantiationException if no protein corresponds to the accession number
+    # @raise RainetException if several proteins correspond to the accession number
+    @staticmethod
+    def bulk_row( protein_acc, db_source, cross_reference ):
+        
         # Control if protein ACC contains a isoform code (like for instance P31496-1 instead of P31496)
         # If so, keep only the root name (the part before the "-") as protein ACC
         try:
@@ -44,33 +69,69 @@ class ProteinCrossReference( Base ):
         except ValueError:
             pass
         
-        # Retrieve the list of Protein corresponding to the provided accession number
-        from fr.tagc.rainet.core.data.Protein import Protein
-        protein_list = sql_session.query( Protein).filter( or_( Protein.uniprotAC == protein_acc, Protein.uniprotID == protein_acc)).all()
+        # Retrieve the list of Protein corresponding to the provided accession number (uniprotAC or uniprotID)
+        protein_list = ProteinCrossReference.get_protein_accessions().get( protein_acc, [])
 
-        # If a single protein exists with the given accession number, check if a similar
-        # cross reference exists in the database (may be true due to protein isoform uniprotACC which is cut) 
-        # If the cross reference does not exist, a new ProteinCrossReferenceObject with the right value and add it to the Protein
-        # cross reference list
-        if protein_list != None and len( protein_list) == 1 :
-            protein = protein_list[0]
-            cross_reference_list = sql_session.query( ProteinCrossReference).filter( ProteinCrossReference.protein_id == protein.uniprotAC,
-                                                                                     ProteinCrossReference.sourceDB == db_source,
-                                                                                     ProteinCrossReference.crossReferenceID == cross_reference).all()
-            if cross_reference_list != None and len( cross_reference_list) > 0:
-                raise NotRequiredInstantiationException( "ProteinCrossReference.init : Cross Reference already present in database.")
-            self.sourceDB = db_source
-            self.crossReferenceID = cross_reference
-            protein.add_cross_reference( self)
-            sql_session.add( protein)
+        # If a single protein exists with the given accession number, the cross reference is linked to it.
         # If several proteins are found with the accession number raise an issue
         # If no protein are found, raise a NotRequiredInstantiationException to indicate
         # the new ProteinCrossReference object do not have to be inserted in DB.
+        if len( protein_list) == 1 :
+            return ( protein_list[0], db_source, cross_reference)
+        elif len( protein_list) > 1:
+            raise RainetException( "ProteinCrossReference.init : Abnormal number of Protein found for accession number '" + protein_acc + "' : " + str( len( protein_list)) + " proteins found.")
         else:
-            if len( protein_list) > 1:
-                raise RainetException( "ProteinCrossReference.init : Abnormal number of Protein found for accession number '" + protein_acc + "' : " + str( len( protein_list)) + " proteins found.")
-            else:
-                raise NotRequiredInstantiationException( "ProteinCrossReference.init : No Corresponding protein found in Database." )
+            raise NotRequiredInstantiationException( "ProteinCrossReference.init : No Corresponding protein found in Database." )
+    
+    ##
+    # Returns the dictionary of the uniprotAC of the Proteins having a given accession number (uniprotAC or uniprotID).
+    # The dictionary is built from the database at first call and kept in the DataManager
+    # (keyword DataConstants.PROTEIN_ACCESSION_KW) so that no query is done per cross reference.
+    #
+    # @return dict<string, list<string>> - The uniprotAC list of each accession number
+    @staticmethod
+    def get_protein_accessions():
+        
+        from fr.tagc.rainet.core.util.data.DataManager import DataManager
+        dt_manager = DataManager.get_instance()
+        if DataConstants.PROTEIN_ACCESSION_KW not in dt_manager.data:
+            dt_manager.perform_query( DataConstants.PROTEIN_ACCESSION_KW, "query( Protein.uniprotAC, Protein.uniprotID ).all()")
+            accession_dict = {}
+            for uniprot_ac, uniprot_id in dt_manager.get_data( DataConstants.PROTEIN_ACCESSION_KW):
+                for accession in set( [ uniprot_ac, uniprot_id]):
+                    if accession not in accession_dict:
+                        accession_dict[ accession] = []
+                    accession_dict[ accession].append( uniprot_ac)
+            dt_manager.store_data( DataConstants.PROTEIN_ACCESSION_KW, accession_dict)
+        
+        return dt_manager.get_data( DataConstants.PROTEIN_ACCESSION_KW)
+    
+    ##
+    # Load the data used by bulk_row, so that the rows can be built by a process without database access
+    # (see DataFactory.prepare_row_creation)
+    @staticmethod
+    def prepare_bulk_rows():
+        
+        ProteinCrossReference.get_protein_accessions()
+    
+    ##
+    # Returns the set of keys ( protein_id, sourceDB, crossReferenceID) of the cross references already inserted.
+    # The set is built from the database at first call and kept in the DataManager
+    # (keyword DataConstants.PROTEIN_CROSS_REFERENCE_KEYS_KW). The new cross references are added to it.
+    #
+    # @return set<tuple> - The keys of the inserted cross references
+    @staticmethod
+    def get_cross_reference_keys():
+        
+        from fr.tagc.rainet.core.util.data.DataManager import DataManager
+        dt_manager = DataManager.get_instance()
+        if DataConstants.PROTEIN_CROSS_REFERENCE_KEYS_KW not in dt_manager.data:
+            dt_manager.perform_query( DataConstants.PROTEIN_CROSS_REFERENCE_KEYS_KW, 
+                                      "query( ProteinCrossReference.protein_id, ProteinCrossReference.sourceDB, ProteinCrossReference.crossReferenceID ).all()")
+            key_set = set( [ tuple( key) for key in dt_manager.get_data( DataConstants.PROTEIN_CROSS_REFERENCE_KEYS_KW)])
+            dt_manager.store_data( DataConstants.PROTEIN_CROSS_REFERENCE_KEYS_KW, key_set)
+        
+        return dt_manager.get_data( DataConstants.PROTEIN_CROSS_REFERENCE_KEYS_KW)
     
     ##
     # Add the object to SQLAlchemy session if it is linked to a protein
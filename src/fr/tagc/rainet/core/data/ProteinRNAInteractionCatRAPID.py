@@ -40,6 +40,9 @@ class ProteinRNAInteractionCatRAPID( Base ):
     
     proteins = relationship( "Protein" )
 
+    # The ordered list of columns filled by the values returned by bulk_row
+    BULK_COLUMNS = [ "transcriptID", "proteinID", "interactionScore"]
+
     # #
     # The ProteinRNAInteractionCatRAPID constructor.
     #
@@ -48,6 +51,22 @@ class ProteinRNAInteractionCatRAPID( Base ):
     #
     def __init__( self, interactors, interaction_score):
 
+        self.transcriptID, self.proteinID, self.interactionScore = ProteinRNAInteractionCatRAPID.bulk_row( interactors, interaction_score)
+
+    # #
+    # Validate the provided values and convert them to a plain row, in the order of BULK_COLUMNS.
+    # This is used by the constructor and by the bulk insertion mode, which bypasses the ORM.
+    #
+    # @param interactors: the interacting protein-RNA pair
+    # @param interaction_score: the interaction score
+    #
+    # @return tuple - ( transcript ID, protein ID, interaction score)
+    #
+    # @raise NotRequiredInstantiationException if the Protein or the RNA is not in the database
+    # @raise RainetException if the values could not be parsed
+    @staticmethod
+    def bulk_row( interactors, interaction_score):
+
         from fr.tagc.rainet.core.util.data.DataManager import DataManager
 
         dt_manager = DataManager.get_instance()
@@ -64,19 +83,14 @@ class ProteinRNAInteractionCatRAPID( Base ):
         # Assumption that there only one interaction between each Protein-RNA pair
         #=======================================================================
 
-        spl = interactors.split(" ")
-        if len(spl) == 2:
-            protein_id = spl[0].split( "|")[1]
-            transcript_id = spl[1].split( "\t")[0]
-        else:
-            raise RainetException( "ProteinRNAInteractionCatRAPID.__init__ : The interactor string could not be parsed: " + str( interactors ))
+        protein_id, transcript_id = ProteinRNAInteractionCatRAPID.parse_interactors( interactors)
 
         #=======================================================================
         # Fill variables
         #=======================================================================
 
         try:
-            self.interactionScore = float( interaction_score)
+            interaction_score = float( interaction_score)
         except ValueError as ve:
             raise RainetException( "ProteinRNAInteractionCatRAPID.__init__ : The value of interaction score is not a float: " + str( interaction_score ), ve )
 
@@ -87,13 +101,13 @@ class ProteinRNAInteractionCatRAPID( Base ):
  
         protein_list = dt_manager.get_data( DataConstants.PROT_ALL_KW)
 
-        if protein_id in protein_list:
-            self.proteinID = protein_id
-        else:
+        if protein_id not in protein_list:
 #            raise RainetException( "ProteinRNAInteractionCatRAPID.init : No Protein object while using cross references for protein_id = " + protein_id)
-            Logger.get_instance().warning( "\nProteinRNAInteractionCatRAPID.init : Protein ID not found, will skip interaction:\t" + str( protein_id) )
-            # Store missing Protein ID in a list
-            dt_manager.data[ DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_PROT_KW].append( protein_id)
+            # Count missing Protein ID occurrences, warning only on the first one
+            missing_protein_counter = dt_manager.data[ DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_PROT_KW]
+            if protein_id not in missing_protein_counter:
+                Logger.get_instance().warning( "\nProteinRNAInteractionCatRAPID.init : Protein ID not found, will skip interaction:\t" + str( protein_id) )
+            missing_protein_counter[ protein_id] += 1
             raise NotRequiredInstantiationException( "ProteinRNAInteractionCatRAPID.init : No Protein found, instance will not be created.")
  
         #=======================================================================
@@ -103,15 +117,40 @@ class ProteinRNAInteractionCatRAPID( Base ):
 
         RNA_list = dt_manager.get_data( DataConstants.RNA_ALL_KW)
  
-        if transcript_id in RNA_list:
-            self.transcriptID = transcript_id
-        else:
+        if transcript_id not in RNA_list:
 #            raise RainetException( "ProteinRNAInteractionCatRAPID.init : No RNA object found for transcript_id = " + transcript_id)
-            Logger.get_instance().warning( "\nProteinRNAInteractionCatRAPID.init : RNA ID not found, will skip interaction:\t" + str( transcript_id) )
-            # Store missing RNA ID in a list
-            dt_manager.data[ DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_RNA_KW].append( transcript_id)
+            # Count missing RNA ID occurrences, warning only on the first one
+            missing_rna_counter = dt_manager.data[ DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_RNA_KW]
+            if transcript_id not in missing_rna_counter:
+                Logger.get_instance().warning( "\nProteinRNAInteractionCatRAPID.init : RNA ID not found, will skip interaction:\t" + str( transcript_id) )
+            missing_rna_counter[ transcript_id] += 1
             raise NotRequiredInstantiationException( "ProteinRNAInteractionCatRAPID.init: No RNA found, instance will not be created." )
 
+        return ( transcript_id, protein_id, interaction_score)
+
+    # #
+    # Parse the catRAPID interactors string
+    #
+    # Example
+    # sp|Q96DC8|ECHD3_HUMAN ENST00000579524
+    # protein and rna separated by " ", protein Uniprot AC is the second field of the protein "|" separated name
+    #
+    # @param interactors: the interacting protein-RNA pair
+    #
+    # @return tuple - ( protein ID, transcript ID)
+    #
+    # @raise RainetException if the interactors string could not be parsed
+    @staticmethod
+    def parse_interactors( interactors):
+
+        spl = interactors.split(" ")
+        if len(spl) == 2:
+            protein_spl = spl[0].split( "|")
+            if len( protein_spl) > 1:
+                return protein_spl[1], spl[1].split( "\t")[0]
+
+        raise RainetException( "ProteinRNAInteractionCatRAPID.__init__ : The interactor string could not be parsed: " + str( interactors ))
+
 
     ##
     # Add the object to SQLAlchemy session if it is linked to a protein and RNA
@@ -186,20 +186,38 @@ class RNA( Base ):
         # each Gene can contain several transcripts. get instance of gene and see if already present, if not, create new Gene entry
         #=======================================================================
 
-        gene = sql_session.query( Gene ).filter( Gene.geneID == gene_ID).first()
+        gene_set = RNA.get_gene_IDs()
 
-        if gene == None: #if no Gene with that Gene ID found, create one
+        if gene_ID in gene_set:
+            myRNA.geneID = gene_ID
+        else: #if no Gene with that Gene ID found, create one
             gene = Gene( gene_ID )
- 
-        gene.add_rna( myRNA )
-        
-        sql_session.add( gene )
+            gene.add_rna( myRNA )
+            sql_session.add( gene )
+            gene_set.add( gene_ID )
         
 
         # Add the respective RNA subclass object, note that RNA itself is not instantiated
         sql_session.add( myRNA )
         raise NotRequiredInstantiationException( "RNA.__init__: RNA instance is not required." )
 
+    # #
+    # Returns the set of the Gene IDs already inserted.
+    # The set is built from the database at first call and kept in the DataManager
+    # (keyword DataConstants.GENE_ALL_KW) so that no query is done per RNA. The new Gene IDs are added to it.
+    #
+    # @return set<string> - The IDs of the inserted Genes
+    @staticmethod
+    def get_gene_IDs():
+        
+        from fr.tagc.rainet.core.util.data.DataManager import DataManager
+        dt_manager = DataManager.get_instance()
+        if DataConstants.GENE_ALL_KW not in dt_manager.data:
+            dt_manager.perform_query( DataConstants.GENE_ALL_KW, "query( Gene.geneID ).all()")
+            dt_manager.store_data( DataConstants.GENE_ALL_KW, set( [ gene[0] for gene in dt_manager.get_data( DataConstants.GENE_ALL_KW)]))
+        
+        return dt_manager.get_data( DataConstants.GENE_ALL_KW)
+
     # #
     # Add a RNACrossReference to the RNA cross reference list
     #
@@ -65,10 +65,11 @@ class RNATissueExpression( Base ):
         from fr.tagc.rainet.core.data.Tissue import Tissue
 
         # Create data structure external to this instance to accumulate already processed tissue names
-        kw = "tempSet"  
+        kw = "tempSet"
         if kw not in dt_manager.data.keys():
-            # initialise data manager as a set
-            dt_manager.store_data( kw, set())
+            # initialise data manager as a set, with the tissues already in the database
+            # (e.g. when an interrupted insertion is resumed)
+            dt_manager.store_data( kw, set( [ tissue[0] for tissue in sql_session.query( Tissue.tissueName).all()]))
   
         if tissue_name not in dt_manager.data[ kw]:
             tissueObj = Tissue( tissue_name, source_db)
@@ -0,0 +1,36 @@
+
+from sqlalchemy.sql.schema import Column
+from sqlalchemy.sql.sqltypes import String, Integer, Float, Text
+
+from fr.tagc.rainet.core.util.sql.Base import Base
+
+# #
+# This class represent the fingerprint of the source file of a DB table when the table was filled:
+# the file size, modification time and the hash of each block of the file. It is used by the
+# update mode of the insertion to detect the tables whose source file changed.
+# 
+class TableFingerprint( Base ):
+    __tablename__ = "TableFingerprint"
+    
+    # The name of the table (with its extension if any)
+    tableName = Column( String, primary_key = True )
+    # The table source (file used to fill the table)
+    tableSource = Column( String )
+    # The size of the file (in bytes)
+    fileSize = Column( Integer )
+    # The modification time of the file
+    fileModificationTime = Column( Float )
+    # The size of the hashed blocks (in bytes)
+    blockSize = Column( Integer )
+    # The MD5 hash of each block of the file, separated by spaces
+    blockHashes = Column( Text )
+    
+    
+    def __init__(self, name, source, file_size, file_modification_time, block_size, block_hash_list):
+        
+        self.tableName = name
+        self.tableSource = source
+        self.fileSize = file_size
+        self.fileModificationTime = file_modification_time
+        self.blockSize = block_size
+        self.blockHashes = " ".join( block_hash_list)
@@ -2,6 +2,7 @@
 import os
 import shutil
 import numpy
+import itertools
 #import numpy as np
 # import pandas as pd
 # import cPickle as pickle
@@ -18,6 +19,7 @@ from fr.tagc.rainet.core.util.exception.RainetException import RainetException
 from fr.tagc.rainet.core.util.log.Logger import Logger
 from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
 from fr.tagc.rainet.core.util.data.DataManager import DataManager
+from fr.tagc.rainet.core.util.data.InteractionStore import InteractionStore
 from fr.tagc.rainet.core.util.time.Timer import Timer
 from fr.tagc.rainet.core.util.subprocess.SubprocessUtil import SubprocessUtil
 
@@ -138,6 +140,7 @@ class AnalysisStrategy(ExecutionStrategy):
     DUMP_EXPRESSION_FILTER = "interactions_expression_filter.tsv"
     DUMP_EXPRESSION = "interactions_expression.tsv"
     DUMP_EXPRESSION_FILTER_BATCH_SIZE = 100
+    DUMP_EXPRESSION_FILTER_MEMORY = 512 * 1024 * 1024 # Memory (in bytes) used by the arrays of a block of RNAs compared to all mRNAs
 
     def __init__(self):  
         
@@ -405,6 +408,11 @@ class AnalysisStrategy(ExecutionStrategy):
         selectedRNAs = { str( item.transcriptID) for item in DataManager.get_instance().get_data( AnalysisStrategy.RNA_FILTER_KW) }
         selectedProteins = { str( item.uniprotAC) for item in DataManager.get_instance().get_data( AnalysisStrategy.PROT_FILTER_KW) } 
 
+        # Read the interactions from the columnar interaction store, if it is up to date with the table
+        if InteractionStore.is_up_to_date( self.DBPath):
+            self.filter_PRI_from_store( selectedRNAs, selectedProteins)
+            return
+
         #===================================================================
         # Total number of distinct proteins and RNAs, regardless of interaction scores (needed for some calculations)
         #===================================================================    
@@ -488,6 +496,35 @@ class AnalysisStrategy(ExecutionStrategy):
 
         DataManager.get_instance().store_data(AnalysisStrategy.PRI_FILTER_KW, selectedInteractions)
 
+    # #
+    # Filter protein-RNA interactions using the interaction store instead of the ProteinRNAInteractionCatRAPID table.
+    # The filters are applied on the columns of the store and only the selected interactions are copied, as records.
+    #
+    # @param selectedRNAs : set<string> - The transcript IDs of the RNAs after RNA filter
+    # @param selectedProteins : set<string> - The uniprotACs of the proteins after protein filter
+    #
+    # Stores final list of interactions on DataManager 
+    def filter_PRI_from_store(self, selectedRNAs, selectedProteins):
+
+        interactionStore = InteractionStore( self.DBPath)
+
+        # Total number of distinct proteins and RNAs, regardless of interaction scores
+        DataManager.get_instance().store_data(AnalysisStrategy.PRI_PROT_ALL_KW, set( interactionStore.get_protein_ids()))
+        DataManager.get_instance().store_data(AnalysisStrategy.PRI_RNA_ALL_KW, set( interactionStore.get_transcript_ids()))
+
+        if self.minimumInteractionScore != OptionConstants.DEFAULT_INTERACTION_SCORE:
+            minimumScore = float( self.minimumInteractionScore)
+        else:
+            minimumScore = None
+
+        Logger.get_instance().info( "filter_PRI : Finished minimum interaction score filter: " + str( interactionStore.count_interactions( minimumScore)) )
+
+        selectedInteractions = interactionStore.get_records( *interactionStore.get_interactions( minimumScore, selectedRNAs, selectedProteins))
+
+        Logger.get_instance().info( "filter_PRI : Finished interacting RNA / protein filter: " + str( len( selectedInteractions)) )
+
+        DataManager.get_instance().store_data(AnalysisStrategy.PRI_FILTER_KW, selectedInteractions)
+
 
 #     # 15-June-2016: due to computational constraints, we decided to not insert all the catRAPID interaction data but instead insert it AFTER applying expression cutoff, therefore this function had to be modified
 #     # #
@@ -695,179 +732,137 @@ class AnalysisStrategy(ExecutionStrategy):
    
             # Get list of tissues for looking over their expression values on each transcript
             tissues = [ str( tiss[0]) for tiss in self.sql_session.query( Tissue.tissueName ).all() ]
-            
-            # Map expression per tissue to transcript ID           
+            tissueIndexes = { tissue : index for index, tissue in enumerate( tissues) }
+
+            # Map expression per tissue to transcript ID
             expressionMap = self.sql_session.query( RNATissueExpression.transcriptID, RNATissueExpression.expressionValue, RNATissueExpression.tissueName).all()
-            self.expressionDict = {} # key -> transcript ID, value -> list of pairs of expression value and tissue name
+            transcriptIndexes = {} # key -> transcript ID, value -> row of the transcript in the expression matrix
             for items in expressionMap:
-                txID, expr, tissName = str( items[0]), float( items[1]), str( items[2])
-                if txID not in self.expressionDict:
-                    self.expressionDict[ txID] = []
-                self.expressionDict[ txID].append( (expr, tissName) )
-
-            Logger.get_instance().info("dump_filter_PRI_expression : loaded expression data. %s total RNAs with expression data." % len( self.expressionDict) )    
-
-            #===================================================================    
+                txID = str( items[0])
+                if txID not in transcriptIndexes:
+                    transcriptIndexes[ txID] = len( transcriptIndexes)
+
+            # Build the matrix of expression (transcripts x tissues). Missing values are set to -inf (never expressed).
+            # The order in which the tissues of each transcript are stored in the database is kept (tissue columns, padded with -1)
+            expressionRows = numpy.array( [ transcriptIndexes[ str( items[0])] for items in expressionMap ], dtype = numpy.int64)
+            expressionColumns = numpy.array( [ tissueIndexes[ str( items[2])] for items in expressionMap ], dtype = numpy.int64)
+            expressionMatrix = numpy.full( ( len( transcriptIndexes), len( tissues)), -numpy.inf)
+            expressionMatrix[ expressionRows, expressionColumns] = [ float( items[1]) for items in expressionMap ]
+            tissueOrder = numpy.full( ( len( transcriptIndexes), len( tissues)), -1, dtype = numpy.int64)
+            sortedIndexes = numpy.argsort( expressionRows, kind = "mergesort")
+            sortedRows = expressionRows[ sortedIndexes]
+            tissueOrder[ sortedRows, numpy.arange( len( sortedRows)) - numpy.searchsorted( sortedRows, sortedRows)] = expressionColumns[ sortedIndexes]
+            del expressionMap, expressionRows, expressionColumns, sortedIndexes, sortedRows
+
+            Logger.get_instance().info("dump_filter_PRI_expression : loaded expression data. %s total RNAs with expression data." % len( transcriptIndexes) )
+
+            #===================================================================
             # Store all protein-related expression values into memory
-            #===================================================================    
-            self.ProtMRNATissueExpressions = {} # key -> prot ID, val -> dict. key -> mRNA ID, val -> expression profile per tissue
+            #===================================================================
+            # there can be several mRNAs for the same protein ID, here we use them all to have set of interacting tissues
+            # we only required that at least one of the mRNAs producing the protein is present with the other RNA (e.g. lncRNA)
+            proteinMRNAs = {} # key -> prot ID, val -> dict. key -> mRNA ID, val -> row of the mRNA in the expression matrix
             for protID in interactingProteins:
                 # skip protein with no mRNAs in database
                 if protID not in self.mRNADict:
                     continue
-
-                if protID not in self.ProtMRNATissueExpressions:
-                    self.ProtMRNATissueExpressions[ protID] = {}
-
-                # Search mRNA that produces interacting protein
-                mRNAs = self.mRNADict[ protID]
-
-                # Get Protein expression for all tissues
-                # there can be several mRNAs for the same protein ID, here we use them all to have set of interacting tissues
-                # we only required that at least one of the mRNAs producing the protein is present with the other RNA (e.g. lncRNA)   
-                for mRNAID in mRNAs:
-                
-                    # skip transcripts with no expression      
-                    if mRNAID not in self.expressionDict:
-                        continue
-                
-                    MRNATissueExpressions = {} # key -> tissue, val -> expression val
-                          
-                    # Get the Protein expression, using its mRNA
-                    for tiss in self.expressionDict[ mRNAID]:     
-                        txExpressionVal = float( tiss[0])
-                        tissueName = str( tiss[1])
-                        MRNATissueExpressions[ tissueName] = txExpressionVal                   
-
-                    # store expression information for each mRNA
-                    if mRNAID not in self.ProtMRNATissueExpressions[ protID]:
-                        self.ProtMRNATissueExpressions[ protID][ mRNAID] = {}
-                    self.ProtMRNATissueExpressions[ protID][ mRNAID] = MRNATissueExpressions
-
-            Logger.get_instance().info("dump_filter_PRI_expression : initialised expression data. %s proteins with expression data." % len( self.ProtMRNATissueExpressions) )    
-
-            #===================================================================             
+                proteinMRNAs[ protID] = {}
+                for mRNAID in self.mRNADict[ protID]:
+                    # skip transcripts with no expression
+                    if mRNAID in transcriptIndexes:
+                        proteinMRNAs[ protID][ mRNAID] = transcriptIndexes[ mRNAID]
+
+            # Stack the expression of the mRNAs of all proteins (mRNAs x tissues). The mRNAs of the protein
+            # number i are the rows mRNAStarts[ i] to mRNAStarts[ i + 1]
+            proteinIDs = list( proteinMRNAs)
+            mRNARows = [ row for protID in proteinIDs for row in proteinMRNAs[ protID].values() ]
+            mRNAStarts = numpy.cumsum( [ 0] + [ len( proteinMRNAs[ protID]) for protID in proteinIDs ])
+            mRNAExpression = expressionMatrix[ mRNARows]
+
+            Logger.get_instance().info("dump_filter_PRI_expression : initialised expression data. %s proteins with expression data." % len( proteinMRNAs) )
+
+            #===================================================================
             # Loop virtual interactions and apply filter
-            # Approach: first retrieve information for RNA, then loop it against each interacting protein. Batch for each RNA
-            #=================================================================== 
+            # Approach: compare blocks of RNAs to the mRNAs of all proteins at once, the size of the block depending
+            # on the memory used by the arrays of a single RNA. Then batch for each RNA
+            #===================================================================
+            blockSize = max( 1, AnalysisStrategy.DUMP_EXPRESSION_FILTER_MEMORY / ( 10 * max( 1, mRNAExpression.size)))
+            interactingRNAList = list( interactingRNAs)
+            # cache of the ordered tissue names corresponding to a co-presence pattern of a pair
+            coPresentTissues = {}
             countRNA = 0
-            #===================================================================             
-            # Loop RNAs
-            #===================================================================             
-            for rnaID in interactingRNAs:
-
-                countRNA += 1
-                if countRNA % AnalysisStrategy.DUMP_EXPRESSION_FILTER_BATCH_SIZE == 0:
-                    Logger.get_instance().info("dump_filter_PRI_expression : processed %s RNAs out of %s" % ( countRNA, len( interactingRNAs)) )   
-                    
-                    if self.lowMemory == 1:
-                        Logger.get_instance().info("dump_filter_PRI_expression : writing expression filter output file. %s lines." % ( len( expressedInteractionsTissues)) )               
-            
-                        # write batch interactions to file
-                        for pair in expressedInteractionsTissues:
-                            transcriptID,proteinID = pair.split( "|")
-                            text = "%s\t%s\n" % ( proteinID, transcriptID )
-                            outHandlerExpFilt.write( text)
-                        
-                        # reset dictionary to save memory
-                        expressedInteractionsTissues = {}
-
-                        Logger.get_instance().info("dump_filter_PRI_expression : writing expression output file. %s lines." % ( len( interactionsExpression)) )               
-
-                        # write batch interactions to file
-                        for pair in interactionsExpression:
-                            transcriptID,proteinID = pair.split( "|")
-                            text = "%s\t%s\t%s\n" % ( proteinID, transcriptID, interactionsExpression[ pair] )
-                            outHandlerExp.write( text)
-
-                        # reset dictionary to save memory
-                        interactionsExpression = {}
-                
-                # skip transcripts with no expression
-                if rnaID not in self.expressionDict:
-                    continue
-
-                # Get RNA transcript expression for all tissues
-                RNATissueExpressions = {}
-                for tiss in self.expressionDict[ rnaID]:     
-                    txExpressionVal = float( tiss[0])
-                    tissueName = str( tiss[1])
-                    RNATissueExpressions[ tissueName] = txExpressionVal                   
+            proteinTissuesStored = False
+            for blockStart in xrange( 0, len( interactingRNAList), blockSize):
+                blockRNAs = interactingRNAList[ blockStart : blockStart + blockSize]
+                blockRows = [ transcriptIndexes[ rnaID] for rnaID in blockRNAs if rnaID in transcriptIndexes ]
+                pairExpressions, pairTissueCounts, pairCoPresence = self.get_pair_expression_block( expressionMatrix[ blockRows], mRNAExpression, mRNAStarts)
+                blockIndex = -1
+
+                #===================================================================
+                # Loop RNAs
+                #===================================================================
+                for rnaID in blockRNAs:
+
+                    countRNA += 1
+                    if countRNA % AnalysisStrategy.DUMP_EXPRESSION_FILTER_BATCH_SIZE == 0:
+                        Logger.get_instance().info("dump_filter_PRI_expression : processed %s RNAs out of %s" % ( countRNA, len( interactingRNAs)) )
+
+                        if self.lowMemory == 1:
+                            self.write_expression_batch( outHandlerExpFilt, outHandlerExp, expressedInteractionsTissues, interactionsExpression)
+                            # reset dictionaries to save memory
+                            expressedInteractionsTissues = {}
+                            interactionsExpression = {}
+
+                    # skip transcripts with no expression
+                    if rnaID not in transcriptIndexes:
+                        continue
+                    blockIndex += 1
 
                     if self.lowMemory == 0:
                         # store data on RNA tissue expression
-                        if txExpressionVal >= self.expressionValueCutoff:
-                            if tissueName not in rnaExpressionTissues:
-                                rnaExpressionTissues[ tissueName] = set()
-                            rnaExpressionTissues[ tissueName].add( rnaID)                               
-
-                #===================================================================             
-                # Loop Proteins
-                #===================================================================             
-                # loop for each protein, with precalculated values. create list of 1 RNA vs all protein interaction
-                for protID in self.ProtMRNATissueExpressions:
-                    
-                    pair = rnaID + "|" + protID
-
-                    # storing the pair expression, defined as the minimum expression between the two partners, in any tissue
-                    pairExpression = 0.0
-
-                    # variable which stores set of tissues where both partners of pair are expressed 
-                    setOfInteractingTissues = set()
-                    
-                    # check expression for each mRNA producing the protein
-                    for mRNAID in self.ProtMRNATissueExpressions[ protID]:
-                        
-                        # compare expressions between RNA and protein for each tissue
-                        for tissue in tissues:
-                            txExpressionVal = RNATissueExpressions[ tissue]
-                            protExpressionVal = self.ProtMRNATissueExpressions[ protID][ mRNAID][ tissue]
-                                                                                                    
-                            if txExpressionVal >= self.expressionValueCutoff and protExpressionVal >= self.expressionValueCutoff:
-                                setOfInteractingTissues.add( tissue)
-
-                            # calculate minimum pair expression, keep the maximum along tissue and among mRNAs of same protein
-                            minExpr = min( txExpressionVal, protExpressionVal)
-                            if minExpr > pairExpression:
-                                pairExpression = minExpr
-
-                            if self.lowMemory == 0:                                    
-                                # store data on protein tissue expression
-                                if protExpressionVal >= self.expressionValueCutoff:
-                                    if tissue not in proteinExpressionTissues:
-                                        proteinExpressionTissues[ tissue] = set()
-                                    proteinExpressionTissues[ tissue].add( protID)
+                        rnaRow = transcriptIndexes[ rnaID]
+                        for column in tissueOrder[ rnaRow]:
+                            if column < 0:
+                                break
+                            if expressionMatrix[ rnaRow, column] >= self.expressionValueCutoff:
+                                if tissues[ column] not in rnaExpressionTissues:
+                                    rnaExpressionTissues[ tissues[ column]] = set()
+                                rnaExpressionTissues[ tissues[ column]].add( rnaID)
+
+                        # store data on protein tissue expression (the same for all RNAs)
+                        if not proteinTissuesStored:
+                            proteinTissuesStored = True
+                            for protID in proteinIDs:
+                                for mRNARow in proteinMRNAs[ protID].values():
+                                    for column in xrange( len( tissues)):
+                                        if expressionMatrix[ mRNARow, column] >= self.expressionValueCutoff:
+                                            if tissues[ column] not in proteinExpressionTissues:
+                                                proteinExpressionTissues[ tissues[ column]] = set()
+                                            proteinExpressionTissues[ tissues[ column]].add( protID)
+
+                    #===================================================================
+                    # Store the pairs of the RNA with all proteins
+                    #===================================================================
+                    pairs = [ rnaID + "|" + protID for protID in proteinIDs ]
 
                     # For a protein-RNA pair, retain interaction only if protein-RNA are present in at least x tissues
-                    if len( setOfInteractingTissues) >= self.expressionTissueCutoff: # cutoff of minimum number of tissues
-                        expressedInteractionsTissues[ pair] = setOfInteractingTissues
+                    # (the tissues are added to the set in the order they are found for each mRNA of the protein)
+                    for proteinIndex in numpy.flatnonzero( pairTissueCounts[ blockIndex] >= self.expressionTissueCutoff):
+                        coPresence = pairCoPresence[ blockIndex, mRNAStarts[ proteinIndex] : mRNAStarts[ proteinIndex + 1]]
+                        coPresenceKey = coPresence.tobytes()
+                        if coPresenceKey not in coPresentTissues:
+                            coPresentTissues[ coPresenceKey] = tuple( [ tissues[ column] for column in numpy.nonzero( coPresence)[ 1] ])
+                        expressedInteractionsTissues[ pairs[ proteinIndex]] = set( coPresentTissues[ coPresenceKey])
 
                     # For a protein-RNA pair, regardless of passing or not cutoffs, store its expression value
-                    interactionsExpression[ pair] = pairExpression
+                    interactionsExpression.update( itertools.izip( pairs, pairExpressions[ blockIndex].tolist()))
 
 
             ## write last batch if using low memory flag
             if self.lowMemory == 1:
-                Logger.get_instance().info("dump_filter_PRI_expression : writing expression filter output file. %s lines." % ( len( expressedInteractionsTissues)) )               
-    
-                # write batch interactions to file
-                for pair in expressedInteractionsTissues:
-                    transcriptID,proteinID = pair.split( "|")
-                    text = "%s\t%s\n" % ( proteinID, transcriptID )
-                    outHandlerExpFilt.write( text)
-                
-                # reset dictionary to save memory
+                self.write_expression_batch( outHandlerExpFilt, outHandlerExp, expressedInteractionsTissues, interactionsExpression)
+                # reset dictionaries to save memory
                 expressedInteractionsTissues = {}
-
-                Logger.get_instance().info("dump_filter_PRI_expression : writing expression output file. %s lines." % ( len( interactionsExpression)) )               
-
-                # write batch interactions to file
-                for pair in interactionsExpression:
-                    transcriptID,proteinID = pair.split( "|")
-                    text = "%s\t%s\t%s\n" % ( proteinID, transcriptID, interactionsExpression[ pair] )
-                    outHandlerExp.write( text)
-
-                # reset dictionary to save memory
                 interactionsExpression = {}
             
             outHandlerExpFilt.close()
@@ -956,6 +951,59 @@ class AnalysisStrategy(ExecutionStrategy):
         DataManager.get_instance().store_data( AnalysisStrategy.FINAL_PRO_KW, interProts)
 
     
+    # #
+    # Compare the expression of a block of RNAs with the expression of the mRNAs of all proteins, in all tissues.
+    #
+    # @param rnaExpression : numpy.array - The expression of the RNAs of the block (RNAs x tissues)
+    # @param mRNAExpression : numpy.array - The expression of the mRNAs of all proteins (mRNAs x tissues), grouped by protein
+    # @param mRNAStarts : numpy.array - The index of the first mRNA of each protein, followed by the total number of mRNAs
+    #
+    # @return tuple( numpy.array, numpy.array, numpy.array) - For each RNA and protein, the pair expression (minimum expression
+    # of the partners, maximum among tissues and mRNAs, at least 0.0) and the number of tissues where both partners are expressed.
+    # For each RNA, mRNA and tissue, whether both partners are expressed.
+    def get_pair_expression_block(self, rnaExpression, mRNAExpression, mRNAStarts):
+
+        proteinNumber = len( mRNAStarts) - 1
+        coPresence = ( rnaExpression >= self.expressionValueCutoff)[ :, numpy.newaxis, :] & ( mRNAExpression >= self.expressionValueCutoff)[ numpy.newaxis, :, :]
+
+        pairExpressions = numpy.zeros( ( len( rnaExpression), proteinNumber))
+        pairTissueCounts = numpy.zeros( ( len( rnaExpression), proteinNumber), dtype = numpy.int64)
+
+        # proteins without expressed mRNA keep a pair expression of 0.0 and no co-present tissue
+        withMRNA = mRNAStarts[ :-1] < mRNAStarts[ 1:]
+        if len( rnaExpression) > 0 and withMRNA.any():
+            starts = mRNAStarts[ :-1][ withMRNA]
+            pairMinimum = numpy.minimum( rnaExpression[ :, numpy.newaxis, :], mRNAExpression[ numpy.newaxis, :, :]).max( axis = 2)
+            pairExpressions[ :, withMRNA] = numpy.maximum( numpy.maximum.reduceat( pairMinimum, starts, axis = 1), 0.0)
+            pairTissueCounts[ :, withMRNA] = numpy.logical_or.reduceat( coPresence, starts, axis = 1).sum( axis = 2)
+
+        return pairExpressions, pairTissueCounts, coPresence
+
+    # #
+    # Write a batch of co-present interacting pairs and of pair expressions to the expression filter output files
+    #
+    # @param outHandlerExpFilt : file - The file listing the pairs passing the expression filter
+    # @param outHandlerExp : file - The file listing the expression of all pairs
+    # @param expressedInteractionsTissues : dict - The pairs passing the expression filter (key -> transcriptID|proteinID)
+    # @param interactionsExpression : dict - The expression of all pairs (key -> transcriptID|proteinID)
+    def write_expression_batch(self, outHandlerExpFilt, outHandlerExp, expressedInteractionsTissues, interactionsExpression):
+
+        Logger.get_instance().info("dump_filter_PRI_expression : writing expression filter output file. %s lines." % ( len( expressedInteractionsTissues)) )
+
+        # write batch interactions to file
+        for pair in expressedInteractionsTissues:
+            transcriptID,proteinID = pair.split( "|")
+            text = "%s\t%s\n" % ( proteinID, transcriptID )
+            outHandlerExpFilt.write( text)
+
+        Logger.get_instance().info("dump_filter_PRI_expression : writing expression output file. %s lines." % ( len( interactionsExpression)) )
+
+        # write batch interactions to file
+        for pair in interactionsExpression:
+            transcriptID,proteinID = pair.split( "|")
+            text = "%s\t%s\t%s\n" % ( proteinID, transcriptID, interactionsExpression[ pair] )
+            outHandlerExp.write( text)
+
     # #
     # Write output file with the parameters used
     def write_parameter_log(self):
@@ -1,9 +1,14 @@
 
 import os
 import shutil
+import hashlib
+import math
 import numpy
 import random
+import itertools
+import multiprocessing
 from scipy import stats
+from scipy import sparse
 # from statsmodels.sandbox.stats.multicomp import multipletests
 
 from sqlalchemy import or_, and_, distinct
@@ -16,7 +21,13 @@ from fr.tagc.rainet.core.util.file.FileUtils import FileUtils
 from fr.tagc.rainet.core.util.exception.RainetException import RainetException
 from fr.tagc.rainet.core.util.log.Logger import Logger
 from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
+from fr.tagc.rainet.core.util.sql.SQLUtil import SQLUtil
 from fr.tagc.rainet.core.util.data.DataManager import DataManager
+from fr.tagc.rainet.core.util.data.InteractionStore import InteractionStore
+from fr.tagc.rainet.core.util.data.HypergeometricTable import HypergeometricTable
+from fr.tagc.rainet.core.util.data.AnnotationMembership import AnnotationMembership
+from fr.tagc.rainet.core.util.data.EnrichmentReport import EnrichmentReport
+from fr.tagc.rainet.core.util.rng.RandomService import RandomService
 from fr.tagc.rainet.core.util.time.Timer import Timer
 from fr.tagc.rainet.core.util.subprocess.SubprocessUtil import SubprocessUtil
 
@@ -68,6 +79,24 @@ from fr.tagc.rainet.core.util import Constants
 from statsmodels.stats.multitest import multipletests
 
 
+# The strategy whose RNAs are tested by a worker process
+workerStrategy = None
+
+# #
+# Function initialising the worker processes of the enrichment analysis. The workers being forked,
+# the strategy and its structures are not copied, but shared with the main process.
+def init_enrichment_worker(strategy):
+
+    global workerStrategy
+    workerStrategy = strategy
+
+# #
+# Function executed by the worker processes of the enrichment analysis: run the tests of a shard of RNAs
+def run_enrichment_shard(shard):
+
+    return workerStrategy.run_rna_shard(*shard)
+
+
 # #
 # This class define the Strategy to produce analysis on the given database and parameters
 class EnrichmentAnalysisStrategy(ExecutionStrategy):
@@ -92,6 +121,19 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
     SIGN_COLUMN = 8  # column from testsCorrected with result significance tag. 0-based
     WARNING_COLUMN = 5  # column from testsCorrected with warning/skipTest tag. 0-based   
 
+    # number of shards of RNAs per worker process, to balance the load of the workers
+    SHARDS_PER_WORKER = 4
+
+    # arguments that can change when resuming a run (the random seed of a resumed run is the one of its checkpoint)
+    RESUME_IGNORED_ARGUMENTS = [ OptionConstants.OPTION_OUTPUT_FOLDER, OptionConstants.OPTION_ENRICHMENT_WORKERS, OptionConstants.OPTION_ENRICHMENT_RESUME,
+                                 OptionConstants.OPTION_RANDOM_SEED]
+
+    # parameters of the tests that can change between the configurations of a parameter sweep (attribute -> option)
+    SWEEP_PARAMETERS = {"minimumProteinAnnotation" : OptionConstants.OPTION_MINIMUM_PROTEIN_ANNOTATION,
+                        "minimumProteinInteraction" : OptionConstants.OPTION_MINIMUM_PROTEIN_INTERACTION,
+                        "expressionWarning" : OptionConstants.OPTION_EXPRESSION_WARNING,
+                        "lowerTail" : OptionConstants.OPTION_LOWER_TAIL}
+
     #===================================================================
     # Data Manager object Keywords
     #===================================================================
@@ -119,18 +161,29 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
     REPORT_ENRICHMENT = "enrichment_results.tsv"
     REPORT_ENRICHMENT_PER_RNA = "enrichment_per_rna.tsv"
 
+    # Checkpoint of the run: parameters, random seed and randomizations, and journal of the RNAs completed
+    CHECKPOINT_FILE = "enrichment_checkpoint.npz"
+    JOURNAL_FILE = "enrichment_journal.tsv"
+
+    # Parameter sweep: subfolder of the outputs of each configuration, and list of the configurations
+    CONFIGURATION_FOLDER = "configuration_%i"
+    REPORT_SWEEP = "sweep_configurations.tsv"
+
 
     def __init__(self):  
         
         # Switch for writing of external report file      
         self.writeReportFile = 1
 
-        # Container for results of hypergeom tests so that they don't have to be repeated. 
-        self.testContainer = {}  # Key -> test parameters, val -> pval result
+        # Tables of the hypergeometric tests of the background, so that they don't have to be repeated.
+        self.pvalueTable = None
 
         # counter for total amount of tests
         self.countTotalTests = 0
 
+        # Randomizations of the annotations, drawn once and shared by the configurations of a parameter sweep
+        self.randomPermutations = None
+
     # #
     # The Strategy execution method
     def execute(self):
@@ -149,6 +202,14 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
         self.expressionWarning = OptionManager.get_instance().get_option(OptionConstants.OPTION_EXPRESSION_WARNING)
         self.minimumExpression = OptionManager.get_instance().get_option(OptionConstants.OPTION_MINIMUM_EXPRESSION)
         self.lowerTail = OptionManager.get_instance().get_option(OptionConstants.OPTION_LOWER_TAIL)
+        self.workers = OptionManager.get_instance().get_option(OptionConstants.OPTION_ENRICHMENT_WORKERS)
+        if self.workers == None:
+            self.workers = OptionConstants.DEFAULT_ENRICHMENT_WORKERS
+        self.resume = OptionManager.get_instance().get_option(OptionConstants.OPTION_ENRICHMENT_RESUME)
+        self.significantOnly = OptionManager.get_instance().get_option(OptionConstants.OPTION_SIGNIFICANT_ONLY)
+        self.columnReport = OptionManager.get_instance().get_option(OptionConstants.OPTION_COLUMN_REPORT)
+        self.randomSeed = OptionManager.get_instance().get_option(OptionConstants.OPTION_RANDOM_SEED)
+        self.sweepFile = OptionManager.get_instance().get_option(OptionConstants.OPTION_PARAMETER_SWEEP)
 
         # Variable that stores all arguments to appear in parameters log file
         self.arguments = {OptionConstants.OPTION_DB_NAME : self.DBPath,
@@ -160,7 +221,13 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
                           OptionConstants.OPTION_NUMBER_RANDOMIZATIONS : self.numberRandomizations,
                           OptionConstants.OPTION_EXPRESSION_WARNING : self.expressionWarning,
                           OptionConstants.OPTION_MINIMUM_EXPRESSION : self.minimumExpression,
-                          OptionConstants.OPTION_LOWER_TAIL : self.lowerTail                          
+                          OptionConstants.OPTION_LOWER_TAIL : self.lowerTail,
+                          OptionConstants.OPTION_ENRICHMENT_WORKERS : self.workers,
+                          OptionConstants.OPTION_ENRICHMENT_RESUME : self.resume,
+                          OptionConstants.OPTION_SIGNIFICANT_ONLY : self.significantOnly,
+                          OptionConstants.OPTION_COLUMN_REPORT : self.columnReport,
+                          OptionConstants.OPTION_RANDOM_SEED : self.randomSeed,
+                          OptionConstants.OPTION_PARAMETER_SWEEP : self.sweepFile
                         }
 
         #===================================================================
@@ -177,17 +244,9 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
         if self.annotationTable not in Constants.ANNOTATION_TABLES:
             raise RainetException("EnrichmentAnalysisStrategy.execute: Provided annotation table name is not correct: " + self.annotationTable + "Must be one of : " + str(Constants.ANNOTATION_TABLES))
             
-        # Check if minimum protein annotation value is consistent
-        try:
-            self.minimumProteinAnnotation = int(self.minimumProteinAnnotation)
-        except:
-            raise RainetException("EnrichmentAnalysisStrategy.execute: Provided minimum protein annotation value is not correct (must be integer): " + str( self.minimumProteinAnnotation))
-            
-        # Check if minimum protein annotation value is consistent
-        try:
-            self.minimumProteinInteraction = int(self.minimumProteinInteraction)
-        except:
-            raise RainetException("EnrichmentAnalysisStrategy.execute: Provided minimum protein interactions value is not correct (must be integer): " + str( self.minimumProteinInteraction))
+        # Check if the tests left out of the results file are kept in the columnar report, which FilterEnrichmentResults reads instead
+        if self.significantOnly and not self.columnReport:
+            raise RainetException("EnrichmentAnalysisStrategy.execute: Provided --significantOnly option only works if --columnReport is active (FilterEnrichmentResults needs all the tests).")
 
         # Check if minimum protein annotation value is consistent
         try:
@@ -195,28 +254,38 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
         except:
             raise RainetException("EnrichmentAnalysisStrategy.execute: Provided number randomizations value is not correct (must be integer): " + str( self.numberRandomizations))
 
-        # Check if expression warning is consistent
-        if self.expressionWarning != OptionConstants.DEFAULT_EXPRESSION_WARNING:            
-            try:
-                self.expressionWarning = float(self.expressionWarning)
-                if self.expressionWarning < 0.0 or self.expressionWarning > 1.0:
-                    raise RainetException("EnrichmentAnalysisStrategy.execute: Provided expression warning value is not correct (must be float between 0.0 and 1.0): " + str(self.expressionWarning))
-            except:
-                raise RainetException("EnrichmentAnalysisStrategy.execute: Provided expression warning value is not correct (must be float between 0.0 and 1.0): " + str(self.expressionWarning))
+        # Check the parameters of the tests, and the ones of each configuration of the parameter sweep
+        self.check_test_parameters()
+        self.sweepConfigurations = None
+        if self.sweepFile != None:
+            self.sweepConfigurations = self.read_sweep_configurations()
+        self.expressionNeeded = self.expressionWarning != OptionConstants.DEFAULT_EXPRESSION_WARNING or \
+            (self.sweepConfigurations != None and any([ configuration.get("expressionWarning", OptionConstants.DEFAULT_EXPRESSION_WARNING) != OptionConstants.DEFAULT_EXPRESSION_WARNING for configuration in self.sweepConfigurations]))
 
         # Check if minimum protein annotation value is consistent
-        if self.minimumExpression != OptionConstants.DEFAULT_MINIMUM_EXPRESSION and self.expressionWarning == OptionConstants.DEFAULT_EXPRESSION_WARNING:            
+        if self.minimumExpression != OptionConstants.DEFAULT_MINIMUM_EXPRESSION and not self.expressionNeeded:            
             raise RainetException("EnrichmentAnalysisStrategy.execute: Provided minimum RPKM expression value only works if --expressionWarning is active.")
         try:
             self.minimumExpression = float(self.minimumExpression)
         except:
             raise RainetException("EnrichmentAnalysisStrategy.execute: Provided minimum RPKM expression value is not correct (must be float): " + str( self.minimumExpression))
 
-        # Check if minimum protein annotation value is consistent
+        # Check if number of workers is consistent
         try:
-            self.lowerTail = int(self.lowerTail)
+            self.workers = int(self.workers)
+            if self.workers < 1:
+                raise RainetException("EnrichmentAnalysisStrategy.execute: Provided number of workers is not correct (must be a positive integer): " + str(self.workers))
         except:
-            raise RainetException("EnrichmentAnalysisStrategy.execute: Provided lower tail option is not correct (must be integer): " + str( self.lowerTail))
+            raise RainetException("EnrichmentAnalysisStrategy.execute: Provided number of workers is not correct (must be a positive integer): " + str(self.workers))
+
+        # Check if random seed is consistent
+        if self.randomSeed != None:
+            try:
+                self.randomSeed = int(self.randomSeed)
+                if self.randomSeed < 0 or self.randomSeed > RandomService.MAXIMUM_SEED:
+                    raise RainetException("EnrichmentAnalysisStrategy.execute: Provided random seed is not correct (must be an integer between 0 and %i): %s" % (RandomService.MAXIMUM_SEED, self.randomSeed))
+            except:
+                raise RainetException("EnrichmentAnalysisStrategy.execute: Provided random seed is not correct (must be an integer between 0 and %i): %s" % (RandomService.MAXIMUM_SEED, self.randomSeed))
 
         #===================================================================
         # Initialisation
@@ -229,6 +298,79 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
                         
         self.analysis()
         
+    # #
+    # Check the parameters of the tests (the ones that can change between the configurations of a parameter sweep),
+    # converting them to their type
+    def check_test_parameters(self):
+
+        # Check if minimum protein annotation value is consistent
+        try:
+            self.minimumProteinAnnotation = int(self.minimumProteinAnnotation)
+        except:
+            raise RainetException("EnrichmentAnalysisStrategy.check_test_parameters: Provided minimum protein annotation value is not correct (must be integer): " + str( self.minimumProteinAnnotation))
+            
+        # Check if minimum protein annotation value is consistent
+        try:
+            self.minimumProteinInteraction = int(self.minimumProteinInteraction)
+        except:
+            raise RainetException("EnrichmentAnalysisStrategy.check_test_parameters: Provided minimum protein interactions value is not correct (must be integer): " + str( self.minimumProteinInteraction))
+
+        # Check if expression warning is consistent
+        if self.expressionWarning != OptionConstants.DEFAULT_EXPRESSION_WARNING:            
+            try:
+                self.expressionWarning = float(self.expressionWarning)
+                if self.expressionWarning < 0.0 or self.expressionWarning > 1.0:
+                    raise RainetException("EnrichmentAnalysisStrategy.check_test_parameters: Provided expression warning value is not correct (must be float between 0.0 and 1.0): " + str(self.expressionWarning))
+            except:
+                raise RainetException("EnrichmentAnalysisStrategy.check_test_parameters: Provided expression warning value is not correct (must be float between 0.0 and 1.0): " + str(self.expressionWarning))
+
+        # Check if minimum protein annotation value is consistent
+        try:
+            self.lowerTail = int(self.lowerTail)
+        except:
+            raise RainetException("EnrichmentAnalysisStrategy.check_test_parameters: Provided lower tail option is not correct (must be integer): " + str( self.lowerTail))
+
+
+    # #
+    # Read the configurations of the parameter sweep: a tab-separated file with a header naming the parameters of the
+    # tests that change (among SWEEP_PARAMETERS, e.g. minimumProteinAnnotation\tlowerTail) and one configuration per line.
+    # The parameters that are not in the file keep the value given on the command line.
+    # Returns the list of configurations (key -> parameter, val -> value)
+    def read_sweep_configurations(self):
+
+        commandLineValues = { name : getattr(self, name) for name in EnrichmentAnalysisStrategy.SWEEP_PARAMETERS}
+        configurations = []
+
+        with FileUtils.open_text_r(self.sweepFile) as inHandler:
+            header = inHandler.readline().strip().split("\t")
+            for name in header:
+                if name not in EnrichmentAnalysisStrategy.SWEEP_PARAMETERS:
+                    raise RainetException("EnrichmentAnalysisStrategy.read_sweep_configurations: Provided sweep parameter is not correct: " + name + ". Must be one of : " + str(sorted(EnrichmentAnalysisStrategy.SWEEP_PARAMETERS)))
+
+            for line in inHandler:
+                if line.strip() == "" or line.startswith("#"):
+                    continue
+                values = line.strip().split("\t")
+                if len(values) != len(header):
+                    raise RainetException("EnrichmentAnalysisStrategy.read_sweep_configurations: Line of the sweep file does not have a value for each parameter: " + line.strip())
+
+                # the values are checked as the ones of the command line
+                for name, value in zip(header, values):
+                    setattr(self, name, value)
+                self.check_test_parameters()
+                configurations.append({ name : getattr(self, name) for name in header})
+
+        for name, value in commandLineValues.iteritems():
+            setattr(self, name, value)
+
+        if len(configurations) == 0:
+            raise RainetException("EnrichmentAnalysisStrategy.read_sweep_configurations: The sweep file does not contain any configuration: " + self.sweepFile)
+
+        Logger.get_instance().info("EnrichmentAnalysisStrategy.read_sweep_configurations : %s configurations in the parameter sweep." % len(configurations))
+
+        return configurations
+
+
     # #
     # Central function to run analysis-related functions in order
     def analysis(self):
@@ -260,7 +402,7 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
         # Load expression data (if needed)
         #===================================================================
            
-        if self.expressionWarning != OptionConstants.DEFAULT_EXPRESSION_WARNING:
+        if self.expressionNeeded:
             
             Timer.get_instance().step("Producing annotation report..")        
             
@@ -278,8 +420,7 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
 #             Timer.get_instance().step( "Writing report.." )
 #             self.write_report()
 # 
-        # Container for results of hypergeom tests so that they don't have to be repeated. 
-        Logger.get_instance().info("EnrichmentAnalysisStrategy.analysis : Number of unique tests performed: %s" % (len(self.testContainer)))
+        Logger.get_instance().info("EnrichmentAnalysisStrategy.analysis : Number of hypergeometric tables of the background: %s" % (len(self.pvalueTable.pairSizes)))
         Logger.get_instance().info("EnrichmentAnalysisStrategy.analysis : Number of tests performed: %s" % (self.countTotalTests))
         
         Timer.get_instance().stop_chrono("Analysis Finished!")
@@ -322,9 +463,13 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
         
         Logger.get_instance().info("get_interaction_data : Loaded %s interacting RNAs. " % str(len(interactingRNAs)))
         
-        # Get interactions
-        queryText = "query( ProteinRNAInteractionCatRAPID.transcriptID, ProteinRNAInteractionCatRAPID.proteinID, ProteinRNAInteractionCatRAPID.interactionScore ).all()"
-        interactions = eval('self.sql_session.' + queryText)
+        # Get interactions, from the columnar interaction store if it is up to date with the table
+        if InteractionStore.is_up_to_date( self.DBPath):
+            interactionStore = InteractionStore( self.DBPath)
+            interactions = interactionStore.get_records( *interactionStore.get_interactions())
+        else:
+            queryText = "query( ProteinRNAInteractionCatRAPID.transcriptID, ProteinRNAInteractionCatRAPID.proteinID, ProteinRNAInteractionCatRAPID.interactionScore ).all()"
+            interactions = eval('self.sql_session.' + queryText)
 
         Logger.get_instance().info("get_interaction_data : Loaded %s interactions. " % str(len(interactions)))
         
@@ -373,74 +518,44 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
         # Define wanted tables         
         tableNameBase = self.annotationTable
         tableNameAnnotation = EnrichmentAnalysisStrategy.ANNOTATION_TABLES_DICT[ tableNameBase]
-         
-        # Get table primary key names 
-        primaryKeys = eval("inspect( " + tableNameAnnotation + ").primary_key") 
-        # e.g. change from ProteinKEGGAnnotation.keggPathway_id to keggPathway_id
-        primaryKeys = [ str(pk).replace(tableNameAnnotation, "")[ 1:] for pk in primaryKeys]
-         
-        # query table containing all pathway/module descriptions
-        baseAnnotations = eval("self.sql_session.query( " + tableNameBase + " ).all()")
-        # query table containing all annotation mappings of pathway-protein
-        proteinAnnotations = eval("self.sql_session.query( " + tableNameAnnotation + " ).all()")
-  
+
+        # protein-annotation memberships of the annotation table, read from the cache of the database when up to date
+        membership = self.get_annotation_membership(tableNameBase, tableNameAnnotation)
+
         #===================================================================   
         # Process annotations
         #=================================================================== 
-         
-        pathwayAnnotDict = {}  # key -> pathway id, value -> list of proteins IDs
-        protAnnotDict = {}  # key -> protein id, value -> list of pathway IDs
- 
-        pathwayAnnotWithInteractionDataDict = {}  # #FOR REPORTING PURPOSES key -> pathway id, value -> list of proteins IDs with interaction data
-        protAnnotWithInteractionDataDict = {}  # key -> protein id (if with interaction data), value -> list of pathway IDs
-        annotWithInteractionDict = {}  # #FOR ANALYSIS PURPOSES. key -> pathway id (if with interaction data), value -> list of proteins IDs with interaction data
+        # Note: the dictionaries are filled in the order of the rows of the annotation table
+
+        if membership.has_duplicates():
+            raise RainetException("EnrichmentAnalysisStrategy.annotation_report: duplicate protein-annotation pair.")
+
+        annotationIDs = membership.annotationIDs
+        proteinIDs = membership.proteinIDs
+        withInteraction = numpy.array([ protID in allProteinsWithInteractionData for protID in proteinIDs], dtype=bool)[ membership.rowProteins]
+
+        # key -> pathway id, value -> list of proteins IDs
+        pathwayAnnotDict = { }
+        for annotCode, protCodes in AnnotationMembership.group_rows(membership.rowAnnotations, membership.rowProteins):
+            pathwayAnnotDict[ annotationIDs[ annotCode]] = [ proteinIDs[ protCode] for protCode in protCodes]
+
+        # key -> protein id, value -> list of pathway IDs
+        protAnnotDict = { }
+        for protCode, annotCodes in AnnotationMembership.group_rows(membership.rowProteins, membership.rowAnnotations):
+            protAnnotDict[ proteinIDs[ protCode]] = [ annotationIDs[ annotCode] for annotCode in annotCodes]
+
+        # #FOR ANALYSIS PURPOSES. key -> pathway id (if with interaction data), value -> list of proteins IDs with interaction data
+        annotWithInteractionDict = { }
+        for annotCode, protCodes in AnnotationMembership.group_rows(membership.rowAnnotations[ withInteraction], membership.rowProteins[ withInteraction]):
+            annotWithInteractionDict[ annotationIDs[ annotCode]] = [ proteinIDs[ protCode] for protCode in protCodes]
+
+        # #FOR REPORTING PURPOSES key -> pathway id, value -> list of proteins IDs with interaction data
+        pathwayAnnotWithInteractionDataDict = dict(annotWithInteractionDict)
 
-        for annot in proteinAnnotations:
-            pathID = str(eval("annot." + primaryKeys[ 0]))
-            protID = str(eval("annot." + primaryKeys[ 1]))
- 
-            # populate dictionaries containing proteins with interaction data
-            if protID in allProteinsWithInteractionData:
-                
-                # initialise if interaction only
-                if pathID not in annotWithInteractionDict:
-                    annotWithInteractionDict[ pathID] = []
-                annotWithInteractionDict[ pathID].append(protID)
-
-                if pathID not in pathwayAnnotWithInteractionDataDict:
-                    pathwayAnnotWithInteractionDataDict[ pathID] = []
-                pathwayAnnotWithInteractionDataDict[ pathID].append(protID)
-                 
-                if protID not in protAnnotWithInteractionDataDict:
-                    protAnnotWithInteractionDataDict[ protID] = []
-
-                if pathID not in protAnnotWithInteractionDataDict[ protID]:
-                    protAnnotWithInteractionDataDict[ protID].append(pathID)
-                else:
-                    raise RainetException("EnrichmentAnalysisStrategy.annotation_report: duplicate protein-annotation pair.")
- 
-            # populate dictionaries containing all proteins
-            # initialise regardless of interaction
-            if pathID not in pathwayAnnotDict:
-                pathwayAnnotDict[ pathID] = []
-            pathwayAnnotDict[ pathID].append(protID)
-             
-            if protID not in protAnnotDict:
-                protAnnotDict[ protID] = []
-            if pathID not in protAnnotDict[ protID]:
-                protAnnotDict[ protID].append(pathID)
-            else:
-                raise RainetException("EnrichmentAnalysisStrategy.annotation_report: duplicate protein-annotation pair.")
-  
         # Note: the protein-pathway annotation table will only contain proteins and pathways which have any annotation
         # add here the pathways which did not have any protein annotation   
-        # get primary key of base pathway table 
-        baseAnnotationsPK = eval("inspect( " + tableNameBase + ").primary_key") 
-        # e.g. from ReactomePathway.reactomeID to reactomeID
-        baseAnnotationsPK = str(baseAnnotationsPK[ 0]).replace(tableNameBase, "")[ 1:]
-  
-        for pathway in baseAnnotations:
-            pathID = str(eval ("pathway." + baseAnnotationsPK))
+        for annotCode in membership.baseAnnotations.tolist():
+            pathID = annotationIDs[ annotCode]
             if pathID not in pathwayAnnotDict:
                 pathwayAnnotDict[ pathID] = []
             if pathID not in pathwayAnnotWithInteractionDataDict:
@@ -521,6 +636,57 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
         Logger.get_instance().info("EnrichmentAnalysisStrategy.annotation_report: Proteins with interactions and with annotations: %s " % str(len(self.proteinWithAnnotationWithInteraction)))
 
  
+    # #
+    # Get the protein-annotation memberships of an annotation table. They are read from the cache of the database if the tables
+    # did not change since the cache was written, otherwise they are queried from the database and written to the cache.
+    # Note: assuming there is two primary keys in annotation table, first pathway ID, then protein ID
+    # Note: assuming there is only one primary key in base annotation table 
+    def get_annotation_membership(self, tableNameBase, tableNameAnnotation):
+
+        tableBase = self.get_table_class(tableNameBase)
+        tableAnnotation = self.get_table_class(tableNameAnnotation)
+
+        tableState = SQLUtil.get_table_state([ tableBase, tableAnnotation])
+        cacheFile = AnnotationMembership.get_cache_file(self.DBPath, tableNameAnnotation)
+        membership = AnnotationMembership.read(cacheFile, tableState)
+        if membership != None:
+            Logger.get_instance().info("EnrichmentAnalysisStrategy.get_annotation_membership: Read memberships of %s from %s" % (tableNameAnnotation, cacheFile))
+            return membership
+
+        # Get table primary key names, e.g. change from ProteinKEGGAnnotation.keggPathway_id to keggPathway_id
+        primaryKeys = [ str(pk).replace(tableNameAnnotation, "")[ 1:] for pk in inspect(tableAnnotation).primary_key]
+        # e.g. from ReactomePathway.reactomeID to reactomeID
+        baseAnnotationsPK = str(inspect(tableBase).primary_key[ 0]).replace(tableNameBase, "")[ 1:]
+
+        # query table containing all annotation mappings of pathway-protein, and table containing all pathway/module descriptions
+        # (all the columns are selected, the rows coming in the same order as the objects of the tables)
+        proteinAnnotations = self.sql_session.query(*tableAnnotation.__table__.columns).all()
+        baseAnnotations = self.sql_session.query(*tableBase.__table__.columns).all()
+
+        membership = AnnotationMembership.from_rows([ (str(getattr(annot, primaryKeys[ 0])), str(getattr(annot, primaryKeys[ 1]))) for annot in proteinAnnotations],
+                                                    [ str(getattr(pathway, baseAnnotationsPK)) for pathway in baseAnnotations])
+        membership.write(cacheFile, tableState)
+
+        return membership
+
+ 
+    # #
+    # Get the class of a table from its name, among the classes imported by this module
+    #
+    # @param tableName : string - The name of the table (the name of its class)
+    #
+    # @return class - The class of the table
+    #
+    # @raise RainetException if no class corresponds to the table name
+    def get_table_class(self, tableName):
+
+        tableClass = globals().get(tableName)
+        if tableClass == None or not hasattr(tableClass, "__table__"):
+            raise RainetException("EnrichmentAnalysisStrategy.get_table_class: No table corresponds to the name " + tableName)
+
+        return tableClass
+
+ 
     # #
     # Perform enrichment analysis
     # Write main output files
@@ -533,29 +699,25 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
         # interactions after interaction filter
         interactions = DataManager.get_instance().get_data(EnrichmentAnalysisStrategy.PRI_KW)
 
-        # For each RNA, store all proteins it interacts with and their annotations
-        rnaInteractions = {}  # Key -> transcript ID, value -> dict; key -> pathway ID, value -> list of prot IDs (after filtering)
-        
+        # For each RNA, store all proteins with annotation it interacts with
+        rnaInteractions = {}  # Key -> transcript ID, value -> set of prot IDs (after filtering)
+
         setInteractingProteins = set()  # stores proteins with at least one interaction
-        
+
         for inter in interactions:
             txID = str(inter.transcriptID)
             protID = str(inter.proteinID)
-            
+
             setInteractingProteins.add(protID)
-                               
+
             # only store info of proteins that have annotation information
-            if protID in self.protAnnotDict: 
+            if protID in self.protAnnotDict:
 
-                # only initialise RNA in dictionary if there is at least one protein with annotation   
+                # only initialise RNA in dictionary if there is at least one protein with annotation
                 if txID not in rnaInteractions:
-                    rnaInteractions[ txID] = {}
+                    rnaInteractions[ txID] = set()
+                rnaInteractions[ txID].add(protID)
 
-                for annot in self.protAnnotDict[ protID]:
-                    if annot not in rnaInteractions[ txID]:
-                        rnaInteractions[ txID][ annot] = []
-                    rnaInteractions[ txID][ annot].append(protID)
-      
         Logger.get_instance().info("EnrichmentAnalysisStrategy.enrichement_analysis: RNAs with interactions: %s " % str(len(rnaInteractions)))
         Logger.get_instance().info("EnrichmentAnalysisStrategy.enrichement_analysis: Proteins with at least one interaction: %s " % str(len(setInteractingProteins)))
         Logger.get_instance().info("EnrichmentAnalysisStrategy.enrichement_analysis: Proteins with annotation: %s " % str(len(self.protAnnotDict)))
@@ -588,20 +750,6 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
         # 
         #===================================================================          
   
-        #===================================================================   
-        # Initialise file with enrichment test per RNA-module pair
-        #===================================================================          
-        # one line per RNA-module (enrichment test)
-        outHandler = FileUtils.open_text_w(self.outputFolder + "/" + EnrichmentAnalysisStrategy.REPORT_ENRICHMENT)
-        outHandler.write("transcriptID\tannotID\tnumber_observed_interactions\tnumber_possible_interactions\tpercent_interacting_proteins\twarning\tpval\tcorrected_pval\tsign_corrected\n")
-
-        #===================================================================   
-        # Initialise file with stats per RNA
-        #===================================================================          
-        # one line per RNA, observed significant tests vs random significant tests
-        outHandlerStats = FileUtils.open_text_w(self.outputFolder + "/" + EnrichmentAnalysisStrategy.REPORT_ENRICHMENT_PER_RNA)
-        outHandlerStats.write("transcriptID\tn_sign_tests_no_warning\tavg_n_sign_random_no_warning\tn_times_above_random\tempiricalPvalue\tsignificant\n")
-
         #===================================================================   
         # Annotation randomization
         #===================================================================          
@@ -614,73 +762,205 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
         if nPermutations < self.numberRandomizations:
             Logger.get_instance().warning("EnrichmentAnalysisStrategy.enrichement_analysis : Number of possible permutations is less than number of randomizations.")           
        
-        # Get list of proteins in a orderly manner
-        listOfProteins = [ prot for annot in sorted(self.annotWithInteractionDict) for prot in sorted(self.annotWithInteractionDict[ annot]) ]
-       
-        # shuffle annotation tags of proteins
-        randomAnnotDicts = [ self.randomize_proteins(self.annotWithInteractionDict, listOfProteins) for i in xrange(0, self.numberRandomizations)]
+        #===================================================================
+        # Sparse matrices of the tests
+        #===================================================================
+        # Proteins and annotations are coded by their index. Membership matrices (proteins x annotations) count
+        # the occurrences of a protein in the list of an annotation, interaction matrix (RNAs x proteins) flags the
+        # proteins an RNA interacts with, so that their product gives the x of all the tests at once.
 
-        #===================================================================   
-        #===================================================================   
+        self.annotationIDs = list(self.annotWithInteractionDict)
+        self.annotationSizes = numpy.array([ len(self.annotWithInteractionDict[ annotID]) for annotID in self.annotationIDs])
+        self.annotationProteins = sorted(self.proteinWithAnnotationWithInteraction)
+        self.annotationProteinIndexes = { prot : index for index, prot in enumerate(self.annotationProteins)}
+
+        self.rnaIDs = sorted(rnaInteractions)
+        self.rnaInteractions = rnaInteractions
+        self.annotationMatrix = self.get_annotation_matrix(self.annotWithInteractionDict, self.annotationIDs, self.annotationProteinIndexes)
+        self.interactionMatrix = self.get_interaction_matrix([ rnaInteractions[ rnaID] for rnaID in self.rnaIDs], self.annotationProteinIndexes)
+        self.observedCounts = self.interactionMatrix.dot(self.annotationMatrix).tocsr()
+
+        #===================================================================
+        # Hypergeometric tables
+        #===================================================================
+        # The tests only depend on the background size, the annotation sizes (m) and the RNA degrees (k): the tails of all
+        # the (m, k) pairs are computed before the tests, stored next to the database and reused by the next runs on the same background.
+        self.rnaDegrees = numpy.array([ len(rnaInteractions[ rnaID]) for rnaID in self.rnaIDs], dtype=numpy.int64)
+        self.pvalueTable = HypergeometricTable(len(backgroundProteins), HypergeometricTable.get_table_file(self.DBPath, backgroundProteins))
+        self.pvalueTable.prepare(self.annotationSizes, self.rnaDegrees)
+
+        #===================================================================
+        # Tests of each configuration
+        #===================================================================
+        # The matrices, the hypergeometric tables and the randomizations above do not depend on the parameters of the tests:
+        # the configurations of a parameter sweep share them, only the tests are run again, in a subfolder per configuration.
+        if self.sweepConfigurations == None:
+            self.run_configuration()
+        else:
+            self.run_sweep()
+
+
+    # #
+    # Run the tests of each configuration of the parameter sweep, with the outputs of configuration i in the
+    # subfolder CONFIGURATION_FOLDER % i of the output folder. The configurations are listed in REPORT_SWEEP.
+    def run_sweep(self):
+
+        mainFolder = self.outputFolder
+        commandLineValues = { name : getattr(self, name) for name in EnrichmentAnalysisStrategy.SWEEP_PARAMETERS}
+        parameterNames = sorted(EnrichmentAnalysisStrategy.SWEEP_PARAMETERS)
+
+        outHandler = FileUtils.open_text_w(mainFolder + "/" + EnrichmentAnalysisStrategy.REPORT_SWEEP)
+        outHandler.write("configuration\t%s\n" % "\t".join(parameterNames))
+        for index, configuration in enumerate(self.sweepConfigurations):
+            outHandler.write("%s\t%s\n" % (EnrichmentAnalysisStrategy.CONFIGURATION_FOLDER % index,
+                                            "\t".join([ str(configuration.get(name, commandLineValues[ name])) for name in parameterNames])))
+        outHandler.close()
+
+        for index, configuration in enumerate(self.sweepConfigurations):
+            Timer.get_instance().step("Running configuration %i of the parameter sweep.." % index)
+
+            for name in parameterNames:
+                value = configuration.get(name, commandLineValues[ name])
+                setattr(self, name, value)
+                self.arguments[ EnrichmentAnalysisStrategy.SWEEP_PARAMETERS[ name]] = value
+
+            self.outputFolder = mainFolder + "/" + EnrichmentAnalysisStrategy.CONFIGURATION_FOLDER % index
+            FileUtils.initialise_output_folders(self.outputFolder)
+            self.arguments[ OptionConstants.OPTION_OUTPUT_FOLDER] = self.outputFolder
+
+            self.run_configuration()
+
+        self.outputFolder = mainFolder
+        self.arguments[ OptionConstants.OPTION_OUTPUT_FOLDER] = mainFolder
+        for name in parameterNames:
+            setattr(self, name, commandLineValues[ name])
+            self.arguments[ EnrichmentAnalysisStrategy.SWEEP_PARAMETERS[ name]] = commandLineValues[ name]
+
+
+    # #
+    # Run the tests of all the RNAs with the current parameters of the tests, writing the reports in the output folder
+    def run_configuration(self):
+
+        if self.expressionWarning != OptionConstants.DEFAULT_EXPRESSION_WARNING:
+            rnasWithoutExpression = [ rnaID for rnaID in self.rnaIDs if rnaID not in self.expressionDict]
+            if len(rnasWithoutExpression) > 0:
+                Logger.get_instance().warning("enrichement_analysis : skipping %s RNAs due to lack of expression data: %s" % (len(rnasWithoutExpression), ",".join(rnasWithoutExpression)))
+
+        #===================================================================
+        # Checkpoint
+        #===================================================================
+        # The randomizations of the run and the RNAs completed are saved in the output folder, so that an interrupted run
+        # can be resumed after its last completed RNA, with the same randomizations.
+        self.parameterHash = self.get_parameter_hash()
+        resumed = self.resume and self.read_checkpoint()
+
+        if not resumed:
+            # shuffle annotation tags of proteins (once, the configurations of a parameter sweep using the same randomizations)
+            if self.randomPermutations is None:
+                self.randomSeed = RandomService.get_instance().set_seed(self.randomSeed)
+                self.randomPermutations = self.get_random_permutations(len(self.annotationProteins))
+            self.write_checkpoint()
+
+        # the parameter log is written again with the random seed of the randomizations
+        self.arguments[ OptionConstants.OPTION_RANDOM_SEED] = self.randomSeed
+        self.write_parameter_log()
+
+        outHandler, outHandlerStats, firstRNA = self.open_reports(resumed)
+
+        #===================================================================
+        #===================================================================
         # Loop RNA to perform tests per RNA
-        #===================================================================          
-        #===================================================================   
-        rnaCounter = 0
+        #===================================================================
+        #===================================================================
+        # RNAs are independent: with several workers, shards of consecutive RNAs are run in parallel
+        if self.workers > 1:
+            self.run_rna_shards(firstRNA, outHandler, outHandlerStats)
+        else:
+            self.run_rna_tests(firstRNA, len(self.rnaIDs), outHandler, outHandlerStats, self.write_journal_entry)
+
+        # Logger.get_instance().info( "EnrichmentAnalysisStrategy.enrichement_analysis: Tests performed: %s " % str( performedTests ) )
+        # Logger.get_instance().info( "EnrichmentAnalysisStrategy.enrichement_analysis: Tests skipped: %s " % str( skippedTests ) )
+   
+        outHandler.close()
+        outHandlerStats.close()
+        self.journalHandler.close()
+        
+
+    # #
+    # Run the tests of the RNAs from index start to end (excluded) of the sorted RNAs, and write their results
+    # If given, the journal function is called with the index of each RNA and the report files once its results are written
+    def run_rna_tests(self, start, end, outHandler, outHandlerStats, journal=None):
+
         # for each RNA with any interaction
-        for rnaID in sorted(rnaInteractions):
-                        
-            rnaCounter += 1
+        for rnaIndex in xrange(start, end):
+
+            rnaID = self.rnaIDs[ rnaIndex]
+
+            rnaCounter = rnaIndex + 1
             if rnaCounter % 100 == 0:
-                Timer.get_instance().step("EnrichmentAnalysisStrategy.enrichement_analysis : processed %s RNAs.." % str(rnaCounter))        
+                Timer.get_instance().step("EnrichmentAnalysisStrategy.enrichement_analysis : processed %s RNAs.." % str(rnaCounter))
 
             # retrieve total number of interactions with annotated proteins for this RNA
-            totalRNAInteractions = { prot for annotID in rnaInteractions[ rnaID] for prot in rnaInteractions[ rnaID][ annotID]}
+            totalRNAInteractions = self.rnaInteractions[ rnaID]
 
-            #===================================================================   
-            # Run real test            
-            #=================================================================== 
-            
-            if self.expressionWarning != OptionConstants.DEFAULT_EXPRESSION_WARNING:            
+            #===================================================================
+            # Run real test
+            #===================================================================
+
+            # skipping rna due to lack of expression data (reported once, see enrichement_analysis)
+            if self.expressionWarning != OptionConstants.DEFAULT_EXPRESSION_WARNING:
                 if rnaID not in self.expressionDict:
-                    Logger.get_instance().warning("enrichement_analysis : skipping rna due to lack of expression data: %s" % (rnaID))
                     continue
-              
-            testsCorrected = self.run_rna_vs_annotations(rnaID, self.annotWithInteractionDict, totalRNAInteractions)
 
-            assert len(testsCorrected) == len(self.annotWithInteractionDict)
+            rnaRow = self.interactionMatrix[ rnaIndex]
+            rnaProteins = [ self.annotationProteins[ index] for index in rnaRow.indices]
+
+            observedMemberships = None
+            if self.expressionWarning != OptionConstants.DEFAULT_EXPRESSION_WARNING:
+                observedMemberships = self.annotationMatrix[ rnaRow.indices]
+
+            skipTests, pvalues, correctedPvalues, significant = self.run_enrichment_tests(rnaID, self.observedCounts[ rnaIndex].toarray(), self.annotationSizes, len(totalRNAInteractions), rnaProteins, observedMemberships)
 
-            #===================================================================          
-            #===================================================================   
+            #===================================================================
+            #===================================================================
             # File with enrichment test per RNA-module pair
-            #===================================================================          
-            #===================================================================          
+            #===================================================================
+            #===================================================================
 
-            for test in testsCorrected:
-                outHandler.write("\t".join(test) + "\n")
+            outHandler.write_tests(rnaIndex, self.observedCounts[ rnaIndex].toarray()[ 0], self.annotationSizes, len(totalRNAInteractions),
+                                   skipTests[ 0], pvalues[ 0], correctedPvalues[ 0], significant[ 0])
 
-            #===================================================================   
+            #===================================================================
             # Randomization tests
-            #===================================================================          
+            #===================================================================
+            # the tests of all randomizations are run at once, one row per randomization
 
-            listRandomSignificants = numpy.empty(self.numberRandomizations, object)
-            listRandomSignificantsNoWarning = numpy.empty(self.numberRandomizations, object)
-            for i in xrange(0, self.numberRandomizations):               
-                randomTestsCorrected = self.run_rna_vs_annotations(rnaID, randomAnnotDicts[ i], totalRNAInteractions)             
-                listRandomSignificants[ i], listRandomSignificantsNoWarning[ i] = self.count_sign_tests(randomTestsCorrected)
+            listRandomSignificants = numpy.zeros(self.numberRandomizations, dtype=int)
+            listRandomSignificantsNoWarning = numpy.zeros(self.numberRandomizations, dtype=int)
+            if self.numberRandomizations > 0:
+                randomCounts = self.get_random_counts(rnaRow.indices, self.randomPermutations, self.annotationMatrix)
+
+                # annotations of the RNA proteins in each randomization, stacked by row
+                randomMemberships = None
+                if self.expressionWarning != OptionConstants.DEFAULT_EXPRESSION_WARNING:
+                    randomMemberships = self.annotationMatrix[ self.randomPermutations[ :, rnaRow.indices].ravel()]
+
+                randomSkipTests, randomPvalues, randomCorrectedPvalues, randomSignificant = self.run_enrichment_tests(rnaID, randomCounts, self.annotationSizes, len(totalRNAInteractions), rnaProteins, randomMemberships)
+                listRandomSignificants, listRandomSignificantsNoWarning = self.count_significant_tests(randomSignificant, randomSkipTests)
 
             # using just Significant no warning
             avgSignRandomNoWarning = numpy.mean(listRandomSignificantsNoWarning)
 
-            #===================================================================          
-            #===================================================================   
+            #===================================================================
+            #===================================================================
             # File with stats per RNA
-            #===================================================================          
-            #===================================================================          
+            #===================================================================
+            #===================================================================
             # count number of significant tests AFTER p-value correction
-            
+
             # stats for the real/observed data
-            countSignificant, countSignificantNoWarning = self.count_sign_tests(testsCorrected)
-            
+            countSignificant, countSignificantNoWarning = [ count[ 0] for count in self.count_significant_tests(significant, skipTests)]
+
             # find position of observed value in respect to random control
             empiricalPvalue, numberAbove = self.empirical_pvalue(listRandomSignificantsNoWarning, countSignificantNoWarning)
             
@@ -691,193 +971,402 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
                 
             outHandlerStats.write("%s\t%i\t%.2f\t%i\t%.1e\t%s\n" % (rnaID, countSignificantNoWarning, avgSignRandomNoWarning, numberAbove, empiricalPvalue, sign))
 
+            if journal != None:
+                journal(rnaIndex, outHandler, outHandlerStats)
+
+
+    # #
+    # Run the tests of the RNAs in a pool of worker processes. Each shard of consecutive RNAs is written to its own
+    # fragment files, which are appended to the reports in the order of the RNAs, from the RNA of index first.
+    # Note: the workers are forked, the structures of the analysis are shared with the main process (copy-on-write).
+    def run_rna_shards(self, first, outHandler, outHandlerStats):
+
+        shardSize = max(1, int(math.ceil((len(self.rnaIDs) - first) / float(self.workers * EnrichmentAnalysisStrategy.SHARDS_PER_WORKER))))
+        shards = [ (start, min(start + shardSize, len(self.rnaIDs))) for start in xrange(first, len(self.rnaIDs), shardSize)]
+
+        Logger.get_instance().info("EnrichmentAnalysisStrategy.run_rna_shards : Running %s shards of RNAs with %s workers." % (len(shards), self.workers))
+
+        pool = multiprocessing.Pool(self.workers, init_enrichment_worker, (self,))
+        try:
+            # shards results come in the order of the shards
+            for fragments, countTotalTests, journalEntries in pool.imap(run_enrichment_shard, shards):
+                (resultsOffset, resultsRows), statsOffset = outHandler.get_offsets(), outHandlerStats.tell()
+                outHandler.append(fragments[ 0])
+                with open(fragments[ 1]) as inHandler:
+                    shutil.copyfileobj(inHandler, outHandlerStats)
+                os.remove(fragments[ 1])
+                self.countTotalTests += countTotalTests
+
+                # the RNAs of the shard are completed once the fragments are in the reports
+                outHandler.flush()
+                outHandlerStats.flush()
+                for rnaIndex, (fragmentOffset, fragmentRows), fragmentStatsOffset in journalEntries:
+                    self.journalHandler.write("%i\t%s\t%i\t%i\t%i\n" % (rnaIndex, self.rnaIDs[ rnaIndex], resultsOffset + fragmentOffset, statsOffset + fragmentStatsOffset, resultsRows + fragmentRows))
+                self.journalHandler.flush()
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+
+    # #
+    # Run the tests of a shard of RNAs in a worker process, writing them to fragment files named after the first RNA index
+    # Returns the fragment files, the number of tests performed and the end offsets of each RNA in the fragments
+    def run_rna_shard(self, start, end):
+
+        fragments = [ "%s/%s.%09i" % (self.outputFolder, report, start) for report in (EnrichmentAnalysisStrategy.REPORT_ENRICHMENT, EnrichmentAnalysisStrategy.REPORT_ENRICHMENT_PER_RNA)]
+        outHandler = self.get_enrichment_report(fragments[ 0], (0, 0))
+        outHandlerStats = FileUtils.open_text_w(fragments[ 1])
+
+        countTotalTests = self.countTotalTests
+        journalEntries = []
+        self.run_rna_tests(start, end, outHandler, outHandlerStats,
+                           lambda rnaIndex, outHandler, outHandlerStats: journalEntries.append((rnaIndex, outHandler.get_offsets(), outHandlerStats.tell())))
 
-        # Logger.get_instance().info( "EnrichmentAnalysisStrategy.enrichement_analysis: Tests performed: %s " % str( performedTests ) )
-        # Logger.get_instance().info( "EnrichmentAnalysisStrategy.enrichement_analysis: Tests skipped: %s " % str( skippedTests ) )
-   
         outHandler.close()
         outHandlerStats.close()
-        
+
+        return fragments, self.countTotalTests - countTotalTests, journalEntries
+
+
+    # #
+    # Get the hash of the parameters of the run and of the RNAs and proteins tested, which must be the same to resume a run
+    def get_parameter_hash(self):
+
+        parameterHash = hashlib.md5()
+        for argName in sorted(self.arguments):
+            if argName not in EnrichmentAnalysisStrategy.RESUME_IGNORED_ARGUMENTS:
+                parameterHash.update("%s\t%s\n" % (argName, self.arguments[ argName]))
+        parameterHash.update("\n".join(self.rnaIDs) + "\n")
+        parameterHash.update("\n".join(self.annotationProteins) + "\n")
+
+        return parameterHash.hexdigest()
+
+
+    # #
+    # Write the checkpoint of the run: the hash of the parameters, the random seed and the randomizations.
+    # The file is written under a temporary name then renamed, so that an interrupted writing does not leave a partial checkpoint.
+    def write_checkpoint(self):
+
+        checkpointFile = self.outputFolder + "/" + EnrichmentAnalysisStrategy.CHECKPOINT_FILE
+        try:
+            with open(checkpointFile + ".tmp", "wb") as checkpointHandler:
+                numpy.savez(checkpointHandler, parameters=self.parameterHash, seed=self.randomSeed, permutations=self.randomPermutations)
+            os.rename(checkpointFile + ".tmp", checkpointFile)
+        except (IOError, OSError) as error:
+            raise RainetException("EnrichmentAnalysisStrategy.write_checkpoint: Unable to write the checkpoint " + checkpointFile + " : " + str(error), error)
+
+
+    # #
+    # Read the random seed and the randomizations of the run to resume from the checkpoint in the output folder.
+    # Returns False if there is no checkpoint (the run is started from the first RNA).
+    #
+    # @raise RainetException if the checkpoint was written by a run with other parameters
+    def read_checkpoint(self):
+
+        checkpointFile = self.outputFolder + "/" + EnrichmentAnalysisStrategy.CHECKPOINT_FILE
+        if not os.path.exists(checkpointFile):
+            Logger.get_instance().warning("EnrichmentAnalysisStrategy.read_checkpoint : No run to resume in " + self.outputFolder + ". The run is started from the first RNA.")
+            return False
+
+        with numpy.load(checkpointFile) as checkpoint:
+            if str(checkpoint[ "parameters"]) != self.parameterHash:
+                raise RainetException("EnrichmentAnalysisStrategy.read_checkpoint: The run of " + self.outputFolder + " has other parameters or data, it cannot be resumed. " +
+                                      "Use another output folder or run the analysis without --resume.")
+            self.randomSeed = RandomService.get_instance().set_seed(int(checkpoint[ "seed"]))
+            self.randomPermutations = checkpoint[ "permutations"]
+
+        Logger.get_instance().info("EnrichmentAnalysisStrategy.read_checkpoint : Resuming the run of %s (random seed %i)." % (self.outputFolder, self.randomSeed))
+
+        return True
+
+
+    # #
+    # Open the report files and the journal of the RNAs completed. When resuming a run, the files are truncated after the last
+    # RNA of the journal (removing the results of the RNA being written when the run was interrupted) and completed from the next RNA.
+    # Returns the report files and the index of the first RNA to test.
+    def open_reports(self, resumed):
+
+        reportFiles = [ self.outputFolder + "/" + report for report in (EnrichmentAnalysisStrategy.REPORT_ENRICHMENT, EnrichmentAnalysisStrategy.REPORT_ENRICHMENT_PER_RNA)]
+        journalFile = self.outputFolder + "/" + EnrichmentAnalysisStrategy.JOURNAL_FILE
+
+        # last complete entry of the journal
+        lastEntry = None
+        if resumed and os.path.exists(journalFile):
+            journalOffset = 0
+            with FileUtils.open_text_r(journalFile) as inHandler:
+                for line in inHandler:
+                    if line.endswith("\n") and journalOffset > 0:
+                        lastEntry = line.split("\t") + [ journalOffset + len(line)]
+                    journalOffset += len(line)
+
+        if lastEntry == None:
+            # one line per RNA-module (enrichment test)
+            outHandler = self.get_enrichment_report(reportFiles[ 0])
+
+            # one line per RNA, observed significant tests vs random significant tests
+            outHandlerStats = FileUtils.open_text_w(reportFiles[ 1])
+            outHandlerStats.write("transcriptID\tn_sign_tests_no_warning\tavg_n_sign_random_no_warning\tn_times_above_random\tempiricalPvalue\tsignificant\n")
+
+            # one line per RNA completed, with the end of its results in the reports
+            self.journalHandler = FileUtils.open_text_w(journalFile)
+            self.journalHandler.write("rnaIndex\ttranscriptID\tresults_offset\tper_rna_offset\tresults_rows\n")
+
+            return outHandler, outHandlerStats, 0
+
+        rnaIndex, rnaID, resultsOffset, statsOffset, resultsRows, journalOffset = lastEntry
+        rnaIndex = int(rnaIndex)
+        if rnaIndex >= len(self.rnaIDs) or self.rnaIDs[ rnaIndex] != rnaID:
+            raise RainetException("EnrichmentAnalysisStrategy.open_reports: The journal of " + self.outputFolder + " does not match the RNAs of the run, it cannot be resumed.")
+
+        outHandler = self.get_enrichment_report(reportFiles[ 0], (int(resultsOffset), int(resultsRows)))
+        outHandlerStats = FileUtils.open_truncated(reportFiles[ 1], int(statsOffset))
+        self.journalHandler = FileUtils.open_truncated(journalFile, journalOffset)
+
+        Logger.get_instance().info("EnrichmentAnalysisStrategy.open_reports : %s RNAs already completed, resuming from RNA %s." % (rnaIndex + 1, rnaIndex + 2))
+
+        return outHandler, outHandlerStats, rnaIndex + 1
+
+
+    # #
+    # Open the report of the enrichment tests (see EnrichmentReport), new or truncated after the given offsets
+    def get_enrichment_report(self, path, offsets=None):
+
+        return EnrichmentReport(path, self.rnaIDs, self.annotationIDs, len(self.backgroundProteins), self.significantOnly, self.columnReport, offsets)
+
+
+    # #
+    # Record in the journal that the results of the RNA of the given index are completed in the reports
+    def write_journal_entry(self, rnaIndex, outHandler, outHandlerStats):
+
+        resultsOffset, resultsRows = outHandler.get_offsets()
+        outHandlerStats.flush()
+        self.journalHandler.write("%i\t%s\t%i\t%i\t%i\n" % (rnaIndex, self.rnaIDs[ rnaIndex], resultsOffset, outHandlerStats.tell(), resultsRows))
+        self.journalHandler.flush()
+
+
+    # #
+    # Build the membership matrix (proteins x annotations) of an annotation dictionary.
+    # A protein present several times in the list of an annotation is counted as many times.
+    def get_annotation_matrix(self, annotation_dict, annotation_ids, protein_indexes):
+
+        rows = [ protein_indexes[ prot] for annotID in annotation_ids for prot in annotation_dict[ annotID]]
+        columns = numpy.repeat(numpy.arange(len(annotation_ids)), [ len(annotation_dict[ annotID]) for annotID in annotation_ids])
+
+        return sparse.coo_matrix((numpy.ones(len(rows), dtype=numpy.int32), (rows, columns)), shape=(len(protein_indexes), len(annotation_ids))).tocsr()
+
+
+    # #
+    # Build the interaction matrix (RNAs x proteins), flagging for each RNA the interacting proteins present in the annotations.
+    def get_interaction_matrix(self, rna_interactions, protein_indexes):
+
+        rows = []
+        columns = []
+        for row, proteins in enumerate(rna_interactions):
+            indexes = sorted([ protein_indexes[ prot] for prot in proteins if prot in protein_indexes])
+            rows.extend([ row] * len(indexes))
+            columns.extend(indexes)
+
+        return sparse.csr_matrix((numpy.ones(len(rows), dtype=numpy.int32), (rows, columns)), shape=(len(rna_interactions), len(protein_indexes)))
+
 
     # #
     # Function to run hypergeometric test of RNA against list of annotations
+    # Note: the analysis itself runs the tests on the membership matrices, see run_enrichment_tests
     def run_rna_vs_annotations(self, rna_id, annotation_dict, total_rna_interactions):
-        
-        pvalues = numpy.empty(len(annotation_dict)) * numpy.nan  # stores list of pvalues to be corrected                  
-        tests = numpy.empty(len(annotation_dict), object)  # stores output from tests
-                                
-        counter = 0
-        # for each annotation with at least one interacting partner
-        for annotID in annotation_dict:
-
-            # keep this as list so that it works even if reshuffling and having replicate proteins in same annotation.
-            protList = []            
-            for prot in annotation_dict[ annotID]:
-                if prot in total_rna_interactions:
-                    protList.append(prot)
-            
-            # number of proteins with annotation that have interaction predictions
-            
-            possibleProtList = self.annotWithInteractionDict[ annotID]
-            
-            assert (len(protList) <= len(possibleProtList)), "RNA cannot interact with more proteins of annotation than existing in annotation"
 
-            # tag whether test does not pass the minimum number of annotations or interactions
-            skipTest = 0
+        annotationIDs = list(annotation_dict)
+        annotationProteins = sorted({ prot for annotID in annotation_dict for prot in annotation_dict[ annotID]})
+        annotationProteinIndexes = { prot : index for index, prot in enumerate(annotationProteins)}
 
-            # Skip test/output if minimum number of items is not respected                   
-            if len(possibleProtList) < self.minimumProteinAnnotation or len(protList) < self.minimumProteinInteraction :
-                skipTest = 1
+        annotationMatrix = self.get_annotation_matrix(annotation_dict, annotationIDs, annotationProteinIndexes)
+        rnaRow = self.get_interaction_matrix([ total_rna_interactions], annotationProteinIndexes)
+        rnaProteins = [ annotationProteins[ index] for index in rnaRow.indices]
 
-            #===================================================================   
-            # Expression warning 
-            #===================================================================          
+        # number of proteins with annotation that have interaction predictions
+        annotationSizes = numpy.array([ len(self.annotWithInteractionDict[ annotID]) for annotID in annotationIDs])
+        counts = rnaRow.dot(annotationMatrix).toarray()
 
-            # Skip test/output if group expression filter is on and filter is not passed
-            if self.expressionWarning != OptionConstants.DEFAULT_EXPRESSION_WARNING:
-                tissueCounts = {}  # key -> tissue name, val -> count of proteins present in tissue
-                for tiss in self.expressionDict[ rna_id]: 
-                    if tiss not in tissueCounts:
-                        tissueCounts[ tiss] = 0
-
-                # for each interacting protein, check which tissues they are expressed
-                for prot in protList:
-                    if prot in self.protTissueExpressions:
-                        for tiss in self.expressionDict[ rna_id]: 
-                            if tiss in self.protTissueExpressions[ prot]:
-                                # i.e. if both RNA and protein present in this tissue
-                                tissueCounts[ tiss] += 1
-                    else:
-                        Logger.get_instance().warning("run_rna_vs_annotations : protein without expression data: %s" % (prot))
-
-                maxTissueOverlap = 0  # store maximum number of proteins present in tissue
-                for tiss in tissueCounts:
-                    if tissueCounts[ tiss] > maxTissueOverlap:
-                        maxTissueOverlap = tissueCounts[ tiss]
-
-                assert maxTissueOverlap <= len(protList), "Maximum number of proteins with interactions in annotation in the same tissue must always be less than number of interacting proteins in annotation"
-
-                # calculate maximum proportion of proteins in same tissue
-                if len(protList) != 0:
-                    overlapProportion = float(maxTissueOverlap) / float(len(protList))
-                else:
-                    # division by zero
-                    overlapProportion = 0
-
-                # if the proportion in same tissue is not sufficient compared to user input proportion
-                if overlapProportion < self.expressionWarning:
-                    skipTest = 1
-
-
-            #===================================================================   
-            # Values for hypergeometric test
-            #===================================================================          
-
-            # Hypergeometric test parameters
-            # note: test for each RNA - annotation pair. 
-            x = len(protList)  # white balls drawn ( proteins with current annotation with positive interactions)
-            m = len(possibleProtList)  # total white balls ( proteins with the current annotation (that have interaction predictions))
-            n = len(self.backgroundProteins) - m  # total black balls ( all the proteins with at least one positive interaction and at least one annotation, but not in current annotation)
-            k = len(total_rna_interactions)  # total number of draws ( proteins with positive interactions, regardless of current annotation)
-
-            assert (m + n >= k), "number of draws should be less than total number of balls"
-
-            # code speed up, don't need to recalculate hypergeom test if already done previously
-            tag = "%s,%s,%s,%s" % (x, m, n, k)
-            if tag in self.testContainer:
-                hyperResult = self.testContainer[ tag]
-            else:
-                # perform the actual test
-                hyperResult = self.hypergeometric_test(x, m, n, k)  # this is the slow part of the code
-                self.testContainer[ tag] = hyperResult
+        skipTests, pvalues, correctedPvalues, significant = self.run_enrichment_tests(rna_id, counts, annotationSizes, len(total_rna_interactions), rnaProteins, annotationMatrix[ rnaRow.indices])
 
-            self.countTotalTests += 1
+        testsCorrected = self.get_test_rows(rna_id, annotationIDs, counts[ 0], annotationSizes, len(total_rna_interactions),
+                                            skipTests[ 0], pvalues[ 0], correctedPvalues[ 0], significant[ 0])
 
-            # store pvalue to be corrected                
-            pvalues[ counter] = hyperResult               
+        return testsCorrected
 
-            percentInteracting = "%.1f%%" % (k * 100.0 / len(self.backgroundProteins))
 
-            text = "%s\t%s\t%s\t%s\t%s\t%s\t%.1e" % (rna_id, annotID, x, m, percentInteracting, skipTest, hyperResult) 
-            tests[ counter] = text.split("\t") 
- 
-            counter += 1
- 
-        #===================================================================   
-        # For each test performed with this RNA
-        #===================================================================          
-        # calculate corrected p values
-                
-        nTests = len(annotation_dict)
-                
-        testsCorrected = self.correct_pvalues(nTests, pvalues, tests)
+    # #
+    # Run the hypergeometric tests of RNA against all annotations, for one or several sets of annotations (e.g. randomizations)
+    #
+    # @param rna_id : string - The RNA tested
+    # @param counts : numpy.array - For each set of annotations (rows) and annotation (columns), the number of proteins of the annotation the RNA interacts with
+    # @param annotation_sizes : numpy.array - For each annotation, the number of proteins with interaction data
+    # @param total_interactions : int - The number of proteins with annotation the RNA interacts with
+    # @param rna_proteins : list - The proteins present in the annotations the RNA interacts with
+    # @param rna_memberships : scipy.sparse.csr_matrix - The annotations of the proteins of rna_proteins, the sets of annotations being
+    # stacked by row (one block of rows per set). Only used by the expression warning.
+    #
+    # @return tuple( numpy.array, numpy.array, numpy.array, numpy.array) - For each test, the warning tag, the p-value, the corrected p-value and the significance tag
+    def run_enrichment_tests(self, rna_id, counts, annotation_sizes, total_interactions, rna_proteins, rna_memberships=None):
+
+        assert (counts <= annotation_sizes).all(), "RNA cannot interact with more proteins of annotation than existing in annotation"
+
+        # tag whether test does not pass the minimum number of annotations or interactions
+        skipTests = (annotation_sizes < self.minimumProteinAnnotation) | (counts < self.minimumProteinInteraction)
+
+        # Skip test/output if group expression filter is on and filter is not passed
+        if self.expressionWarning != OptionConstants.DEFAULT_EXPRESSION_WARNING:
+            skipTests |= self.get_expression_warnings(rna_id, rna_proteins, rna_memberships, counts.shape[ 0]).reshape(counts.shape)
 
-        return testsCorrected
+        #===================================================================
+        # Values for hypergeometric test
+        #===================================================================
+        # x: white balls drawn ( proteins with current annotation with positive interactions)
+        # m: total white balls ( proteins with the current annotation (that have interaction predictions))
+        # n: total black balls ( all the proteins with at least one positive interaction and at least one annotation, but not in current annotation)
+        # k: total number of draws ( proteins with positive interactions, regardless of current annotation)
+        pvalues = self.get_pvalues(counts, annotation_sizes, total_interactions)
+
+        # calculate corrected p values, for each set of tests
+        correctedPvalues = self.multiple_test_correction(pvalues)
+        significant = self.get_significant_tests(pvalues, correctedPvalues)
+
+        return skipTests, pvalues, correctedPvalues, significant
+
+
+    # #
+    # Tag the tests for which the proportion of interacting proteins present in the same tissue as the RNA is not sufficient
+    # compared to user input proportion. Returns one tag per set of annotations and annotation, the set_number sets being
+    # the blocks of rows of rna_memberships (one row per protein of rna_proteins in each block).
+    # The number of proteins of each annotation present in each tissue of the RNA is the product of the memberships and of the
+    # tissue presence of the proteins (see retrieve_expression), the proteins repeated in an annotation being counted as many times.
+    def get_expression_warnings(self, rna_id, rna_proteins, rna_memberships, set_number):
+
+        # tissue presence of the interacting proteins, in the tissues where the RNA is present (proteins without expression data are never present)
+        rnaTissues = [ self.tissueIndexes[ tiss] for tiss in self.expressionDict[ rna_id]]
+        proteinRows = [ self.proteinTissueIndexes.get(prot, -1) for prot in rna_proteins]
+        presence = self.proteinTissues[ numpy.ix_(proteinRows, rnaTissues)].astype(numpy.int32)
+
+        # memberships of the proteins (columns) to the annotations of all sets (rows)
+        memberships = rna_memberships.tocoo()
+        proteinNumber = len(rna_proteins)
+        testNumber = set_number * memberships.shape[ 1]
+        memberships = sparse.csr_matrix((memberships.data, ((memberships.row / proteinNumber) * memberships.shape[ 1] + memberships.col, memberships.row % proteinNumber)),
+                                        shape=(testNumber, proteinNumber))
+
+        tissueCounts = memberships.dot(presence)  # key -> test, tissue of RNA, val -> count of proteins present in tissue
+        protCounts = numpy.asarray(memberships.sum(axis=1)).ravel()  # number of interacting proteins in the annotation
+
+        # store maximum number of proteins present in tissue
+        maxTissueOverlap = numpy.zeros(testNumber, dtype=numpy.int64)
+        if len(rnaTissues) > 0:
+            maxTissueOverlap = tissueCounts.max(axis=1)
+
+        assert (maxTissueOverlap <= protCounts).all(), "Maximum number of proteins with interactions in annotation in the same tissue must always be less than number of interacting proteins in annotation"
+
+        # calculate maximum proportion of proteins in same tissue (0 for the annotations without interacting proteins)
+        overlapProportion = numpy.zeros(testNumber)
+        numpy.divide(maxTissueOverlap, protCounts.astype(float), out=overlapProportion, where=protCounts != 0)
+
+        # if the proportion in same tissue is not sufficient compared to user input proportion
+        return overlapProportion < self.expressionWarning
+
+
+    # #
+    # Get the p-values of hypergeometric tests, given x and m for each test and the number of draws k.
+    # code speed up, don't need to recalculate hypergeom test if already done previously: the p-values are read
+    # from the tables of the background (see HypergeometricTable), the tables missing being computed first.
+    def get_pvalues(self, x, m, k):
+
+        background = len(self.backgroundProteins)
+        if self.pvalueTable == None or self.pvalueTable.backgroundSize != background:
+            self.pvalueTable = HypergeometricTable(background)
+
+        # the tables give the same values as stats.hypergeom.sf, see hypergeometric_test
+        pvalues = self.pvalueTable.get_tails(x, m, k)
+        if not self.lowerTail:
+            # equivalent to R lower.tail = FALSE
+            pvalues = 1 - pvalues
+
+        self.countTotalTests += pvalues.size
+
+        return pvalues
+
+
+    # #
+    # Format the tests of RNA against annotations into the columns of the enrichment report
+    def get_test_rows(self, rna_id, annotation_ids, counts, annotation_sizes, total_interactions, skip_tests, pvalues, corrected_pvalues, significant):
+
+        percentInteracting = EnrichmentReport.get_percent_interacting(total_interactions, len(self.backgroundProteins))
+
+        return [ [ rna_id, annotID, "%i" % x, "%i" % m, percentInteracting, "%i" % skipTest, "%.1e" % pvalue, "%.1e" % correctedPvalue, "%i" % sign]
+                 for annotID, x, m, skipTest, pvalue, correctedPvalue, sign in itertools.izip(annotation_ids, counts.tolist(), annotation_sizes.tolist(), skip_tests.tolist(),
+                                                                                             pvalues.tolist(), corrected_pvalues.tolist(), significant.tolist())]
 
 
     # #
     # Function to correct pvalues, and add correction and significance to provided 'tests' list
     def correct_pvalues(self, nTests, pvalues, tests):
-        
+
         testsCorrected = numpy.empty(nTests, object)  # stores data plus correction
-         
+
         correctedPvalues = self.multiple_test_correction(pvalues)
-        
+
         assert (len(pvalues) == len(correctedPvalues))
 
-        # Correction of test selection, by ranking original pvalues, apply correction, 
-        # select all the original p-values below the first where corrected pvalue is below our threshold
+        significant = self.get_significant_tests(pvalues, correctedPvalues)
 
-        # sort pvalues and keep index        
-        sortedPvalues = sorted(pvalues, reverse=True)
-        sortedPvaluesIdx = sorted(xrange(len(pvalues)), reverse=True, key=lambda k: pvalues[ k])
+        for i in xrange(0, len(tests)):
+            # add corrected pvalue and significative result tag to existing list
+            testsCorrected[ i] = tests[ i][:] + [ "%.1e" % correctedPvalues[ i], "%i" % significant[ i]]
 
-        # correspondece of pvalues -> corrected pvalues of the sorted pvalues array
-        correctedPvaluesOfSorted = [ correctedPvalues[ idx]  for idx in sortedPvaluesIdx]
+        return testsCorrected
 
-        # stores list of indexes deemed significant with our own selection of rejected values from 
-        significantIndexes = []
 
-        # find the first corrected pvalue below our threshold, and pick all the original pvalues on the sorted array as accepted            
-        for i in xrange(len(sortedPvalues)):
-            if correctedPvaluesOfSorted[ i] < EnrichmentAnalysisStrategy.SIGN_VALUE_TEST:
-                significantIndexes = sortedPvaluesIdx[ i: ]
-                break
+    # #
+    # Correction of test selection, by ranking original pvalues, apply correction,
+    # select all the original p-values below the first where corrected pvalue is below our threshold.
+    # As corrected pvalues do not decrease with pvalues, these are the pvalues up to the highest one with a corrected pvalue below the threshold.
+    # Works on the last axis, for several sets of tests at once.
+    def get_significant_tests(self, pvalues, corrected_pvalues):
 
-#         # to observe that some corrected pvalues will be higher than threshold, yet their original pvalue is below the first sorted pvalue to be accepted
-#         for idx in significantIndexes:
-#              
-#             if correctedPvalues[ idx] > EnrichmentAnalysisStrategy.SIGN_VALUE_TEST:
-#                 print "SEE", correctedPvalues[idx], pvalues[idx]
+        pvalues = numpy.asarray(pvalues, dtype=float)
 
-        for i in xrange(0, len(tests)):
-            l = tests[i][:]
-   
-            # add corrected pvalue to existing list
-            corr = "%.1e" % correctedPvalues[i]
-            l.append(corr)
-   
-            # significative result tag
-            sign = "0"
-            if i in significantIndexes:
-                sign = "1"
-   
-            # add sign tag to existing list
-            l.append(sign)
-   
-            # append current list to list of RNA vs annotation
-            testsCorrected[ i] = l
+        thresholds = numpy.where(corrected_pvalues < EnrichmentAnalysisStrategy.SIGN_VALUE_TEST, pvalues, -numpy.inf).max(axis=-1)
+
+        return pvalues <= thresholds[ ..., numpy.newaxis]
 
-        return testsCorrected
 
     # #
     # Run multipletest correction and return pvalues
+    # The Benjamini-Hochberg correction is computed as in statsmodels multipletests, on the last axis for several sets of tests at once.
     def multiple_test_correction(self, pvalues, meth="fdr_bh"):
-        return multipletests(pvalues, method=meth)[1]
+
+        if meth != "fdr_bh":
+            return multipletests(pvalues, method=meth)[1]
+
+        pvalues = numpy.asarray(pvalues, dtype=float)
+        nTests = pvalues.shape[ -1]
+
+        sortedIndexes = numpy.argsort(pvalues, axis=-1)
+        sortedPvalues = numpy.take_along_axis(pvalues, sortedIndexes, axis=-1)
+
+        # pvalue over its rank proportion, with the minimum from the highest pvalues downwards
+        ecdfFactor = numpy.arange(1, nTests + 1) / float(nTests)
+        sortedCorrectedPvalues = numpy.minimum.accumulate((sortedPvalues / ecdfFactor)[ ..., ::-1], axis=-1)[ ..., ::-1]
+        sortedCorrectedPvalues[ sortedCorrectedPvalues > 1] = 1
+
+        correctedPvalues = numpy.empty_like(sortedCorrectedPvalues)
+        numpy.put_along_axis(correctedPvalues, sortedIndexes, sortedCorrectedPvalues, axis=-1)
+
+        return correctedPvalues
 
 
     # #
     # Run hypergeometric test using scipy. Based on R phyper rationel.
+    # x, m, n and k can be arrays, to run several tests at once.
     def hypergeometric_test(self, x, m, n, k):
 
         # Documentation from R phyper function.
@@ -900,13 +1389,13 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
 #         cmd = "Rscript /home/diogo/workspace/tagc-rainet-RNA/src/fr/tagc/rainet/core/execution/analysis/Rscripts/hypergeom_test.R %s %s %s %s" % (x,m,n,k)
 #         os.system(cmd)
         
-        if k > (m + n):
+        if numpy.any(k > (m + n)):
             raise RainetException("EnrichmentAnalysisStrategy.hypergeometric_test: Number of draws is higher than total balls.")                   
-        if m == 0:
+        if numpy.any(m == 0):
             raise RainetException("EnrichmentAnalysisStrategy.hypergeometric_test: Number of white balls is zero.")
-        if k == 0:
+        if numpy.any(k == 0):
             raise RainetException("EnrichmentAnalysisStrategy.hypergeometric_test: Number of draws is zero.")
-        if n < 0:
+        if numpy.any(n < 0):
             raise RainetException("EnrichmentAnalysisStrategy.hypergeometric_test: Number of black balls is negative. Possible issue with protein background.")
             
  
@@ -952,6 +1441,14 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
         return countSignificant, countSignificantNoWarning
 
 
+    # #
+    # Count number of significant tests among tests performed, for each set of tests (last axis)
+    # Returns the number of significant tests regardless of warning and the number of significant tests without a warning
+    def count_significant_tests(self, significant, skip_tests):
+
+        return significant.sum(axis=-1), (significant & ~skip_tests).sum(axis=-1)
+
+
     # #
     # Calculate proportion of random tests that are below observed value
     # Conservative approach: only counts observed below if < random value (not <=)
@@ -1075,15 +1572,15 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
 
 
     # #
-    # Randomize values in a dictionary while keeping the structure of the dictionary
-    # Approach: swap the identify of the protein (e.g. Protein1 becomes Protein2, Protein5 becomes Protein1 etc)
-    def randomize_proteins(self, annotDict, listOfProteins):
+    # Swap the identity of the proteins of a list, drawing from the given stream (random module or random.Random, see RandomService)
+    # Returns a dictionary with key -> old ID of protein, val -> new ID of protein
+    def shuffle_proteins(self, listOfProteins, stream=random):
 
         # remove redundancy in list           
         listOfProteins = list(set(listOfProteins))
 
         # shuffle list of proteins (use of sample with maximum number of sample size, same as shuffle)
-        randomizedListOfProteins = random.sample(listOfProteins, len(listOfProteins))
+        randomizedListOfProteins = stream.sample(listOfProteins, len(listOfProteins))
 
         # assert sorted( listOfProteins) == sorted( randomizedListOfProteins)
 
@@ -1094,13 +1591,50 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
             if oldProtID not in proteinShapeshifter:
                 proteinShapeshifter[ oldProtID] = ""
             else:
-                raise RainetException("EnrichmentAnalysisStrategy.randomize_proteins: randomization issue: original ID is not unique", listOfProteins[ i])
+                raise RainetException("EnrichmentAnalysisStrategy.shuffle_proteins: randomization issue: original ID is not unique", listOfProteins[ i])
             
             # assign new identity to protein
             proteinShapeshifter[ oldProtID] = randomizedListOfProteins[ i]
 
         assert len(proteinShapeshifter) == len(listOfProteins)
 
+        return proteinShapeshifter
+
+
+    # #
+    # Draw the permutations of the randomization control at once, from the stream of the randomizations (see RandomService).
+    # Each randomization is a permuted index vector giving, for each protein, the protein whose annotations it takes
+    # (the identity of the proteins is swapped, as in randomize_proteins).
+    def get_random_permutations(self, protein_number):
+
+        return RandomService.permutations(RandomService.get_instance().get_stream("EnrichmentAnalysis", "permutations"), self.numberRandomizations, protein_number)
+
+
+    # #
+    # Get the number of proteins of each annotation an RNA interacts with, for all the randomizations at once
+    #
+    # @param rna_rows : numpy.array - The indexes of the proteins the RNA interacts with
+    # @param random_permutations : numpy.array - The permuted index vectors of the randomizations (randomizations x proteins)
+    # @param annotation_matrix : scipy.sparse.csr_matrix - The membership matrix (proteins x annotations)
+    #
+    # @return numpy.array - The counts of the tests (randomizations x annotations)
+    def get_random_counts(self, rna_rows, random_permutations, annotation_matrix):
+
+        # in a randomization, the RNA interacts with the annotations of the proteins its partners are swapped with
+        rows = numpy.repeat(numpy.arange(len(random_permutations)), len(rna_rows))
+        columns = random_permutations[ :, rna_rows].ravel()
+        randomInteractions = sparse.csr_matrix((numpy.ones(len(rows), dtype=numpy.int32), (rows, columns)), shape=(len(random_permutations), annotation_matrix.shape[ 0]))
+
+        return randomInteractions.dot(annotation_matrix).toarray()
+
+
+    # #
+    # Randomize values in a dictionary while keeping the structure of the dictionary
+    # Approach: swap the identify of the protein (e.g. Protein1 becomes Protein2, Protein5 becomes Protein1 etc)
+    def randomize_proteins(self, annotDict, listOfProteins, stream=random):
+
+        proteinShapeshifter = self.shuffle_proteins(listOfProteins, stream)
+
         # container of randomized annotation dict
         randomAnnotDict = {}  # key -> annot, val -> list of proteins
 
@@ -1191,6 +1725,20 @@ class EnrichmentAnalysisStrategy(ExecutionStrategy):
         
         Logger.get_instance().info("retrieve_expression : initialised expression data. %s proteins with expression data loaded." % len(self.protTissueExpressions))    
 
+        proteinsWithoutExpression = sorted(set(self.proteinWithAnnotationWithInteraction) - set(self.protTissueExpressions))
+        if len(proteinsWithoutExpression) > 0:
+            Logger.get_instance().warning("retrieve_expression : %s proteins without expression data: %s" % (len(proteinsWithoutExpression), ",".join(proteinsWithoutExpression)))
+
+        #===================================================================    
+        # Tissue presence of the proteins
+        #===================================================================    
+        # boolean matrix (proteins x tissues), with a last row for the proteins without expression data (present in no tissue)
+        self.tissueIndexes = { tiss : index for index, tiss in enumerate(sorted({ tiss for tissues in self.expressionDict.itervalues() for tiss in tissues}))}
+        self.proteinTissueIndexes = { protID : index for index, protID in enumerate(sorted(self.protTissueExpressions))}
+        self.proteinTissues = numpy.zeros((len(self.proteinTissueIndexes) + 1, len(self.tissueIndexes)), dtype=bool)
+        for protID, index in self.proteinTissueIndexes.iteritems():
+            self.proteinTissues[ index, [ self.tissueIndexes[ tiss] for tiss in self.protTissueExpressions[ protID]]] = True
+
 
     # #
     # Run Rscript to produce Sweave file and consequent pdf report, using the data written by this script
@@ -2,12 +2,16 @@
 import shutil
 import os
 from os.path import basename
+from collections import Counter
 
 from fr.tagc.rainet.core.data import DataConstants
 from fr.tagc.rainet.core.data.TableStatus import TableStatus
+from fr.tagc.rainet.core.data.InsertionCheckpoint import InsertionCheckpoint
 from fr.tagc.rainet.core.execution.ExecutionStrategy import ExecutionStrategy
 from fr.tagc.rainet.core.util import Constants
 from fr.tagc.rainet.core.util.exception.RainetException import RainetException
+from fr.tagc.rainet.core.util.factory.DataFactory import DataFactory
+from fr.tagc.rainet.core.util.file.FileUtils import FileUtils
 from fr.tagc.rainet.core.util.log.Logger import Logger
 from fr.tagc.rainet.core.util.option import OptionConstants
 from fr.tagc.rainet.core.util.option.OptionManager import OptionManager
@@ -16,11 +20,15 @@ from fr.tagc.rainet.core.util.parser.NetworkModuleAnnotationParser import Networ
 from fr.tagc.rainet.core.util.parser.NetworkModuleParser import NetworkModuleParser
 from fr.tagc.rainet.core.util.parser.OboParser import OboParser
 from fr.tagc.rainet.core.util.parser.TSVParser import TSVParser
+from fr.tagc.rainet.core.util.parser.CatRAPIDParser import CatRAPIDParser
+from fr.tagc.rainet.core.util.scheduler.InsertionScheduler import InsertionScheduler
 from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
+from fr.tagc.rainet.core.util.sql import SQLConstants
 from fr.tagc.rainet.core.util.sql.SQLUtil import SQLUtil
 from fr.tagc.rainet.core.util.time.Timer import Timer
 from fr.tagc.rainet.core.util.property.PropertyManager import PropertyManager
 from fr.tagc.rainet.core.util.data.DataManager import DataManager
+from fr.tagc.rainet.core.util.data.InteractionStore import InteractionStore
 
 from fr.tagc.rainet.core.data.PPINetwork import PPINetwork
 from fr.tagc.rainet.core.data.PPINetworkInteraction import PPINetworkInteraction
@@ -50,6 +58,31 @@ from fr.tagc.rainet.core.data.ProteinCustomAnnotation import ProteinCustomAnnota
 # This class define the Strategy executing insertion of the various data in database
 class InsertionStrategy( ExecutionStrategy ):
     
+    # The insertion modes of a table (see get_insertion_mode)
+    # -- the table is filled from its source file (not inserted yet or force override)
+    INSERTION_MODE_FULL = "full"
+    # -- the table is cleaned and filled again since its source file changed (update mode)
+    INSERTION_MODE_RELOAD = "reload"
+    # -- only the rows that changed in the source file are applied to the table (update mode)
+    INSERTION_MODE_DELTA = "delta"
+    
+    # #
+    # The constructor. The options are read by the execute method.
+    def __init__( self ):
+        
+        self.forceOverride = False
+        self.resume = False
+        self.update = False
+        self.workers = OptionConstants.DEFAULT_INSERTION_WORKERS
+        self.interactionStore = False
+        # The insertion mode chosen for each table
+        self.insertionModes = {}
+        # The TSV steps filling each table, as list of tuple( table extension, file path, clean table) (see add_TSV_step)
+        self.tableSteps = {}
+        # Indicates, for each table filled by several steps, if one of their source files changed
+        self.sharedTableChanges = {}
+        # The changes applied to the tables by the update mode, as tuple( table name, mode, inserted, updated, deleted)
+        self.updateReport = []
 
     # #
     # The Strategy execution method
@@ -57,6 +90,15 @@ class InsertionStrategy( ExecutionStrategy ):
         
         self.DBPath = OptionManager.get_instance().get_option( OptionConstants.OPTION_DB_NAME )
         self.forceOverride = OptionManager.get_instance().get_option( OptionConstants.OPTION_INSERTION_FORCE_OVERRIDE )
+        self.sqlProfile = OptionManager.get_instance().get_option( OptionConstants.OPTION_INSERTION_SQL_PROFILE )
+        if self.sqlProfile == None:
+            self.sqlProfile = OptionConstants.DEFAULT_INSERTION_SQL_PROFILE
+        self.workers = OptionManager.get_instance().get_option( OptionConstants.OPTION_INSERTION_WORKERS )
+        if self.workers == None:
+            self.workers = OptionConstants.DEFAULT_INSERTION_WORKERS
+        self.resume = OptionManager.get_instance().get_option( OptionConstants.OPTION_INSERTION_RESUME )
+        self.update = OptionManager.get_instance().get_option( OptionConstants.OPTION_INSERTION_UPDATE )
+        self.interactionStore = OptionManager.get_instance().get_option( OptionConstants.OPTION_INSERTION_INTERACTION_STORE )
         self.insert_data()
 
     
@@ -75,6 +117,9 @@ class InsertionStrategy( ExecutionStrategy ):
 #         except IOError as ioe:
 #             Logger.get_instance().info( " warning : Unable to backup database file : " + self.DBPath + " : " + str( ioe))
         
+        # Configure the SQL connections according to the chosen performance profile
+        SQLManager.get_instance().set_profile( self.sqlProfile )
+        
         # Create database sqlite file at the provided path
         SQLManager.get_instance().build_database( self.DBPath, self.forceOverride )
         
@@ -89,6 +134,8 @@ class InsertionStrategy( ExecutionStrategy ):
         # Indicate insertion mode
         if self.forceOverride:
             Logger.get_instance().info( " -- MODE FORCE OVERRIDE -- " )
+        elif self.update:
+            Logger.get_instance().info( " -- MODE UPDATE -- " )
         else:
             Logger.get_instance().info( " -- MODE RESUME -- " )
         
@@ -96,6 +143,10 @@ class InsertionStrategy( ExecutionStrategy ):
         # INSERTION OF DATA
         #=======================================================================
         try:
+            
+            # Declare the insertion steps and the steps they depend on. The steps are executed 
+            # in declaration order by default, the data files being read by worker processes if required
+            scheduler = InsertionScheduler( self.workers )
  
             #===================================================================
             # PROTEIN DEFINITION
@@ -103,23 +154,24 @@ class InsertionStrategy( ExecutionStrategy ):
                
             # Parse the protein file
             input_file = PropertyManager.get_instance().get_property( DataConstants.PROTEIN_UNIPROT_DEFINITION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, True, DataConstants.PROTEIN_HEADERS, DataConstants.PROTEIN_CLASS, DataConstants.PROTEIN_PARAMS, None, DataConstants.PROTEIN_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [], input_file, True, DataConstants.PROTEIN_HEADERS, DataConstants.PROTEIN_CLASS, DataConstants.PROTEIN_PARAMS, None, DataConstants.PROTEIN_COMMENT_CHAR )
     
             # Parse the protein cross references file
             input_file = PropertyManager.get_instance().get_property( DataConstants.PROTEIN_CROSSREFERENCES_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, False, DataConstants.PROTEIN_CROSS_REFERENCE_HEADERS, DataConstants.PROTEIN_CROSS_REFERENCE_CLASS, DataConstants.PROTEIN_CROSS_REFERENCE_PARAMS, None, DataConstants.PROTEIN_CROSS_REFERENCE_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [ DataConstants.PROTEIN_CLASS], input_file, False, DataConstants.PROTEIN_CROSS_REFERENCE_HEADERS, DataConstants.PROTEIN_CROSS_REFERENCE_CLASS, DataConstants.PROTEIN_CROSS_REFERENCE_PARAMS, None, DataConstants.PROTEIN_CROSS_REFERENCE_COMMENT_CHAR )
     
             # Parse the protein isoform file
             input_file = PropertyManager.get_instance().get_property( DataConstants.PROTEIN_ISOFORMS_PROPERTY, True)
-            self.launch_insertion_Fasta( input_file, DataConstants.ISOFORM_CLASS, DataConstants.ISOFORM_REGULAR_EXPRESSION, DataConstants.ISOFORM_GROUPS, DataConstants.ISOFORM_PARAMS, DataConstants.ISOFORM_PARAMS_VALUE_ALTERNATIVE, DataConstants.ISOFORM_COMMENT_CHAR )
+            scheduler.add_step( DataConstants.ISOFORM_CLASS, [ DataConstants.PROTEIN_CLASS],
+                                lambda value_source, input_file = input_file: self.launch_insertion_Fasta( input_file, DataConstants.ISOFORM_CLASS, DataConstants.ISOFORM_REGULAR_EXPRESSION, DataConstants.ISOFORM_GROUPS, DataConstants.ISOFORM_PARAMS, DataConstants.ISOFORM_PARAMS_VALUE_ALTERNATIVE, DataConstants.ISOFORM_COMMENT_CHAR ) )
                 
             # Parse the protein domain file of SMART DB
             input_file = PropertyManager.get_instance().get_property( DataConstants.PROTEIN_DOMAIN_SMART_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, True, DataConstants.PROTEIN_DOMAIN_HEADERS_SMART, DataConstants.PROTEIN_DOMAIN_CLASS, DataConstants.PROTEIN_DOMAIN_PARAM_SMART, DataConstants.PROTEIN_DOMAIN_VALUE_SMART, DataConstants.PROTEIN_DOMAIN_COMMENT_CHAR, "SMART" , False)
+            self.add_TSV_step( scheduler, [], input_file, True, DataConstants.PROTEIN_DOMAIN_HEADERS_SMART, DataConstants.PROTEIN_DOMAIN_CLASS, DataConstants.PROTEIN_DOMAIN_PARAM_SMART, DataConstants.PROTEIN_DOMAIN_VALUE_SMART, DataConstants.PROTEIN_DOMAIN_COMMENT_CHAR, "SMART" , False)
                 
             # Parse the protein domain file of PFAM DB
             input_file = PropertyManager.get_instance().get_property( DataConstants.PROTEIN_DOMAIN_PFAM_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, False, DataConstants.PROTEIN_DOMAIN_HEADERS_PFAM, DataConstants.PROTEIN_DOMAIN_CLASS, DataConstants.PROTEIN_DOMAIN_PARAM_PFAM, DataConstants.PROTEIN_DOMAIN_VALUE_PFAM, DataConstants.PROTEIN_DOMAIN_COMMENT_CHAR, "PFAM", False )
+            self.add_TSV_step( scheduler, [ DataConstants.PROTEIN_DOMAIN_CLASS + "SMART"], input_file, False, DataConstants.PROTEIN_DOMAIN_HEADERS_PFAM, DataConstants.PROTEIN_DOMAIN_CLASS, DataConstants.PROTEIN_DOMAIN_PARAM_PFAM, DataConstants.PROTEIN_DOMAIN_VALUE_PFAM, DataConstants.PROTEIN_DOMAIN_COMMENT_CHAR, "PFAM", False )
     
             #===================================================================
             # FUNCTION AND PATHWAY ANNOTATIONS
@@ -127,19 +179,20 @@ class InsertionStrategy( ExecutionStrategy ):
     
             # Parse the Gene Ontology file
             input_file = PropertyManager.get_instance().get_property( DataConstants.GENE_ONTOLOGY_DEFINITION_PROPERTY, True)
-            self.launch_insertion_Obo( input_file, DataConstants.GENE_ONTOLOGY_CLASS, DataConstants.GENE_ONTOLOGY_ID_TAG, DataConstants.GENE_ONTOLOGY_NAME_TAG, DataConstants.GENE_ONTOLOGY_NAMESPACE_TAG )
+            scheduler.add_step( DataConstants.GENE_ONTOLOGY_CLASS, [],
+                                lambda value_source, input_file = input_file: self.launch_insertion_Obo( input_file, DataConstants.GENE_ONTOLOGY_CLASS, DataConstants.GENE_ONTOLOGY_ID_TAG, DataConstants.GENE_ONTOLOGY_NAME_TAG, DataConstants.GENE_ONTOLOGY_NAMESPACE_TAG ) )
                 
             # Parse the Protein Gene Ontology annotation file
             input_file = PropertyManager.get_instance().get_property( DataConstants.GENE_ONTOLOGY_ANNOTATION_PROPERTY, True)    
-            self.launch_insertion_TSV( input_file, False, DataConstants.PROTEIN_GO_ANNOTATION_HEADERS, DataConstants.PROTEIN_GO_ANNOTATION_CLASS, DataConstants.PROTEIN_GO_ANNOTATION_PARAMS, None, DataConstants.PROTEIN_GO_ANNOTATION_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [ DataConstants.PROTEIN_CLASS, DataConstants.GENE_ONTOLOGY_CLASS], input_file, False, DataConstants.PROTEIN_GO_ANNOTATION_HEADERS, DataConstants.PROTEIN_GO_ANNOTATION_CLASS, DataConstants.PROTEIN_GO_ANNOTATION_PARAMS, None, DataConstants.PROTEIN_GO_ANNOTATION_COMMENT_CHAR )
     
             # Parse the KEGG pathway file
             input_file = PropertyManager.get_instance().get_property( DataConstants.KEGG_PATHWAY_DEFINITION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, True, DataConstants.KEGG_PATHWAY_HEADERS, DataConstants.KEGG_PATHWAY_CLASS, DataConstants.KEGG_PATHWAY_PARAMS, None, DataConstants.KEGG_PATHWAY_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [], input_file, True, DataConstants.KEGG_PATHWAY_HEADERS, DataConstants.KEGG_PATHWAY_CLASS, DataConstants.KEGG_PATHWAY_PARAMS, None, DataConstants.KEGG_PATHWAY_COMMENT_CHAR )
                 
             # Parse the Protein KEGG Pathway annotation file
             input_file = PropertyManager.get_instance().get_property( DataConstants.KEGG_PATHWAY_ANNOTATION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, True, DataConstants.KEGG_PATHWAY_ANNOTATION_HEADERS, DataConstants.KEGG_PATHWAY_ANNOTATION_CLASS, DataConstants.KEGG_PATHWAY_ANNOTATION_PARAMS, None, DataConstants.KEGG_PATHWAY_ANNOTATION_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [ DataConstants.PROTEIN_CLASS, DataConstants.PROTEIN_CROSS_REFERENCE_CLASS, DataConstants.KEGG_PATHWAY_CLASS], input_file, True, DataConstants.KEGG_PATHWAY_ANNOTATION_HEADERS, DataConstants.KEGG_PATHWAY_ANNOTATION_CLASS, DataConstants.KEGG_PATHWAY_ANNOTATION_PARAMS, None, DataConstants.KEGG_PATHWAY_ANNOTATION_COMMENT_CHAR )
                 
             #===================================================================
             # REACTOME
@@ -147,11 +200,11 @@ class InsertionStrategy( ExecutionStrategy ):
     
             # Parse the Reactome pathway file
             input_file = PropertyManager.get_instance().get_property( DataConstants.REACTOME_PATHWAY_DEFINITION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, False, DataConstants.REACTOME_PATHWAY_HEADERS, DataConstants.REACTOME_PATHWAY_CLASS, DataConstants.REACTOME_PATHWAY_PARAMS, None, DataConstants.REACTOME_PATHWAY_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [], input_file, False, DataConstants.REACTOME_PATHWAY_HEADERS, DataConstants.REACTOME_PATHWAY_CLASS, DataConstants.REACTOME_PATHWAY_PARAMS, None, DataConstants.REACTOME_PATHWAY_COMMENT_CHAR )
                 
             # Parse the Protein Reactome Pathway annotation file
             input_file = PropertyManager.get_instance().get_property( DataConstants.REACTOME_PATHWAY_ANNOTATION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, False, DataConstants.REACTOME_PATHWAY_ANNOTATION_HEADERS, DataConstants.REACTOME_PATHWAY_ANNOTATION_CLASS, DataConstants.REACTOME_PATHWAY_ANNOTATION_PARAMS, None, DataConstants.REACTOME_PATHWAY_ANNOTATION_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [ DataConstants.PROTEIN_CLASS, DataConstants.REACTOME_PATHWAY_CLASS], input_file, False, DataConstants.REACTOME_PATHWAY_ANNOTATION_HEADERS, DataConstants.REACTOME_PATHWAY_ANNOTATION_CLASS, DataConstants.REACTOME_PATHWAY_ANNOTATION_PARAMS, None, DataConstants.REACTOME_PATHWAY_ANNOTATION_COMMENT_CHAR )
     
             #===================================================================
             # BIOPLEX
@@ -159,15 +212,15 @@ class InsertionStrategy( ExecutionStrategy ):
     
             # Parse the file listing Bioplex clusters
             input_file = PropertyManager.get_instance().get_property( DataConstants.BIOPLEX_CLUSTER_DEFINITION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, False, DataConstants.BIOPLEX_CLUSTER_HEADERS,
-                                       DataConstants.BIOPLEX_CLUSTER_CLASS, DataConstants.BIOPLEX_CLUSTER_PARAMS,
-                                        None, DataConstants.BIOPLEX_CLUSTER_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [], input_file, False, DataConstants.BIOPLEX_CLUSTER_HEADERS,
+                               DataConstants.BIOPLEX_CLUSTER_CLASS, DataConstants.BIOPLEX_CLUSTER_PARAMS,
+                               None, DataConstants.BIOPLEX_CLUSTER_COMMENT_CHAR )
 
             # Parse the file with Bioplex annotations
             input_file = PropertyManager.get_instance().get_property( DataConstants.BIOPLEX_ANNOTATION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, False, DataConstants.BIOPLEX_ANNOTATION_HEADERS,
-                                       DataConstants.BIOPLEX_ANNOTATION_CLASS, DataConstants.BIOPLEX_ANNOTATION_PARAMS,
-                                        None, DataConstants.BIOPLEX_ANNOTATION_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [ DataConstants.PROTEIN_CLASS, DataConstants.BIOPLEX_CLUSTER_CLASS], input_file, False, DataConstants.BIOPLEX_ANNOTATION_HEADERS,
+                               DataConstants.BIOPLEX_ANNOTATION_CLASS, DataConstants.BIOPLEX_ANNOTATION_PARAMS,
+                               None, DataConstants.BIOPLEX_ANNOTATION_COMMENT_CHAR )
 
             #===================================================================
             # WAN CLUSTERS
@@ -175,15 +228,15 @@ class InsertionStrategy( ExecutionStrategy ):
     
             # Parse the file listing Wan clusters
             input_file = PropertyManager.get_instance().get_property( DataConstants.WAN_CLUSTER_DEFINITION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, False, DataConstants.WAN_CLUSTER_HEADERS,
-                                       DataConstants.WAN_CLUSTER_CLASS, DataConstants.WAN_CLUSTER_PARAMS,
-                                        None, DataConstants.WAN_CLUSTER_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [], input_file, False, DataConstants.WAN_CLUSTER_HEADERS,
+                               DataConstants.WAN_CLUSTER_CLASS, DataConstants.WAN_CLUSTER_PARAMS,
+                               None, DataConstants.WAN_CLUSTER_COMMENT_CHAR )
 
             # Parse the file with Wan annotations
             input_file = PropertyManager.get_instance().get_property( DataConstants.WAN_ANNOTATION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, False, DataConstants.WAN_ANNOTATION_HEADERS,
-                                       DataConstants.WAN_ANNOTATION_CLASS, DataConstants.WAN_ANNOTATION_PARAMS,
-                                        None, DataConstants.WAN_ANNOTATION_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [ DataConstants.PROTEIN_CLASS, DataConstants.WAN_CLUSTER_CLASS], input_file, False, DataConstants.WAN_ANNOTATION_HEADERS,
+                               DataConstants.WAN_ANNOTATION_CLASS, DataConstants.WAN_ANNOTATION_PARAMS,
+                               None, DataConstants.WAN_ANNOTATION_COMMENT_CHAR )
 
 
             #===================================================================
@@ -192,15 +245,15 @@ class InsertionStrategy( ExecutionStrategy ):
     
             # Parse the file listing Corum clusters
             input_file = PropertyManager.get_instance().get_property( DataConstants.CORUM_CLUSTER_DEFINITION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, False, DataConstants.CORUM_CLUSTER_HEADERS,
-                                       DataConstants.CORUM_CLUSTER_CLASS, DataConstants.CORUM_CLUSTER_PARAMS,
-                                        None, DataConstants.CORUM_CLUSTER_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [], input_file, False, DataConstants.CORUM_CLUSTER_HEADERS,
+                               DataConstants.CORUM_CLUSTER_CLASS, DataConstants.CORUM_CLUSTER_PARAMS,
+                               None, DataConstants.CORUM_CLUSTER_COMMENT_CHAR )
 
             # Parse the file with Corum annotations
             input_file = PropertyManager.get_instance().get_property( DataConstants.CORUM_ANNOTATION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, False, DataConstants.CORUM_ANNOTATION_HEADERS,
-                                       DataConstants.CORUM_ANNOTATION_CLASS, DataConstants.CORUM_ANNOTATION_PARAMS,
-                                        None, DataConstants.CORUM_ANNOTATION_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [ DataConstants.PROTEIN_CLASS, DataConstants.CORUM_CLUSTER_CLASS], input_file, False, DataConstants.CORUM_ANNOTATION_HEADERS,
+                               DataConstants.CORUM_ANNOTATION_CLASS, DataConstants.CORUM_ANNOTATION_PARAMS,
+                               None, DataConstants.CORUM_ANNOTATION_COMMENT_CHAR )
 
             #===================================================================
             # CUSTOM CLUSTERS
@@ -208,15 +261,15 @@ class InsertionStrategy( ExecutionStrategy ):
             
             # Parse the file listing Custom clusters
             input_file = PropertyManager.get_instance().get_property( DataConstants.CUSTOM_CLUSTER_DEFINITION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, False, DataConstants.CUSTOM_CLUSTER_HEADERS,
-                                       DataConstants.CUSTOM_CLUSTER_CLASS, DataConstants.CUSTOM_CLUSTER_PARAMS,
-                                        None, DataConstants.CUSTOM_CLUSTER_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [], input_file, False, DataConstants.CUSTOM_CLUSTER_HEADERS,
+                               DataConstants.CUSTOM_CLUSTER_CLASS, DataConstants.CUSTOM_CLUSTER_PARAMS,
+                               None, DataConstants.CUSTOM_CLUSTER_COMMENT_CHAR )
             
             # Parse the file with Custom annotations
             input_file = PropertyManager.get_instance().get_property( DataConstants.CUSTOM_ANNOTATION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, False, DataConstants.CUSTOM_ANNOTATION_HEADERS,
-                                       DataConstants.CUSTOM_ANNOTATION_CLASS, DataConstants.CUSTOM_ANNOTATION_PARAMS,
-                                        None, DataConstants.CUSTOM_ANNOTATION_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [ DataConstants.PROTEIN_CLASS, DataConstants.CUSTOM_CLUSTER_CLASS], input_file, False, DataConstants.CUSTOM_ANNOTATION_HEADERS,
+                               DataConstants.CUSTOM_ANNOTATION_CLASS, DataConstants.CUSTOM_ANNOTATION_PARAMS,
+                               None, DataConstants.CUSTOM_ANNOTATION_COMMENT_CHAR )
     
     
             #===================================================================
@@ -225,114 +278,129 @@ class InsertionStrategy( ExecutionStrategy ):
                 
             # Parse the protein interaction file
             input_file = PropertyManager.get_instance().get_property( DataConstants.INTERACTOME_DEFINITION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, False, DataConstants.INTERACTOME_HEADER, DataConstants.INTERACTOME_CLASS, DataConstants.INTERACTOME_PARAMS, None, DataConstants.INTERACTOME_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [ DataConstants.PROTEIN_CLASS, DataConstants.PROTEIN_CROSS_REFERENCE_CLASS], input_file, False, DataConstants.INTERACTOME_HEADER, DataConstants.INTERACTOME_CLASS, DataConstants.INTERACTOME_PARAMS, None, DataConstants.INTERACTOME_COMMENT_CHAR )
                 
             # Parse the protein interaction network file
             input_file = PropertyManager.get_instance().get_property( DataConstants.INTERACTOME_NETWORK_DEFINITION_PROPERTY, True)
             ppi_default_values = [None, None, os.path.basename( input_file)]
-            self.launch_insertion_TSV( input_file, False, DataConstants.INTERACTOME_NETWORK_HEADER, DataConstants.INTERACTOME_NETWORK_CLASS, DataConstants.INTERACTOME_NETWORK_PARAMS, ppi_default_values, DataConstants.INTERACTOME_NETWORK_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [ DataConstants.PROTEIN_CLASS, DataConstants.PROTEIN_CROSS_REFERENCE_CLASS], input_file, False, DataConstants.INTERACTOME_NETWORK_HEADER, DataConstants.INTERACTOME_NETWORK_CLASS, DataConstants.INTERACTOME_NETWORK_PARAMS, ppi_default_values, DataConstants.INTERACTOME_NETWORK_COMMENT_CHAR )
                 
             # Parse the Network Module file            
             input_file = PropertyManager.get_instance().get_property( DataConstants.INTERACTOME_NETWORK_PARTITION_DEFINITION_PROPERTY, True)
-            self.launch_insertion_NetworkModule( input_file, DataConstants.INTERACTOME_NETWORK_PARTITION_CLASS, DataConstants.INTERACTOME_NETWORK_PARTITION_CLASS_TAG, DataConstants.INTERACTOME_NETWORK_PARTITION_COMMENT_CHAR )
+            scheduler.add_step( DataConstants.INTERACTOME_NETWORK_PARTITION_CLASS, [ DataConstants.PROTEIN_CLASS, DataConstants.PROTEIN_CROSS_REFERENCE_CLASS, DataConstants.INTERACTOME_NETWORK_CLASS],
+                                lambda value_source, input_file = input_file: self.launch_insertion_NetworkModule( input_file, DataConstants.INTERACTOME_NETWORK_PARTITION_CLASS, DataConstants.INTERACTOME_NETWORK_PARTITION_CLASS_TAG, DataConstants.INTERACTOME_NETWORK_PARTITION_COMMENT_CHAR ) )
                 
             # Parse the Network Module Annotation file  
             input_file = PropertyManager.get_instance().get_property( DataConstants.INTERACTOME_NETWORK_PARTITION_ANNOTATION_PROPERTY, True)
-            self.launch_insertion_NetworkModuleAnnotation( input_file, DataConstants.INTERACTOME_NETWORK_PARTITION_ANNOTATION_CLASS, DataConstants.INTERACTOME_NETWORK_PARTITION_ANNOTATION_CLASS_TAG, DataConstants.INTERACTOME_NETWORK_PARTITION_ANNOTATION_CLASS_REGEX, DataConstants.INTERACTOME_NETWORK_PARTITION_ANNOTATION_PROTEIN_TAG, DataConstants.INTERACTOME_NETWORK_PARTITION_ANNOTATION_ANNOTATION_TAG, DataConstants.INTERACTOME_NETWORK_PARTITION_COMMENT_CHAR )
+            scheduler.add_step( DataConstants.INTERACTOME_NETWORK_PARTITION_ANNOTATION_CLASS, [ DataConstants.INTERACTOME_NETWORK_PARTITION_CLASS],
+                                lambda value_source, input_file = input_file: self.launch_insertion_NetworkModuleAnnotation( input_file, DataConstants.INTERACTOME_NETWORK_PARTITION_ANNOTATION_CLASS, DataConstants.INTERACTOME_NETWORK_PARTITION_ANNOTATION_CLASS_TAG, DataConstants.INTERACTOME_NETWORK_PARTITION_ANNOTATION_CLASS_REGEX, DataConstants.INTERACTOME_NETWORK_PARTITION_ANNOTATION_PROTEIN_TAG, DataConstants.INTERACTOME_NETWORK_PARTITION_ANNOTATION_ANNOTATION_TAG, DataConstants.INTERACTOME_NETWORK_PARTITION_COMMENT_CHAR ) )
                 
             # Parse the protein redundancy file
+            # (the Network Modules look for proteins in all cross references: they must be inserted before the redundancy ones)
             input_file = PropertyManager.get_instance().get_property( DataConstants.INTERACTOME_NETWORK_REDUNDANCY_DEFINITION_PROPERTY, True)
             interactome_network_redundancy_definition_value = [None, basename( input_file), None]
-            self.launch_insertion_TSV( input_file, False, DataConstants.INTERACTOME_NETWORK_REDUNDANCY_DEFINITION_HEADERS, DataConstants.INTERACTOME_NETWORK_REDUNDANCY_DEFINITION_CLASS, DataConstants.INTERACTOME_NETWORK_REDUNDANCY_DEFINITION_PARAMS, interactome_network_redundancy_definition_value, DataConstants.INTERACTOME_NETWORK_REDUNDANCY_DEFINITION_COMMENT_CHAR, "Redundancy", False )
+            self.add_TSV_step( scheduler, [ DataConstants.PROTEIN_CROSS_REFERENCE_CLASS, DataConstants.INTERACTOME_CLASS, DataConstants.INTERACTOME_NETWORK_CLASS, DataConstants.INTERACTOME_NETWORK_PARTITION_CLASS, DataConstants.INTERACTOME_NETWORK_PARTITION_ANNOTATION_CLASS],
+                               input_file, False, DataConstants.INTERACTOME_NETWORK_REDUNDANCY_DEFINITION_HEADERS, DataConstants.INTERACTOME_NETWORK_REDUNDANCY_DEFINITION_CLASS, DataConstants.INTERACTOME_NETWORK_REDUNDANCY_DEFINITION_PARAMS, interactome_network_redundancy_definition_value, DataConstants.INTERACTOME_NETWORK_REDUNDANCY_DEFINITION_COMMENT_CHAR, "Redundancy", False )
             
             #===================================================================
             # RNA DEFINITION
             #===================================================================
 
             # Make query of specific type of protein cross references to speed up insertion
-            DataManager.get_instance().perform_query( DataConstants.PROTEIN_ENSP_XREF_KW,
-                                                     "query( ProteinCrossReference.protein_id,ProteinCrossReference.crossReferenceID ).filter(ProteinCrossReference.sourceDB == DataConstants.PROTEIN_ENSP_XREF_DB).all()") 
-            # Convert query into a dictionary
-            DataManager.get_instance().query_to_dict( DataConstants.PROTEIN_ENSP_XREF_KW, 1, 0)
+            scheduler.add_step( DataConstants.PROTEIN_ENSP_XREF_KW, [ DataConstants.PROTEIN_CROSS_REFERENCE_CLASS, DataConstants.INTERACTOME_NETWORK_REDUNDANCY_DEFINITION_CLASS + "Redundancy"],
+                                lambda value_source: self.load_ENSP_cross_references() )
   
             # Parse the RNA file
             input_file = PropertyManager.get_instance().get_property( DataConstants.RNA_DEFINITION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, True, DataConstants.RNA_HEADERS, DataConstants.RNA_CLASS, DataConstants.RNA_PARAMS, None, DataConstants.RNA_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [ DataConstants.PROTEIN_ENSP_XREF_KW], input_file, True, DataConstants.RNA_HEADERS, DataConstants.RNA_CLASS, DataConstants.RNA_PARAMS, None, DataConstants.RNA_COMMENT_CHAR )
     
             # Parse the RNA cross references file
             input_file = PropertyManager.get_instance().get_property( DataConstants.RNA_CROSS_REFERENCE_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, False, DataConstants.RNA_CROSS_REFERENCE_HEADERS, DataConstants.RNA_CROSS_REFERENCE_CLASS, DataConstants.RNA_CROSS_REFERENCE_PARAMS, None, DataConstants.RNA_CROSS_REFERENCE_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [ DataConstants.RNA_CLASS], input_file, False, DataConstants.RNA_CROSS_REFERENCE_HEADERS, DataConstants.RNA_CROSS_REFERENCE_CLASS, DataConstants.RNA_CROSS_REFERENCE_PARAMS, None, DataConstants.RNA_CROSS_REFERENCE_COMMENT_CHAR )
 
             #===================================================================
             # RNA TISSUE EXPRESSION
             #===================================================================
   
-            # Make query of all RNA IDs to speed up insertion
-            DataManager.get_instance().perform_query( DataConstants.RNA_ALL_KW, "query( RNA ).all()") 
-            # Format query into dict data structure
-            DataManager.get_instance().query_to_object_dict( DataConstants.RNA_ALL_KW, "transcriptID")
- 
-            # Make query of all Protein IDs (uniprotAC) to speed up insertion
-            DataManager.get_instance().perform_query( DataConstants.PROT_ALL_KW, "query( Protein ).all()") 
-            # Format query into dict data structure
-            DataManager.get_instance().query_to_object_dict( DataConstants.PROT_ALL_KW, "uniprotAC")
+            # Make query of all RNA and Protein IDs to speed up insertion
+            scheduler.add_step( DataConstants.RNA_ALL_KW, [ DataConstants.RNA_CLASS], lambda value_source: self.load_RNA_IDs() )
+            scheduler.add_step( DataConstants.PROT_ALL_KW, [ DataConstants.PROTEIN_CLASS], lambda value_source: self.load_protein_IDs() )
 
             # Parse the RNA tissue expression file
             input_file = PropertyManager.get_instance().get_property( DataConstants.RNA_TISSUE_EXPRESSION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, True, DataConstants.RNA_TISSUE_EXPRESSION_HEADERS, DataConstants.RNA_TISSUE_EXPRESSION_CLASS,
-                                        DataConstants.RNA_TISSUE_EXPRESSION_PARAMS, DataConstants.RNA_TISSUE_EXPRESSION_VALUE,
-                                        DataConstants.RNA_TISSUE_EXPRESSION_COMMENT_CHAR ) 
+            self.add_TSV_step( scheduler, [ DataConstants.RNA_ALL_KW], input_file, True, DataConstants.RNA_TISSUE_EXPRESSION_HEADERS, DataConstants.RNA_TISSUE_EXPRESSION_CLASS,
+                               DataConstants.RNA_TISSUE_EXPRESSION_PARAMS, DataConstants.RNA_TISSUE_EXPRESSION_VALUE,
+                               DataConstants.RNA_TISSUE_EXPRESSION_COMMENT_CHAR ) 
 
 
             #===================================================================
             # PROTEIN RNA INTERACTION
             #===================================================================
 
-            self.forceOverride = 1
-  
             # Parse the file listing RNA with catRAPID data
             input_file = PropertyManager.get_instance().get_property( DataConstants.INTERACTING_RNA_DEFINITION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, True, DataConstants.INTERACTING_RNA_DEFINITION_HEADERS,
-                                       DataConstants.INTERACTING_RNA_DEFINITION_CLASS, DataConstants.INTERACTING_RNA_DEFINITION_PARAMS,
-                                        None, DataConstants.INTERACTING_RNA_DEFINITION_COMMENT_CHAR )
-   
-    
+            self.add_TSV_step( scheduler, [ DataConstants.RNA_ALL_KW], input_file, True, DataConstants.INTERACTING_RNA_DEFINITION_HEADERS,
+                               DataConstants.INTERACTING_RNA_DEFINITION_CLASS, DataConstants.INTERACTING_RNA_DEFINITION_PARAMS,
+                               None, DataConstants.INTERACTING_RNA_DEFINITION_COMMENT_CHAR, bulk_insertion = True, force_override = True )
    
             # Parse the file listing Proteins with catRAPID data
             input_file = PropertyManager.get_instance().get_property( DataConstants.INTERACTING_PROTEIN_DEFINITION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, True, DataConstants.INTERACTING_PROTEIN_DEFINITION_HEADERS,
-                                       DataConstants.INTERACTING_PROTEIN_DEFINITION_CLASS, DataConstants.INTERACTING_PROTEIN_DEFINITION_PARAMS,
-                                        None, DataConstants.INTERACTING_PROTEIN_DEFINITION_COMMENT_CHAR )
+            self.add_TSV_step( scheduler, [ DataConstants.PROT_ALL_KW], input_file, True, DataConstants.INTERACTING_PROTEIN_DEFINITION_HEADERS,
+                               DataConstants.INTERACTING_PROTEIN_DEFINITION_CLASS, DataConstants.INTERACTING_PROTEIN_DEFINITION_PARAMS,
+                               None, DataConstants.INTERACTING_PROTEIN_DEFINITION_COMMENT_CHAR, bulk_insertion = True, force_override = True )
     
-            # Initialize data items to store missing interactions
+            # Initialize data items to count missing interactions
             if DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_RNA_KW not in DataManager.get_instance().data:
-                DataManager.get_instance().store_data(DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_RNA_KW,[])
+                DataManager.get_instance().store_data(DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_RNA_KW, Counter())
             if DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_PROT_KW not in DataManager.get_instance().data:
-                DataManager.get_instance().store_data(DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_PROT_KW,[])
+                DataManager.get_instance().store_data(DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_PROT_KW, Counter())
                
-            # Parse the ProteinRNAInteractionCatRAPID file
+            # Parse the ProteinRNAInteractionCatRAPID file (streaming)
             input_file = PropertyManager.get_instance().get_property( DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_DEFINITION_PROPERTY, True)
-            self.launch_insertion_TSV( input_file, False, DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_HEADERS,
-                                       DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_CLASS, DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_PARAMS,
-                                        None, DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_COMMENT_CHAR )
+            scheduler.add_step( DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_CLASS, [ DataConstants.RNA_ALL_KW, DataConstants.PROT_ALL_KW],
+                                lambda value_source, input_file = input_file: self.launch_insertion_CatRAPID( input_file, DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_CLASS, DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_COMMENT_CHAR, force_override = True, value_source = value_source ),
+                                CatRAPIDParser.read_rows,
+                                lambda input_file = input_file: [ input_file, DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_COMMENT_CHAR,
+                                                                  self.get_resume_position( DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_CLASS, input_file )[0] ],
+                                lambda: SQLUtil.insert_data_required( DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_CLASS, True ),
+                                producer_after_dependencies = True )
+            
+            # Write (or remove) the columnar copy of the interactions used by the analysis
+            scheduler.add_step( InteractionStore.__name__, [ DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_CLASS],
+                                lambda value_source: self.write_interaction_store() )
    
-            self.forceOverride = 0
-  
+            # Execute the insertion steps
+            scheduler.run()
               
             # Remove data that will no longer be used to reduce memory usage 
             DataManager.get_instance().delete_data(DataConstants.PROTEIN_ENSP_XREF_KW)
             DataManager.get_instance().delete_data(DataConstants.RNA_ALL_KW)
             DataManager.get_instance().delete_data(DataConstants.PROT_ALL_KW)
+            for keyword in [ DataConstants.PROTEIN_ACCESSION_KW, DataConstants.PROTEIN_CROSS_REFERENCE_KEYS_KW, DataConstants.GENE_ALL_KW]:
+                if keyword in DataManager.get_instance().data:
+                    DataManager.get_instance().delete_data( keyword)
            
             
         except RainetException as re:
             Logger.get_instance().error( re.to_string() )
             Timer.get_instance().stop_chrono( "ERROR : Data insertion FAILED" )
+            SQLManager.get_instance().set_keep_session_open( False )
             return
 
         # # Report on potential missing data
         # self.check_missing_data()
+        
+        # Report the changes applied by the update mode
+        if self.update:
+            self.log_update_report()
 
+        # Update the statistics used by the query planner
+        if SQLManager.get_instance().get_profile_setting( SQLConstants.PROFILE_ANALYZE ):
+            Timer.get_instance().step( "Analyzing database:" )
+            SQLManager.get_instance().analyze()
+        
+        # Release the session kept open during insertion (if any)
+        SQLManager.get_instance().set_keep_session_open( False )
         
         # Stop the chrono      
         Timer.get_instance().stop_chrono( "Data insertion finished" )
@@ -350,19 +418,41 @@ class InsertionStrategy( ExecutionStrategy ):
     # @param comment_char : string - the character used to declare comment lines in the data file
     # @param table_extension : string (optional) - Extension to add to the class name to declare a particular sub-case in some classes
     # @param clean_table : boolean  - The information indicating if the related db table must be cleaned before insertion or not 
+    # @param bulk_insertion : boolean (optional) - Indicates if rows must be inserted in bulk mode, bypassing the ORM (see TSVParser)
+    # @param force_override : boolean (optional) - Indicates if the data must be inserted even if they were already inserted
+    # @param value_source : iterator (optional) - The batches read from the file by another process: the rows of the class
+    #                                            if they are built by that process (see build_TSV_rows), the values otherwise
     #
-    def launch_insertion_TSV( self, file_path, has_headers, headers, class_name, params, default_values, comment_char, table_extension = "", clean_table = True ):
+    def launch_insertion_TSV( self, file_path, has_headers, headers, class_name, params, default_values, comment_char, table_extension = "", clean_table = True, bulk_insertion = False, force_override = False, value_source = None ):
         
         composite_table_name = class_name + table_extension
         
         try:
             # Start timing
             Timer.get_instance().step( "Inserting " + composite_table_name + ":" )
-            # Check if the insertion is required not not, depending on the fact the data
-            # were already inserted and theforceOverride option
-            if SQLUtil.insert_data_required( class_name, self.forceOverride, table_extension ) :
-                Logger.get_instance().info( "|--Starting insertion..." )
-                status = TSVParser.parse_file( file_path, has_headers, headers, class_name, params, default_values, comment_char, clean_table )
+            # Check if the insertion is required or not, depending on the fact the data
+            # were already inserted, the forceOverride option and the changes of the file in update mode
+            insertion_mode = self.get_insertion_mode( file_path, class_name, table_extension, clean_table, force_override, self.delta_supported( class_name, clean_table ) )
+            # The batches provided by another process are rows if the rows were built by that process
+            row_source = None
+            if value_source != None and self.build_TSV_rows( file_path, class_name, table_extension, clean_table, bulk_insertion, force_override ):
+                row_source, value_source = value_source, None
+            if insertion_mode == InsertionStrategy.INSERTION_MODE_DELTA:
+                Logger.get_instance().info( "|--Source file changed: applying the changed rows..." )
+                status, change_counts = TSVParser.parse_file_delta( file_path, has_headers, headers, class_name, params, default_values, comment_char, value_source, row_source )
+                self.updateReport.append( ( composite_table_name, insertion_mode ) + change_counts )
+            elif insertion_mode != None :
+                start_offset, start_row_number = self.start_insertion( composite_table_name, file_path, insertion_mode )
+                if start_offset > 0:
+                    clean_table = False
+                row_number = self.count_table_rows( class_name, insertion_mode )
+                index_sql_list = self.drop_table_indexes( class_name )
+                try:
+                    status = TSVParser.parse_file( file_path, has_headers, headers, class_name, params, default_values, comment_char, clean_table, bulk_insertion, value_source,
+                                                   composite_table_name, start_offset, start_row_number, row_source )
+                finally:
+                    SQLManager.get_instance().create_indexes( index_sql_list )
+                self.report_reload( composite_table_name, class_name, insertion_mode, row_number )
             else:
                 Logger.get_instance().info( "|--Data already inserted: insertion bypassed." )
                 status = None
@@ -379,16 +469,409 @@ class InsertionStrategy( ExecutionStrategy ):
         # In all case insert or update the status of the insertion to TableStatus table in DB
         finally:
             if status != None:
-                sql_session = SQLManager.get_instance().get_session()
-                db_status_list = sql_session.query( TableStatus ).filter( TableStatus.tableName == composite_table_name ).all()
-                if db_status_list == None or len( db_status_list) == 0:
-                    sql_session.add( TableStatus( composite_table_name, status, file_path ) )
+                self.save_table_status( composite_table_name, status, file_path, not force_override )
+    
+    # #
+    # Declare to the scheduler the insertion of a TSV (tab separated) file. The file is read by the TSVParser
+    # in a worker process (if any) while the objects are created and inserted by the main process.
+    # When the rows of the class can be built without the ORM (see build_TSV_rows), the worker process also
+    # builds them: it is then started once the dependencies are done, so that it inherits the data they loaded.
+    # The name of the step is the name of the table (class name and extension).
+    #
+    # @param scheduler : InsertionScheduler - The scheduler of the insertion steps
+    # @param dependency_list : list<string> - The names of the steps that must be done before this one
+    # The other parameters are the ones of launch_insertion_TSV
+    #
+    def add_TSV_step( self, scheduler, dependency_list, file_path, has_headers, headers, class_name, params, default_values, comment_char, table_extension = "", clean_table = True, bulk_insertion = False, force_override = False ):
+        
+        self.tableSteps.setdefault( class_name, [] ).append( ( table_extension, file_path, clean_table ) )
+        scheduler.add_step( class_name + table_extension, dependency_list,
+                            lambda value_source: self.launch_insertion_TSV( file_path, has_headers, headers, class_name, params, default_values, comment_char, table_extension, clean_table, bulk_insertion, force_override, value_source ),
+                            InsertionStrategy.read_TSV_batches,
+                            lambda: self.get_TSV_producer_arguments( file_path, has_headers, headers, class_name, params, default_values, comment_char, table_extension, clean_table, bulk_insertion, force_override ),
+                            lambda: self.get_insertion_mode( file_path, class_name, table_extension, clean_table, force_override, self.delta_supported( class_name, clean_table ) ) != None,
+                            DataFactory( class_name ).bulk_insertion_supported() )
+
+    # #
+    # Indicates if the rows of a TSV step are built by the worker process reading the file: the class must
+    # support the bulk insertion mode and the rows must be inserted in bulk mode or applied by difference
+    #
+    # The parameters are the ones of launch_insertion_TSV
+    #
+    # @return True if the worker process builds the rows
+    def build_TSV_rows( self, file_path, class_name, table_extension, clean_table, bulk_insertion, force_override ):
+        
+        if not DataFactory( class_name ).bulk_insertion_supported():
+            return False
+        insertion_mode = self.get_insertion_mode( file_path, class_name, table_extension, clean_table, force_override, self.delta_supported( class_name, clean_table ) )
+        return bulk_insertion or insertion_mode == InsertionStrategy.INSERTION_MODE_DELTA
+
+    # #
+    # Get the arguments of the worker process reading a TSV file (see read_TSV_batches). If the process builds
+    # the rows, the data used to build them are loaded first, so that the process does not use the database.
+    #
+    # The parameters are the ones of launch_insertion_TSV
+    #
+    # @return list - The arguments of read_TSV_batches
+    def get_TSV_producer_arguments( self, file_path, has_headers, headers, class_name, params, default_values, comment_char, table_extension, clean_table, bulk_insertion, force_override ):
+        
+        build_rows = self.build_TSV_rows( file_path, class_name, table_extension, clean_table, bulk_insertion, force_override )
+        if build_rows:
+            DataFactory( class_name ).prepare_row_creation()
+        
+        return [ build_rows, file_path, has_headers, headers, class_name, params, default_values, comment_char, self.get_resume_position( class_name + table_extension, file_path )[0] ]
+
+    # #
+    # Read a TSV file in a worker process and yield its batches: the rows of the class (see TSVParser.read_rows)
+    # or the values of the lines (see TSVParser.read_values)
+    #
+    # @param build_rows : boolean - Indicates if the rows of the class must be built
+    # @param start_offset : int - The byte offset in the file of the first line to read
+    # The other parameters are the ones of launch_insertion_TSV
+    #
+    # @return generator of tuple( int, list) - The byte offset of the first line not read yet and the batch
+    @staticmethod
+    def read_TSV_batches( build_rows, file_path, has_headers, headers, class_name, params, default_values, comment_char, start_offset ):
+        
+        if build_rows:
+            return TSVParser.read_rows( file_path, has_headers, headers, class_name, params, default_values, comment_char, start_offset )
+        return TSVParser.read_values( file_path, has_headers, headers, params, default_values, comment_char, start_offset )
+
+    # #
+    # Load in the DataManager the ENSP cross references of the proteins (used by the MRNA insertion)
+    #
+    def load_ENSP_cross_references( self ):
+        
+        # Make query of specific type of protein cross references to speed up insertion
+        DataManager.get_instance().perform_query( DataConstants.PROTEIN_ENSP_XREF_KW,
+                                                 "query( ProteinCrossReference.protein_id,ProteinCrossReference.crossReferenceID ).filter(ProteinCrossReference.sourceDB == DataConstants.PROTEIN_ENSP_XREF_DB).all()") 
+        # Convert query into a dictionary
+        DataManager.get_instance().query_to_dict( DataConstants.PROTEIN_ENSP_XREF_KW, 1, 0)
+
+    # #
+    # Load in the DataManager the set of all RNA IDs to speed up insertion
+    #
+    def load_RNA_IDs( self ):
+        
+        DataManager.get_instance().perform_query( DataConstants.RNA_ALL_KW, "query( RNA.transcriptID ).all()") 
+        # Format query into set data structure (only IDs are kept in memory)
+        DataManager.get_instance().query_to_set( DataConstants.RNA_ALL_KW, 0)
+
+    # #
+    # Load in the DataManager the set of all Protein IDs (uniprotAC) to speed up insertion
+    #
+    def load_protein_IDs( self ):
+        
+        DataManager.get_instance().perform_query( DataConstants.PROT_ALL_KW, "query( Protein.uniprotAC ).all()") 
+        # Format query into set data structure (only IDs are kept in memory)
+        DataManager.get_instance().query_to_set( DataConstants.PROT_ALL_KW, 0)
+
+    # #
+    # Write the interaction store (columnar copy of the catRAPID interactions) if requested. Otherwise, remove
+    # the existing store since it may not correspond anymore to the interactions of the database.
+    #
+    def write_interaction_store( self ):
+        
+        if self.interactionStore:
+            Timer.get_instance().step( "Writing interaction store:" )
+            InteractionStore.write( self.DBPath, SQLManager.get_instance().get_session() )
+            SQLManager.get_instance().commit()
+        else:
+            InteractionStore.delete( self.DBPath )
+
+    # #
+    # Get the position in the data file from which the insertion of the given table must start: the checkpoint
+    # of the previous interrupted insertion in resume mode, the beginning of the file otherwise.
+    # The checkpoint is ignored if it was saved for another file or if it is beyond the end of the file.
+    #
+    # @param table_name : string - The name of the table (with its extension if any)
+    # @param file_path : string - The path to the data file
+    #
+    # @return tuple( int, int) - The byte offset in the file and the number of rows already inserted
+    def get_resume_position( self, table_name, file_path ):
+        
+        if not self.resume:
+            return 0, 0
+        
+        checkpoint = SQLUtil.get_insertion_checkpoint( table_name )
+        if checkpoint == None:
+            return 0, 0
+        if checkpoint.tableSource != file_path or checkpoint.byteOffset > os.path.getsize( file_path ):
+            Logger.get_instance().warning( "InsertionStrategy.get_resume_position : The checkpoint of table " + table_name + 
+                                           " does not correspond to file " + file_path + ". The insertion is restarted from the beginning of the file." )
+            return 0, 0
+        
+        return checkpoint.byteOffset, checkpoint.rowNumber
+    
+    # #
+    # Log the start of the insertion of the given table and get the position in the data file from which it must start
+    # (see get_resume_position). If the insertion starts from the beginning of the file, the possible checkpoint
+    # of a previous insertion is removed (with the table content, if cleaned).
+    #
+    # @param table_name : string - The name of the table (with its extension if any)
+    # @param file_path : string - The path to the data file
+    # @param insertion_mode : string (optional) - The insertion mode of the table (see get_insertion_mode)
+    #
+    # @return tuple( int, int) - The byte offset in the file and the number of rows already inserted
+    def start_insertion( self, table_name, file_path, insertion_mode = INSERTION_MODE_FULL ):
+        
+        start_offset, start_row_number = self.get_resume_position( table_name, file_path )
+        if start_offset > 0:
+            Logger.get_instance().info( "|--Resuming insertion after %i rows already inserted (byte %i of the file)..." % ( start_row_number, start_offset ) )
+        else:
+            if insertion_mode == InsertionStrategy.INSERTION_MODE_RELOAD:
+                Logger.get_instance().info( "|--Source file changed: reloading the table..." )
+            else:
+                Logger.get_instance().info( "|--Starting insertion..." )
+            SQLUtil.delete_insertion_checkpoint( table_name )
+        
+        return start_offset, start_row_number
+
+    # #
+    # Get the way the given table must be filled:
+    #   - INSERTION_MODE_FULL if the data were not inserted yet (or not correctly) or if the insertion is forced
+    #   - in update mode, if the source file changed since the table was filled (see source_file_changed):
+    #     INSERTION_MODE_DELTA if the rows can be compared to the ones of the table, INSERTION_MODE_RELOAD if the
+    #     table can be cleaned and filled again
+    #   - in update mode, for a table filled by several steps (see is_shared_table), if the source file of one of the steps
+    #     changed: INSERTION_MODE_RELOAD for the step cleaning the table and INSERTION_MODE_FULL for the other steps,
+    #     so that all the data of the table are inserted again
+    #   - None if the table must not be modified
+    # The mode is computed once per table.
+    #
+    # @param file_path : string - The path to the data file
+    # @param class_name : string - The name of the class corresponding to the table
+    # @param table_extension : string (optional) - Extension to add to the class name to declare a particular sub-case in some classes
+    # @param clean_table : boolean (optional) - Indicates if the table is cleaned before insertion
+    # @param force_override : boolean (optional) - Indicates if the data must be inserted even if they were already inserted
+    # @param delta_supported : boolean (optional) - Indicates if the changes of the file can be applied by difference
+    #
+    # @return string - The insertion mode or None
+    def get_insertion_mode( self, file_path, class_name, table_extension = "", clean_table = True, force_override = False, delta_supported = False ):
+        
+        table_name = class_name + table_extension
+        if table_name in self.insertionModes:
+            return self.insertionModes[ table_name]
+        
+        if SQLUtil.insert_data_required( class_name, self.forceOverride or force_override, table_extension ):
+            insertion_mode = InsertionStrategy.INSERTION_MODE_FULL
+        elif not self.update:
+            insertion_mode = None
+        elif self.is_shared_table( class_name ):
+            if not self.shared_table_changed( class_name ):
+                insertion_mode = None
+            elif len( [ step for step in self.tableSteps[ class_name] if step[ 2] ] ) > 0:
+                if clean_table:
+                    insertion_mode = InsertionStrategy.INSERTION_MODE_RELOAD
                 else:
-                    db_status = db_status_list[0]
-                    db_status.tableStatus = status
-                    sql_session.add( db_status )
-                SQLManager.get_instance().commit()
+                    insertion_mode = InsertionStrategy.INSERTION_MODE_FULL
+            else:
+                Logger.get_instance().warning( "InsertionStrategy.get_insertion_mode : A source file of table " + class_name + " changed but the table is shared by several files" +
+                                               " and none of them cleans it. Use the force override mode to insert the new data." )
+                insertion_mode = None
+        elif not self.source_file_changed( table_name, file_path ):
+            insertion_mode = None
+        elif delta_supported:
+            insertion_mode = InsertionStrategy.INSERTION_MODE_DELTA
+        elif clean_table:
+            insertion_mode = InsertionStrategy.INSERTION_MODE_RELOAD
+        else:
+            Logger.get_instance().warning( "InsertionStrategy.get_insertion_mode : The source file of table " + table_name + " changed but the table is not cleaned by its insertion" +
+                                           " and cannot be reloaded. Use the force override mode to insert the new data." )
+            insertion_mode = None
+        
+        self.insertionModes[ table_name] = insertion_mode
+        return insertion_mode
+
+    # #
+    # Indicates if a table is filled by several TSV steps, or by a step with a table extension (a sub-case of the class,
+    # the table being shared with other data). The rows of such a table cannot be compared to the ones of a single file.
+    #
+    # @param class_name : string - The name of the class corresponding to the table
+    #
+    # @return True if the table is shared
+    def is_shared_table( self, class_name ):
+        
+        step_list = self.tableSteps.get( class_name, [] )
+        return len( step_list ) > 1 or len( [ step for step in step_list if step[ 0] != "" ] ) > 0
+
+    # #
+    # Indicates if the source file of one of the steps filling a shared table changed since the table was filled.
+    # The result is computed once per table, before any of its steps saves the fingerprint of its file.
+    #
+    # @param class_name : string - The name of the class corresponding to the table
+    #
+    # @return True if a source file changed
+    def shared_table_changed( self, class_name ):
+        
+        if class_name not in self.sharedTableChanges:
+            changed = False
+            for table_extension, file_path, clean_table in self.tableSteps[ class_name]:
+                if self.source_file_changed( class_name + table_extension, file_path ):
+                    changed = True
+            self.sharedTableChanges[ class_name] = changed
+        
+        return self.sharedTableChanges[ class_name]
+
+    # #
+    # Indicates if the changes of the source file of a table can be applied by difference (see DataFactory.apply_row_delta):
+    # the rows of the class must be buildable without the ORM and the table must be filled by a single step (see is_shared_table)
+    #
+    # @param class_name : string - The name of the class corresponding to the table
+    # @param clean_table : boolean - Indicates if the table is cleaned before insertion
+    #
+    # @return True if the update by difference is possible
+    def delta_supported( self, class_name, clean_table ):
+        
+        return clean_table and not self.is_shared_table( class_name ) and DataFactory( class_name ).bulk_insertion_supported()
+
+    # #
+    # Indicates if the source file of a table changed since the table was filled, using the fingerprint of the file
+    # saved at that time. The file is considered unchanged if its size and modification time did not change, or if
+    # the hashes of its blocks did not change (the fingerprint is then refreshed). A table without fingerprint
+    # or filled from another file is considered changed.
+    #
+    # @param table_name : string - The name of the table (with its extension if any)
+    # @param file_path : string - The path to the data file
+    #
+    # @return True if the file changed
+    def source_file_changed( self, table_name, file_path ):
+        
+        table_fingerprint = SQLUtil.get_table_fingerprint( table_name )
+        if table_fingerprint == None or table_fingerprint.tableSource != file_path:
+            return True
+        
+        file_stat = os.stat( file_path )
+        if file_stat.st_size == table_fingerprint.fileSize and file_stat.st_mtime == table_fingerprint.fileModificationTime:
+            return False
+        
+        if file_stat.st_size != table_fingerprint.fileSize or table_fingerprint.blockSize != Constants.FINGERPRINT_BLOCK_SIZE:
+            return True
+        
+        fingerprint = FileUtils.compute_fingerprint( file_path )
+        if " ".join( fingerprint[ 2] ) != table_fingerprint.blockHashes:
+            return True
+        
+        # Only the modification time changed: keep the new one to avoid hashing the file at the next update
+        SQLUtil.save_table_fingerprint( table_name, file_path, fingerprint )
+        SQLManager.get_instance().commit()
+        return False
+
+    # #
+    # Insert or update the status of the insertion of a table in the TableStatus table. If the insertion did not fail,
+    # the insertion checkpoint is removed and the fingerprint of the source file is saved (used by the update mode).
+    #
+    # @param table_name : string - The name of the table (with its extension if any)
+    # @param status : string - The status of the insertion
+    # @param file_path : string - The path to the data file
+    # @param fingerprint : boolean (optional) - Indicates if the fingerprint of the source file must be saved
+    def save_table_status( self, table_name, status, file_path, fingerprint = True ):
+        
+        if status not in ( Constants.STATUS_ERROR, Constants.STATUS_RAINET_ERROR ):
+            SQLUtil.delete_insertion_checkpoint( table_name )
+            if fingerprint:
+                SQLUtil.save_table_fingerprint( table_name, file_path, FileUtils.compute_fingerprint( file_path ) )
+        sql_session = SQLManager.get_instance().get_session()
+        db_status_list = sql_session.query( TableStatus ).filter( TableStatus.tableName == table_name ).all()
+        if db_status_list == None or len( db_status_list) == 0:
+            sql_session.add( TableStatus( table_name, status, file_path ) )
+        else:
+            db_status = db_status_list[0]
+            db_status.tableStatus = status
+            sql_session.add( db_status )
+        SQLManager.get_instance().commit()
+
+    # #
+    # Count the rows of a table before it is reloaded (to report the changes of the update mode)
+    #
+    # @param class_name : string - The name of the class corresponding to the table
+    # @param insertion_mode : string - The insertion mode of the table
+    #
+    # @return int - The number of rows of the table, or None if the table is not reloaded
+    def count_table_rows( self, class_name, insertion_mode ):
+        
+        if insertion_mode != InsertionStrategy.INSERTION_MODE_RELOAD:
+            return None
+        
+        class_object = DataFactory( class_name ).classObject
+        sql_session = SQLManager.get_instance().get_session()
+        return sql_session.execute( class_object.__table__.count() ).scalar()
+    
+    # #
+    # Record the changes done by the reload of a table: the previous rows are counted as deleted
+    # and the new ones as inserted
+    #
+    # @param table_name : string - The name of the table (with its extension if any)
+    # @param class_name : string - The name of the class corresponding to the table
+    # @param insertion_mode : string - The insertion mode of the table
+    # @param previous_row_number : int - The number of rows of the table before the reload
+    def report_reload( self, table_name, class_name, insertion_mode, previous_row_number ):
+        
+        if insertion_mode == InsertionStrategy.INSERTION_MODE_RELOAD:
+            self.updateReport.append( ( table_name, insertion_mode, self.count_table_rows( class_name, insertion_mode ), 0, previous_row_number ) )
     
+    # #
+    # Log the changes applied to each table by the update mode
+    #
+    def log_update_report( self ):
+        
+        if len( self.updateReport ) == 0:
+            Logger.get_instance().info( "InsertionStrategy.log_update_report : No source file changed: the database is up to date." )
+            return
+        
+        Logger.get_instance().info( "InsertionStrategy.log_update_report : Changes applied by the update:" )
+        for table_name, insertion_mode, inserted, updated, deleted in self.updateReport:
+            Logger.get_instance().info( "|--%s (%s) : %i rows inserted, %i rows updated, %i rows deleted" % ( table_name, insertion_mode, inserted, updated, deleted ) )
+
+    # #
+    # Drop the secondary indexes of the given table before a large insertion, if required by the SQL performance profile
+    #
+    # @param table_name : string - The name of the table
+    #
+    # @return list<string> - The SQL statements to use to rebuild the indexes after insertion
+    def drop_table_indexes( self, table_name ):
+        
+        if SQLManager.get_instance().get_profile_setting( SQLConstants.PROFILE_DEFER_INDEXES ):
+            return SQLManager.get_instance().drop_indexes( table_name )
+        
+        return []
+
+    # # Insert data linked to a catRAPID interaction file, using the streaming CatRAPIDParser
+    #
+    # @param file_path : string - The path to the data file
+    # @param class_name : string - The name of the class corresponding to the table filled
+    # @param comment_char : string - the character used to declare comment lines in the data file
+    # @param clean_table : boolean  - The information indicating if the related db table must be cleaned before insertion or not
+    # @param force_override : boolean (optional) - Indicates if the data must be inserted even if they were already inserted
+    # @param value_source : iterator (optional) - The batches of rows read from the file by another process (see CatRAPIDParser.read_rows)
+    def launch_insertion_CatRAPID( self, file_path, class_name, comment_char, clean_table = True, force_override = False, value_source = None ):
+        
+        try:
+            Timer.get_instance().step( "Inserting " + class_name + ":" )
+            if SQLUtil.insert_data_required( class_name, self.forceOverride or force_override ) :
+                start_offset, start_row_number = self.start_insertion( class_name, file_path )
+                if start_offset > 0:
+                    clean_table = False
+                index_sql_list = self.drop_table_indexes( class_name )
+                try:
+                    status = CatRAPIDParser.parse_file( file_path, comment_char, clean_table, value_source, class_name, start_offset, start_row_number )
+                finally:
+                    SQLManager.get_instance().create_indexes( index_sql_list )
+            else:
+                Logger.get_instance().info( "|--Data already inserted: insertion bypassed." )
+                status = None
+        except RainetException as re:
+            Logger.get_instance().error( re.to_string() )
+            status = Constants.STATUS_RAINET_ERROR
+            raise re
+        except Exception as e:
+            Logger.get_instance().error( e.message )
+            status = Constants.STATUS_ERROR
+            raise RainetException( "Abnormal Exception during insertion of " + class_name, e )
+        finally:
+            if status != None:
+                self.save_table_status( class_name, status, file_path, not force_override )
+
     # # Insert data linked to a network module (.clas) file
     #
     # @param file_path : string - The path to the data file
@@ -400,9 +883,12 @@ class InsertionStrategy( ExecutionStrategy ):
         
         try:
             Timer.get_instance().step( "Inserting " + class_name + ":" )
-            if SQLUtil.insert_data_required( class_name, self.forceOverride ) :
-                Logger.get_instance().info( "|--Starting insertion..." )
+            insertion_mode = self.get_insertion_mode( file_path, class_name, clean_table = clean_table )
+            if insertion_mode != None :
+                self.start_insertion( class_name, file_path, insertion_mode )
+                row_number = self.count_table_rows( class_name, insertion_mode )
                 status = NetworkModuleParser.parse_file( file_path, class_tag, comment_char, clean_table )
+                self.report_reload( class_name, class_name, insertion_mode, row_number )
             else:
                 Logger.get_instance().info( "|--Data already inserted: insertion bypassed." )
                 status = None
@@ -416,15 +902,7 @@ class InsertionStrategy( ExecutionStrategy ):
             raise RainetException( "Abnormal Exception during insertion of " + class_name, e )
         finally:
             if status != None:
-                sql_session = SQLManager.get_instance().get_session()
-                db_status_list = sql_session.query( TableStatus ).filter( TableStatus.tableName == class_name ).all()
-                if db_status_list == None or len( db_status_list) == 0:
-                    sql_session.add( TableStatus( class_name, status, file_path ) )
-                else:
-                    db_status = db_status_list[0]
-                    db_status.tableStatus = status
-                    sql_session.add( db_status )
-                SQLManager.get_instance().commit()
+                self.save_table_status( class_name, status, file_path )
                 
     # # Insert data linked to a network module annotation file
     #
@@ -439,9 +917,12 @@ class InsertionStrategy( ExecutionStrategy ):
         
         try:
             Timer.get_instance().step( "Inserting " + class_name + ":" )
-            if SQLUtil.insert_data_required( class_name, self.forceOverride ) :
-                Logger.get_instance().info( "|--Starting insertion..." )
+            insertion_mode = self.get_insertion_mode( file_path, class_name, clean_table = clean_table )
+            if insertion_mode != None :
+                self.start_insertion( class_name, file_path, insertion_mode )
+                row_number = self.count_table_rows( class_name, insertion_mode )
                 status = NetworkModuleAnnotationParser.parse_file( file_path, class_tag, class_regex, protein_tag, annotation_tag, comment_char, clean_table )
+                self.report_reload( class_name, class_name, insertion_mode, row_number )
             else:
                 Logger.get_instance().info( "|--Data already inserted: insertion bypassed." )
                 status = None
@@ -455,15 +936,7 @@ class InsertionStrategy( ExecutionStrategy ):
             raise RainetException( "Abnormal Exception during insertion of " + class_name, e )
         finally:
             if status != None:
-                sql_session = SQLManager.get_instance().get_session()
-                db_status_list = sql_session.query( TableStatus ).filter( TableStatus.tableName == class_name ).all()
-                if db_status_list == None or len( db_status_list) == 0:
-                    sql_session.add( TableStatus( class_name, status, file_path ) )
-                else:
-                    db_status = db_status_list[0]
-                    db_status.tableStatus = status
-                    sql_session.add( db_status )
-                SQLManager.get_instance().commit()
+                self.save_table_status( class_name, status, file_path )
         
         
     # Insert data linked to an OBO file
@@ -478,9 +951,12 @@ class InsertionStrategy( ExecutionStrategy ):
         
         try:
             Timer.get_instance().step( "Inserting " + class_name + ":" )
-            if SQLUtil.insert_data_required( class_name, self.forceOverride ) :
-                Logger.get_instance().info( "|--Starting insertion..." )
+            insertion_mode = self.get_insertion_mode( file_path, class_name, clean_table = clean_table )
+            if insertion_mode != None :
+                self.start_insertion( class_name, file_path, insertion_mode )
+                row_number = self.count_table_rows( class_name, insertion_mode )
                 status = OboParser.parse_file( file_path, id_tag, name_tag, namespace_tag, clean_table )
+                self.report_reload( class_name, class_name, insertion_mode, row_number )
             else:
                 Logger.get_instance().info( "|--Data already inserted: insertion bypassed." )
                 status = None
@@ -494,15 +970,7 @@ class InsertionStrategy( ExecutionStrategy ):
             raise RainetException( "Abnormal Exception during insertion of " + class_name, e )
         finally:
             if status != None:
-                sql_session = SQLManager.get_instance().get_session()
-                db_status_list = sql_session.query( TableStatus ).filter( TableStatus.tableName == class_name ).all()
-                if db_status_list == None or len( db_status_list) == 0:
-                    sql_session.add( TableStatus( class_name, status, file_path ) )
-                else:
-                    db_status = db_status_list[0]
-                    db_status.tableStatus = status
-                    sql_session.add( db_status )
-                SQLManager.get_instance().commit()
+                self.save_table_status( class_name, status, file_path )
         
     # #
     # Insert data linked to a FASTA file
@@ -519,9 +987,15 @@ class InsertionStrategy( ExecutionStrategy ):
         
         try:
             Timer.get_instance().step( "Inserting " + class_name + ":" )
-            if SQLUtil.insert_data_required( class_name, self.forceOverride ) :
-                Logger.get_instance().info( "|--Starting insertion..." )
-                status = FastaParser.parse_file( file_path, class_name, regex, groups, params, params_values, comment_char, clean_table )
+            insertion_mode = self.get_insertion_mode( file_path, class_name, clean_table = clean_table )
+            if insertion_mode != None :
+                start_offset, start_row_number = self.start_insertion( class_name, file_path, insertion_mode )
+                if start_offset > 0:
+                    clean_table = False
+                row_number = self.count_table_rows( class_name, insertion_mode )
+                status = FastaParser.parse_file( file_path, class_name, regex, groups, params, params_values, comment_char, clean_table,
+                                                 class_name, start_offset, start_row_number )
+                self.report_reload( class_name, class_name, insertion_mode, row_number )
             else:
                 Logger.get_instance().info( "|--Data already inserted: insertion bypassed." )
                 status = None
@@ -535,15 +1009,7 @@ class InsertionStrategy( ExecutionStrategy ):
             raise RainetException( "Abnormal Exception during insertion of " + class_name, e )
         finally:
             if status != None:
-                sql_session = SQLManager.get_instance().get_session()
-                db_status_list = sql_session.query( TableStatus ).filter( TableStatus.tableName == class_name ).all()
-                if db_status_list == None or len( db_status_list) == 0:
-                    sql_session.add( TableStatus( class_name, status, file_path ) )
-                else:
-                    db_status = db_status_list[0]
-                    db_status.tableStatus = status
-                    sql_session.add( db_status )
-                SQLManager.get_instance().commit()
+                self.save_table_status( class_name, status, file_path )
 
 #     #
 #     # Report on data that failed to be inserted in the database
@@ -553,9 +1019,9 @@ class InsertionStrategy( ExecutionStrategy ):
 #  
 #         # Report on failed insertions during Protein-RNA interaction insertion
 #         Logger.get_instance().info("During ProteinRNAInteractionCatRAPID insertion: Number of protein IDs that failed to be found in database: " + 
-#                     str(len(DataManager.get_instance().get_data(DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_PROT_KW) ) ) )
+#                     str(sum(DataManager.get_instance().get_data(DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_PROT_KW).values() ) ) )
 #         Logger.get_instance().info("During ProteinRNAInteractionCatRAPID insertion: Number of transcript IDs that failed to be found in database: " + 
-#                     str(len(DataManager.get_instance().get_data(DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_RNA_KW) ) ) )
+#                     str(sum(DataManager.get_instance().get_data(DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_RNA_KW).values() ) ) )
 
 
     def check_database_tables(self):
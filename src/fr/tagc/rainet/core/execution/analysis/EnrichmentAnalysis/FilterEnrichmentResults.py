@@ -1,6 +1,7 @@
 import sys
 import os
 import argparse
+import itertools
 
 import numpy as np
 # import pandas as pd
@@ -8,6 +9,7 @@ import numpy as np
 from fr.tagc.rainet.core.util.exception.RainetException import RainetException
 from fr.tagc.rainet.core.util.log.Logger import Logger
 from fr.tagc.rainet.core.util.time.Timer import Timer
+from fr.tagc.rainet.core.util.data.EnrichmentReport import EnrichmentReport
 
 # from fr.tagc.rainet.core.util.subprocess.SubprocessUtil import SubprocessUtil
 # from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
@@ -35,6 +37,8 @@ SCRIPT_NAME = "FilterEnrichmentResults.py"
 # 2) If random has zero significant, ratio is close to infinite
 # 3) When using topEnrichmentsPerComplex option, get all enrichments with same number of observed interactions in case of draw
 # 4) Output matrix file is written after the enrichment_per_rna random filtering and minimumProteinInteraction filtering, but before other optional filters
+# 5) If enrichment_results was written with its binary columns (EnrichmentAnalysis --columnReport), the columns are read instead of the file,
+#    only the lines of the RNAs passing the enrichment_per_rna filter being formatted
 #===============================================================================
 
 
@@ -213,63 +217,69 @@ class FilterEnrichmentResults(object):
     
         filteredEnrichmentResults = [] # lists with enrichment results after filter (same as output file)
     
-        with open( self.enrichmentResultsFile, "r") as inFile:
+        if EnrichmentReport.has_columns( self.enrichmentResultsFile):
+            # the columns contain all the tests, even when the file only contains the significant ones
+            filteredEnrichmentResults.append( EnrichmentReport.HEADER)
+            dictPairs, setRNAs, setAnnots, nonEnrichedAnnotations, excludedByRNA, excludedByMinimumInteractions = \
+                self.read_enrichment_results_columns( list_rna_significant_enrich, filteredEnrichmentResults)
+        else:
+            with open( self.enrichmentResultsFile, "r") as inFile:
             
-            header = inFile.readline()
-#             outFile1.write( header) # transport header
-            filteredEnrichmentResults.append( header)
+                header = inFile.readline()
+#                 outFile1.write( header) # transport header
+                filteredEnrichmentResults.append( header)
     
-            for line in inFile:
+                for line in inFile:
                 
-                # First check if all the results with this RNA should be filtered out or not
-                txID = line.split("\t")[0]
+                    # First check if all the results with this RNA should be filtered out or not
+                    txID = line.split("\t")[0]
     
-                if txID not in list_rna_significant_enrich:
-                    excludedByRNA += 1
-                    continue
+                    if txID not in list_rna_significant_enrich:
+                        excludedByRNA += 1
+                        continue
     
-                # RNA was not filtered out:    
-                line = line.strip()
-                spl = line.split( "\t")
+                    # RNA was not filtered out:    
+                    line = line.strip()
+                    spl = line.split( "\t")
                 
-                annotID = spl[1]
-                nObservedInteractions = int( spl[2])
-                warningFlag = int( spl[5])
-                signFlag = int( spl[8])
+                    annotID = spl[1]
+                    nObservedInteractions = int( spl[2])
+                    warningFlag = int( spl[5])
+                    signFlag = int( spl[8])
                 
-                value = spl[ self.matrixValueColumn] # can be p-value, corrected p-value or significant boolean
-    
-                # if filtering is on
-                if self.filterWarningColumn:
-                    # If value is determined not significant OR is tagged with a warning (for several reasons), fill it with constant value. 
-                    if warningFlag or signFlag == 0:
-                        value = self.filterWarningValue
-                    # apply filter for minimum number of interactions in enrichment
-                    elif self.minimumProteinInteraction != -1 and nObservedInteractions < self.minimumProteinInteraction:
-                        excludedByMinimumInteractions += 1
-                        value = self.filterWarningValue
+                    value = spl[ self.matrixValueColumn] # can be p-value, corrected p-value or significant boolean
+    
+                    # if filtering is on
+                    if self.filterWarningColumn:
+                        # If value is determined not significant OR is tagged with a warning (for several reasons), fill it with constant value. 
+                        if warningFlag or signFlag == 0:
+                            value = self.filterWarningValue
+                        # apply filter for minimum number of interactions in enrichment
+                        elif self.minimumProteinInteraction != -1 and nObservedInteractions < self.minimumProteinInteraction:
+                            excludedByMinimumInteractions += 1
+                            value = self.filterWarningValue
+                        else:
+                            filteredEnrichmentResults.append( line)
+    
+                    pair = txID + "|" + annotID
+                    if pair not in dictPairs:
+                        dictPairs[ pair] = value
                     else:
-                        filteredEnrichmentResults.append( line)
+                        raise RainetException("read_enrichment_results_file: duplicate key", pair)
     
-                pair = txID + "|" + annotID
-                if pair not in dictPairs:
-                    dictPairs[ pair] = value
-                else:
-                    raise RainetException("read_enrichment_results_file: duplicate key", pair)
-    
-                if annotID not in annotValues:
-                    annotValues[ annotID] = []
-                annotValues[ annotID].append( value)
+                    if annotID not in annotValues:
+                        annotValues[ annotID] = []
+                    annotValues[ annotID].append( value)
                        
-                setRNAs.add( txID)
-                setAnnots.add( annotID)
+                    setRNAs.add( txID)
+                    setAnnots.add( annotID)
     
     
-        # Get set of annotations which had no enrichment
-        nonEnrichedAnnotations = set()
-        for annotID in annotValues:
-            if annotValues[ annotID].count( self.filterWarningValue) == len( annotValues[ annotID]):
-                nonEnrichedAnnotations.add( annotID)
+            # Get set of annotations which had no enrichment
+            nonEnrichedAnnotations = set()
+            for annotID in annotValues:
+                if annotValues[ annotID].count( self.filterWarningValue) == len( annotValues[ annotID]):
+                    nonEnrichedAnnotations.add( annotID)
     
     
         # the number of retained enrichments after filtering is equal to the length of filteredEnrichmentsResults minus the header
@@ -345,6 +355,61 @@ class FilterEnrichmentResults(object):
         return dictPairs, filteredEnrichmentResults
     
     
+    # #
+    # Read the binary columns of the RNA-annotation enrichment file (see EnrichmentReport), keeping the tests of the RNAs
+    # that are significantly enriched over random control. Same results as reading the enrichment file (see read_enrichment_results_file),
+    # without formatting the tests: only the value column of the matrix and the lines of the enrichments kept are formatted.
+    # The lines of the enrichments kept are added to filtered_enrichment_results.
+    # Returns the value of each RNA-annotation pair, the RNAs, the annotations, the annotations without enrichment
+    # and the number of tests filtered out by the enrichment_rna and minimum observed proteins interacting filters.
+    def read_enrichment_results_columns(self, list_rna_significant_enrich, filtered_enrichment_results):
+
+        rnaIDs, annotationIDs, backgroundSize, columns = EnrichmentReport.read_columns( self.enrichmentResultsFile)
+
+        keptRNAs = np.array( [ rnaID in list_rna_significant_enrich for rnaID in rnaIDs], dtype = bool)
+        keptRows = np.flatnonzero( keptRNAs[ columns[ "rna"]])
+        excludedByRNA = len( columns[ "rna"]) - len( keptRows)
+
+        # value of each test as in enrichment file (variable, boolean or pval)
+        values = np.array( EnrichmentReport.format_column( rnaIDs, annotationIDs, backgroundSize, columns, keptRows, self.matrixValueColumn), dtype = object)
+
+        excludedByMinimumInteractions = 0
+        if self.filterWarningColumn:
+            # If value is determined not significant OR is tagged with a warning (for several reasons), fill it with constant value. 
+            filteredTests = ( columns[ "warning"][ keptRows] != 0) | ( columns[ "sign"][ keptRows] == 0)
+            # apply filter for minimum number of interactions in enrichment
+            if self.minimumProteinInteraction != -1:
+                fewInteractions = ~filteredTests & ( columns[ "observed"][ keptRows] < self.minimumProteinInteraction)
+                excludedByMinimumInteractions = int( fewInteractions.sum())
+                filteredTests |= fewInteractions
+            values[ filteredTests] = self.filterWarningValue
+
+            for row in keptRows[ ~filteredTests].tolist():
+                line = EnrichmentReport.ROW_FORMAT % ( rnaIDs[ columns[ "rna"][ row]], annotationIDs[ columns[ "annotation"][ row]], columns[ "observed"][ row],
+                                                       columns[ "possible"][ row], EnrichmentReport.get_percent_interacting( int( columns[ "interactions"][ row]), backgroundSize),
+                                                       columns[ "warning"][ row], columns[ "pval"][ row], columns[ "corrected_pval"][ row], columns[ "sign"][ row])
+                filtered_enrichment_results.append( line.strip())
+
+        rnaCodes = columns[ "rna"][ keptRows]
+        annotCodes = columns[ "annotation"][ keptRows]
+        dictPairs = {}
+        for rnaCode, annotCode, value in itertools.izip( rnaCodes.tolist(), annotCodes.tolist(), values.tolist()):
+            pair = rnaIDs[ rnaCode] + "|" + annotationIDs[ annotCode]
+            if pair not in dictPairs:
+                dictPairs[ pair] = value
+            else:
+                raise RainetException("read_enrichment_results_columns: duplicate key", pair)
+
+        setRNAs = set( [ rnaIDs[ rnaCode] for rnaCode in np.unique( rnaCodes).tolist()])
+        setAnnots = set( [ annotationIDs[ annotCode] for annotCode in np.unique( annotCodes).tolist()])
+
+        # annotations whose values are all the constant value of the filtered tests
+        enrichedAnnotCodes = np.unique( annotCodes[ values != self.filterWarningValue])
+        nonEnrichedAnnotations = setAnnots - set( [ annotationIDs[ annotCode] for annotCode in enrichedAnnotCodes.tolist()])
+
+        return dictPairs, setRNAs, setAnnots, nonEnrichedAnnotations, excludedByRNA, excludedByMinimumInteractions
+
+
     # #
     # Writes file with complex-lncRNA pairs ranked by specificity
     def rank_by_specificity(self, dict_pairs, filter_warning_value):
@@ -11,6 +11,7 @@ import numpy as np
 from fr.tagc.rainet.core.util.exception.RainetException import RainetException
 from fr.tagc.rainet.core.util.log.Logger import Logger
 from fr.tagc.rainet.core.util.time.Timer import Timer
+from fr.tagc.rainet.core.util.rng.RandomService import RandomService
 
 # from fr.tagc.rainet.core.util.subprocess.SubprocessUtil import SubprocessUtil
 from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
@@ -87,13 +88,15 @@ class NetworkScoreAnalysis(object):
     REPORT_METRICS_OUTPUT = "metrics_per_rna.tsv"
 
        
-    def __init__(self, networkFile, catrapidFile, topPartners, outputFolder, numberRandomizations):
+    def __init__(self, networkFile, catrapidFile, topPartners, outputFolder, numberRandomizations, randomSeed = None):
 
         self.networkFile = networkFile
         self.catrapidFile = catrapidFile
         self.topPartners = [int( i) for i in topPartners.split(",")]
         self.outputFolder = outputFolder
         self.numberRandomizations = numberRandomizations
+        # the randomizations of each RNA are drawn from their own stream, derived from the seed
+        self.randomSeed = RandomService.get_instance().set_seed( randomSeed)
 
 #         # Build a SQL session to DB
 #         SQLManager.get_instance().set_DBpath(self.rainetDBFile)
@@ -381,6 +384,8 @@ class NetworkScoreAnalysis(object):
 
         outFile = open( self.outputFolder + str( topValue) + "/" + NetworkScoreAnalysis.REPORT_METRICS_OUTPUT, "w" )
 
+        self.write_parameter_log( self.outputFolder + str( topValue) + "/" + NetworkScoreAnalysis.PARAMETERS_LOG, topValue)
+
         # write header
         outFile.write("transcriptID\tLCneighbours\tLCneighboursRandom\tLCneighboursPval\tShortestPath\tShortestPathRandom\tShortestPathPval\n")
 
@@ -424,10 +429,12 @@ class NetworkScoreAnalysis(object):
                 if rna not in lionelMetricsRandom:
                     lionelMetricsRandom[ rna] = []
     
+                randomStream = RandomService.get_instance().get_python_stream( "NetworkScoreAnalysis", topValue, rna)
+
                 for i in xrange( self.numberRandomizations):
                     
                     # retrieve a new set of top proteins, with the same degree
-                    newProteinSet = self._get_sample_protein_degree( topProteins)
+                    newProteinSet = self._get_sample_protein_degree( topProteins, randomStream)
                     
                     meanRNAShortestPath, lionelMetric = self._calculate_metric_for_rna( newProteinSet)
                     
@@ -533,7 +540,8 @@ class NetworkScoreAnalysis(object):
 
     # #
     # Internal function to pick a random set of proteins with the same degree as input protein list.
-    def _get_sample_protein_degree(self, list_of_proteins):
+    # The proteins are drawn from the given stream (random module or random.Random, see RandomService)
+    def _get_sample_protein_degree(self, list_of_proteins, random_stream = random):
         
         degreeDict = self.degreeDict
         
@@ -569,7 +577,7 @@ class NetworkScoreAnalysis(object):
 #                 Logger.get_instance().warning( "NetworkScoreAnalysis._get_sample_protein_degree : less proteins with degree %s than number of randomizations." % ( degree ) )
 
             # pick one random protein from list of proteins with that degree
-            randomProt = random.sample( proteinsPerDegreeDictCopy[ degree], 1)[0]
+            randomProt = random_stream.sample( proteinsPerDegreeDictCopy[ degree], 1)[0]
 
             # remove protein so that it is not picked up again in this randomization
             proteinsPerDegreeDictCopy[ degree].remove( randomProt)
@@ -588,6 +596,17 @@ class NetworkScoreAnalysis(object):
         return newProteinSet
 
 
+    # #
+    # Write the parameters used (including the random seed) to the parameters log of an output folder
+    def write_parameter_log(self, log_file, top_value):
+
+        with open( log_file, "w") as outFile:
+            outFile.write( "Argument\tValue\n")
+            for argName, argValue in [ ( "networkFile", self.networkFile), ( "catrapidFile", self.catrapidFile), ( "topPartners", top_value),
+                                       ( "numberRandomizations", self.numberRandomizations), ( "randomSeed", self.randomSeed) ]:
+                outFile.write( "%s:\t%s\n" % ( argName, argValue))
+
+
     # Function to get the closest possible available degree
     def _get_new_degree(self, degree, proteinsPerDegreeDictCopy):
 
@@ -685,12 +704,14 @@ if __name__ == "__main__":
         # optional args
         parser.add_argument('--numberRandomizations', metavar='numberRandomizations', type=int, default = 1000,
                              help='Number of randomizations to be performed to calculate empirical p-value for each metric, for each transcript.')
+        parser.add_argument('--randomSeed', metavar='randomSeed', type=int, default = None,
+                             help='Seed of the randomizations, written in the parameters log. Default: drawn at random.')
            
         # gets the arguments
         args = parser.parse_args( ) 
     
         # Initialise class
-        networkScoreAnalysis = NetworkScoreAnalysis( args.networkFile, args.catrapidFile, args.topPartners, args.outputFolder, args.numberRandomizations)
+        networkScoreAnalysis = NetworkScoreAnalysis( args.networkFile, args.catrapidFile, args.topPartners, args.outputFolder, args.numberRandomizations, args.randomSeed)
     
         #===============================================================================
         # Run analysis / processing
@@ -4,13 +4,13 @@ import os
 import argparse
 import numpy as np
 from scipy import stats
-import random
 
 from fr.tagc.rainet.core.util.exception.RainetException import RainetException
 from fr.tagc.rainet.core.util.log.Logger import Logger
 from fr.tagc.rainet.core.util.time.Timer import Timer
 from fr.tagc.rainet.core.util.subprocess.SubprocessUtil import SubprocessUtil
 from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
+from fr.tagc.rainet.core.util.rng.RandomService import RandomService
 
 #===============================================================================
 # Started 14-June-2016
@@ -25,8 +25,10 @@ SCRIPT_NAME = "SubsetSimilarLength.py"
 class SubsetSimilarLength(object):
 
     MINIMUM_LENGTH = 50
+
+    PARAMETERS_LOG = "parameters.log"
     
-    def __init__(self, lnc_rnalengths, m_rnalengths, output_folder, bin_size, length_max):
+    def __init__(self, lnc_rnalengths, m_rnalengths, output_folder, bin_size, length_max, random_seed = None):
 
         self.lncRNAlengths = lnc_rnalengths
         self.mRNAlengths = m_rnalengths
@@ -38,6 +40,15 @@ class SubsetSimilarLength(object):
         if not os.path.exists( self.outputFolder):
             os.mkdir( self.outputFolder)
 
+        # the downsampling of each bin is drawn from its own stream, derived from the seed
+        self.randomSeed = RandomService.get_instance().set_seed( random_seed)
+
+        with open( self.outputFolder + "/" + SubsetSimilarLength.PARAMETERS_LOG, "w") as outFile:
+            outFile.write("Argument\tValue\n")
+            for argName, argValue in [ ( "lncRNAlengths", self.lncRNAlengths), ( "mRNAlengths", self.mRNAlengths), ( "binSize", self.binSize),
+                                       ( "lengthMax", self.lengthMax), ( "randomSeed", self.randomSeed) ]:
+                outFile.write( "%s:\t%s\n" % ( argName, argValue))
+
     # #
     # Function to put transcripts into length bins
     def read_fastalength(self, in_file_path):
@@ -117,14 +128,16 @@ class SubsetSimilarLength(object):
             nBins1 = len( bins1[ binName])
             nBins2 = len( bins2[ binName])
 
+            randomStream = RandomService.get_instance().get_stream( "SubsetSimilarLength", binName)
+
             if nBins1 > nBins2:
                 # downsample nBins1 to match nBins2
-                subset = random.sample( tBins1, nBins2)
+                subset = RandomService.sample( randomStream, sorted( tBins1), nBins2)
                 newList1.update( set( subset))
                 newList2.update( tBins2)             
             elif nBins2 > nBins1:
                 # downsample nBins2 to match nBins1
-                subset = random.sample( tBins2, nBins1)
+                subset = RandomService.sample( randomStream, sorted( tBins2), nBins1)
                 newList1.update( tBins1)
                 newList2.update( set( subset))
             else:
@@ -170,13 +183,14 @@ if __name__ == "__main__":
     parser.add_argument('outputFolder', metavar='outputFolder', type=str, help='Folder where to write output files.')
     parser.add_argument('--binSize', metavar='binSize', default = 10, type=int, help='Length bin size.')
     parser.add_argument('--lengthMax', metavar='lengthMax', default = 1200, type=int, help='The maximum length size for both libraries.')
+    parser.add_argument('--randomSeed', metavar='randomSeed', default = None, type=int, help='Seed of the downsampling, written in the parameters log. Default: drawn at random.')
 
 
     #gets the arguments
     args = parser.parse_args( ) 
 
     # init
-    run = SubsetSimilarLength( args.lncRNAlengths, args.mRNAlengths, args.outputFolder, args.binSize, args.lengthMax)
+    run = SubsetSimilarLength( args.lncRNAlengths, args.mRNAlengths, args.outputFolder, args.binSize, args.lengthMax, args.randomSeed)
     
     lncRNABins, lncRNALengths = run.read_fastalength( args.lncRNAlengths)
     mRNABins, mRNALengths = run.read_fastalength( args.mRNAlengths)
@@ -1,11 +1,16 @@
 import os
+import shutil
 import argparse
+import itertools
+import multiprocessing
 import numpy as np
+from scipy import sparse
 
 from fr.tagc.rainet.core.util.exception.RainetException import RainetException
 from fr.tagc.rainet.core.util.log.Logger import Logger
 from fr.tagc.rainet.core.util.time.Timer import Timer
-from fr.tagc.rainet.core.util.subprocess.SubprocessUtil import SubprocessUtil
+from fr.tagc.rainet.core.util.file.FileUtils import FileUtils
+from fr.tagc.rainet.core.util.data.ScoreHistogram import ScoreHistogram
 
 #===============================================================================
 # Started 20-May-2016 
@@ -26,23 +31,66 @@ SCRIPT_NAME = "ReadCatrapid.py"
 # 1) To reduce memory consumption, the score values are rounded to 1 decimal. 
 #    Thus, means are not precise
 # 2) Filters are all applied on top of each other, first by score, then RNA, then protein, then interaction-based.
+# 3) The catRAPID file is read in chunks (starting at the beginning of a line) by worker processes, each chunk 
+#    producing its filtered interactions file and the (item, score bin) cells of its score frequencies, merged in the order of the file.
+# 4) The score frequencies of the proteins and of the RNAs are counted in matrices of items x score bins (see ScoreHistogram),
+#    updated by batches of lines.
+# 5) If normalised interactions are wanted, the RNA, protein and rounded score of each stored interaction are also written
+#    to a binary file while reading the catRAPID file, so that the normalisation does not parse the interactions file again.
+#    This file is removed once the normalised interactions are written.
+# 6) The interaction matrix can be written as text, as a dense numpy matrix (.npy, memory-mappable) or as a sparse scipy CSR matrix (.npz),
+#    the binary matrices having files with their row (RNA) and column (protein) IDs. The text matrix can be derived from them
+#    (see load_matrix_output and write_text_matrix).
 #===============================================================================
 
 
+# The reader whose chunks are read by a worker process
+workerReader = None
+
+# #
+# Function initialising the worker processes reading the catRAPID file. The workers being forked,
+# the reader and its filters are not copied, but shared with the main process.
+def init_catrapid_worker(reader):
+
+    global workerReader
+    workerReader = reader
+
+# #
+# Function executed by the worker processes: read a chunk of the catRAPID file
+def read_catrapid_chunk(chunk):
+
+    return workerReader.read_chunk( *chunk)
+
+
 class ReadCatrapid(object):
     
     TEMP_STORED_INTERACTIONS_FILENAME = "/temp_storedInteractions_"
+    TEMP_INTERACTION_SCORES_FILENAME = "/temp_storedInteractionScores_"
     STORED_INTERACTIONS_FILENAME = "/storedInteractions.tsv"
     SAMPLE_INTERACTIONS_FILENAME = "/sampleInteractions.tsv"
     PROTEIN_INTERACTIONS_FILENAME = "/proteinInteractions.tsv"
     RNA_INTERACTIONS_FILENAME = "/rnaInteractions.tsv"
     ALL_INTERACTIONS_FILTERED_TAG = "NA" # value to give when an RNA or protein has all their interactions filtered with cutoff
     NORMALISED_STORED_INTERACTIONS_FILENAME = "/storedInteractionsNormalised.tsv"
+    INTERACTION_SCORES_FILENAME = "/storedInteractionScores.bin"
+    # record of the binary interaction scores file, one per line of the stored interactions file:
+    # code of the RNA and of the protein (order of first appearance) and score bin (see ScoreHistogram)
+    INTERACTION_SCORES_DTYPE = np.dtype( [ ( "rna", np.int32), ( "protein", np.int32), ( "bin", np.int32)])
     INTERACTIONS_SCORE_MATRIX = "/interaction_score_matrix.tsv"
+    INTERACTIONS_SCORE_MATRIX_DENSE = "/interaction_score_matrix.npy"
+    INTERACTIONS_SCORE_MATRIX_SPARSE = "/interaction_score_matrix.npz"
+    INTERACTIONS_SCORE_MATRIX_RNAS = "/interaction_score_matrix_rnas.txt" # row IDs of the binary matrices, one per line
+    INTERACTIONS_SCORE_MATRIX_PROTEINS = "/interaction_score_matrix_proteins.txt" # column IDs of the binary matrices, one per line
+    MATRIX_FORMAT_TEXT = "text"
+    MATRIX_FORMAT_DENSE = "dense"
+    MATRIX_FORMAT_SPARSE = "sparse"
+    MATRIX_FORMATS = [ MATRIX_FORMAT_TEXT, MATRIX_FORMAT_DENSE, MATRIX_FORMAT_SPARSE]
     MAXIMUM_NUMBER_VIABLE_INTERACTIONS = 170000000 # maximum number of interactions writable for interaction matrix output #170M interactions = 23Gb
+    CHUNKS_PER_WORKER = 4 # number of chunks of the catRAPID file per worker process, to balance the load of the workers
     
     def __init__(self, catrapid_file, output_folder, interaction_cutoff, interaction_filter_file, rna_filter_file, protein_filter_file,
-                 write_interactions, batch_size, write_normalised_interactions, write_interaction_matrix, boolean_interaction, sample_interactions):
+                 write_interactions, batch_size, write_normalised_interactions, write_interaction_matrix, boolean_interaction, sample_interactions, workers = 1,
+                 matrix_format = MATRIX_FORMAT_TEXT):
 
         self.catRAPIDFile = catrapid_file
         self.outputFolder = output_folder
@@ -56,7 +104,13 @@ class ReadCatrapid(object):
         self.writeInteractionMatrix = write_interaction_matrix
         self.booleanInteraction = boolean_interaction
         self.sampleInteractions = sample_interactions
+        self.workers = workers
+        self.matrixFormat = matrix_format
 
+        if workers < 1:
+            raise RainetException( "ReadCatrapid.__init__ : --workers must be a positive integer.")
+        if matrix_format not in ReadCatrapid.MATRIX_FORMATS:
+            raise RainetException( "ReadCatrapid.__init__ : --matrixFormat must be one of %s." % ", ".join( ReadCatrapid.MATRIX_FORMATS))
         if (write_normalised_interactions and write_interactions == 0) or (write_interaction_matrix and write_interactions == 0):
             raise RainetException( "ReadCatrapid.__init__ : --writeInteractions option must be on for --writeNormalisedInteractions to run.")
         if (boolean_interaction and write_interactions == 0) or (boolean_interaction and write_interaction_matrix == 0):
@@ -112,6 +166,8 @@ class ReadCatrapid(object):
  
     # #
     # Read catrapid file, apply filters, and write processed output to files
+    # The file is split in chunks starting at the beginning of a line, read by worker processes (see read_chunk).
+    # The partial results of the chunks are then merged in the order of the file.
     def read_catrapid_file( self, wanted_pairs, wanted_RNAs, wanted_proteins):
 
         #=======================================================================
@@ -134,15 +190,10 @@ class ReadCatrapid(object):
         else:
             self.interactionCutoff = float( self.interactionCutoff)
 
-        # check if we need to filter by wanted pairs, proteins, rnas
-        if len( wanted_pairs) > 0: interactionFilterBool = 1
-        else: interactionFilterBool = 0
-
-        if len( wanted_RNAs) > 0: rnaFilterBool = 1
-        else: rnaFilterBool = 0
-
-        if len( wanted_proteins) > 0: proteinFilterBool = 1
-        else: proteinFilterBool = 0
+        # filters used by the chunks (shared with the worker processes, which are forked)
+        self.wantedPairs = wanted_pairs
+        self.wantedRNAs = wanted_RNAs
+        self.wantedProteins = wanted_proteins
 
         
         ### Protein containers ####
@@ -151,133 +202,112 @@ class ReadCatrapid(object):
 #         proteinInteractionsSum = {} # key -> protein ID, value -> sum of scores
         proteinInteractionsCounter = {} # key -> protein ID, value -> number of times protein appears
         proteinInteractionsMean = {}
-        # approach2: initialise protein, create a dictionary for each protein which contains the frequencies of each score instead of list of scores, in order to save memory
-        proteinScoreFrequencies = {} # key -> protein ID, value -> dict. key -> score, value -> frequency of score
+        # approach2: initialise protein, count the frequencies of each score instead of keeping the list of scores, in order to save memory
+        proteinScoreFrequencies = ScoreHistogram()
         allProtSet = set()
 
         ### RNA containers ####
-        # approach: initialise RNA, create a dictionary for each RNA which contains the frequencies of each score instead of list of scores, in order to save memory
-        rnaScoreFrequencies = {} # key -> RNA ID, value -> dict. key -> score, value -> frequency of score
+        # approach: initialise RNA, count the frequencies of each score instead of keeping the list of scores, in order to save memory
+        rnaScoreFrequencies = ScoreHistogram()
         allRNASet = set()
 
         lineCount = 0
-        outFileCount = 1
         
         # variable used for sampling interactions
         itemCount = {} # key -> protein or RNA ID, value -> frequency
         interactionSample = set()
 
-        # variable which will store text to be written into files        
-        interactionText = ""
-
         #=======================================================================
         # read file
         #=======================================================================
-        with open( self.catRAPIDFile, "r") as inFile:
-            for line in inFile:
-
-                # every X lines, write to file to liberate memory                
-                if lineCount % self.batchSize == 0 and lineCount != 0:
-                    Timer.get_instance().step("read_catrapid_file: reading %s lines.." % lineCount)    
+        if self.workers > 1:
+            chunks = FileUtils.get_line_offsets( self.catRAPIDFile, self.workers * ReadCatrapid.CHUNKS_PER_WORKER)
+        else:
+            chunks = FileUtils.get_line_offsets( self.catRAPIDFile, 1)
+        chunks = [ ( chunkIndex, start, end) for chunkIndex, ( start, end) in enumerate( chunks)]
 
-                    # print len( proteinInteractionsSum), sys.getsizeof( proteinInteractionsSum) / 1000000.0
-                    # print len( interactionText), sys.getsizeof( interactionText) / 1000000.0 
+        if self.workers > 1:
+            pool = multiprocessing.Pool( self.workers, init_catrapid_worker, ( self,))
+            chunkResults = pool.imap( read_catrapid_chunk, chunks)
+        else:
+            pool = None
+            chunkResults = itertools.imap( lambda chunk: self.read_chunk( *chunk), chunks)
 
-                    # dump dictionaries into files
-                    if self.writeInteractions:
-                        with open( self.outputFolder + ReadCatrapid.TEMP_STORED_INTERACTIONS_FILENAME + str( outFileCount) + ".tsv", "w") as outFile:
-                            outFile.write( interactionText)
-                    
-                    interactionText = ""
-                    
-                    outFileCount += 1
+        # the filtered interactions are written to one file per chunk, joined in the order of the chunks
+        if self.writeInteractions:
+            outFile = open( self.outputFolder + ReadCatrapid.STORED_INTERACTIONS_FILENAME, "w")
+        if self.writeNormalisedInteractions:
+            scoresFile = open( self.outputFolder + ReadCatrapid.INTERACTION_SCORES_FILENAME, "wb")
 
-                lineCount += 1 # this has to be before the filterings ( 'continue')
-                    
-                spl = line.split(" ")
-                
-                protID = spl[0].split( "|")[1]
-                spl2 = spl[1].split( "\t")
-                rnaID = spl2[0]
-                score = float( spl2[1])
-                scoreRounded = round( score, 1) 
- 
-                pair = "_".join( [protID, rnaID])
-                           
-                allRNASet.add( rnaID)
-                allProtSet.add( protID)
-                               
-                #### Apply filterings ####     
-                # filter by score
-                if score < self.interactionCutoff: 
-                    continue
+        # merge results of the chunks, which come in the order of the chunks
+        try:
+            sampledProteins = set()
+            sampledRNAs = set()
+            for chunkIndex, ( chunkLineCount, chunkProts, chunkRNAs, chunkProteinScores, chunkRNAScores, firstProteinLines, firstRNALines) in enumerate( chunkResults):
 
-                # if filtering by wanted RNAs and it is not present
-                if rnaFilterBool and rnaID not in wanted_RNAs:
-                    continue
+                lineCount += chunkLineCount
+                Timer.get_instance().step("read_catrapid_file: reading %s lines.." % lineCount)    
 
-                # if filtering by wanted Proteins and it is not present
-                if proteinFilterBool and protID not in wanted_proteins:
-                    continue
+                # adding the new items in the order of the file gives the same sets as reading the file in one go
+                for protID in chunkProts:
+                    allProtSet.add( protID)
+                for rnaID in chunkRNAs:
+                    allRNASet.add( rnaID)
 
-                # if filtering by wanted pairs and it is not present
-                if interactionFilterBool and pair not in wanted_pairs:
-                    continue
+                proteinCodes = proteinScoreFrequencies.merge( *chunkProteinScores)
+                rnaCodes = rnaScoreFrequencies.merge( *chunkRNAScores)
 
-                # if sample interaction filtering is on
+                # an interaction is sampled if it is the first (kept) interaction of its protein or of its RNA,
+                # the interactions being added in the order of the file
                 if self.sampleInteractions:
-
-                    # initialise sample counter
-                    if protID not in itemCount: itemCount[ protID] = 0
-                    if rnaID not in itemCount: itemCount[ rnaID] = 0
-
-                    # only add new sample interactions any of the items still need more samples
-                    # this certifies that each item has at least one interaction, unless they are excluded after filter
-                    if itemCount[ protID] < 1 or itemCount[ rnaID] < 1:
-                        if line not in interactionSample:
-                            interactionSample.add( line)
-                            itemCount[ protID] += 1
-                            itemCount[ rnaID] += 1
-
-                #### Store interaction #### 
-                #interactionText += "%s\t%s\n" % (pair, score)
-                interactionText+= line
-
-                ## Protein side
-#                 # for calculating average score per protein
-                if protID not in proteinScoreFrequencies:
-                    proteinScoreFrequencies[ protID] = {}
-
-                # producing dictionary with score frequencies for a protein
-                if scoreRounded not in proteinScoreFrequencies[ protID]:
-                    proteinScoreFrequencies[ protID][ scoreRounded] = 0
-                proteinScoreFrequencies[ protID][ scoreRounded] += 1
- 
-                ## RNA side
-                if rnaID not in rnaScoreFrequencies:
-                    rnaScoreFrequencies[ rnaID] = {}
-
-                if scoreRounded not in rnaScoreFrequencies[ rnaID]:
-                    rnaScoreFrequencies[ rnaID][ scoreRounded] = 0
-                rnaScoreFrequencies[ rnaID][ scoreRounded] += 1
-
-
-            # write remaining interactions into file
+                    chunkSample = []
+                    for itemLines, sampledItems in ( ( firstProteinLines, sampledProteins), ( firstRNALines, sampledRNAs)):
+                        for itemID, ( lineIndex, line) in itemLines.iteritems():
+                            if itemID not in sampledItems:
+                                sampledItems.add( itemID)
+                                chunkSample.append( ( lineIndex, line))
+                    for lineIndex, line in sorted( chunkSample):
+                        interactionSample.add( line)
+
+                if self.writeInteractions:
+                    chunkFile = self.get_chunk_file( chunkIndex)
+                    with open( chunkFile, "r") as inFile:
+                        shutil.copyfileobj( inFile, outFile)
+                    os.remove( chunkFile)
+
+                # the scores of the chunk are recoded with the codes of the merged score frequencies
+                if self.writeNormalisedInteractions:
+                    chunkFile = self.get_chunk_scores_file( chunkIndex)
+                    with open( chunkFile, "rb") as inFile:
+                        records = np.fromfile( inFile, ReadCatrapid.INTERACTION_SCORES_DTYPE, self.batchSize)
+                        while len( records) > 0:
+                            records[ "rna"] = rnaCodes[ records[ "rna"]]
+                            records[ "protein"] = proteinCodes[ records[ "protein"]]
+                            records.tofile( scoresFile)
+                            records = np.fromfile( inFile, ReadCatrapid.INTERACTION_SCORES_DTYPE, self.batchSize)
+                    os.remove( chunkFile)
+
+            if pool != None:
+                pool.close()
+        except:
+            if pool != None:
+                pool.terminate()
+            raise
+        finally:
+            if pool != None:
+                pool.join()
             if self.writeInteractions:
-                with open( self.outputFolder + ReadCatrapid.TEMP_STORED_INTERACTIONS_FILENAME + str( outFileCount) + ".tsv", "w") as outFile:
-                    outFile.write( interactionText)
+                outFile.close()
+            if self.writeNormalisedInteractions:
+                scoresFile.close()
 
-        print "read_catrapid_file: read %s lines.." % lineCount
+        # number of sampled interactions of each item
+        for line in interactionSample:
+            protID, rnaID, _ = ReadCatrapid.parse_interaction_line( line)
+            for itemID in ( protID, rnaID):
+                itemCount[ itemID] = itemCount.get( itemID, 0) + 1
 
-        # join stored interaction files
-        if self.writeInteractions:
-            # cat files
-            cmd = "cat %s* > %s" % ( self.outputFolder + ReadCatrapid.TEMP_STORED_INTERACTIONS_FILENAME, self.outputFolder + ReadCatrapid.STORED_INTERACTIONS_FILENAME )
-            os.system( cmd)
-            
-            # remove temp files
-            cmd = "rm %s*" % ( self.outputFolder + ReadCatrapid.TEMP_STORED_INTERACTIONS_FILENAME)
-            os.system( cmd)
+        print "read_catrapid_file: read %s lines.." % lineCount
 
 
         #=======================================================================
@@ -291,17 +321,10 @@ class ReadCatrapid(object):
             outFile.write("ensembl_id\tmean_score\tmedian_score\tmin_score\tmax_score\tstd_score\tcount\n")
 
             for rna in allRNASet:
-                if rna in rnaScoreFrequencies:
-                    # recreate all original values for a rna
-                    listOfScores = [ scoreVal for scoreVal in rnaScoreFrequencies[ rna] for i in range( rnaScoreFrequencies[ rna][ scoreVal])]
-     
-                    mean = np.mean( listOfScores)
-                    median = np.median( listOfScores)   
-                    minimum = np.min( listOfScores)
-                    maximum = np.max( listOfScores)
-                    std = np.std( listOfScores)    
-                    # number of Proteins/interactions above filter
-                    count = len(listOfScores)
+                if rnaScoreFrequencies.has_item( rna):
+                    # statistics of all original values for a rna
+                    # count: number of Proteins/interactions above filter
+                    mean, median, minimum, maximum, std, count = rnaScoreFrequencies.get_statistics( rna)
                     
                     outFile.write( "%s\t%.2f\t%.2f\t%.2f\t%.2f\t%.2f\t%s\n" % (rna, mean, median, minimum, maximum, std, count) )
 
@@ -320,19 +343,11 @@ class ReadCatrapid(object):
 
             # calculate protein score metrics
             for prot in allProtSet:
-                if prot in proteinScoreFrequencies:
+                if proteinScoreFrequencies.has_item( prot):
 
-                    # recreate all original values for a protein
-                    listOfScores = [ scoreVal for scoreVal in proteinScoreFrequencies[ prot] for i in range( proteinScoreFrequencies[ prot][ scoreVal])]
-    
-                    mean = np.mean( listOfScores)
-                    median = np.median( listOfScores)
-                    minimum = np.min( listOfScores)
-                    maximum = np.max( listOfScores)
-                    std = np.std( listOfScores)
-                        
-                    # number of RNAs above filter
-                    count = len(listOfScores)
+                    # statistics of all original values for a protein
+                    # count: number of RNAs above filter
+                    mean, median, minimum, maximum, std, count = proteinScoreFrequencies.get_statistics( prot)
     
                     proteinInteractionsMean[ prot] = mean
                     proteinInteractionsCounter[ prot] = count
@@ -353,117 +368,265 @@ class ReadCatrapid(object):
 
         self.itemCount = itemCount
         self.interactionSample = interactionSample
+        self.rnaScoreFrequencies = rnaScoreFrequencies
 
         return proteinInteractionsMean, proteinInteractionsCounter
 
 
     # #
-    # Function to write extra output file with interactions normalised by the max for each RNA, 
-    # (using unity-based normalisation, aka min-max normalisation)
-    # This function runs after writing non-normalised interactions file and rna interactions file.
-    def write_normalised_interactions( self):
+    # Read a chunk of the catRAPID file and apply the filters
+    #
+    # @param chunk_index : int - The index of the chunk, the filtered interactions being written to its chunk file (see get_chunk_file)
+    # @param start : int - The offset of the first line of the chunk
+    # @param end : int - The offset of the end of the chunk (beginning of a line or end of file)
+    #
+    # @return tuple - The number of lines of the chunk, the proteins and the RNAs of the chunk (in order of first appearance),
+    # the score frequencies of the proteins and of the RNAs (cells of their ScoreHistogram, see ScoreHistogram.get_cells)
+    # and, if sampling interactions, the first interaction kept of each protein and of each RNA (key -> ID, value -> line number in the chunk and line)
+    def read_chunk( self, chunk_index, start, end):
 
-        if not os.path.exists( self.outputFolder + ReadCatrapid.STORED_INTERACTIONS_FILENAME):
-            raise RainetException( "ReadCatrapid.write_normalised_interactions : output interactions file not found. %s" % self.outputFolder + ReadCatrapid.STORED_INTERACTIONS_FILENAME)
-        if not os.path.exists( self.outputFolder + ReadCatrapid.RNA_INTERACTIONS_FILENAME):
-            raise RainetException( "ReadCatrapid.write_normalised_interactions : output rna interactions file not found. %s" % self.outputFolder + ReadCatrapid.RNA_INTERACTIONS_FILENAME)
+        # check if we need to filter by wanted pairs, proteins, rnas
+        if len( self.wantedPairs) > 0: interactionFilterBool = 1
+        else: interactionFilterBool = 0
 
+        if len( self.wantedRNAs) > 0: rnaFilterBool = 1
+        else: rnaFilterBool = 0
 
-        #===============================================================================
-        # Get maximum and minimum scores for each transcript
-        #===============================================================================
+        if len( self.wantedProteins) > 0: proteinFilterBool = 1
+        else: proteinFilterBool = 0
 
-        # e.g. format: ensembl_id      mean_score      median_score    min_score       max_score       std_score       count
-        #        ENST00000388090 -15.11  -16.10  -45.90  26.90   10.46   1978
+        proteinScoreFrequencies = ScoreHistogram()
+        rnaScoreFrequencies = ScoreHistogram()
+        protSet = set()
+        protList = []
+        rnaSet = set()
+        rnaList = []
 
-        # column indexes
-        txIDCol = 0
-        minCol = 3 
-        maxCol = 4
+        # first interaction kept of each item, for sampling interactions
+        firstProteinLines = {}
+        firstRNALines = {}
 
-        rnaMax = {} # key -> transcriptID, val -> max score among all interactions
-        rnaMin = {} # key -> transcriptID, val -> min score among all interactions
-        with open( self.outputFolder + ReadCatrapid.RNA_INTERACTIONS_FILENAME, "r") as inFile:
-            inFile.readline() # skip header
-            
+        lineCount = 0
+
+        # lines to be written into the chunk file, and their scores to be counted (item codes and rounded scores)
+        interactionLines = []
+        proteinCodes = []
+        rnaCodes = []
+        roundedScores = []
+
+        if self.writeInteractions:
+            outFile = open( self.get_chunk_file( chunk_index), "w")
+        if self.writeNormalisedInteractions:
+            scoresFile = open( self.get_chunk_scores_file( chunk_index), "wb")
+        else:
+            scoresFile = None
+
+        with open( self.catRAPIDFile, "r") as inFile:
+            inFile.seek( start)
+            position = start
             for line in inFile:
-                line = line.strip()
-                spl = line.split( "\t")
-                
-                transcriptID = spl[ txIDCol]
-                minimum = spl[ minCol]
-                maximum = spl[ maxCol]
+                if position >= end:
+                    break
+                position += len( line)
+
+                # every X lines, write to file to liberate memory                
+                if lineCount % self.batchSize == 0 and lineCount != 0:
+                    Timer.get_instance().step("read_chunk: chunk %s, reading %s lines.." % ( chunk_index, lineCount))    
+                    if self.writeInteractions:
+                        outFile.write( "".join( interactionLines))
+                    interactionLines = []
+                    ReadCatrapid._add_scores( proteinScoreFrequencies, rnaScoreFrequencies, proteinCodes, rnaCodes, roundedScores, scoresFile)
+                    proteinCodes = []
+                    rnaCodes = []
+                    roundedScores = []
+
+                lineCount += 1 # this has to be before the filterings ( 'continue')
+
+                protID, rnaID, score = ReadCatrapid.parse_interaction_line( line)
+                scoreRounded = round( score, 1) 
+
+                if rnaID not in rnaSet:
+                    rnaSet.add( rnaID)
+                    rnaList.append( rnaID)
+                if protID not in protSet:
+                    protSet.add( protID)
+                    protList.append( protID)
+                               
+                #### Apply filterings ####     
+                # filter by score
+                if score < self.interactionCutoff: 
+                    continue
 
-                # if this RNA was filtered out, it will also not feature in the interactions file.
-                if minimum == ReadCatrapid.ALL_INTERACTIONS_FILTERED_TAG or maximum == ReadCatrapid.ALL_INTERACTIONS_FILTERED_TAG:
+                # if filtering by wanted RNAs and it is not present
+                if rnaFilterBool and rnaID not in self.wantedRNAs:
                     continue
 
-                minimum = float( minimum)
-                maximum = float( maximum)
+                # if filtering by wanted Proteins and it is not present
+                if proteinFilterBool and protID not in self.wantedProteins:
+                    continue
 
-                if transcriptID not in rnaMax:
-                    rnaMax[ transcriptID] = maximum
-                else:
-                    raise RainetException( "ReadCatrapid.write_normalised_interactions : duplicate transcript ID. %s" % transcriptID)
+                # if filtering by wanted pairs and it is not present
+                if interactionFilterBool and "_".join( [protID, rnaID]) not in self.wantedPairs:
+                    continue
+
+                # if sample interaction filtering is on, keep the first interaction of each item
+                if self.sampleInteractions:
+                    if protID not in firstProteinLines: firstProteinLines[ protID] = ( lineCount, line)
+                    if rnaID not in firstRNALines: firstRNALines[ rnaID] = ( lineCount, line)
+
+                #### Store interaction #### 
+                interactionLines.append( line)
+
+                ## Protein and RNA sides: score frequencies, counted by batch
+                proteinCodes.append( proteinScoreFrequencies.get_code( protID))
+                rnaCodes.append( rnaScoreFrequencies.get_code( rnaID))
+                roundedScores.append( scoreRounded)
+
+        # write remaining interactions into file
+        if self.writeInteractions:
+            outFile.write( "".join( interactionLines))
+            outFile.close()
+        ReadCatrapid._add_scores( proteinScoreFrequencies, rnaScoreFrequencies, proteinCodes, rnaCodes, roundedScores, scoresFile)
+        if scoresFile != None:
+            scoresFile.close()
+
+        # only the cells with scores are sent to the parent process, which has the matrices of all the chunks
+        return lineCount, protList, rnaList, proteinScoreFrequencies.get_cells(), rnaScoreFrequencies.get_cells(), firstProteinLines, firstRNALines
+
+
+    # #
+    # @param chunk_index : int - The index of a chunk of the catRAPID file
+    #
+    # @return string - The path to the file of the filtered interactions of the chunk
+    def get_chunk_file( self, chunk_index):
+
+        return self.outputFolder + ReadCatrapid.TEMP_STORED_INTERACTIONS_FILENAME + str( chunk_index) + ".tsv"
+
+
+    # #
+    # @param chunk_index : int - The index of a chunk of the catRAPID file
+    #
+    # @return string - The path to the binary file of the scores of the filtered interactions of the chunk
+    def get_chunk_scores_file( self, chunk_index):
+
+        return self.outputFolder + ReadCatrapid.TEMP_INTERACTION_SCORES_FILENAME + str( chunk_index) + ".bin"
 
-                if transcriptID not in rnaMin:
-                    rnaMin[ transcriptID] = minimum
-                else:
-                    raise RainetException( "ReadCatrapid.write_normalised_interactions : duplicate transcript ID. %s" % transcriptID)
+
+    # #
+    # Parse a line of the catRAPID file (see read_catrapid_file)
+    #
+    # @return tuple( string, string, float) - The protein, the RNA and the score of the interaction
+    @staticmethod
+    def parse_interaction_line( line):
+
+        spl = line.split(" ")
+                
+        protID = spl[0].split( "|")[1]
+        spl2 = spl[1].split( "\t")
+
+        return protID, spl2[0], float( spl2[1])
+
+
+    # #
+    # Count a batch of scores in the score frequencies of the proteins and of the RNAs
+    #
+    # @param protein_frequencies : ScoreHistogram - The score frequencies of the proteins
+    # @param rna_frequencies : ScoreHistogram - The score frequencies of the RNAs
+    # @param protein_codes : list<int> - The protein code of each score
+    # @param rna_codes : list<int> - The RNA code of each score
+    # @param scores : list<float> - The scores, rounded to one decimal
+    # @param scores_file : file (optional) - The binary file where to write the records of the scores (see INTERACTION_SCORES_DTYPE)
+    @staticmethod
+    def _add_scores( protein_frequencies, rna_frequencies, protein_codes, rna_codes, scores, scores_file = None):
+
+        bins = ScoreHistogram.get_bins( scores)
+        protein_frequencies.add( np.array( protein_codes, dtype = np.int64), bins)
+        rna_frequencies.add( np.array( rna_codes, dtype = np.int64), bins)
+
+        if scores_file != None:
+            records = np.empty( len( bins), dtype = ReadCatrapid.INTERACTION_SCORES_DTYPE)
+            records[ "rna"] = rna_codes
+            records[ "protein"] = protein_codes
+            records[ "bin"] = bins
+            records.tofile( scores_file)
 
 
+    # #
+    # Function to write extra output file with interactions normalised by the max for each RNA, 
+    # (using unity-based normalisation, aka min-max normalisation)
+    # This function runs after reading the catRAPID file with --writeNormalisedInteractions on: the minimum and maximum
+    # scores of each RNA come from its score frequencies, and the scores of the interactions from the binary interaction scores file,
+    # normalised by batches. The interactions file is only read to copy its other columns.
+    def write_normalised_interactions( self):
+
+        if not os.path.exists( self.outputFolder + ReadCatrapid.STORED_INTERACTIONS_FILENAME):
+            raise RainetException( "ReadCatrapid.write_normalised_interactions : output interactions file not found. %s" % self.outputFolder + ReadCatrapid.STORED_INTERACTIONS_FILENAME)
+        if not os.path.exists( self.outputFolder + ReadCatrapid.INTERACTION_SCORES_FILENAME):
+            raise RainetException( "ReadCatrapid.write_normalised_interactions : interaction scores file not found. %s" % self.outputFolder + ReadCatrapid.INTERACTION_SCORES_FILENAME)
+
+        #===============================================================================
+        # Get maximum and minimum scores for each transcript
+        #===============================================================================
+
+        # same values as the min_score and max_score columns of the RNA interactions file
+        minimumBins, maximumBins = self.rnaScoreFrequencies.get_bin_ranges()
+        rnaMin = ScoreHistogram.get_scores( minimumBins)
+        rnaMax = ScoreHistogram.get_scores( maximumBins)
+
         #===============================================================================
         # Apply normalisation
         #===============================================================================
 
-        idColumn = 0        
-        scoreColumn = 1
-        
         # e.g. format: sp|Q7Z419|R144B_HUMAN ENST00000542804    20.56    0.54    0.00
+        # the score column is replaced by the normalised score
 
         outFile = open( self.outputFolder + ReadCatrapid.NORMALISED_STORED_INTERACTIONS_FILENAME, "w")
-        
+
         with open( self.outputFolder + ReadCatrapid.STORED_INTERACTIONS_FILENAME, "r") as inFile:
-            
-            for line in inFile:
-                line = line.strip()
-                spl = line.split( "\t")
-                
-                score = round( float( spl[ scoreColumn]), 1)
+            with open( self.outputFolder + ReadCatrapid.INTERACTION_SCORES_FILENAME, "rb") as scoresFile:
 
-                transcriptID = spl[ idColumn].split( " ")[1]
-                                
-                # min-max normalisation
+                records = np.fromfile( scoresFile, ReadCatrapid.INTERACTION_SCORES_DTYPE, self.batchSize)
+                while len( records) > 0:
 
-                minimum = rnaMin[ transcriptID]
-                maximum = rnaMax[ transcriptID]
-                
-                assert score >= minimum
-                assert score <= maximum
+                    # min-max normalisation
+                    rnaCodes = records[ "rna"]
+                    sameScores = rnaMin[ rnaCodes] == rnaMax[ rnaCodes]
+                    if np.any( sameScores):
+                        transcriptID = self.rnaScoreFrequencies.itemIDs[ rnaCodes[ sameScores][ 0]]
+                        raise RainetException( "ReadCatrapid.write_normalised_interactions : all interactions of transcript have the same score. %s" % transcriptID)
 
-                normalisedScore = self._min_max_normalisation( score, minimum, maximum)
-                
-                # rewrite output file
-                text = "%s\t%.2f\t%s\n" % ( "\t".join( spl[ :scoreColumn]), normalisedScore, "\t".join( spl[ scoreColumn+1:]))
+                    normalisedScores = self._min_max_normalisation( ScoreHistogram.get_scores( records[ "bin"]), rnaMin[ rnaCodes], rnaMax[ rnaCodes])
+
+                    # rewrite output file
+                    text = []
+                    for line, normalisedScore in itertools.izip( itertools.islice( inFile, len( records)), normalisedScores.tolist()):
+                        spl = line.strip().split( "\t", 2)
+                        text.append( "%s\t%.2f\t%s\n" % ( spl[ 0], normalisedScore, "\t".join( spl[ 2:])))
+                    outFile.write( "".join( text))
 
-                outFile.write( text)
+                    records = np.fromfile( scoresFile, ReadCatrapid.INTERACTION_SCORES_DTYPE, self.batchSize)
 
         outFile.close()
+
+        # the interaction scores file is only used for the normalisation
+        os.remove( self.outputFolder + ReadCatrapid.INTERACTION_SCORES_FILENAME)
         
 
-    # function to calculate min-max normalisation (unity-based normalisation)
+    # function to calculate min-max normalisation (unity-based normalisation), of a value or of an array of values
     def _min_max_normalisation(self, x, minimum, maximum):
 
-        normVal = float( x - minimum) / float( maximum - minimum)
+        normVal = np.true_divide( np.subtract( x, minimum), np.subtract( maximum, minimum))
        
-        assert normVal >= 0        
-        assert normVal <= 1
+        assert np.all( normVal >= 0)
+        assert np.all( normVal <= 1)
 
         return normVal
 
 
     # #
-    # Function to write matrix output file for interactions after filtering.
+    # Function to write matrix output file for interactions after filtering, in the format given by matrixFormat:
+    # text, dense numpy matrix (with NaN for the missing interactions) or sparse scipy CSR matrix.
+    # The binary matrices are written with their RNA and protein ID files.
     # This function runs after writing interactions file.
     def write_matrix_output( self):
 
@@ -474,29 +637,74 @@ class ReadCatrapid(object):
         if not os.path.exists( self.outputFolder + ReadCatrapid.STORED_INTERACTIONS_FILENAME):
             raise RainetException( "ReadCatrapid.write_matrix_output : output interactions file not found. %s" % self.outputFolder + ReadCatrapid.STORED_INTERACTIONS_FILENAME)
 
-        ## Check amount of interactions to not overload the system
-        
-        cmd = "wc -l %s" % ( self.outputFolder + ReadCatrapid.STORED_INTERACTIONS_FILENAME)
+        #=================================================================== 
+        # Read filtered interactions file, as arrays of row, column and score of each interaction
+        #=================================================================== 
 
-        stout = SubprocessUtil.run_command( cmd, verbose = 0, return_stdout = 1)
-        try:
-            nlines = int( stout.split( " ")[0])
-        except:
-            raise RainetException( "Could not calculate number of lines in filtered stored interactions." % cmd)
+        rnaIDs, protIDs, rows, columns, scores = self.read_matrix_interactions()
 
-        if nlines > ReadCatrapid.MAXIMUM_NUMBER_VIABLE_INTERACTIONS:
-            raise RainetException( "ReadCatrapid.write_matrix_output : number of interactions to write matrix is too large to be computable: %s interactions" % nlines)
-            
-        print "Writing matrix with %s interactions" % nlines
+        print "Writing matrix with %s interactions" % len( scores)
+
+        # with boolean interactions, the matrix has 1 or 0 instead of scores
+        if self.booleanInteraction:
+            values = np.ones( len( scores), dtype = np.int8)
+        else:
+            values = scores
+
+        # sort the interactions by row and column, checking that there is only one interaction for each pair
+        order = np.argsort( rows.astype( np.int64) * len( protIDs) + columns, kind = "mergesort")
+        rows, columns, values = rows[ order], columns[ order], values[ order]
+        duplicates = np.flatnonzero( ( rows[ 1:] == rows[ :-1]) & ( columns[ 1:] == columns[ :-1]))
+        if len( duplicates) > 0:
+            pair = rnaIDs[ rows[ duplicates[ 0]]] + "|" + protIDs[ columns[ duplicates[ 0]]]
+            raise RainetException("ReadCatrapid.write_matrix_output: duplicate interaction", pair)
 
         #=================================================================== 
-        # Read filtered interactions file and store interactions into memory
+        # Write matrix, one row per rna, one column per protein
         #=================================================================== 
 
-        # create data structures with all proteins, RNAs and scores of pairs 
-        setInteractingRNAs = set()
-        setInteractingProts = set()
-        dictPairs = {}
+        if self.matrixFormat == ReadCatrapid.MATRIX_FORMAT_DENSE:
+            if self.booleanInteraction:
+                matrix = np.lib.format.open_memmap( self.outputFolder + ReadCatrapid.INTERACTIONS_SCORE_MATRIX_DENSE, mode = "w+",
+                                                    dtype = np.int8, shape = ( len( rnaIDs), len( protIDs)))
+            else:
+                matrix = np.lib.format.open_memmap( self.outputFolder + ReadCatrapid.INTERACTIONS_SCORE_MATRIX_DENSE, mode = "w+",
+                                                    dtype = np.float32, shape = ( len( rnaIDs), len( protIDs)))
+                matrix[:] = np.nan
+            # filled by blocks of rows
+            for start in xrange( 0, len( rows), self.batchSize):
+                matrix[ rows[ start:start + self.batchSize], columns[ start:start + self.batchSize]] = values[ start:start + self.batchSize]
+            matrix.flush()
+            del matrix
+        else:
+            indptr = np.concatenate( ( [ 0], np.cumsum( np.bincount( rows, minlength = len( rnaIDs)))))
+            matrix = sparse.csr_matrix( ( values, columns, indptr), shape = ( len( rnaIDs), len( protIDs)))
+            if self.matrixFormat == ReadCatrapid.MATRIX_FORMAT_SPARSE:
+                sparse.save_npz( self.outputFolder + ReadCatrapid.INTERACTIONS_SCORE_MATRIX_SPARSE, matrix, compressed = False)
+            else:
+                ReadCatrapid.write_text_matrix( matrix, rnaIDs, protIDs, self.outputFolder + ReadCatrapid.INTERACTIONS_SCORE_MATRIX)
+
+        if self.matrixFormat != ReadCatrapid.MATRIX_FORMAT_TEXT:
+            for fileName, itemIDs in ( ( ReadCatrapid.INTERACTIONS_SCORE_MATRIX_RNAS, rnaIDs), ( ReadCatrapid.INTERACTIONS_SCORE_MATRIX_PROTEINS, protIDs)):
+                with open( self.outputFolder + fileName, "w") as outFile:
+                    for itemID in itemIDs:
+                        outFile.write( "%s\n" % itemID)
+
+
+    # #
+    # Read the filtered interactions file, by batches of lines
+    #
+    # @return tuple - The sorted RNA IDs and protein IDs (rows and columns of the matrix),
+    # and the row, column and score (numpy.float32) of each interaction, as numpy arrays in the order of the file
+    def read_matrix_interactions( self):
+
+        # codes of the RNAs and proteins, in order of first appearance
+        rnaCodes = {}
+        protCodes = {}
+        rowBatches = []
+        columnBatches = []
+        scoreBatches = []
+        interactionCount = 0
 
         idColumn = 0        
         scoreColumn = 1
@@ -504,68 +712,115 @@ class ReadCatrapid(object):
         # e.g. format: sp|Q7Z419|R144B_HUMAN ENST00000542804    20.56    0.54    0.00
   
         with open( self.outputFolder + ReadCatrapid.STORED_INTERACTIONS_FILENAME, "r") as inFile:
-             
-            for line in inFile:
-                line = line.strip()
-                spl = line.split( "\t")
-                 
-                score = float( spl[ scoreColumn])
- 
-                spl2 = spl[ idColumn].split( " ")
- 
-                txID = spl2[ 1]
-                protID = spl2[ 0]
-                            
-                pair = txID + "|" + protID
+            lines = list( itertools.islice( inFile, self.batchSize))
+            while len( lines) > 0:
+
+                ## Check amount of interactions to not overload the system
+                interactionCount += len( lines)
+                if interactionCount > ReadCatrapid.MAXIMUM_NUMBER_VIABLE_INTERACTIONS:
+                    raise RainetException( "ReadCatrapid.write_matrix_output : number of interactions to write matrix is too large to be computable: more than %s interactions" % ReadCatrapid.MAXIMUM_NUMBER_VIABLE_INTERACTIONS)
+
+                rows = []
+                columns = []
+                scores = []
+                for line in lines:
+                    spl = line.strip().split( "\t")
+                    spl2 = spl[ idColumn].split( " ")
+                    rows.append( rnaCodes.setdefault( spl2[ 1], len( rnaCodes)))
+                    columns.append( protCodes.setdefault( spl2[ 0], len( protCodes)))
+                    scores.append( float( spl[ scoreColumn]))
+                rowBatches.append( np.array( rows, dtype = np.int32))
+                columnBatches.append( np.array( columns, dtype = np.int32))
+                scoreBatches.append( np.array( scores, dtype = np.float32))
+
+                lines = list( itertools.islice( inFile, self.batchSize))
+
+        # use sorting to keep headers in place: codes replaced by the index of the ID in the sorted IDs
+        sortedIDs = []
+        sortedIndexes = []
+        for codes in ( rnaCodes, protCodes):
+            itemIDs = sorted( codes)
+            indexes = np.empty( len( itemIDs), dtype = np.int32)
+            indexes[ [ codes[ itemID] for itemID in itemIDs]] = np.arange( len( itemIDs), dtype = np.int32)
+            sortedIDs.append( itemIDs)
+            sortedIndexes.append( indexes)
+
+        rows = sortedIndexes[ 0][ np.concatenate( rowBatches + [ np.zeros( 0, dtype = np.int32)])]
+        columns = sortedIndexes[ 1][ np.concatenate( columnBatches + [ np.zeros( 0, dtype = np.int32)])]
+        scores = np.concatenate( scoreBatches + [ np.zeros( 0, dtype = np.float32)])
+
+        return sortedIDs[ 0], sortedIDs[ 1], rows, columns, scores
 
-                if pair not in dictPairs:
-                    dictPairs[pair] = score
-                else:
-                    raise RainetException("ReadCatrapid.write_matrix_output: duplicate interaction", pair)
-     
-                setInteractingRNAs.add( txID)
-                setInteractingProts.add( protID)
- 
-        #=================================================================== 
-        # Write file with interaction scores for each protein-RNA pair, matrix format
-        #=================================================================== 
-        # E.g.
-        # RNAs Prot1 Prot2
-        # RNA1 10.4    0.3
-        # RNA2 32.6    -34.5
- 
-        outHandler = open( self.outputFolder + ReadCatrapid.INTERACTIONS_SCORE_MATRIX, "w")
- 
-        # use sorting to keep headers in place
-        sortedSetInteractingProts = sorted( setInteractingProts)
-        sortedSetInteractingRNAs = sorted( setInteractingRNAs)
- 
-        # write header with protein IDs
-        outHandler.write( "RNAs")
-        for prot in sortedSetInteractingProts:
-            outHandler.write( "\t%s" % prot )
-        outHandler.write( "\n")
-             
-        # write bulk of file, one row per rna, one column per protein
-        for rna in sortedSetInteractingRNAs:
-            text = rna
-            for prot in sortedSetInteractingProts:
-                tag = rna + "|" + prot
-                if tag in dictPairs:
-                    if self.booleanInteraction:
-                        score = "1"
+
+    # #
+    # Load the binary interaction matrix written by write_matrix_output
+    #
+    # @param output_folder : string - The folder of the matrix
+    # @param matrix_format : string - The format of the matrix, dense or sparse
+    #
+    # @return tuple - The matrix (memory-mapped numpy array or scipy CSR matrix), the RNA IDs (rows) and the protein IDs (columns)
+    @staticmethod
+    def load_matrix_output( output_folder, matrix_format):
+
+        if matrix_format == ReadCatrapid.MATRIX_FORMAT_DENSE:
+            matrix = np.load( output_folder + ReadCatrapid.INTERACTIONS_SCORE_MATRIX_DENSE, mmap_mode = "r")
+        elif matrix_format == ReadCatrapid.MATRIX_FORMAT_SPARSE:
+            matrix = sparse.load_npz( output_folder + ReadCatrapid.INTERACTIONS_SCORE_MATRIX_SPARSE)
+        else:
+            raise RainetException( "ReadCatrapid.load_matrix_output : no binary matrix for format %s" % matrix_format)
+
+        itemIDs = []
+        for fileName in ( ReadCatrapid.INTERACTIONS_SCORE_MATRIX_RNAS, ReadCatrapid.INTERACTIONS_SCORE_MATRIX_PROTEINS):
+            with open( output_folder + fileName, "r") as inFile:
+                itemIDs.append( [ line.rstrip( "\n") for line in inFile])
+
+        return matrix, itemIDs[ 0], itemIDs[ 1]
+
+
+    # #
+    # Write an interaction matrix as text, e.g.
+    # RNAs Prot1 Prot2
+    # RNA1 10.4    0.3
+    # RNA2 32.6    -34.5
+    # The missing interactions are written as NA for a matrix of scores, and as 0 for a boolean matrix (integers).
+    #
+    # @param matrix : numpy array or scipy CSR matrix - The matrix (see load_matrix_output)
+    # @param rna_ids : list<string> - The RNA of each row
+    # @param protein_ids : list<string> - The protein of each column
+    # @param path : string - The text file to write
+    @staticmethod
+    def write_text_matrix( matrix, rna_ids, protein_ids, path):
+
+        isSparse = sparse.issparse( matrix)
+        isBoolean = not np.issubdtype( matrix.dtype, np.floating)
+
+        with open( path, "w") as outHandler:
+
+            # write header with protein IDs
+            outHandler.write( "RNAs")
+            for prot in protein_ids:
+                outHandler.write( "\t%s" % prot )
+            outHandler.write( "\n")
+
+            # write bulk of file, one row per rna, one column per protein
+            for rowIndex, rna in enumerate( rna_ids):
+                if isSparse:
+                    if isBoolean:
+                        row = np.zeros( len( protein_ids), dtype = matrix.dtype)
                     else:
-                        score = dictPairs[tag]
+                        row = np.full( len( protein_ids), np.nan, dtype = matrix.dtype)
+                    start, end = matrix.indptr[ rowIndex], matrix.indptr[ rowIndex + 1]
+                    row[ matrix.indices[ start:end]] = matrix.data[ start:end]
                 else:
-                    if self.booleanInteraction:
-                        score = "0"
-                    else:
-                        score = "NA"
-                text+= "\t%s" % score 
-            text+= "\n"
-            outHandler.write( text)
- 
-        outHandler.close()
+                    row = matrix[ rowIndex]
+
+                if isBoolean:
+                    text = row.astype( str)
+                else:
+                    # scores written as "%s" % float, like the scores read from the catRAPID file: the float32 scores are
+                    # converted to float64 through their shortest representation (e.g. 20.56), which recovers the scores of the file
+                    text = [ "NA" if np.isnan( score) else "%s" % score for score in row.astype( str).astype( np.float64).tolist() ]
+                outHandler.write( "%s\t%s\n" % ( rna, "\t".join( text)))
 
         
     # run functions in proper order
@@ -627,6 +882,10 @@ if __name__ == "__main__":
                              default = 0, help='Whether to write interaction matrix file with 1 or 0 instead of score values. --writeInteractions and --writeInteractionMatrix argument must also be 1.')   
         parser.add_argument('--sampleInteractions', metavar='sampleInteractions', type=int,
                              default = 0, help='Whether to write file with at least one interactions for each RNA and each protein. Output file can have more than X interactions for a protein/RNA since they are co-dependent. Applied after all other filters. Default = 0 (OFF).')   
+        parser.add_argument('--workers', metavar='workers', type=int,
+                             default = 1, help='Number of worker processes reading the catRAPID file, split in chunks starting at the beginning of a line. Default = 1 (file read by the main process).')   
+        parser.add_argument('--matrixFormat', metavar='matrixFormat', type=str, choices = ReadCatrapid.MATRIX_FORMATS,
+                             default = ReadCatrapid.MATRIX_FORMAT_TEXT, help='Format of the interaction matrix file: text, dense (numpy .npy file, memory-mappable) or sparse (scipy CSR .npz file). The binary matrices come with files of their RNA and protein IDs. Default = text.')   
     
         #gets the arguments
         args = parser.parse_args( ) 
@@ -634,7 +893,8 @@ if __name__ == "__main__":
         # init
         readCatrapid = ReadCatrapid( args.catRAPIDFile, args.outputFolder, args.interactionCutoff, args.interactionFilterFile, 
                                      args.rnaFilterFile, args.proteinFilterFile, args.writeInteractions, args.batchSize, 
-                                     args.writeNormalisedInteractions, args.writeInteractionMatrix, args.booleanInteraction, args.sampleInteractions)
+                                     args.writeNormalisedInteractions, args.writeInteractionMatrix, args.booleanInteraction, args.sampleInteractions, args.workers,
+                                     args.matrixFormat)
     
         readCatrapid.run()
     
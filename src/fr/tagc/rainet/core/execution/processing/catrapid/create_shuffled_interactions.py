@@ -1,19 +1,24 @@
 
 import sys
-import random
+
+from fr.tagc.rainet.core.util.rng.RandomService import RandomService
 
 #12-Oct-2016
 # Simple script to create set of catRAPID interactions, by replacing/shuffling names of proteins.
 # The number and values of scores for an RNA will be kept, only their binding partners change.
+# Optional third argument: the random seed (drawn at random by default, and printed so that the shuffling can be reproduced)
 
 proteinListFile = sys.argv[1]
 catrapidFile = sys.argv[2]
+randomSeed = RandomService.get_instance().set_seed( int( sys.argv[3]) if len( sys.argv) > 3 else None)
+
+print "Random seed: %s" % randomSeed
 
 ### read list of proteins and swap names of proteins
 
 proteinList = [line.strip() for line in open( proteinListFile,"r").readlines()]
 
-randomizedProteinList = random.sample( proteinList, len( proteinList))
+randomizedProteinList = RandomService.sample( RandomService.get_instance().get_stream( "create_shuffled_interactions"), proteinList, len( proteinList))
 
 assert( len( set(proteinList)) == len( set(randomizedProteinList)) )
 
@@ -39,29 +39,27 @@ def splitFile( library_file, batch_size, output_folder):
     
     inFileName = os.path.basename( library_file)
     
-    # read input file
+    # read input file, the lines being written to the current split file as they are read
     with open( library_file, "r") as inFile:
-        text = ""
         totalLines = 0 # for statistical purposes
         lineCount = 0
         fileCount = 0
+        outFile = open( outPath + "/" + inFileName + "_" + str( fileCount) + ".lib", "w")
         for line in inFile:
             totalLines +=1
             lineCount += 1
             
-            text += line
+            outFile.write( line)
             
             if lineCount == numMolecules:
-                with open( outPath + "/" + inFileName + "_" + str( fileCount) + ".lib", "w") as outFile:
-                    outFile.write( text)
+                outFile.close()
                 fileCount+=1
                 lineCount = 0
-                text = ""
+                outFile = open( outPath + "/" + inFileName + "_" + str( fileCount) + ".lib", "w")
                 
 
-        # write the last batch
-        with open( outPath + "/" + inFileName + "_" + str( fileCount) + ".lib", "w") as outFile:
-            outFile.write( text)
+        # close the last batch
+        outFile.close()
     
         
         # check if written correct number of files
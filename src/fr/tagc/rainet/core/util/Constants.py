@@ -45,6 +45,12 @@ STATUS_WARNING = "WARNING"
 STATUS_RAINET_ERROR = "RAINET ERROR"
 STATUS_ERROR = "ERROR" 
 
+# Number of file lines processed between two commits during insertion
+INSERTION_BATCH_SIZE = 100000
+
+# Size (in bytes) of the file blocks hashed to fingerprint the source files of the tables
+FINGERPRINT_BLOCK_SIZE = 16 * 1024 * 1024
+
 #===============================================================================
 # Constants on folder creation
 #===============================================================================
@@ -0,0 +1,142 @@
+import os
+
+import numpy
+
+from fr.tagc.rainet.core.util.log.Logger import Logger
+
+
+# #
+# This class is a compact copy of the protein-annotation membership of an annotation table (e.g. ProteinKEGGAnnotation)
+# and of the annotations of its base table (e.g. KEGGPathway). The annotation and protein IDs are coded as integers
+# (their index in the list of IDs, in order of first appearance in the table) and the memberships are stored as
+# the codes of the rows, in the order of the table, so that the dictionaries built from them are the same as
+# the ones built from the query of the table.
+# The memberships are cached in a folder next to the database, one file per annotation table. A cached file
+# is used only if the state of the tables (their TableStatus and TableFingerprint entries and number of rows)
+# is the same as when it was written.
+class AnnotationMembership( object ):
+
+    # Folder of the cache: database path + extension
+    CACHE_EXTENSION = ".annotations"
+
+    # Extension of the file of an annotation table
+    FILE_EXTENSION = ".npz"
+
+    # #
+    # @param annotation_ids : list<string> - The annotation IDs, by code
+    # @param protein_ids : list<string> - The protein IDs, by code
+    # @param row_annotations : numpy.array - The annotation code of each row of the annotation table
+    # @param row_proteins : numpy.array - The protein code of each row of the annotation table
+    # @param base_annotations : numpy.array - The annotation code of each row of the base table
+    def __init__( self, annotation_ids, protein_ids, row_annotations, row_proteins, base_annotations ):
+
+        self.annotationIDs = annotation_ids
+        self.proteinIDs = protein_ids
+        self.rowAnnotations = row_annotations
+        self.rowProteins = row_proteins
+        self.baseAnnotations = base_annotations
+
+    # #
+    # Build the memberships from the rows of the tables
+    #
+    # @param annotation_rows : list<tuple( string, string)> - The annotation and protein IDs of each row of the annotation table
+    # @param base_rows : list<string> - The annotation ID of each row of the base table
+    #
+    # @return AnnotationMembership - The memberships
+    @staticmethod
+    def from_rows( annotation_rows, base_rows ):
+
+        annotationCodes = {}
+        proteinCodes = {}
+        rowAnnotations = numpy.array( [ annotationCodes.setdefault( annotID, len( annotationCodes ) ) for annotID, _ in annotation_rows ], dtype = numpy.int32 )
+        rowProteins = numpy.array( [ proteinCodes.setdefault( protID, len( proteinCodes ) ) for _, protID in annotation_rows ], dtype = numpy.int32 )
+        baseAnnotations = numpy.array( [ annotationCodes.setdefault( annotID, len( annotationCodes ) ) for annotID in base_rows ], dtype = numpy.int32 )
+
+        return AnnotationMembership( AnnotationMembership.sort_ids( annotationCodes ), AnnotationMembership.sort_ids( proteinCodes ),
+                                     rowAnnotations, rowProteins, baseAnnotations )
+
+    # #
+    # @param codes : dict - The code of each ID (key -> ID, value -> code)
+    #
+    # @return list<string> - The IDs, by code
+    @staticmethod
+    def sort_ids( codes ):
+
+        ids = [ None ] * len( codes )
+        for itemID, code in codes.iteritems():
+            ids[ code ] = itemID
+        return ids
+
+    # #
+    # Group the rows of the annotation table by key (annotation or protein), the keys being in order of first appearance
+    # in the selected rows and the rows of a key in table order
+    #
+    # @param keys : numpy.array - The key code of each selected row
+    # @param values : numpy.array - The value code of each selected row
+    #
+    # @return list<tuple( int, numpy.array)> - The key codes and the value codes of their rows
+    @staticmethod
+    def group_rows( keys, values ):
+
+        uniqueKeys, firstRows, keyCounts = numpy.unique( keys, return_index = True, return_counts = True )
+        groupedValues = values[ numpy.argsort( keys, kind = "mergesort" ) ]
+        groupStarts = numpy.concatenate( ( [ 0 ], numpy.cumsum( keyCounts ) ) )
+
+        return [ ( uniqueKeys[ group ], groupedValues[ groupStarts[ group ] : groupStarts[ group + 1 ] ] ) for group in numpy.argsort( firstRows, kind = "mergesort" ) ]
+
+    # #
+    # @return boolean - True if the table contains the same protein-annotation pair several times
+    def has_duplicates( self ):
+
+        pairs = self.rowAnnotations.astype( numpy.int64 ) * len( self.proteinIDs ) + self.rowProteins
+        return len( numpy.unique( pairs ) ) != len( pairs )
+
+    # #
+    # @param db_path : string - The path to the database
+    # @param table_name : string - The name of the annotation table
+    #
+    # @return string - The path to the cache file of the annotation table
+    @staticmethod
+    def get_cache_file( db_path, table_name ):
+
+        return os.path.join( db_path + AnnotationMembership.CACHE_EXTENSION, table_name + AnnotationMembership.FILE_EXTENSION )
+
+    # #
+    # Read the memberships from a cache file
+    #
+    # @param cache_file : string - The path to the cache file
+    # @param table_state : string - The current state of the tables (see SQLUtil.get_table_state)
+    #
+    # @return AnnotationMembership - The memberships, None if there is no cache file or if it was written for another state of the tables
+    @staticmethod
+    def read( cache_file, table_state ):
+
+        if not os.path.exists( cache_file ):
+            return None
+
+        with numpy.load( cache_file ) as cache:
+            if str( cache[ "state" ] ) != table_state:
+                Logger.get_instance().info( "AnnotationMembership.read : The tables changed since the cache " + cache_file + " was written." )
+                return None
+            return AnnotationMembership( cache[ "annotations" ].tolist(), cache[ "proteins" ].tolist(), cache[ "row_annotations" ],
+                                         cache[ "row_proteins" ], cache[ "base_annotations" ] )
+
+    # #
+    # Write the memberships to a cache file. The file is written under a temporary name then renamed,
+    # so that a run reading the cache never sees a partial file.
+    #
+    # @param cache_file : string - The path to the cache file
+    # @param table_state : string - The current state of the tables (see SQLUtil.get_table_state)
+    def write( self, cache_file, table_state ):
+
+        try:
+            folder = os.path.dirname( cache_file )
+            if folder != "" and not os.path.isdir( folder ):
+                os.makedirs( folder )
+            with open( cache_file + ".tmp", "wb" ) as cacheHandler:
+                numpy.savez( cacheHandler, state = table_state, annotations = numpy.array( self.annotationIDs, dtype = str ),
+                             proteins = numpy.array( self.proteinIDs, dtype = str ), row_annotations = self.rowAnnotations,
+                             row_proteins = self.rowProteins, base_annotations = self.baseAnnotations )
+            os.rename( cache_file + ".tmp", cache_file )
+        except ( IOError, OSError ) as error:
+            Logger.get_instance().warning( "AnnotationMembership.write : Unable to write the cache " + cache_file + " : " + str( error ) )
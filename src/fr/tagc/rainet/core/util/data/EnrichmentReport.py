@@ -0,0 +1,314 @@
+import os
+import shutil
+import itertools
+
+import numpy
+
+from fr.tagc.rainet.core.util.file.FileUtils import FileUtils
+from fr.tagc.rainet.core.util.exception.RainetException import RainetException
+
+
+# #
+# This class writes the report of the enrichment tests (one line per RNA-annotation test). The tests of an RNA are
+# formatted and written as a single block, and can optionally be written to a columnar copy of the report as well:
+# a folder next to the report with one binary file per column (one value per test, in the order of the tests), the
+# RNAs and annotations being coded by their index in the files of IDs of the folder. The columns always contain
+# all the tests, even when the report only contains the significant ones.
+# When the report is closed, its size and modification time are written to the columns folder: the columns are used
+# only if they still correspond to the report (e.g. not left by a previous run of the same report).
+class EnrichmentReport( object ):
+
+    HEADER = "transcriptID\tannotID\tnumber_observed_interactions\tnumber_possible_interactions\tpercent_interacting_proteins\twarning\tpval\tcorrected_pval\tsign_corrected\n"
+
+    ROW_FORMAT = "%s\t%s\t%i\t%i\t%s\t%i\t%.1e\t%.1e\t%i\n"
+
+    # Name of the column of the tests of each column of the report (see ROW_FORMAT), and its format
+    REPORT_COLUMNS = [ ( "rna", None ),
+                       ( "annotation", None ),
+                       ( "observed", "%i" ),
+                       ( "possible", "%i" ),
+                       ( "interactions", None ),
+                       ( "warning", "%i" ),
+                       ( "pval", "%.1e" ),
+                       ( "corrected_pval", "%.1e" ),
+                       ( "sign", "%i" ) ]
+
+    # Folder of the columns: report path + extension
+    COLUMN_EXTENSION = ".columns"
+
+    # Files of the columns folder
+    TRANSCRIPT_FILE = "transcripts.txt"
+    ANNOTATION_FILE = "annotations.txt"
+    BACKGROUND_FILE = "background.txt"
+    REPORT_STAMP_FILE = "report_stamp.txt"
+    COLUMN_FILE_EXTENSION = ".bin"
+
+    # Columns of the tests and their type
+    COLUMNS = [ ( "rna", numpy.int32 ),
+                ( "annotation", numpy.int32 ),
+                ( "observed", numpy.int32 ),
+                ( "possible", numpy.int32 ),
+                ( "interactions", numpy.int32 ),
+                ( "warning", numpy.int8 ),
+                ( "pval", numpy.float64 ),
+                ( "corrected_pval", numpy.float64 ),
+                ( "sign", numpy.int8 ) ]
+
+    # #
+    # Open the report. A new report is written with its header (and the files of IDs of the columns), an existing report
+    # is truncated after the given offsets and completed.
+    #
+    # @param report_file : string - The path to the report
+    # @param rna_ids : list<string> - The RNAs, by index
+    # @param annotation_ids : list<string> - The annotations, by index (the tests of an RNA being in this order)
+    # @param background_size : int - The number of proteins of the background
+    # @param significant_only : boolean - Whether only the significant tests are written to the report
+    # @param columns : boolean - Whether the tests are written to the columns as well
+    # @param offsets : tuple( int, int) (optional) - The size of the report and the number of rows of the columns to keep
+    # from an existing report, ( 0, 0) for a fragment of report (without header). None for a new report.
+    def __init__( self, report_file, rna_ids, annotation_ids, background_size, significant_only = False, columns = False, offsets = None ):
+
+        self.reportFile = report_file
+        self.rnaIDs = rna_ids
+        self.annotationIDs = annotation_ids
+        self.backgroundSize = background_size
+        self.significantOnly = significant_only
+        self.columns = columns
+
+        columnFolder = EnrichmentReport.get_column_folder( self.reportFile )
+        if offsets == None:
+            self.reportHandler = FileUtils.open_text_w( self.reportFile )
+            self.reportHandler.write( EnrichmentReport.HEADER )
+            self.rowNumber = 0
+            if self.columns:
+                EnrichmentReport.write_column_ids( columnFolder, self.rnaIDs, self.annotationIDs, self.backgroundSize )
+            elif os.path.isdir( columnFolder ):
+                # the columns of a previous run of the report
+                shutil.rmtree( columnFolder )
+        else:
+            self.reportHandler = FileUtils.open_truncated( self.reportFile, offsets[ 0 ] )
+            self.rowNumber = offsets[ 1 ]
+            if self.columns and not os.path.isdir( columnFolder ):
+                os.makedirs( columnFolder )
+
+        # the columns do not correspond to the report until it is closed
+        stampFile = os.path.join( columnFolder, EnrichmentReport.REPORT_STAMP_FILE )
+        if os.path.exists( stampFile ):
+            os.remove( stampFile )
+
+        self.columnHandlers = []
+        if self.columns:
+            self.columnHandlers = [ FileUtils.open_truncated( os.path.join( columnFolder, name + EnrichmentReport.COLUMN_FILE_EXTENSION ),
+                                                              self.rowNumber * numpy.dtype( dtype ).itemsize, "ab" )
+                                    for name, dtype in EnrichmentReport.COLUMNS ]
+
+    # #
+    # Write the tests of an RNA against all the annotations
+    #
+    # @param rna_index : int - The index of the RNA
+    # @param counts : numpy.array - For each annotation, the number of proteins of the annotation the RNA interacts with
+    # @param annotation_sizes : numpy.array - For each annotation, the number of proteins with interaction data
+    # @param total_interactions : int - The number of proteins with annotation the RNA interacts with
+    # @param skip_tests : numpy.array - For each annotation, the warning tag
+    # @param pvalues : numpy.array - For each annotation, the p-value
+    # @param corrected_pvalues : numpy.array - For each annotation, the corrected p-value
+    # @param significant : numpy.array - For each annotation, the significance tag
+    def write_tests( self, rna_index, counts, annotation_sizes, total_interactions, skip_tests, pvalues, corrected_pvalues, significant ):
+
+        rows = numpy.arange( len( self.annotationIDs ) )
+        if self.significantOnly:
+            rows = numpy.flatnonzero( significant )
+
+        self.reportHandler.write( EnrichmentReport.format_rows( self.rnaIDs[ rna_index ], [ self.annotationIDs[ row ] for row in rows.tolist() ],
+                                                                counts[ rows ], annotation_sizes[ rows ],
+                                                                EnrichmentReport.get_percent_interacting( total_interactions, self.backgroundSize ),
+                                                                skip_tests[ rows ], pvalues[ rows ], corrected_pvalues[ rows ], significant[ rows ] ) )
+
+        if self.columns:
+            testNumber = len( self.annotationIDs )
+            values = [ numpy.full( testNumber, rna_index ), numpy.arange( testNumber ), counts, annotation_sizes,
+                       numpy.full( testNumber, total_interactions ), skip_tests, pvalues, corrected_pvalues, significant ]
+            for ( name, dtype ), value, columnHandler in zip( EnrichmentReport.COLUMNS, values, self.columnHandlers ):
+                numpy.asarray( value, dtype = dtype ).tofile( columnHandler )
+            self.rowNumber += testNumber
+
+    # #
+    # Write the tests of the report to disk
+    def flush( self ):
+
+        self.reportHandler.flush()
+        for columnHandler in self.columnHandlers:
+            columnHandler.flush()
+
+    # #
+    # @return tuple( int, int) - The size of the report and the number of rows of the columns, once written to disk
+    def get_offsets( self ):
+
+        self.flush()
+        return self.reportHandler.tell(), self.rowNumber
+
+    # #
+    # Append a fragment of report (written with offsets ( 0, 0) and closed) to the report, the fragment being removed
+    #
+    # @param fragment_file : string - The path to the fragment
+    def append( self, fragment_file ):
+
+        with open( fragment_file ) as fragmentHandler:
+            shutil.copyfileobj( fragmentHandler, self.reportHandler )
+        os.remove( fragment_file )
+
+        if self.columns:
+            fragmentFolder = EnrichmentReport.get_column_folder( fragment_file )
+            name, dtype = EnrichmentReport.COLUMNS[ 0 ]
+            self.rowNumber += os.path.getsize( os.path.join( fragmentFolder, name + EnrichmentReport.COLUMN_FILE_EXTENSION ) ) / numpy.dtype( dtype ).itemsize
+            for ( name, dtype ), columnHandler in zip( EnrichmentReport.COLUMNS, self.columnHandlers ):
+                with open( os.path.join( fragmentFolder, name + EnrichmentReport.COLUMN_FILE_EXTENSION ), "rb" ) as fragmentHandler:
+                    shutil.copyfileobj( fragmentHandler, columnHandler )
+            shutil.rmtree( fragmentFolder )
+
+    # #
+    # Close the report, stamping the columns (if any) with the size and modification time of the report
+    def close( self ):
+
+        self.reportHandler.close()
+        for columnHandler in self.columnHandlers:
+            columnHandler.close()
+
+        if self.columns:
+            reportStat = os.stat( self.reportFile )
+            output_file = FileUtils.open_text_w( os.path.join( EnrichmentReport.get_column_folder( self.reportFile ), EnrichmentReport.REPORT_STAMP_FILE ) )
+            output_file.write( "%i\t%r\n" % ( reportStat.st_size, reportStat.st_mtime ) )
+            output_file.close()
+
+    # #
+    # Format tests of an RNA as lines of the report
+    #
+    # @param rna_id : string - The RNA
+    # @param annotation_ids : list<string> - The annotation of each test
+    # @param percent_interacting : string - The percentage of the background the RNA interacts with (see get_percent_interacting)
+    # Other parameters : numpy.array - The columns of the tests (see write_tests)
+    #
+    # @return string - The lines of the tests
+    @staticmethod
+    def format_rows( rna_id, annotation_ids, counts, annotation_sizes, percent_interacting, skip_tests, pvalues, corrected_pvalues, significant ):
+
+        return "".join( [ EnrichmentReport.ROW_FORMAT % row for row in itertools.izip( itertools.repeat( rna_id ), annotation_ids, counts.tolist(), annotation_sizes.tolist(),
+                                                                                        itertools.repeat( percent_interacting ), skip_tests.tolist(), pvalues.tolist(),
+                                                                                        corrected_pvalues.tolist(), significant.tolist() ) ] )
+
+    # #
+    # Format a column of the report for some tests of the columns (see read_columns)
+    #
+    # @param rna_ids : list<string> - The RNAs, by index
+    # @param annotation_ids : list<string> - The annotations, by index
+    # @param background_size : int - The number of proteins of the background
+    # @param columns : dict - The columns of the tests
+    # @param rows : numpy.array - The rows of the tests to format
+    # @param report_column : int - The column of the report (0-based)
+    #
+    # @return list<string> - The value of each test, as written in the report
+    @staticmethod
+    def format_column( rna_ids, annotation_ids, background_size, columns, rows, report_column ):
+
+        name, valueFormat = EnrichmentReport.REPORT_COLUMNS[ report_column ]
+        values = columns[ name ][ rows ].tolist()
+        if name == "rna":
+            return [ rna_ids[ value ] for value in values ]
+        if name == "annotation":
+            return [ annotation_ids[ value ] for value in values ]
+        if name == "interactions":
+            return [ EnrichmentReport.get_percent_interacting( value, background_size ) for value in values ]
+        return [ valueFormat % value for value in values ]
+
+    # #
+    # @param total_interactions : int - The number of proteins with annotation the RNA interacts with
+    # @param background_size : int - The number of proteins of the background
+    #
+    # @return string - The percentage of the background the RNA interacts with, as written in the report
+    @staticmethod
+    def get_percent_interacting( total_interactions, background_size ):
+
+        return "%.1f%%" % ( total_interactions * 100.0 / background_size )
+
+    # #
+    # @param report_file : string - The path to the report
+    #
+    # @return string - The path to the columns folder of the report
+    @staticmethod
+    def get_column_folder( report_file ):
+
+        return report_file + EnrichmentReport.COLUMN_EXTENSION
+
+    # #
+    # @param report_file : string - The path to the report
+    #
+    # @return boolean - True if the report was written with its columns, and was not written again since
+    @staticmethod
+    def has_columns( report_file ):
+
+        stamp_file = os.path.join( EnrichmentReport.get_column_folder( report_file ), EnrichmentReport.REPORT_STAMP_FILE )
+        if not os.path.exists( stamp_file ) or not os.path.exists( report_file ):
+            return False
+
+        input_file = FileUtils.open_text_r( stamp_file )
+        stamp = input_file.read().split()
+        input_file.close()
+        report_stat = os.stat( report_file )
+
+        return len( stamp ) == 2 and int( stamp[ 0 ] ) == report_stat.st_size and float( stamp[ 1 ] ) == report_stat.st_mtime
+
+    # #
+    # Write the files of IDs and the background size of the columns folder, removing the previous columns
+    #
+    # @param column_folder : string - The path to the columns folder
+    # @param rna_ids : list<string> - The RNAs, by index
+    # @param annotation_ids : list<string> - The annotations, by index
+    # @param background_size : int - The number of proteins of the background
+    @staticmethod
+    def write_column_ids( column_folder, rna_ids, annotation_ids, background_size ):
+
+        if os.path.isdir( column_folder ):
+            shutil.rmtree( column_folder )
+        os.makedirs( column_folder )
+
+        for file_name, id_list in ( ( EnrichmentReport.TRANSCRIPT_FILE, rna_ids ), ( EnrichmentReport.ANNOTATION_FILE, annotation_ids ), ( EnrichmentReport.BACKGROUND_FILE, [ background_size ] ) ):
+            output_file = FileUtils.open_text_w( os.path.join( column_folder, file_name ) )
+            for item_id in id_list:
+                output_file.write( "%s\n" % item_id )
+            output_file.close()
+
+    # #
+    # Read the columns of a report. The columns are memory-mapped (not loaded in memory).
+    #
+    # @param report_file : string - The path to the report
+    #
+    # @return tuple( list<string>, list<string>, int, dict) - The RNAs and the annotations (by index), the background size
+    # and the columns (key -> column name, value -> numpy.array)
+    #
+    # @raise RainetException if the report has no columns (see has_columns) or if they are incomplete
+    @staticmethod
+    def read_columns( report_file ):
+
+        column_folder = EnrichmentReport.get_column_folder( report_file )
+        if not EnrichmentReport.has_columns( report_file ):
+            raise RainetException( "EnrichmentReport.read_columns : No columns for report " + report_file + " or they do not correspond to the report." )
+
+        id_lists = []
+        for file_name in ( EnrichmentReport.TRANSCRIPT_FILE, EnrichmentReport.ANNOTATION_FILE, EnrichmentReport.BACKGROUND_FILE ):
+            input_file = FileUtils.open_text_r( os.path.join( column_folder, file_name ) )
+            id_lists.append( [ line.rstrip( "\n" ) for line in input_file ] )
+            input_file.close()
+        rna_ids, annotation_ids, background = id_lists
+
+        columns = {}
+        for name, dtype in EnrichmentReport.COLUMNS:
+            column_file = os.path.join( column_folder, name + EnrichmentReport.COLUMN_FILE_EXTENSION )
+            if os.path.getsize( column_file ) == 0:
+                columns[ name ] = numpy.empty( 0, dtype = dtype )
+            else:
+                columns[ name ] = numpy.memmap( column_file, dtype = dtype, mode = "r" )
+
+        if len( set( [ len( column ) for column in columns.values() ] ) ) != 1:
+            raise RainetException( "EnrichmentReport.read_columns : The columns of report " + report_file + " are incomplete." )
+
+        return rna_ids, annotation_ids, int( background[ 0 ] ), columns
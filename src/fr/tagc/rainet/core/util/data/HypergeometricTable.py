@@ -0,0 +1,202 @@
+import os
+import hashlib
+
+import numpy
+from scipy import stats
+
+from fr.tagc.rainet.core.util.exception.RainetException import RainetException
+from fr.tagc.rainet.core.util.log.Logger import Logger
+
+
+# #
+# This class holds the upper tails P( X > x) of the hypergeometric distributions of the enrichment tests, for a
+# given background of N proteins. A distribution is defined by the number m of proteins of an annotation and
+# the number k of proteins an RNA interacts with: the tail of each (m, k) pair is computed once for all the
+# possible x (0 to min( m, k)), so that the p-values of the tests are read by array indexing.
+# The tails of all pairs are stored end to end in a single array (the tail of a pair starts at its offset).
+# The tables can be stored in a folder next to the database, one file per background, and extended by later runs.
+class HypergeometricTable( object ):
+
+    # Folder of the tables: database path + extension
+    TABLE_EXTENSION = ".pvalues"
+
+    # Extension of the file of the tables of a background
+    FILE_EXTENSION = ".npz"
+
+    # #
+    # Build the tables of a background, reading the tables already computed from the given file if it exists
+    #
+    # @param background_size : int - The number N of proteins of the background
+    # @param table_file : string (optional) - The file storing the tables (None to keep them in memory only)
+    #
+    # @raise RainetException if the file does not contain tables of a background of the same size
+    def __init__( self, background_size, table_file = None ):
+
+        self.backgroundSize = int( background_size )
+        self.tableFile = table_file
+
+        # tail of the pairs, in the order they were computed
+        self.pairSizes = numpy.empty( 0, numpy.int64 )
+        self.pairDraws = numpy.empty( 0, numpy.int64 )
+        self.pairOffsets = numpy.empty( 0, numpy.int64 )
+        self.tails = numpy.empty( 0, numpy.float64 )
+
+        if self.tableFile != None and os.path.exists( self.tableFile ):
+            with numpy.load( self.tableFile ) as tables:
+                if int( tables[ "background" ] ) != self.backgroundSize:
+                    raise RainetException( "HypergeometricTable.__init__ : The tables of file " + self.tableFile + " are not computed for a background of " +
+                                           str( self.backgroundSize ) + " proteins." )
+                self.pairSizes = tables[ "sizes" ]
+                self.pairDraws = tables[ "draws" ]
+                self.pairOffsets = tables[ "offsets" ]
+                self.tails = tables[ "tails" ]
+            Logger.get_instance().info( "HypergeometricTable : Read %i tables from %s." % ( len( self.pairSizes ), self.tableFile ) )
+
+        self.index_pairs()
+
+    # #
+    # Build the grid of the offsets of the pairs: offsets[ i, j] is the offset of the pair ( sizes[ i], draws[ j]), -1 if not computed
+    def index_pairs( self ):
+
+        self.sizes, sizeIndexes = numpy.unique( self.pairSizes, return_inverse = True )
+        self.draws, drawIndexes = numpy.unique( self.pairDraws, return_inverse = True )
+        self.offsets = numpy.full( ( len( self.sizes ), len( self.draws ) ), -1, dtype = numpy.int64 )
+        self.offsets[ sizeIndexes, drawIndexes ] = self.pairOffsets
+
+    # #
+    # Compute the tables of the pairs not computed yet, among all the pairs of the given m and k values.
+    # The new tables are written to the table file (if any).
+    #
+    # @param sizes : list<int> - The numbers m of proteins of the annotations
+    # @param draws : list<int> - The numbers k of proteins the RNAs interact with
+    def prepare( self, sizes, draws ):
+
+        sizes, draws = numpy.meshgrid( numpy.unique( sizes ).astype( numpy.int64 ), numpy.unique( draws ).astype( numpy.int64 ), indexing = "ij" )
+        missing = self.get_pair_offsets( sizes, draws ) < 0
+        if not missing.any():
+            return
+
+        newSizes = sizes[ missing ]
+        newDraws = draws[ missing ]
+        newTails = [ HypergeometricTable.compute_tail( self.backgroundSize, m, k ) for m, k in zip( newSizes.tolist(), newDraws.tolist() ) ]
+
+        Logger.get_instance().info( "HypergeometricTable.prepare : Computed %i tables (%i already computed)." % ( len( newTails ), len( self.pairSizes ) ) )
+
+        self.pairSizes = numpy.concatenate( ( self.pairSizes, newSizes ) )
+        self.pairDraws = numpy.concatenate( ( self.pairDraws, newDraws ) )
+        self.pairOffsets = numpy.concatenate( ( self.pairOffsets, len( self.tails ) + numpy.cumsum( [ 0 ] + [ len( tail ) for tail in newTails[ :-1 ] ], dtype = numpy.int64 ) ) )
+        self.tails = numpy.concatenate( [ self.tails ] + newTails )
+        self.index_pairs()
+
+        if self.tableFile != None:
+            self.write()
+
+    # #
+    # Write the tables to the table file. The file is written under a temporary name then renamed,
+    # so that a run reading the tables never sees a partial file.
+    def write( self ):
+
+        temporaryFile = self.tableFile + ".tmp"
+        try:
+            folder = os.path.dirname( self.tableFile )
+            if folder != "" and not os.path.isdir( folder ):
+                os.makedirs( folder )
+            with open( temporaryFile, "wb" ) as tableHandler:
+                numpy.savez( tableHandler, background = self.backgroundSize, sizes = self.pairSizes, draws = self.pairDraws,
+                             offsets = self.pairOffsets, tails = self.tails )
+            os.rename( temporaryFile, self.tableFile )
+        except ( IOError, OSError ) as error:
+            Logger.get_instance().warning( "HypergeometricTable.write : Unable to write the tables to " + self.tableFile + " : " + str( error ) )
+
+    # #
+    # @param sizes : numpy.array - The m of the pairs
+    # @param draws : numpy.array - The k of the pairs
+    #
+    # @return numpy.array - The offsets of the tails of the pairs, -1 for the pairs not computed
+    def get_pair_offsets( self, sizes, draws ):
+
+        if len( self.sizes ) == 0:
+            return numpy.full( numpy.shape( sizes ), -1, dtype = numpy.int64 )
+
+        sizeIndexes = numpy.minimum( numpy.searchsorted( self.sizes, sizes ), len( self.sizes ) - 1 )
+        drawIndexes = numpy.minimum( numpy.searchsorted( self.draws, draws ), len( self.draws ) - 1 )
+
+        offsets = self.offsets[ sizeIndexes, drawIndexes ]
+        offsets[ ( self.sizes[ sizeIndexes ] != sizes ) | ( self.draws[ drawIndexes ] != draws ) ] = -1
+        return offsets
+
+    # #
+    # Get the upper tails P( X > x) of tests, the tables of the pairs not computed yet being computed first
+    #
+    # @param x : numpy.array - The number of proteins of the annotation the RNA interacts with, for each test
+    # @param m : numpy.array - The number of proteins of the annotation, for each test
+    # @param k : int - The number of proteins the RNA interacts with
+    #
+    # @return numpy.array - The upper tail of each test
+    def get_tails( self, x, m, k ):
+
+        x, m, k = numpy.broadcast_arrays( numpy.asarray( x, dtype = numpy.int64 ), numpy.asarray( m, dtype = numpy.int64 ), numpy.asarray( k, dtype = numpy.int64 ) )
+
+        offsets = self.get_pair_offsets( m, k )
+        if ( offsets < 0 ).any():
+            self.prepare( m[ offsets < 0 ], k[ offsets < 0 ] )
+            offsets = self.get_pair_offsets( m, k )
+
+        return self.tails[ offsets + x ]
+
+    # #
+    # Compute the upper tail P( X > x) of a hypergeometric distribution for x from 0 to min( m, k).
+    # Each value is the sum of the probabilities of the values above x. The sums are accumulated in log space
+    # (from the highest value down), so that the tails far from the mean do not underflow before being summed.
+    #
+    # @param background_size : int - The number N of proteins of the background
+    # @param m : int - The number of proteins of the annotation (white balls)
+    # @param k : int - The number of proteins the RNA interacts with (draws)
+    #
+    # @return numpy.array - The upper tail of each x
+    #
+    # @raise RainetException if the parameters do not define a distribution of the tests
+    @staticmethod
+    def compute_tail( background_size, m, k ):
+
+        if k > background_size:
+            raise RainetException( "HypergeometricTable.compute_tail: Number of draws is higher than total balls." )
+        if m == 0:
+            raise RainetException( "HypergeometricTable.compute_tail: Number of white balls is zero." )
+        if k == 0:
+            raise RainetException( "HypergeometricTable.compute_tail: Number of draws is zero." )
+        if m > background_size:
+            raise RainetException( "HypergeometricTable.compute_tail: Number of black balls is negative. Possible issue with protein background." )
+
+        # support of the distribution: the tail is 1.0 below and 0.0 from the upper bound
+        lowest = max( k - ( background_size - m ), 0 )
+        highest = min( m, k )
+
+        tail = numpy.zeros( highest + 1 )
+        tail[ :lowest ] = 1.0
+        if lowest < highest:
+            # log of the probabilities of lowest + 1 to highest, then log of their sums from each value to highest
+            logProbabilities = stats.hypergeom.logpmf( numpy.arange( lowest + 1, highest + 1 ), background_size, m, k )
+            logTails = numpy.logaddexp.accumulate( logProbabilities[ ::-1 ] )[ ::-1 ]
+            tail[ lowest:highest ] = numpy.clip( numpy.exp( logTails ), 0, 1 )
+
+        return tail
+
+    # #
+    # @param background_proteins : set<string> - The proteins of the background
+    #
+    # @return string - The fingerprint of the background
+    @staticmethod
+    def get_fingerprint( background_proteins ):
+
+        return hashlib.md5( "\n".join( sorted( background_proteins ) ) ).hexdigest()
+
+    # #
+    # @param db_path : string - The path to the database
+    # @param background_proteins : set<string> - The proteins of the background
+    #
+    # @return string - The path to the file of the tables of the background
+    @staticmethod
+    def get_table_file( db_path, background_proteins ):
+
+        return os.path.join( db_path + HypergeometricTable.TABLE_EXTENSION, HypergeometricTable.get_fingerprint( background_proteins ) + HypergeometricTable.FILE_EXTENSION )
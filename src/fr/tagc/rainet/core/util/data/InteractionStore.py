@@ -0,0 +1,385 @@
+
+import os
+import shutil
+
+import numpy
+from sqlalchemy import func
+
+from fr.tagc.rainet.core.util.file.FileUtils import FileUtils
+from fr.tagc.rainet.core.util.exception.RainetException import RainetException
+from fr.tagc.rainet.core.util.log.Logger import Logger
+from fr.tagc.rainet.core.util.sql.SQLUtil import SQLUtil
+from fr.tagc.rainet.core.data.ProteinRNAInteractionCatRAPID import ProteinRNAInteractionCatRAPID
+
+
+# #
+# This class is a columnar, memory-mapped copy of the ProteinRNAInteractionCatRAPID table, stored in a folder
+# next to the database file. The transcript and protein IDs are coded as integers (their index in the sorted
+# list of IDs) and the interactions are stored twice, grouped by transcript and grouped by protein
+# (CSR layout: for transcript code t, its protein codes and scores are at [ offsets[t], offsets[t+1]) ).
+# This allows the analysis to read the interactions of a RNA, of a protein or above a score without
+# building one Python object per interaction.
+# The state of the ProteinRNAInteractionCatRAPID table (see SQLUtil.get_table_state) is recorded with the store,
+# which is used only if the table did not change since it was written (see is_up_to_date).
+class InteractionStore( object ):
+
+    # Folder of the store: database path + extension
+    STORE_EXTENSION = ".interactions"
+
+    # Files of the store
+    TRANSCRIPT_FILE = "transcripts.txt"
+    PROTEIN_FILE = "proteins.txt"
+    RNA_OFFSET_FILE = "rna_offsets.npy"
+    RNA_PROTEIN_FILE = "rna_proteins.npy"
+    RNA_SCORE_FILE = "rna_scores.npy"
+    PROTEIN_OFFSET_FILE = "protein_offsets.npy"
+    PROTEIN_TRANSCRIPT_FILE = "protein_transcripts.npy"
+    PROTEIN_SCORE_FILE = "protein_scores.npy"
+    TABLE_STATE_FILE = "table_state.txt"
+
+    # Fields of the interaction records, named as the columns of the ProteinRNAInteractionCatRAPID table
+    RECORD_FIELDS = [ "transcriptID", "proteinID", "interactionScore"]
+
+    # Number of rows read from the database at once when writing the store
+    WRITE_BATCH_SIZE = 1000000
+
+    # #
+    # Open the store of the given database. The columns are memory-mapped (not loaded in memory).
+    #
+    # @param db_path : string - The path to the database
+    #
+    # @raise RainetException if the store does not exist
+    def __init__( self, db_path ):
+
+        store_path = InteractionStore.get_store_path( db_path )
+        if not os.path.isdir( store_path ):
+            raise RainetException( "InteractionStore.__init__ : No interaction store for database " + db_path +
+                                   ". Use the Insertion option '--interactionStore' to build it." )
+
+        self.transcriptIDs = InteractionStore.read_ids( os.path.join( store_path, InteractionStore.TRANSCRIPT_FILE ) )
+        self.proteinIDs = InteractionStore.read_ids( os.path.join( store_path, InteractionStore.PROTEIN_FILE ) )
+        self.transcriptCodes = { transcript_id : code for code, transcript_id in enumerate( self.transcriptIDs ) }
+        self.proteinCodes = { protein_id : code for code, protein_id in enumerate( self.proteinIDs ) }
+        self.transcriptIDArray = numpy.array( self.transcriptIDs, numpy.str_ )
+        self.proteinIDArray = numpy.array( self.proteinIDs, numpy.str_ )
+
+        self.rnaOffsets = numpy.load( os.path.join( store_path, InteractionStore.RNA_OFFSET_FILE ), mmap_mode = "r" )
+        self.rnaProteins = numpy.load( os.path.join( store_path, InteractionStore.RNA_PROTEIN_FILE ), mmap_mode = "r" )
+        self.rnaScores = numpy.load( os.path.join( store_path, InteractionStore.RNA_SCORE_FILE ), mmap_mode = "r" )
+        self.proteinOffsets = numpy.load( os.path.join( store_path, InteractionStore.PROTEIN_OFFSET_FILE ), mmap_mode = "r" )
+        self.proteinTranscripts = numpy.load( os.path.join( store_path, InteractionStore.PROTEIN_TRANSCRIPT_FILE ), mmap_mode = "r" )
+        self.proteinScores = numpy.load( os.path.join( store_path, InteractionStore.PROTEIN_SCORE_FILE ), mmap_mode = "r" )
+
+        Logger.get_instance().info( "InteractionStore : Opened store with %i interactions (%i RNAs, %i proteins)." %
+                                    ( len( self.rnaScores ), len( self.transcriptIDs ), len( self.proteinIDs ) ) )
+
+    # #
+    # @return list<string> - The IDs of the transcripts with at least one interaction
+    def get_transcript_ids( self ):
+
+        return self.transcriptIDs
+
+    # #
+    # @return list<string> - The IDs of the proteins with at least one interaction
+    def get_protein_ids( self ):
+
+        return self.proteinIDs
+
+    # #
+    # Get the interactions of a RNA
+    #
+    # @param transcript_id : string - The transcript ID of the RNA
+    #
+    # @return tuple( list<string>, numpy.array) - The IDs of the interacting proteins and the interaction scores (float32)
+    def get_rna_interactions( self, transcript_id ):
+
+        if transcript_id not in self.transcriptCodes:
+            return [], numpy.empty( 0, numpy.float32 )
+
+        code = self.transcriptCodes[ transcript_id ]
+        start, end = self.rnaOffsets[ code ], self.rnaOffsets[ code + 1 ]
+        return [ self.proteinIDs[ protein_code ] for protein_code in self.rnaProteins[ start:end ] ], self.rnaScores[ start:end ]
+
+    # #
+    # Get the interactions of a protein
+    #
+    # @param protein_id : string - The uniprotAC of the protein
+    #
+    # @return tuple( list<string>, numpy.array) - The IDs of the interacting transcripts and the interaction scores (float32)
+    def get_protein_interactions( self, protein_id ):
+
+        if protein_id not in self.proteinCodes:
+            return [], numpy.empty( 0, numpy.float32 )
+
+        code = self.proteinCodes[ protein_id ]
+        start, end = self.proteinOffsets[ code ], self.proteinOffsets[ code + 1 ]
+        return [ self.transcriptIDs[ transcript_code ] for transcript_code in self.proteinTranscripts[ start:end ] ], self.proteinScores[ start:end ]
+
+    # #
+    # Build the mask of the interactions (in transcript order) whose score is greater or equal to the given score.
+    # The scores are stored as float32: the scores equal to the float32 value of the minimum score are
+    # compared with their decimal value (see get_scores) to give the same result as a query on the table.
+    #
+    # @param minimum_score : float - The minimum interaction score
+    #
+    # @return numpy.array - The boolean mask of the interactions
+    def get_score_mask( self, minimum_score ):
+
+        minimum_score = float( minimum_score )
+        minimum_score_32 = numpy.float32( minimum_score )
+        mask = self.rnaScores > minimum_score_32
+        boundary_indexes = numpy.flatnonzero( self.rnaScores == minimum_score_32 )
+        if len( boundary_indexes ) > 0:
+            mask[ boundary_indexes ] = InteractionStore.get_scores( self.rnaScores[ boundary_indexes ] ) >= minimum_score
+        return mask
+
+    # #
+    # Count the interactions whose score is greater or equal to the given score
+    #
+    # @param minimum_score : float - The minimum interaction score (None for all the interactions)
+    #
+    # @return int - The number of interactions
+    def count_interactions( self, minimum_score = None ):
+
+        if minimum_score == None:
+            return len( self.rnaScores )
+
+        return int( numpy.count_nonzero( self.get_score_mask( minimum_score ) ) )
+
+    # #
+    # Get the interactions whose score is greater or equal to the given score, between the given RNAs and proteins.
+    # The interactions are returned as columns of codes (indexes in get_transcript_ids and get_protein_ids) and scores,
+    # sorted by transcript ID then protein ID, without building one Python object per interaction.
+    #
+    # @param minimum_score : float (optional) - The minimum interaction score (None for no score filter)
+    # @param transcript_ids : set<string> (optional) - The transcript IDs of the selected RNAs (None for all RNAs)
+    # @param protein_ids : set<string> (optional) - The uniprotAC of the selected proteins (None for all proteins)
+    #
+    # @return tuple( numpy.array, numpy.array, numpy.array) - The transcript codes, the protein codes and the scores (float32)
+    def get_interactions( self, minimum_score = None, transcript_ids = None, protein_ids = None ):
+
+        if minimum_score != None:
+            mask = self.get_score_mask( minimum_score )
+        else:
+            mask = numpy.ones( len( self.rnaScores ), bool )
+
+        if transcript_ids != None:
+            transcript_mask = numpy.array( [ transcript_id in transcript_ids for transcript_id in self.transcriptIDs ], bool )
+            mask &= numpy.repeat( transcript_mask, numpy.diff( self.rnaOffsets ) )
+
+        if protein_ids != None:
+            protein_mask = numpy.array( [ protein_id in protein_ids for protein_id in self.proteinIDs ], bool )
+            mask &= protein_mask[ self.rnaProteins ]
+
+        indexes = numpy.flatnonzero( mask )
+        transcript_codes = numpy.searchsorted( self.rnaOffsets, indexes, side = "right" ) - 1
+
+        return transcript_codes, self.rnaProteins[ indexes ], self.rnaScores[ indexes ]
+
+    # #
+    # Convert interactions given as columns (see get_interactions) to a record array whose records have the
+    # same attributes as the rows queried on the ProteinRNAInteractionCatRAPID table. The IDs are copied as
+    # fixed-width strings and the scores are the decimal values inserted in the table (see get_scores).
+    #
+    # @param transcript_codes : numpy.array - The transcript codes of the interactions
+    # @param protein_codes : numpy.array - The protein codes of the interactions
+    # @param scores : numpy.array - The float32 scores of the interactions
+    #
+    # @return numpy.recarray - The interactions, with fields transcriptID, proteinID and interactionScore
+    def get_records( self, transcript_codes, protein_codes, scores ):
+
+        return numpy.rec.fromarrays( [ self.transcriptIDArray[ transcript_codes ], self.proteinIDArray[ protein_codes ], InteractionStore.get_scores( scores ) ],
+                                     names = InteractionStore.RECORD_FIELDS )
+
+    # #
+    # Convert float32 scores to Python floats through their shortest decimal representation,
+    # so that the scores inserted with up to 7 significant digits are recovered exactly
+    #
+    # @param scores : numpy.array - The float32 scores
+    #
+    # @return numpy.array - The scores (float64)
+    @staticmethod
+    def get_scores( scores ):
+
+        return numpy.asarray( scores ).astype( numpy.str_ ).astype( numpy.float64 )
+
+    # #
+    # @param db_path : string - The path to the database
+    #
+    # @return string - The path to the folder of the store of the database
+    @staticmethod
+    def get_store_path( db_path ):
+
+        return db_path + InteractionStore.STORE_EXTENSION
+
+    # #
+    # @param db_path : string - The path to the database
+    #
+    # @return boolean - True if the database has an interaction store
+    @staticmethod
+    def exists( db_path ):
+
+        return os.path.isdir( InteractionStore.get_store_path( db_path ) )
+
+    # #
+    # Indicates if the store of the given database can be used instead of the ProteinRNAInteractionCatRAPID table:
+    # the store exists and the state of the table is the one recorded when the store was written.
+    # A warning is logged if the store exists but is out of date.
+    #
+    # @param db_path : string - The path to the database
+    #
+    # @return boolean - True if the database has an up to date interaction store
+    @staticmethod
+    def is_up_to_date( db_path ):
+
+        if not InteractionStore.exists( db_path ):
+            return False
+
+        state_file = os.path.join( InteractionStore.get_store_path( db_path ), InteractionStore.TABLE_STATE_FILE )
+        store_state = None
+        if os.path.exists( state_file ):
+            store_state = InteractionStore.read_ids( state_file )[ 0]
+        if store_state != SQLUtil.get_table_state( [ ProteinRNAInteractionCatRAPID ] ):
+            Logger.get_instance().warning( "InteractionStore.is_up_to_date : The ProteinRNAInteractionCatRAPID table changed since the interaction store " +
+                                           InteractionStore.get_store_path( db_path ) + " was written. The interactions are read from the table." +
+                                           " Use the Insertion option '--interactionStore' to write the store again." )
+            return False
+
+        return True
+
+    # #
+    # Remove the store of the given database (if any)
+    #
+    # @param db_path : string - The path to the database
+    @staticmethod
+    def delete( db_path ):
+
+        store_path = InteractionStore.get_store_path( db_path )
+        if os.path.isdir( store_path ):
+            shutil.rmtree( store_path )
+            Logger.get_instance().info( "InteractionStore.delete : Removed interaction store " + store_path )
+
+    # #
+    # Write the store of the given database from its ProteinRNAInteractionCatRAPID table. The store is written
+    # in a temporary folder which replaces the previous store once complete.
+    #
+    # @param db_path : string - The path to the database
+    # @param sql_session : Session - The SQL session to the database
+    @staticmethod
+    def write( db_path, sql_session ):
+
+        store_path = InteractionStore.get_store_path( db_path )
+        temporary_path = store_path + ".tmp"
+        if os.path.isdir( temporary_path ):
+            shutil.rmtree( temporary_path )
+        os.makedirs( temporary_path )
+
+        # Code the transcript and protein IDs by their rank
+        transcript_ids = sorted( [ str( item[ 0] ) for item in sql_session.query( ProteinRNAInteractionCatRAPID.transcriptID ).distinct().all() ] )
+        protein_ids = sorted( [ str( item[ 0] ) for item in sql_session.query( ProteinRNAInteractionCatRAPID.proteinID ).distinct().all() ] )
+        transcript_codes = { transcript_id : code for code, transcript_id in enumerate( transcript_ids ) }
+        protein_codes = { protein_id : code for code, protein_id in enumerate( protein_ids ) }
+
+        # Read the interactions by batch into the columns
+        interaction_number = sql_session.query( func.count( ProteinRNAInteractionCatRAPID.transcriptID ) ).scalar()
+        rna_column = numpy.empty( interaction_number, numpy.int32 )
+        protein_column = numpy.empty( interaction_number, numpy.int32 )
+        score_column = numpy.empty( interaction_number, numpy.float32 )
+
+        row_counter = 0
+        batch = []
+        query = sql_session.query( ProteinRNAInteractionCatRAPID.transcriptID, ProteinRNAInteractionCatRAPID.proteinID, ProteinRNAInteractionCatRAPID.interactionScore )
+        for interaction in query.yield_per( InteractionStore.WRITE_BATCH_SIZE ):
+            batch.append( interaction )
+            if len( batch ) >= InteractionStore.WRITE_BATCH_SIZE:
+                row_counter = InteractionStore.fill_columns( batch, row_counter, transcript_codes, protein_codes, rna_column, protein_column, score_column )
+                batch = []
+        row_counter = InteractionStore.fill_columns( batch, row_counter, transcript_codes, protein_codes, rna_column, protein_column, score_column )
+
+        if row_counter != interaction_number:
+            raise RainetException( "InteractionStore.write : Read %i interactions instead of %i." % ( row_counter, interaction_number ) )
+
+        # Write the state of the table, the IDs and the interactions grouped by transcript and by protein
+        InteractionStore.write_ids( os.path.join( temporary_path, InteractionStore.TABLE_STATE_FILE ), [ SQLUtil.get_table_state( [ ProteinRNAInteractionCatRAPID ] ) ] )
+        InteractionStore.write_ids( os.path.join( temporary_path, InteractionStore.TRANSCRIPT_FILE ), transcript_ids )
+        InteractionStore.write_ids( os.path.join( temporary_path, InteractionStore.PROTEIN_FILE ), protein_ids )
+
+        order = numpy.lexsort( ( protein_column, rna_column ) )
+        numpy.save( os.path.join( temporary_path, InteractionStore.RNA_OFFSET_FILE ), InteractionStore.get_offsets( rna_column, len( transcript_ids ) ) )
+        numpy.save( os.path.join( temporary_path, InteractionStore.RNA_PROTEIN_FILE ), protein_column[ order ] )
+        numpy.save( os.path.join( temporary_path, InteractionStore.RNA_SCORE_FILE ), score_column[ order ] )
+
+        order = numpy.lexsort( ( rna_column, protein_column ) )
+        numpy.save( os.path.join( temporary_path, InteractionStore.PROTEIN_OFFSET_FILE ), InteractionStore.get_offsets( protein_column, len( protein_ids ) ) )
+        numpy.save( os.path.join( temporary_path, InteractionStore.PROTEIN_TRANSCRIPT_FILE ), rna_column[ order ] )
+        numpy.save( os.path.join( temporary_path, InteractionStore.PROTEIN_SCORE_FILE ), score_column[ order ] )
+
+        # Replace the previous store
+        InteractionStore.delete( db_path )
+        os.rename( temporary_path, store_path )
+
+        Logger.get_instance().info( "InteractionStore.write : Wrote %i interactions (%i RNAs, %i proteins) to %s" %
+                                    ( interaction_number, len( transcript_ids ), len( protein_ids ), store_path ) )
+
+    # #
+    # Fill the columns with a batch of interactions
+    #
+    # @param batch : list<tuple> - The interactions as ( transcript_id, protein_id, interaction_score) tuples
+    # @param row_counter : int - The index of the first row of the batch in the columns
+    # @param transcript_codes : dict<string,int> - The code of each transcript ID
+    # @param protein_codes : dict<string,int> - The code of each protein ID
+    # @param rna_column : numpy.array - The transcript codes column
+    # @param protein_column : numpy.array - The protein codes column
+    # @param score_column : numpy.array - The scores column
+    #
+    # @return int - The number of rows filled so far
+    @staticmethod
+    def fill_columns( batch, row_counter, transcript_codes, protein_codes, rna_column, protein_column, score_column ):
+
+        end = row_counter + len( batch )
+        rna_column[ row_counter:end ] = [ transcript_codes[ str( interaction[ 0] ) ] for interaction in batch ]
+        protein_column[ row_counter:end ] = [ protein_codes[ str( interaction[ 1] ) ] for interaction in batch ]
+        score_column[ row_counter:end ] = [ interaction[ 2] for interaction in batch ]
+
+        return end
+
+    # #
+    # Compute the CSR offsets of the groups of a column
+    #
+    # @param code_column : numpy.array - The codes of the rows
+    # @param code_number : int - The number of codes
+    #
+    # @return numpy.array - The offsets (int64) of the rows of each code in the column sorted by code
+    @staticmethod
+    def get_offsets( code_column, code_number ):
+
+        offsets = numpy.zeros( code_number + 1, numpy.int64 )
+        numpy.cumsum( numpy.bincount( code_column, minlength = code_number ), out = offsets[ 1:] )
+        return offsets
+
+    # #
+    # Read a file of IDs (one per line)
+    #
+    # @param file_path : string - The path to the file
+    #
+    # @return list<string> - The IDs
+    @staticmethod
+    def read_ids( file_path ):
+
+        input_file = FileUtils.open_text_r( file_path )
+        id_list = [ line.rstrip( "\n" ) for line in input_file ]
+        input_file.close()
+        return id_list
+
+    # #
+    # Write a file of IDs (one per line)
+    #
+    # @param file_path : string - The path to the file
+    # @param id_list : list<string> - The IDs
+    @staticmethod
+    def write_ids( file_path, id_list ):
+
+        output_file = FileUtils.open_text_w( file_path )
+        for item_id in id_list:
+            output_file.write( "%s\n" % item_id )
+        output_file.close()
@@ -0,0 +1,208 @@
+import numpy
+
+
+# #
+# This class counts the scores of items (e.g. the interaction scores of each protein or RNA), rounded to one decimal,
+# in a matrix of items x score bins. The items are coded by their index, in order of first appearance, and the bins
+# are the scores in tenths ( bin of score 12.3 -> 123), the first column of the matrix being the bin firstBin.
+# The matrix grows (in items and in bins) as scores are added, by batches of scores.
+# A second matrix keeps the rank of first appearance of each bin of an item, so that the mean and the standard deviation
+# of an item are computed on its scores in the same order as from a dictionary of score frequencies filled score by score
+# (the floating-point sums, and thus the rounded statistics, being the same).
+class ScoreHistogram( object ):
+
+    # Number of bins per unit of score (scores rounded to one decimal)
+    BINS_PER_UNIT = 10
+
+    # Number of items of the matrix when created
+    INITIAL_ITEM_NUMBER = 1024
+
+    # Number of bins added on each side of the bins of a batch when the matrix grows, to limit the reallocations
+    BIN_MARGIN = 100
+
+    # #
+    # The constructor, the matrix is empty
+    def __init__( self ):
+
+        self.itemIDs = []
+        self.itemCodes = {}
+        self.firstBin = 0
+        self.counts = numpy.zeros( ( 0, 0 ), dtype = numpy.int32 )
+        self.ranks = numpy.zeros( ( 0, 0 ), dtype = numpy.int32 )
+        # number of bins of each item
+        self.binNumbers = numpy.zeros( 0, dtype = numpy.int32 )
+
+    # #
+    # @param item_id : string - The item
+    #
+    # @return int - The code of the item, a new code being given to a new item
+    def get_code( self, item_id ):
+
+        code = self.itemCodes.get( item_id )
+        if code == None:
+            code = len( self.itemIDs )
+            self.itemCodes[ item_id ] = code
+            self.itemIDs.append( item_id )
+        return code
+
+    # #
+    # @param item_id : string - The item
+    #
+    # @return boolean - True if scores were added for the item
+    def has_item( self, item_id ):
+
+        return item_id in self.itemCodes
+
+    # #
+    # @param scores : list<float> - Scores rounded to one decimal
+    #
+    # @return numpy.array - The bins of the scores
+    @staticmethod
+    def get_bins( scores ):
+
+        return numpy.rint( numpy.asarray( scores, dtype = numpy.float64 ) * ScoreHistogram.BINS_PER_UNIT ).astype( numpy.int64 )
+
+    # #
+    # @param bins : numpy.array - Bins of scores
+    #
+    # @return numpy.array - The scores of the bins (the same floats as the scores rounded to one decimal)
+    @staticmethod
+    def get_scores( bins ):
+
+        return bins / float( ScoreHistogram.BINS_PER_UNIT )
+
+    # #
+    # Grow the matrices so that they contain all the items coded and the given bins
+    #
+    # @param minimum_bin : int - The minimum bin to contain
+    # @param maximum_bin : int - The maximum bin to contain
+    def grow( self, minimum_bin, maximum_bin ):
+
+        previousItemNumber, binNumber = self.counts.shape
+        itemNumber = previousItemNumber
+        if binNumber == 0:
+            firstBin, lastBin = minimum_bin - ScoreHistogram.BIN_MARGIN, maximum_bin + ScoreHistogram.BIN_MARGIN
+        else:
+            firstBin, lastBin = self.firstBin, self.firstBin + binNumber - 1
+            if minimum_bin < firstBin:
+                firstBin = minimum_bin - ScoreHistogram.BIN_MARGIN
+            if maximum_bin > lastBin:
+                lastBin = maximum_bin + ScoreHistogram.BIN_MARGIN
+
+        if len( self.itemIDs ) > itemNumber:
+            itemNumber = max( 2 * itemNumber, len( self.itemIDs ), ScoreHistogram.INITIAL_ITEM_NUMBER )
+
+        if ( itemNumber, lastBin - firstBin + 1 ) != self.counts.shape:
+            columns = slice( self.firstBin - firstBin, self.firstBin - firstBin + binNumber )
+            for name in ( "counts", "ranks" ):
+                matrix = numpy.zeros( ( itemNumber, lastBin - firstBin + 1 ), dtype = numpy.int32 )
+                matrix[ :previousItemNumber, columns ] = getattr( self, name )
+                setattr( self, name, matrix )
+            binNumbers = numpy.zeros( itemNumber, dtype = numpy.int32 )
+            binNumbers[ :len( self.binNumbers ) ] = self.binNumbers
+            self.binNumbers = binNumbers
+            self.firstBin = firstBin
+
+    # #
+    # Add a batch of scores
+    #
+    # @param codes : numpy.array - The code of the item of each score
+    # @param bins : numpy.array - The bin of each score (see get_bins)
+    # @param frequencies : numpy.array (optional) - The number of times each score is added, the (item, bin) cells of the
+    # scores being distinct. By default, each score is added once.
+    # @param order : numpy.array (optional) - The order of appearance of the scores, for the ranks of the new bins of
+    # the items. By default, the order of the batch.
+    def add( self, codes, bins, frequencies = None, order = None ):
+
+        if len( codes ) == 0:
+            return
+
+        self.grow( int( bins.min() ), int( bins.max() ) )
+
+        # the counts of each (item, bin) cell of the batch are added at once
+        cells = numpy.asarray( codes, dtype = numpy.int64 ) * self.counts.shape[ 1 ] + ( bins - self.firstBin )
+        if frequencies is None:
+            cells, order, frequencies = numpy.unique( cells, return_index = True, return_counts = True )
+        elif order is None:
+            order = numpy.arange( len( cells ) )
+
+        # ranks of the new bins of each item, after its previous bins, in order of appearance
+        isNew = self.counts.flat[ cells ] == 0
+        newCells = cells[ isNew ]
+        newItems = newCells // self.counts.shape[ 1 ]
+        newOrder = numpy.lexsort( ( order[ isNew ], newItems ) )
+        newCells, newItems = newCells[ newOrder ], newItems[ newOrder ]
+        itemStarts = numpy.searchsorted( newItems, newItems )
+        self.ranks.flat[ newCells ] = self.binNumbers[ newItems ] + numpy.arange( len( newCells ) ) - itemStarts
+        self.binNumbers += numpy.bincount( newItems, minlength = len( self.binNumbers ) ).astype( numpy.int32 )
+
+        self.counts.flat[ cells ] += numpy.asarray( frequencies, dtype = numpy.int32 )
+
+    # #
+    # Get the (item, bin) cells with scores, e.g. to send the histogram of a worker process to the parent process
+    # without its matrices (see merge)
+    #
+    # @return tuple( list<string>, numpy.array, numpy.array, numpy.array, numpy.array ) - The items (indexed by their code) and,
+    # for each cell with scores, the code of its item, its bin, its number of scores and the rank of its bin in its item
+    def get_cells( self ):
+
+        rows, columns = numpy.nonzero( self.counts )
+
+        return self.itemIDs, rows, columns + self.firstBin, self.counts[ rows, columns ], self.ranks[ rows, columns ]
+
+    # #
+    # Add the cells of another histogram (whose scores appeared after the scores of this histogram),
+    # its new items being coded in its order of first appearance
+    #
+    # @param item_ids : list<string> - The items of the other histogram (indexed by their code)
+    # @param rows : numpy.array - The code of the item of each cell, in the other histogram
+    # @param bins : numpy.array - The bin of each cell
+    # @param frequencies : numpy.array - The number of scores of each cell
+    # @param ranks : numpy.array - The rank of the bin of each cell in its item, in the other histogram
+    #
+    # @return numpy.array - The code in this histogram of each item of the other histogram (indexed by its code)
+    def merge( self, item_ids, rows, bins, frequencies, ranks ):
+
+        codes = numpy.array( [ self.get_code( itemID ) for itemID in item_ids ], dtype = numpy.int64 )
+        self.add( codes[ rows ], bins, frequencies, ranks )
+
+        return codes
+
+    # #
+    # @return tuple( numpy.array, numpy.array ) - The minimum and the maximum bins of each item (indexed by its code)
+    def get_bin_ranges( self ):
+
+        hasScores = self.counts[ :len( self.itemIDs ) ] > 0
+        minimumBins = hasScores.argmax( axis = 1 ) + self.firstBin
+        maximumBins = hasScores.shape[ 1 ] - 1 - hasScores[ :, ::-1 ].argmax( axis = 1 ) + self.firstBin
+
+        return minimumBins, maximumBins
+
+    # #
+    # Get the statistics of the scores of an item, as numpy.mean, numpy.median, numpy.min, numpy.max and numpy.std
+    # compute them on the list of its scores recreated from a dictionary of score frequencies
+    #
+    # @param item_id : string - The item (with scores)
+    #
+    # @return tuple( float, float, float, float, float, int) - The mean, median, minimum, maximum, standard deviation and number of the scores
+    def get_statistics( self, item_id ):
+
+        code = self.itemCodes[ item_id ]
+        bins = numpy.flatnonzero( self.counts[ code ] )
+        frequencies = self.counts[ code, bins ]
+        count = int( frequencies.sum() )
+        scores = ScoreHistogram.get_scores( bins + self.firstBin )
+
+        # median: middle score, or mean of the two middle scores
+        cumulative = numpy.cumsum( frequencies )
+        middleScores = scores[ numpy.searchsorted( cumulative, [ ( count - 1 ) // 2 + 1, count // 2 + 1 ] ) ]
+        median = numpy.mean( middleScores[ count % 2: ] )
+
+        # scores in the order of a dictionary whose scores were added in order of appearance
+        scoreList = scores.tolist()
+        scoreFrequencies = {}
+        for index in numpy.argsort( self.ranks[ code, bins ] ).tolist():
+            scoreFrequencies[ scoreList[ index ] ] = frequencies[ index ]
+        listOfScores = numpy.repeat( scoreFrequencies.keys(), scoreFrequencies.values() )
+
+        return numpy.mean( listOfScores ), median, scores[ 0 ], scores[ -1 ], numpy.std( listOfScores ), count
@@ -1,6 +1,11 @@
 
+from sqlalchemy import exc, and_, or_, bindparam, exists, func, select, Table, Column, MetaData
+from sqlalchemy.orm import class_mapper, configure_mappers
+from sqlalchemy.orm.interfaces import ONETOMANY
+
 from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
 from fr.tagc.rainet.core.util.log.Logger import Logger
+from fr.tagc.rainet.core.util.data.DataManager import DataManager
 from fr.tagc.rainet.core.util.exception.RainetException import RainetException
 from fr.tagc.rainet.core.util.exception.NotRequiredInstantiationException import NotRequiredInstantiationException
 
@@ -19,6 +24,7 @@ from fr.tagc.rainet.core.data.NetworkModule import NetworkModule
 from fr.tagc.rainet.core.data.NetworkModuleAnnotation import NetworkModuleAnnotation
 from fr.tagc.rainet.core.data.PPINetwork import PPINetwork
 from fr.tagc.rainet.core.data.PPINetworkInteraction import PPINetworkInteraction
+from fr.tagc.rainet.core.data.Gene import Gene
 from fr.tagc.rainet.core.data.RNA import RNA
 from fr.tagc.rainet.core.data.RNACrossReference import RNACrossReference
 from fr.tagc.rainet.core.data.ProteinRNAInteractionCatRAPID import ProteinRNAInteractionCatRAPID
@@ -40,6 +46,9 @@ from fr.tagc.rainet.core.data.ProteinCustomAnnotation import ProteinCustomAnnota
 # object and ensure its correct connection in the database schema.
 class DataFactory:
 
+    # Suffix of the temporary table staging the rows of an update by difference (see apply_row_delta)
+    DELTA_STAGING_TABLE_SUFFIX = "_delta"
+
     # #
     # Constructor of the Factory
     #
@@ -48,22 +57,140 @@ class DataFactory:
     def __init__( self, class_name ):
 
         self.className = class_name
+        # The Class itself, resolved once (used by the bulk insertion mode)
+        self.classObject = globals().get( class_name)
+        # The compiled INSERT statement of the bulk insertion mode (see insert_rows)
+        self.insertStatement = None
 
     ##
-    # Remove the content of the given table
+    # Remove the content of the given table.
+    # The references of the other tables to the rows are first cleared as the ORM does when the objects are deleted
+    # (see clear_references). The rows are then removed with set-based DELETE statements (no object is loaded) on:
+    # - the association tables used by the Class relationships (e.g. ProteinGOAnnotation for GeneOntology),
+    #   whose rows would be deleted with the objects by the ORM
+    # - the tables of the subclasses (joined inheritance, e.g. MRNA, LncRNA and OtherRNA for RNA)
+    # - the table of the Class
+    # The Classes that are themselves subclasses are cleaned object per object.
     #
+    # @raise RainetException if the table cannot be cleaned
     def clean_table(self):
         
         Logger.get_instance().info( "|--Cleaning table : " + self.className)
+        if self.classObject == None or not hasattr( self.classObject, "__table__"):
+            Logger.get_instance().warning( "|--Table not found : " + self.className)
+            return
+        
+        mapper = class_mapper( self.classObject)
+        if mapper.inherits != None:
+            self.delete_objects()
+        else:
+            sql_session = SQLManager.get_instance().get_session()
+            try:
+                self.clear_references( sql_session, mapper)
+                for table in self.get_dependent_tables( mapper):
+                    result = sql_session.execute( table.delete())
+                    Logger.get_instance().info( "|--Deleted %i rows from table %s" % ( result.rowcount, table.name))
+            except exc.SQLAlchemyError as sqle:
+                SQLManager.get_instance().rollback_session()
+                raise RainetException( "DataFactory.clean_table : An error occurred while cleaning table " + self.className, sqle)
+            except RainetException:
+                SQLManager.get_instance().rollback_session()
+                raise
+            SQLManager.get_instance().commit()
+        
+        self.clean_insertion_cache()
+        Logger.get_instance().info( "|--Table cleaned : " + self.className)
+
+    ##
+    # Returns the tables to clean with the table of the Class, in the order they must be cleaned:
+    # the association tables of the Class relationships, the subclass tables and the Class table.
+    #
+    # @param mapper : Mapper - The SQLAlchemy mapper of the Class
+    #
+    # @return list<Table> - The tables to clean
+    def get_dependent_tables(self, mapper):
+        
+        # Ensure the backref relationships (declared by other Classes) are known by the mapper
+        configure_mappers()
+        
+        table_list = []
+        for relationship in mapper.relationships:
+            if relationship.secondary != None and relationship.secondary not in table_list:
+                table_list.append( relationship.secondary)
+        for sub_mapper in mapper.polymorphic_iterator():
+            if sub_mapper.local_table not in table_list and sub_mapper.local_table != mapper.local_table:
+                table_list.append( sub_mapper.local_table)
+        table_list.append( mapper.local_table)
+        
+        return table_list
+
+    ##
+    # Clear, with set-based statements, the references of the other tables to the rows of the Class table and of its
+    # subclass tables, as the ORM does when the objects are deleted: for each one-to-many relationship of the Class
+    # (including the backrefs declared by other Classes, e.g. Gene.transcriptList for RNA.geneID), the foreign keys
+    # of the referencing rows are set to NULL, or the referencing rows are deleted if the relationship cascades deletes.
+    #
+    # @param sql_session : Session - The SQL session
+    # @param mapper : Mapper - The SQLAlchemy mapper of the Class
+    #
+    # @raise RainetException if a foreign key to clear is part of the primary key of referencing rows
+    #                        (the ORM refuses to blank it out: the referencing table must be cleaned first)
+    def clear_references(self, sql_session, mapper):
+        
+        # Ensure the backref relationships (declared by other Classes) are known by the mapper
+        configure_mappers()
+        
+        relationship_list = []
+        for sub_mapper in mapper.polymorphic_iterator():
+            for relationship in sub_mapper.relationships:
+                if relationship.direction != ONETOMANY or relationship.secondary != None or relationship.viewonly or relationship.passive_deletes:
+                    continue
+                if relationship not in relationship_list:
+                    relationship_list.append( relationship)
+        
+        for relationship in relationship_list:
+            pair_list = relationship.local_remote_pairs
+            table = pair_list[ 0][ 1].table
+            # the referencing rows: the ones whose foreign key matches a row of the Class table
+            condition = exists().where( and_( *[ local_column == remote_column for local_column, remote_column in pair_list]))
+            
+            if relationship.cascade.delete:
+                result = sql_session.execute( table.delete().where( condition))
+                Logger.get_instance().info( "|--Deleted %i rows from table %s" % ( result.rowcount, table.name))
+                continue
+            
+            if len( [ remote_column for local_column, remote_column in pair_list if remote_column.primary_key]) > 0:
+                reference_number = sql_session.execute( select( [ func.count()]).select_from( table).where( condition)).scalar()
+                if reference_number > 0:
+                    raise RainetException( "DataFactory.clear_references : Table " + self.className + " cannot be cleaned: " + str( reference_number) +
+                                           " rows of table " + table.name + " reference it by their primary key. Clean table " + table.name + " first.")
+                continue
+            
+            result = sql_session.execute( table.update().where( condition).values( { remote_column.name : None for local_column, remote_column in pair_list}))
+            if result.rowcount > 0:
+                Logger.get_instance().info( "|--Cleared %i references of table %s to table %s" % ( result.rowcount, table.name, self.className))
+
+    ##
+    # Remove the objects of the Class one by one with the ORM
+    #
+    def delete_objects(self):
+        
         sql_session = SQLManager.get_instance().get_session()
         line_list = eval( "sql_session.query(" + self.className + ").all()" )
-        if line_list != None:
-            for line in line_list:
-                sql_session.delete( line)
-            SQLManager.get_instance().commit()
-            Logger.get_instance().info( "|--Table cleaned : " + self.className)
-        else:
-            Logger.get_instance().warning( "|--Table not found : " + self.className)                
+        for line in line_list:
+            sql_session.delete( line)
+        SQLManager.get_instance().commit()
+        
+    ##
+    # Remove from the DataManager the data built from the table during insertion
+    # (declared by the Class in 'INSERTION_CACHE_KEYWORDS'), since they are no longer valid
+    #
+    def clean_insertion_cache(self):
+        
+        dt_manager = DataManager.get_instance()
+        for keyword in getattr( self.classObject, "INSERTION_CACHE_KEYWORDS", []):
+            if keyword in dt_manager.data:
+                dt_manager.delete_data( keyword)
         
     ##
     # Create an instance of the given class with the given parameters using the correct constructor
@@ -165,4 +292,169 @@ class DataFactory:
         except Exception as excep:
             raise RainetException( "DataFactory.create_object_from_fasta : An issue occurred in the object creation.", excep )
         
-        return new_instance
\ No newline at end of file
+        return new_instance
+
+    # #
+    # Indicates if the Class can be inserted in bulk mode, i.e. if it provides a static
+    # 'bulk_row' method (validating values and returning a plain row) and the ordered
+    # list of columns of these rows ('BULK_COLUMNS')
+    #
+    # @return True if the bulk insertion mode is available for the Class
+    def bulk_insertion_supported( self ):
+        
+        return self.classObject != None and hasattr( self.classObject, "bulk_row" ) and hasattr( self.classObject, "BULK_COLUMNS" )
+
+    # #
+    # Convert the given parameters to a plain row (tuple of column values) using the Class 'bulk_row' method.
+    # The validation is the same as the one done by the Class constructor, but no ORM object is created.
+    #
+    # @param parameter_value_list : list - the list of parameters values to be used to create the row
+    #
+    # @return The row as a tuple ordered as the Class BULK_COLUMNS or None if the row must not be inserted
+    #
+    # @raise RainetException if an error occurred while building the row
+    def create_row_from_tsv( self, parameter_value_list ):
+        # Test if the parameter list contains elements
+        if parameter_value_list == None or len( parameter_value_list ) == 0:
+            raise RainetException( "DataFactory.create_row_from_tsv: No value provided for the row creation of class " + self.className )
+
+        if not self.bulk_insertion_supported():
+            raise RainetException( "DataFactory.create_row_from_tsv: Bulk insertion is not supported by class " + self.className )
+        
+        try:
+            return self.classObject.bulk_row( *parameter_value_list )
+        # Possibly the row does not have to be created (e.g. related object not in database)
+        except NotRequiredInstantiationException:
+            return None
+        # If any other Exception occurred, the values are not valid
+        except Exception as excep:
+            raise RainetException( "DataFactory.create_row_from_tsv : An issue occurred in the row creation.", excep )
+
+    # #
+    # Load the data used by the Class 'bulk_row' method (declared by the Class in an optional static
+    # 'prepare_bulk_rows' method), so that the rows can then be built by another process without
+    # using the database (see TSVParser.read_rows)
+    #
+    def prepare_row_creation( self ):
+        
+        if hasattr( self.classObject, "prepare_bulk_rows" ):
+            self.classObject.prepare_bulk_rows()
+
+    # #
+    # Insert the given rows in the Class table, in a single executemany statement on the current SQL session.
+    # Neither the ORM nor the parameter processing of SQLAlchemy Core is used: the rows are given as they are
+    # to the executemany of the database driver, with the INSERT statement compiled once per Factory.
+    #
+    # @param row_list : list<tuple> - the rows to insert, as created by create_row_from_tsv
+    #
+    # @raise RainetException if an error occurred during the insertion
+    def insert_rows( self, row_list ):
+        
+        if row_list == None or len( row_list ) == 0:
+            return
+        
+        sql_session = SQLManager.get_instance().get_session()
+        try:
+            connection = sql_session.connection()
+            if self.insertStatement == None:
+                self.insertStatement = self.compile_insert_statement( connection.dialect )
+            statement, index_list = self.insertStatement
+            if index_list != None:
+                row_list = [ tuple( [ row[ index] for index in index_list ] ) for row in row_list ]
+            connection.execute( statement, row_list )
+        except exc.SQLAlchemyError as sqle:
+            raise RainetException( "DataFactory.insert_rows : An error occurred while inserting rows of class " + self.className, sqle )
+
+    # #
+    # Compile the INSERT statement of the Class BULK_COLUMNS with positional parameters
+    #
+    # @param dialect : Dialect - The SQLAlchemy dialect of the database
+    #
+    # @return tuple( string, list<int>) - The SQL of the statement and, if the order of its parameters is not the one
+    #                                     of BULK_COLUMNS, the index in the rows of each parameter (None otherwise)
+    #
+    # @raise RainetException if the dialect does not use positional parameters
+    def compile_insert_statement( self, dialect ):
+        
+        column_list = self.classObject.BULK_COLUMNS
+        compiled = self.classObject.__table__.insert().compile( dialect = dialect, column_keys = column_list )
+        if not compiled.positional:
+            raise RainetException( "DataFactory.compile_insert_statement : The bulk insertion requires a database driver with positional parameters." )
+        
+        index_list = [ column_list.index( name ) for name in compiled.positiontup ]
+        if index_list == range( len( column_list ) ):
+            index_list = None
+        
+        return compiled.string, index_list
+
+    # #
+    # Apply to the Class table the difference between its content and the given rows, by primary key:
+    # the rows whose key is not in the table are inserted, the rows of the table whose key is not in the given
+    # rows are deleted and the rows whose values changed are replaced. The unchanged rows are not touched.
+    # The given rows are streamed to a temporary staging table (the last row of a key is kept), so that the
+    # difference is computed by the database without loading the file or the table in memory.
+    # The changes are not committed.
+    #
+    # @param row_batches : iterable<list<tuple>> - all the rows the table must contain, by batches, as created by create_row_from_tsv
+    #
+    # @return tuple( int, int, int) - The number of inserted, updated and deleted rows
+    #
+    # @raise RainetException if the primary key is not part of the Class BULK_COLUMNS or if an error occurred during the update
+    def apply_row_delta( self, row_batches ):
+        
+        column_list = self.classObject.BULK_COLUMNS
+        table = self.classObject.__table__
+        key_column_list = [ column.name for column in table.primary_key.columns ]
+        if len( [ column for column in key_column_list if column not in column_list ] ) > 0:
+            raise RainetException( "DataFactory.apply_row_delta : The primary key of class " + self.className + " is not part of its BULK_COLUMNS." )
+        key_index_list = [ column_list.index( column ) for column in key_column_list ]
+        
+        sql_session = SQLManager.get_instance().get_session()
+        staging = Table( table.name + DataFactory.DELTA_STAGING_TABLE_SUFFIX, MetaData(),
+                         *[ Column( column, table.columns[ column ].type, primary_key = column in key_column_list ) for column in column_list ],
+                         prefixes = [ "TEMPORARY" ] )
+        
+        try:
+            staging.create( bind = sql_session.connection() )
+            
+            # Stage the rows: a key staged by a previous batch is replaced
+            key_delete = staging.delete().where( and_( *[ staging.columns[ column ] == bindparam( "key_" + column ) for column in key_column_list ] ) )
+            for row_list in row_batches:
+                batch_row_dict = {}
+                for row in row_list:
+                    batch_row_dict[ tuple( [ row[ index] for index in key_index_list ] ) ] = row
+                if len( batch_row_dict ) == 0:
+                    continue
+                sql_session.execute( key_delete, [ dict( zip( [ "key_" + column for column in key_column_list ], key ) ) for key in batch_row_dict ] )
+                sql_session.execute( staging.insert(), [ dict( zip( column_list, row ) ) for row in batch_row_dict.itervalues() ] )
+            
+            # Compute the difference
+            same_key = and_( *[ DataFactory.same_value( table.columns[ column ], staging.columns[ column ] ) for column in key_column_list ] )
+            same_row = and_( *[ DataFactory.same_value( table.columns[ column ], staging.columns[ column ] ) for column in column_list ] )
+            inserted_count = sql_session.execute( select( [ func.count() ] ).select_from( staging ).where( ~exists().where( same_key ) ) ).scalar()
+            updated_count = sql_session.execute( select( [ func.count() ] ).select_from( staging ).where( and_( exists().where( same_key ), ~exists().where( same_row ) ) ) ).scalar()
+            deleted_count = sql_session.execute( select( [ func.count() ] ).select_from( table ).where( ~exists().where( same_key ) ) ).scalar()
+            
+            # Remove the deleted and updated rows, then insert the new and updated rows
+            sql_session.execute( table.delete().where( ~exists().where( same_row ) ) )
+            sql_session.execute( table.insert().from_select( column_list, select( [ staging.columns[ column ] for column in column_list ] ).where( ~exists().where( same_key ) ) ) )
+            
+            staging.drop( bind = sql_session.connection() )
+        except exc.SQLAlchemyError as sqle:
+            raise RainetException( "DataFactory.apply_row_delta : An error occurred while updating rows of class " + self.className, sqle )
+        
+        self.clean_insertion_cache()
+        
+        return inserted_count, updated_count, deleted_count
+
+    # #
+    # Build the condition of equality of two columns, two NULL values being equal
+    #
+    # @param column : Column - A column
+    # @param other_column : Column - Another column
+    #
+    # @return The SQL condition
+    @staticmethod
+    def same_value( column, other_column ):
+        
+        return or_( column == other_column, and_( column == None, other_column == None ) )
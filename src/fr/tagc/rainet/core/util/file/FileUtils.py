@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import os
+import hashlib
 
 from fr.tagc.rainet.core.util.log.Logger import Logger
 from fr.tagc.rainet.core.util.exception.FileFormatException import FileFormatException
@@ -55,6 +56,33 @@ class FileUtils(object):
         return file_handle
 
 
+    ## compute_fingerprint
+    #  -------------------
+    #
+    # Compute the fingerprint of a file: its size, its modification time and the MD5 hash of
+    # each block of the file (so that the changed parts of a file can be located)
+    #
+    # @param path : string - the file path
+    # @param block_size : int - the size (in bytes) of the hashed blocks
+    #
+    # @return tuple( int, float, list<string>) - The size, the modification time and the block hashes
+    @staticmethod
+    def compute_fingerprint( path, block_size = Constants.FINGERPRINT_BLOCK_SIZE):
+        
+        file_stat = os.stat( path)
+        block_hash_list = []
+        try:
+            with open( path, 'rb') as file_handle:
+                block = file_handle.read( block_size)
+                while block:
+                    block_hash_list.append( hashlib.md5( block).hexdigest())
+                    block = file_handle.read( block_size)
+        except IOError as ioe:
+            raise RainetException( "FileUtils.compute_fingerprint : Unable to read file '" + path + "' : " + str( ioe), ioe)
+        
+        return file_stat.st_size, file_stat.st_mtime, block_hash_list
+
+
     # open_text_w
     # -------
     #
@@ -77,6 +105,60 @@ class FileUtils(object):
         return file_handle
 
 
+    # open_truncated
+    # -------
+    #
+    # Open a file to append after the given offset, the content after the offset being removed
+    # (the file is created if it does not exist)
+    #
+    # @param path : string - the file path
+    # @param offset : int - the size of the file kept
+    # @param mode : string - the opening mode ('a' for text, 'ab' for binary)
+    #
+    # @return an object of type file handler, positioned at the end of the file
+    @staticmethod
+    def open_truncated( path, offset, mode = 'a'):
+        try:
+            file_handle = open( path, mode)
+            file_handle.truncate( offset)
+            file_handle.seek( 0, os.SEEK_END)
+        except IOError as ioe:
+            raise RainetException( "FileUtils.open_truncated : Unable to open file '" + path + "' : " + str( ioe), ioe)
+
+        return file_handle
+
+
+    # get_line_offsets
+    # -------
+    #
+    # Split a text file in chunks of about the same size, the chunks starting at the beginning of a line
+    #
+    # @param path : string - the file path
+    # @param chunk_number : int - the number of chunks wanted
+    #
+    # @return list<tuple( int, int)> - the start and end offsets of each chunk, in the order of the file
+    # (less chunks than wanted if the file has less lines)
+    @staticmethod
+    def get_line_offsets( path, chunk_number):
+        try:
+            file_size = os.path.getsize( path)
+            offset_list = [ 0]
+            with open( path, 'rb') as file_handle:
+                for chunk in range( 1, chunk_number):
+                    # the chunk ends after the line containing the byte before its nominal end
+                    file_handle.seek( max( file_size * chunk / chunk_number - 1, offset_list[ -1]))
+                    file_handle.readline()
+                    offset = file_handle.tell()
+                    if offset > offset_list[ -1] and offset < file_size:
+                        offset_list.append( offset)
+        except (IOError, OSError) as ioe:
+            raise RainetException( "FileUtils.get_line_offsets : Unable to read file '" + path + "' : " + str( ioe), ioe)
+
+        offset_list.append( file_size)
+
+        return zip( offset_list[ :-1], offset_list[ 1:])
+
+
     # find_extension
     # -------------
     #
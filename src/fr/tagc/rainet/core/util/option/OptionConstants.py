@@ -3,6 +3,7 @@ import os
 
 from fr.tagc.rainet.core.util import Constants
 from fr.tagc.rainet.core.data import DataConstants
+from fr.tagc.rainet.core.util.sql import SQLConstants
 
 #===============================================================================
 # The list of available strageties
@@ -31,6 +32,11 @@ OPTION_OUTPUT_FOLDER = "Output folder"
 # Insertion strategy options
 OPTION_INSERTION_PROPERTIES_PATH = "insertionPropertiesPath"
 OPTION_INSERTION_FORCE_OVERRIDE = "insertionForceOverride"
+OPTION_INSERTION_SQL_PROFILE = "insertionSQLProfile"
+OPTION_INSERTION_WORKERS = "insertionWorkers"
+OPTION_INSERTION_RESUME = "insertionResume"
+OPTION_INSERTION_INTERACTION_STORE = "insertionInteractionStore"
+OPTION_INSERTION_UPDATE = "insertionUpdate"
 # InteractiveQuery Strategy options
 OPTION_QUERY_FILE = "query_file"
 # Analysis Strategy options
@@ -48,11 +54,21 @@ OPTION_NUMBER_RANDOMIZATIONS = "Number randomizations"
 OPTION_EXPRESSION_WARNING = "Protein group expression proportion warning"
 OPTION_MINIMUM_EXPRESSION = "Minimum RPKM expression"
 OPTION_LOWER_TAIL = "Use lower tail of hypergeometric test"
+OPTION_ENRICHMENT_WORKERS = "Number worker processes"
+OPTION_ENRICHMENT_RESUME = "Resume interrupted run"
+OPTION_SIGNIFICANT_ONLY = "Significant tests only"
+OPTION_COLUMN_REPORT = "Columnar report"
+OPTION_RANDOM_SEED = "Random seed"
+OPTION_PARAMETER_SWEEP = "Parameter sweep file"
 
 #===============================================================================
 # Constants for default values
 #===============================================================================
 
+# Insertion strategy
+DEFAULT_INSERTION_SQL_PROFILE = SQLConstants.SQLITE_PROFILE_DEFAULT
+DEFAULT_INSERTION_WORKERS = 1
+
 # Analysis strategy
 DEFAULT_BIOTYPE = "RNA"
 DEFAULT_INTERACTION_SCORE = "OFF"
@@ -72,6 +88,7 @@ DEFAULT_NUMBER_RANDOMIZATIONS = 100
 DEFAULT_EXPRESSION_WARNING = "OFF"
 DEFAULT_MINIMUM_EXPRESSION = 0.0
 DEFAULT_LOWER_TAIL = 1
+DEFAULT_ENRICHMENT_WORKERS = 1
 
 #===============================================================================
 # The definition of the options
@@ -82,6 +99,11 @@ OPTION_LIST = {  "Insertion": [
                     [ "-v", "--verbose", "store", "string", OPTION_VERBOSITY, Constants.MODE_INFO, "The level of verbosity. Must be one of : " + str( Constants.VERBOSITY_LEVELS)],
                     [ "-i", "--insertionPropertiesPath", "store", "string", OPTION_INSERTION_PROPERTIES_PATH, None, "The path to the properties file containing the list of files to use for DB insertion."],
                     [ "-f", "--forceOverride", "store_true", None, OPTION_INSERTION_FORCE_OVERRIDE, None, "Indicates if the whole database must be dropped and re-inserted or not."],
+                    [ "-p", "--sqlProfile", "store", "string", OPTION_INSERTION_SQL_PROFILE, DEFAULT_INSERTION_SQL_PROFILE, "The SQLite performance profile used during insertion (PRAGMA settings, single connection, index deferral, ANALYZE). Must be one of : " + str( sorted( SQLConstants.SQLITE_PROFILES.keys()))],
+                    [ "-w", "--workers", "store", "int", OPTION_INSERTION_WORKERS, DEFAULT_INSERTION_WORKERS, "Number of worker processes reading the data files (and building the rows of the bulk tables) while the database is written by the main process. Default: 1 (files read by the main process, in insertion order)."],
+                    [ "-r", "--resume", "store_true", None, OPTION_INSERTION_RESUME, None, "Indicates if the insertions interrupted during a previous run must be resumed from their last committed batch (instead of being restarted from the beginning of the file)."],
+                    [ "-c", "--interactionStore", "store_true", None, OPTION_INSERTION_INTERACTION_STORE, None, "Indicates if the columnar, memory-mapped copy of the catRAPID interactions used by the analysis must be written next to the database."],
+                    [ "-u", "--update", "store_true", None, OPTION_INSERTION_UPDATE, None, "Indicates if the tables already inserted must be updated when their source file changed since their insertion (only the changed rows are applied when possible). The changes applied are reported at the end of the insertion."],
                 ], 
                  "InteractiveQuery":[
                     [ "-d", "--databasePath", "store", "string", OPTION_DB_NAME, None, "The path to the SQL database to use/create."],
@@ -111,7 +133,13 @@ OPTION_LIST = {  "Insertion": [
                     [ "-r", "--numberRandomizations", "store", "int", OPTION_NUMBER_RANDOMIZATIONS, DEFAULT_NUMBER_RANDOMIZATIONS, "Number of randomizations to be performed for the control experiment." ],
                     [ "-e", "--expressionWarning", "store", "string", OPTION_EXPRESSION_WARNING, DEFAULT_EXPRESSION_WARNING, "Turn warning flag on unless >=X proportion of proteins in annotations are present in the same tissue. Accepts values between 0.0 and 1.0. Default = 'OFF'" ],
                     [ "-c", "--minimumExpression", "store", "float", OPTION_MINIMUM_EXPRESSION, DEFAULT_MINIMUM_EXPRESSION, "Used in conjunction with --expressionWarning. Minimum RPKM value to consider present in tissue. Default = 0" ],
-                    [ "-t", "--lowerTail", "store", "int", OPTION_LOWER_TAIL, DEFAULT_LOWER_TAIL, "While computing hypergeometric test, whether to look for enrichment (lower tail = 1) or depletion ( lower tail = 0). Default = 1" ]
+                    [ "-t", "--lowerTail", "store", "int", OPTION_LOWER_TAIL, DEFAULT_LOWER_TAIL, "While computing hypergeometric test, whether to look for enrichment (lower tail = 1) or depletion ( lower tail = 0). Default = 1" ],
+                    [ "-w", "--workers", "store", "int", OPTION_ENRICHMENT_WORKERS, DEFAULT_ENRICHMENT_WORKERS, "Number of worker processes running the tests of the RNAs, the sorted RNAs being split in shards. Default = 1 (tests run by the main process)" ],
+                    [ "-u", "--resume", "store_true", None, OPTION_ENRICHMENT_RESUME, None, "Indicates if the run interrupted in the output folder must be resumed after its last completed RNA, with the same randomizations (instead of being restarted from the first RNA). The run must have the same parameters." ],
+                    [ "-g", "--significantOnly", "store_true", None, OPTION_SIGNIFICANT_ONLY, None, "Indicates if only the significant tests must be written to the enrichment results file (the results per RNA are unchanged). Requires --columnReport, whose copy keeps all the tests." ],
+                    [ "-b", "--columnReport", "store_true", None, OPTION_COLUMN_REPORT, None, "Indicates if the enrichment tests must also be written to a binary, columnar copy of the enrichment results file (folder enrichment_results.tsv.columns), containing all the tests even with --significantOnly. This copy is read by FilterEnrichmentResults instead of the results file." ],
+                    [ "-n", "--randomSeed", "store", "int", OPTION_RANDOM_SEED, None, "Seed of the randomizations, written in the parameters log. Default: drawn at random (a resumed run uses the seed of its checkpoint)." ],
+                    [ "-p", "--parameterSweep", "store", "string", OPTION_PARAMETER_SWEEP, None, "Tab-separated file of configurations of the tests to run on the same data: a header naming parameters among minimumProteinAnnotation, minimumProteinInteraction, expressionWarning and lowerTail, then one configuration per line (the parameters not in the file keep their command-line value). The data and the randomizations are loaded once, the outputs of configuration i are written in the subfolder configuration_i of the output folder." ]
                 ],
                 "DatabaseCheck" : [
                     [ "-d", "--databasePath", "store", "string", OPTION_DB_NAME, None, "The path to the SQL database to use/create."],
@@ -0,0 +1,199 @@
+import time
+from collections import Counter
+
+from fr.tagc.rainet.core.util.file.FileUtils import FileUtils 
+from fr.tagc.rainet.core.util.exception.RainetException import RainetException
+from fr.tagc.rainet.core.util.factory.DataFactory import DataFactory
+from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
+from fr.tagc.rainet.core.util.sql.SQLUtil import SQLUtil
+from fr.tagc.rainet.core.util.data.DataManager import DataManager
+from fr.tagc.rainet.core.util.log.Logger import Logger
+from fr.tagc.rainet.core.util import Constants
+from fr.tagc.rainet.core.data import DataConstants
+from fr.tagc.rainet.core.data.ProteinRNAInteractionCatRAPID import ProteinRNAInteractionCatRAPID
+
+## This class is a streaming parser of catRAPID interaction files.
+# Lines have the format "sp|P10645|CMGA_HUMAN ENST00000516610\t10.66\t0.32\t0.00" and are converted
+# to plain rows inserted by batch in the ProteinRNAInteractionCatRAPID table, without creating ORM objects.
+# The parser requires the sets of known Protein and RNA IDs to be stored in the DataManager
+# (keywords DataConstants.PROT_ALL_KW and DataConstants.RNA_ALL_KW). Interactions with an unknown
+# Protein or RNA are skipped and counted in Counters stored in the DataManager
+# (keywords DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_PROT_KW and 
+# DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_RNA_KW).
+# Only one batch of rows is kept in memory at a time. The reading and filtering of the file (read_rows) is 
+# separated from the insertion so that it can be done in another process (see InsertionScheduler).
+class CatRAPIDParser(object):
+
+    ##
+    # This method parses the provided catRAPID interaction file and inserts the interactions in database
+    #
+    # @param file_path : string - The path to the catRAPID file to parse
+    # @param comment_symbol : string - Symbol used to comment lines in the file to parse
+    # @param clean_table : boolean  - The information indicating if the related db table must be cleaned before insertion or not
+    # @param value_source : iterator (optional) - Iterator over the batches of rows of the file, as produced by read_rows.
+    #                                   If None, the file is read by the current process.
+    # @param checkpoint_name : string (optional) - The name under which the insertion checkpoint (file offset and number of rows committed)
+    #                                   is saved with each batch commit. If None, no checkpoint is saved.
+    # @param start_offset : int (optional) - The byte offset in the file where the parsing starts (to resume an interrupted insertion)
+    # @param start_row_number : int (optional) - The number of rows already committed before start_offset
+    #
+    # @return the status of the insertion
+    @staticmethod
+    def parse_file( file_path, comment_symbol, clean_table = True, value_source = None, checkpoint_name = None, start_offset = 0, start_row_number = 0):
+        
+        # Initialize the status of the insertion
+        status = Constants.STATUS_OK
+        
+        # Retrieve the counters of missing IDs
+        dt_manager = DataManager.get_instance()
+        for keyword in [ DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_PROT_KW, DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_RNA_KW]:
+            if keyword not in dt_manager.data:
+                dt_manager.store_data( keyword, Counter())
+        missing_protein_counter = dt_manager.get_data( DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_PROT_KW)
+        missing_rna_counter = dt_manager.get_data( DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_MISSING_RNA_KW)
+        
+        # Build the Factory to be used to insert the rows
+        data_factory = DataFactory( DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_CLASS)
+        if clean_table:
+            data_factory.clean_table()
+        
+        # Read the file if the rows are not provided by another process
+        if value_source == None:
+            value_source = CatRAPIDParser.read_rows( file_path, comment_symbol, start_offset)
+        
+        line_counter = 0
+        row_counter = start_row_number
+        start_time = time.time()
+        
+        for line_counter, byte_offset, row_list, batch_missing_protein_counter, batch_missing_rna_counter in value_source:
+            missing_protein_counter.update( batch_missing_protein_counter)
+            missing_rna_counter.update( batch_missing_rna_counter)
+
+            # Insert and commit rows by batch, with the checkpoint of the insertion
+            data_factory.insert_rows( row_list)
+            row_counter += len( row_list)
+            if checkpoint_name != None:
+                SQLUtil.save_insertion_checkpoint( checkpoint_name, file_path, byte_offset, row_counter)
+            SQLManager.get_instance().commit()
+            CatRAPIDParser.log_progress( file_path, line_counter, row_counter - start_row_number, start_time)
+
+        # Commit the SQLAlchemy session
+        Logger.get_instance().info( "CatRAPIDParser.parse_file : Committing SQL session.")
+        SQLManager.get_instance().commit()
+
+        # Report on interactions skipped due to missing IDs
+        if len( missing_protein_counter) > 0 or len( missing_rna_counter) > 0:
+            Logger.get_instance().warning( "CatRAPIDParser.parse_file : Skipped %i interactions with %i Protein IDs not found in database." % 
+                                           ( sum( missing_protein_counter.values()), len( missing_protein_counter)) )
+            Logger.get_instance().warning( "CatRAPIDParser.parse_file : Skipped %i interactions with %i RNA IDs not found in database." % 
+                                           ( sum( missing_rna_counter.values()), len( missing_rna_counter)) )
+            status = Constants.STATUS_WARNING
+
+        return status
+
+    ##
+    # Read the provided catRAPID interaction file and yield by batch the rows to insert, i.e. the interactions
+    # whose Protein and RNA are known. This method does not use the database: the sets of known IDs are the ones
+    # of the DataManager (they must be loaded before the process is started when it is another process).
+    #
+    # @param file_path : string - The path to the catRAPID file to parse
+    # @param comment_symbol : string - Symbol used to comment lines in the file to parse
+    # @param start_offset : int - The byte offset in the file of the first line to read (0 to read the whole file)
+    # @param batch_size : int - The number of interactions of each yielded batch (default: DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_BATCH_SIZE)
+    #
+    # @return generator of tuple( int, int, list<tuple>, Counter, Counter) - The number of lines read so far, the byte offset of the first
+    #         line not read yet, the batch of rows (see read_interactions) and the counts of the Protein and RNA IDs not found in the batch
+    @staticmethod
+    def read_rows( file_path, comment_symbol, start_offset = 0, batch_size = None):
+        
+        dt_manager = DataManager.get_instance()
+        protein_set = dt_manager.get_data( DataConstants.PROT_ALL_KW)
+        rna_set = dt_manager.get_data( DataConstants.RNA_ALL_KW)
+        
+        for line_counter, byte_offset, interaction_batch in CatRAPIDParser.read_interactions( file_path, comment_symbol, start_offset, batch_size):
+            row_list = []
+            missing_protein_counter = Counter()
+            missing_rna_counter = Counter()
+            for interaction in interaction_batch:
+                # Skip interactions whose Protein or RNA is not in the database
+                if interaction[1] not in protein_set:
+                    missing_protein_counter[ interaction[1]] += 1
+                    continue
+                if interaction[0] not in rna_set:
+                    missing_rna_counter[ interaction[0]] += 1
+                    continue
+                row_list.append( interaction)
+            yield line_counter, byte_offset, row_list, missing_protein_counter, missing_rna_counter
+
+    ##
+    # Read the provided catRAPID interaction file and yield the interactions by batch. 
+    # This method does not use the database, the filtering on known IDs is done by read_rows.
+    #
+    # @param file_path : string - The path to the catRAPID file to parse
+    # @param comment_symbol : string - Symbol used to comment lines in the file to parse
+    # @param start_offset : int - The byte offset in the file of the first line to read (0 to read the whole file)
+    # @param batch_size : int - The number of interactions of each yielded batch (default: DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_BATCH_SIZE)
+    #
+    # @return generator of tuple( int, int, list<tuple>) - The number of lines read so far, the byte offset of the first
+    #         line not read yet and the batch of interactions as ( transcript_id, protein_id, interaction_score) tuples
+    @staticmethod
+    def read_interactions( file_path, comment_symbol, start_offset = 0, batch_size = None):
+        
+        if batch_size == None:
+            batch_size = DataConstants.PROTEIN_RNA_INTERACTION_CATRAPID_BATCH_SIZE
+        
+        # Open the file to parse in 'read' mode and go to the first line not yet inserted
+        input_file = FileUtils.open_text_r( file_path)
+        input_file.seek( start_offset)
+        
+        interaction_batch = []
+        line_counter = 0
+        # The position in the file is followed from the line lengths (file iteration does not support tell())
+        byte_offset = start_offset
+        
+        for line in input_file:
+            line_counter += 1
+            byte_offset += len( line)
+            
+            # Ignore the empty and comment lines
+            if line.startswith( comment_symbol) or line.strip() == '':
+                continue
+            
+            # e.g. "sp|Q96DC8|ECHD3_HUMAN ENST00000579524\t-12.33\t0.10\t0.00"
+            value_list = line.split( "\t", 2)
+            if len( value_list) < 2:
+                raise RainetException( "CatRAPIDParser.read_interactions : Bad line format in file, no interaction score found at line " + str( line_counter) + " : " + line)
+
+            protein_id, transcript_id = ProteinRNAInteractionCatRAPID.parse_interactors( value_list[0])
+            try:
+                interaction_score = float( value_list[1])
+            except ValueError as ve:
+                raise RainetException( "CatRAPIDParser.read_interactions : The value of interaction score is not a float at line " + str( line_counter) + " : " + value_list[1], ve)
+
+            interaction_batch.append( ( transcript_id, protein_id, interaction_score))
+
+            if len( interaction_batch) >= batch_size:
+                yield line_counter, byte_offset, interaction_batch
+                interaction_batch = []
+
+        # Close the input file
+        input_file.close()
+        
+        yield line_counter, byte_offset, interaction_batch
+
+    ##
+    # Log the number of lines read, of rows inserted and the insertion rate
+    #
+    # @param file_path : string - The path to the parsed file
+    # @param line_number : int - The number of lines read so far
+    # @param row_number : int - The number of rows inserted so far
+    # @param start_time : float - The time at which the insertion started
+    @staticmethod
+    def log_progress( file_path, line_number, row_number, start_time):
+        
+        duration = time.time() - start_time
+        if duration > 0:
+            rate = row_number / duration
+        else:
+            rate = float( row_number)
+        Logger.get_instance().info( "CatRAPIDParser.parse_file : %s Read %i lines, inserted %i rows (%.1f rows per second)." % ( file_path, line_number, row_number, rate) )
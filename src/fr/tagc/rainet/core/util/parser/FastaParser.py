@@ -4,6 +4,7 @@ import re
 from fr.tagc.rainet.core.util.file.FileUtils import FileUtils 
 from fr.tagc.rainet.core.util.factory.DataFactory import DataFactory
 from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
+from fr.tagc.rainet.core.util.sql.SQLUtil import SQLUtil
 from fr.tagc.rainet.core.util.log.Logger import Logger
 from fr.tagc.rainet.core.util import Constants
 
@@ -31,16 +32,23 @@ class FastaParser(object):
     # @param parameter_value_list : list<string> - Ordered list of optional parameter values used to instantiate the Class
     # @param comment_symbol : string - symbol used to comment lines in the file to parse
     # @param clean_table : boolean  - The information indicating if the related db table must be cleaned before insertion or not
+    # @param checkpoint_name : string (optional) - The name under which the insertion checkpoint (file offset and number of rows committed)
+    #                                   is saved with each batch commit. If None, no checkpoint is saved.
+    # @param start_offset : int (optional) - The byte offset in the file where the parsing starts (to resume an interrupted insertion).
+    #                                   It must be the offset of a sequence definition line.
+    # @param start_row_number : int (optional) - The number of rows already committed before start_offset
     #
     # @return None
     @staticmethod
-    def parse_file( file_path, class_name, regular_expression, group_list, parameter_name_list, parameter_value_list, comment_symbol, clean_table = True):
+    def parse_file( file_path, class_name, regular_expression, group_list, parameter_name_list, parameter_value_list, comment_symbol, clean_table = True,
+                    checkpoint_name = None, start_offset = 0, start_row_number = 0):
         
         # Initialize the status of insertion
         status = Constants.STATUS_OK
         
-        # Open the file to parse in 'read' mode
+        # Open the file to parse in 'read' mode and go to the first sequence not yet inserted
         input_file = FileUtils.open_text_r( file_path)                
+        input_file.seek( start_offset)
         
         # Build the map of parameter name to regex group index
         # If a parameter name is not in the regex group, the index is set to -1
@@ -65,12 +73,16 @@ class FastaParser(object):
         
         # Parse the lines in the files and create one object by line matching the provided regex and
         # add it the sequence (lines below the matching line and before the next matching line or EOF)
+        # The objects are committed by batch, with the offset of the next sequence definition line as checkpoint
         instance_list = []
+        row_counter = start_row_number
+        line_offset = input_file.tell()
         line = input_file.readline()
         current_matcher = None
         end_of_file = False
         while not end_of_file:
             # Read next line
+            next_line_offset = input_file.tell()
             next_line = input_file.readline()
             if next_line == None or next_line == '':
                 end_of_file = True
@@ -98,17 +110,29 @@ class FastaParser(object):
                         new_instance = data_factory.create_object_from_fasta( parameter_value_list)
                         if new_instance != None:
                             instance_list.append( new_instance)
+                        
+                        # Commit the batch of objects created before the current sequence definition line
+                        if len( instance_list) >= Constants.INSERTION_BATCH_SIZE and not end_of_file:
+                            row_counter += len( instance_list)
+                            instance_list = []
+                            if checkpoint_name != None:
+                                SQLUtil.save_insertion_checkpoint( checkpoint_name, file_path, line_offset, row_counter)
+                            Logger.get_instance().info( "FastaParser.parse_file : %s Committing %i rows.." % ( file_path, row_counter) )
+                            SQLManager.get_instance().commit()
                     
                     # Initialize the new sequence definition and sequence
                     current_matcher = matcher
             
             line = next_line
+            line_offset = next_line_offset
             
         # Close the input file
         input_file.close()
         
         # Commit the SQLAlchemy session
         Logger.get_instance().info( "FastaParser.parse_file : Committing SQL session.")
+        if checkpoint_name != None:
+            SQLUtil.save_insertion_checkpoint( checkpoint_name, file_path, line_offset, row_counter + len( instance_list))
         SQLManager.get_instance().commit();
         
         # Return the list of created instances
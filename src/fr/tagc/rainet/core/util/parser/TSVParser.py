@@ -1,8 +1,11 @@
 
+import time
+
 from fr.tagc.rainet.core.util.file.FileUtils import FileUtils 
 from fr.tagc.rainet.core.util.exception.RainetException import RainetException
 from fr.tagc.rainet.core.util.factory.DataFactory import DataFactory
 from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
+from fr.tagc.rainet.core.util.sql.SQLUtil import SQLUtil
 from fr.tagc.rainet.core.util.log.Logger import Logger
 from fr.tagc.rainet.core.util import Constants
 from fr.tagc.rainet.core.util.time.Timer import Timer
@@ -19,6 +22,10 @@ from fr.tagc.rainet.core.util.time.Timer import Timer
 # - The ordered list of optional values to use to call the Class constructor
 # - The comment symbol
 # - clean_table : boolean  - The information indicating if the related db table must be cleaned before insertion or not
+# - bulk_insertion : boolean - The information indicating if the rows must be inserted in bulk mode (no ORM object created)
+# The reading of the file (read_values) is separated from the creation of the objects so that it can be
+# done in another process (see InsertionScheduler). In bulk mode, the rows can also be built by that
+# process (read_rows), the current process only inserting them.
 class TSVParser(object):
 
     ##
@@ -32,29 +39,198 @@ class TSVParser(object):
     # @param parameter_value_list : list<string> - Ordered list of optional parameter values used to instantiate the Class
     # @param comment_symbol : string - Symbol used to comment lines in the file to parse
     # @param clean_table : boolean  - The information indicating if the related db table must be cleaned before insertion or not
+    # @param bulk_insertion : boolean - Indicates if lines must be converted to plain rows and inserted by batch (executemany)
+    #                                   instead of creating one ORM object per line. Only used if the Class supports it.
+    # @param value_source : iterator (optional) - Iterator over the batches of parameter values of the file, as produced by read_values.
+    #                                   If None, the file is read by the current process.
+    # @param checkpoint_name : string (optional) - The name under which the insertion checkpoint (file offset and number of rows committed)
+    #                                   is saved with each batch commit. If None, no checkpoint is saved.
+    # @param start_offset : int (optional) - The byte offset in the file where the parsing starts (to resume an interrupted insertion)
+    # @param start_row_number : int (optional) - The number of rows already committed before start_offset
+    # @param row_source : iterator (optional) - Iterator over the batches of rows of the file, as produced by read_rows in bulk mode.
+    #                                   If provided, value_source is not used.
     #
     # @return None
     @staticmethod
-    def parse_file( file_path, has_headers, group_list, class_name, parameter_name_list, parameter_value_list, comment_symbol, clean_table = False):
+    def parse_file( file_path, has_headers, group_list, class_name, parameter_name_list, parameter_value_list, comment_symbol, clean_table = False, bulk_insertion = False, value_source = None,
+                    checkpoint_name = None, start_offset = 0, start_row_number = 0, row_source = None):
         
         # Initialize the status of the insertion
         status = Constants.STATUS_OK
         
-        # Open the file to parse in 'read' mode
-        input_file = FileUtils.open_text_r( file_path)
+        # Check the parameters are found in the headers
+        group_list = TSVParser.read_headers( file_path, has_headers, group_list)
+        parameter_to_header_index_map = TSVParser.build_parameter_index_map( group_list, parameter_name_list)
+        if -1 in parameter_to_header_index_map.values():
+            status = Constants.STATUS_WARNING
         
-        # If required, look for the header line (first non-empty line)
-        if has_headers:
+        # Build the Factory to be used to create the objects
+        data_factory = DataFactory( class_name)
+        if clean_table:
+            data_factory.clean_table()
+        
+        # Check if the bulk insertion mode can be used for the requested class
+        if bulk_insertion and not data_factory.bulk_insertion_supported():
+            Logger.get_instance().warning( "TSVParser.parse_file : Bulk insertion is not supported by class " + class_name + ". Using object insertion.")
+            bulk_insertion = False
+        
+        # Read the file if the values are not provided by another process
+        if value_source == None and row_source == None:
+            value_source = TSVParser.read_values( file_path, has_headers, group_list, parameter_name_list, parameter_value_list, comment_symbol, start_offset)
+        
+        # In bulk mode, insert the rows by batch (built from the values if they are not provided by another process),
+        # committing into database after each batch, with the checkpoint of the insertion
+        row_counter = start_row_number
+        if bulk_insertion or row_source != None:
+            if row_source == None:
+                row_source = TSVParser.build_row_batches( file_path, data_factory, value_source)
+            start_time = time.time()
+            for byte_offset, row_list in row_source:
+                Timer.get_instance().time_point()
+                data_factory.insert_rows( row_list)
+                row_counter += len( row_list)
+                if checkpoint_name != None:
+                    SQLUtil.save_insertion_checkpoint( checkpoint_name, file_path, byte_offset, row_counter)
+                SQLManager.get_instance().commit()
+                TSVParser.log_insertion_rate( file_path, row_counter - start_row_number, start_time)
+        
+        # Otherwise, create one object of the requested type per line, 
+        # commit into database after each batch of lines, with the checkpoint of the insertion
+        else:
+            line_counter = 0
+            for byte_offset, value_batch in value_source:
+                instance_list = []
+                for value_list in value_batch:
+                    #Call for the Object creation
+                    new_instance = data_factory.create_object_from_tsv( value_list)
+                    if new_instance != None:
+                        instance_list.append( new_instance)
+                
+                line_counter += len( value_batch)
+                Logger.get_instance().info( "TSVParser.parse_file : %s Read %i lines.." % (file_path, line_counter) )
+                Timer.get_instance().time_point()
+                row_counter += len( instance_list)
+                if checkpoint_name != None:
+                    SQLUtil.save_insertion_checkpoint( checkpoint_name, file_path, byte_offset, row_counter)
+                SQLManager.get_instance().commit()
+        
+        # Commit the SQLAlchemy session
+        Logger.get_instance().info( "TSVParser.parse_file : Committing SQL session.")
+        SQLManager.get_instance().commit();
+        
+        # Return the list of created instances
+        return status
+
+    ##
+    # Update the table of the given Class with the content of a TSV file: only the difference between the
+    # rows of the file and the rows of the table (by primary key) is applied (see DataFactory.apply_row_delta).
+    # The Class must support the bulk insertion mode.
+    #
+    # The parameters are the ones of parse_file
+    #
+    # @return tuple( string, tuple( int, int, int)) - The status of the update and the number of inserted, updated and deleted rows
+    @staticmethod
+    def parse_file_delta( file_path, has_headers, group_list, class_name, parameter_name_list, parameter_value_list, comment_symbol, value_source = None, row_source = None):
+        
+        # Initialize the status of the update
+        status = Constants.STATUS_OK
+        
+        # Check the parameters are in the file headers
+        group_list = TSVParser.read_headers( file_path, has_headers, group_list)
+        parameter_to_header_index_map = TSVParser.build_parameter_index_map( group_list, parameter_name_list)
+        if -1 in parameter_to_header_index_map.values():
+            status = Constants.STATUS_WARNING
+        
+        data_factory = DataFactory( class_name)
+        if not data_factory.bulk_insertion_supported():
+            raise RainetException( "TSVParser.parse_file_delta : The update by difference is not supported by class " + class_name)
+        
+        # Read the file and build the rows if they are not provided by another process
+        if row_source == None:
+            if value_source == None:
+                value_source = TSVParser.read_values( file_path, has_headers, group_list, parameter_name_list, parameter_value_list, comment_symbol)
+            row_source = TSVParser.build_row_batches( file_path, data_factory, value_source)
+        
+        # Apply the difference between the rows of the file, batch by batch, and the rows of the table
+        change_counts = data_factory.apply_row_delta( row_list for byte_offset, row_list in row_source)
+        
+        Logger.get_instance().info( "TSVParser.parse_file_delta : Committing SQL session.")
+        SQLManager.get_instance().commit()
+        
+        return status, change_counts
+
+    ##
+    # Build the rows of the given Class from batches of values, one batch of rows per batch of values
+    #
+    # @param file_path : string - The path to the TSV file (used in the log)
+    # @param data_factory : DataFactory - The factory of the Class
+    # @param value_source : iterable - The batches of values (see read_values)
+    #
+    # @return generator of tuple( int, list<tuple>) - The byte offset of the first line not read yet and the batch of rows,
+    #         as created by DataFactory.create_row_from_tsv
+    @staticmethod
+    def build_row_batches( file_path, data_factory, value_source):
+        
+        line_counter = 0
+        for byte_offset, value_batch in value_source:
+            row_list = []
+            for value_list in value_batch:
+                new_row = data_factory.create_row_from_tsv( value_list)
+                if new_row != None:
+                    row_list.append( new_row)
+            line_counter += len( value_batch)
+            Logger.get_instance().info( "TSVParser.build_row_batches : %s Read %i lines.." % (file_path, line_counter) )
+            yield byte_offset, row_list
+
+    ##
+    # Read the provided TSV file and yield, by batch of lines, the rows of the given Class ready to be inserted
+    # (see DataFactory.insert_rows). The Class must support the bulk insertion mode. This method does not use
+    # the database: the data used to build the rows must be loaded before (see DataFactory.prepare_row_creation).
+    #
+    # @param class_name : string - name of the class of the rows
+    # The other parameters are the ones of read_values
+    #
+    # @return generator of tuple( int, list<tuple>) - The byte offset of the first line not read yet and the batch of rows
+    @staticmethod
+    def read_rows( file_path, has_headers, group_list, class_name, parameter_name_list, parameter_value_list, comment_symbol, start_offset = 0, batch_size = None):
+        
+        value_source = TSVParser.read_values( file_path, has_headers, group_list, parameter_name_list, parameter_value_list, comment_symbol, start_offset, batch_size)
+        
+        return TSVParser.build_row_batches( file_path, DataFactory( class_name), value_source)
+
+    ##
+    # Returns the list of headers of the file: the provided one if any, or the file header line
+    #
+    # @param file_path : string - The path to the TSV file
+    # @param has_header : boolean - Indicates if the file has a header line
+    # @param header_list : list<string> - Ordered list of headers name (could be None)
+    #
+    # @return list<string> - The list of headers
+    @staticmethod
+    def read_headers( file_path, has_headers, group_list):
+        
+        if has_headers and group_list == None:
+            input_file = FileUtils.open_text_r( file_path)
             line = ''
             while line == '':
                 line = input_file.readline()
-            # If no headers are provided by the user, use the file headers
-            if group_list == None:
-                group_list = line.split( "\t")
+            input_file.close()
+            group_list = line.split( "\t")
+        
+        return group_list
+
+    ##
+    # Build the map of parameter name to header index
+    # If a parameter name is not in the header the index is set to -1
+    # and a warning message is sent
+    #
+    # @param header_list : list<string> - Ordered list of headers name
+    # @param parameter_name_list : list<string> - Ordered list of parameters used to instantiate the Class
+    #
+    # @return dict<string,int> - The header index of each parameter
+    @staticmethod
+    def build_parameter_index_map( group_list, parameter_name_list):
         
-        # Build the map of parameter name to header index
-        # If a parameter name is not in the header the index is set to -1
-        # and a warning message is sent
         parameter_to_header_index_map = {}
         for parameter_name in parameter_name_list:
             try:
@@ -62,17 +238,54 @@ class TSVParser(object):
             except ValueError:
                 index = -1
                 Logger.get_instance().warning( "TSVParser.parse_file : The parameter '" + parameter_name + "' is not in the header list : " + str(group_list) + ".\n Check whether it is normal or not.")
-                status = Constants.STATUS_WARNING
             parameter_to_header_index_map[ parameter_name] = index
-                        
         
-        # Build the Factory to be used to create the objects
-        data_factory = DataFactory( class_name)
-        if clean_table:
-            data_factory.clean_table()
+        return parameter_to_header_index_map
+
+    ##
+    # Read the provided TSV file and yield, by batch of lines, the ordered list of values required 
+    # for Object creation of each line. This method does not use the database.
+    #
+    # @param file_path : string - The path to the TSV file to parse
+    # @param has_header : boolean - Indicates if the file to parse has a header line
+    # @param header_list : list<string> - Ordered list of headers name (could be None)
+    # @param parameter_name_list : list<string> - Ordered list of parameters used to instantiate the Class
+    # @param parameter_value_list : list<string> - Ordered list of optional parameter values used to instantiate the Class
+    # @param comment_symbol : string - Symbol used to comment lines in the file to parse
+    # @param start_offset : int - The byte offset in the file of the first line to read (0 to read the whole file)
+    # @param batch_size : int - The number of lines read for each yielded batch (default: Constants.INSERTION_BATCH_SIZE)
+    #
+    # @return generator of tuple( int, list<list<string>>) - The byte offset of the first line not read yet and the batch of parameter values
+    @staticmethod
+    def read_values( file_path, has_headers, group_list, parameter_name_list, parameter_value_list, comment_symbol, start_offset = 0, batch_size = None):
+        
+        if batch_size == None:
+            batch_size = Constants.INSERTION_BATCH_SIZE
+        
+        # Open the file to parse in 'read' mode
+        input_file = FileUtils.open_text_r( file_path)
+        
+        # If required, look for the header line (first non-empty line)
+        if has_headers:
+            line = ''
+            while line == '':
+                line = input_file.readline()
+            # If no headers are provided by the user, use the file headers
+            if group_list == None:
+                group_list = line.split( "\t")
         
-        # Parse the lines in the files and create one object of the requested type per line
-        instance_list = []
+        parameter_to_header_index_map = TSVParser.build_parameter_index_map( group_list, parameter_name_list)
+        
+        #If no parameter_value_list is provided, create a new 'None' one
+        if( parameter_value_list == None):
+            parameter_value_list = [None]*len( parameter_name_list)
+        
+        # Go to the first line not yet inserted when resuming an insertion
+        if start_offset > 0:
+            input_file.seek( start_offset)
+        
+        # Parse the lines in the files and build the list of values of each line
+        value_batch = []
         line = input_file.readline()
         counter = 0
         while line != None and line != '':
@@ -87,44 +300,46 @@ class TSVParser(object):
                         +" Line =" + line)
                 
                 #Build the ordered list of value required for Object creation
-                #If no parameter_value_list is provided, create a new 'None' one
                 # If a parameter_value_list is provided, override only the values
                 # corresponding to a parameter found in the file header
-                if( parameter_value_list == None):
-                    parameter_value_list = [None]*len( parameter_name_list)
+                value_list = list( parameter_value_list)
                 value_index = 0
                 for parameter_name in parameter_name_list:
                     parameter_index = parameter_to_header_index_map[ parameter_name]
                     if parameter_index >=0 :
-                        parameter_value_list[ value_index] = line_value_list[ parameter_index].strip()
+                        value_list[ value_index] = line_value_list[ parameter_index].strip()
                     value_index = value_index + 1
-                    
-                #Call for the Object creation
-                new_instance = data_factory.create_object_from_tsv( parameter_value_list)
-                if new_instance != None:
-                    instance_list.append( new_instance)
+                value_batch.append( value_list)
+            
+            # Counter for large files, yield the values after 100000 lines
+            # with the position of the next line in the file
+            counter += 1
+            if counter % batch_size == 0:
+                yield input_file.tell(), value_batch
+                value_batch = []
             
             # Read a new line
             line = input_file.readline()
 
-            
-            # Counter for large files, commits into database after 100000 lines
-            counter += 1
-            if counter % 100000 == 0:
-                Logger.get_instance().info( "TSVParser.parse_file : %s Read %i lines.." % (file_path,counter) )
-                Timer.get_instance().time_point()
-                SQLManager.get_instance().commit()
-                instance_list = []
-
-
         # Close the input file
+        byte_offset = input_file.tell()
         input_file.close()
         
-        # Commit the SQLAlchemy session
-        Logger.get_instance().info( "TSVParser.parse_file : Committing SQL session.")
-        SQLManager.get_instance().commit();
-        
-        # Return the list of created instances
-        return status
-        
+        if len( value_batch) > 0:
+            yield byte_offset, value_batch
+    
+    ##
+    # Log the number of rows inserted so far and the insertion rate
+    #
+    # @param file_path : string - The path to the parsed file
+    # @param row_number : int - The number of rows inserted so far
+    # @param start_time : float - The time at which the insertion started
+    @staticmethod
+    def log_insertion_rate( file_path, row_number, start_time):
         
+        duration = time.time() - start_time
+        if duration > 0:
+            rate = row_number / duration
+        else:
+            rate = float( row_number)
+        Logger.get_instance().info( "TSVParser.parse_file : %s Inserted %i rows (%.1f rows per second)." % ( file_path, row_number, rate) )
@@ -0,0 +1,119 @@
+import random
+import hashlib
+
+import numpy
+
+from fr.tagc.rainet.core.util.exception.RainetException import RainetException
+from fr.tagc.rainet.core.util.log.Logger import Logger
+
+
+##
+# This class is a singleton providing the random streams of the randomization-based analyses.
+# All the streams derive from a single seed (given by the user or drawn once): the seed of a stream is the hash of
+# the seed and of the stream keys (e.g. the analysis step and the RNA ID), so that a stream does not depend on
+# the order in which the streams are used. Each RNA (or worker shard) can have its own stream, and a sharded run
+# draws the same numbers as a serial run. The seed is meant to be written in the parameter log of the analyses.
+class RandomService( object ):
+
+    ## The singleton instance
+    __instance = None
+
+    # maximum value of a seed (seeds of numpy.random.RandomState are 32-bit integers)
+    MAXIMUM_SEED = 2 ** 32 - 1
+
+    ##
+    # The constructor
+    def __init__( self ):
+
+        self.seed = None
+
+    ##
+    # The singleton provider
+    @staticmethod
+    def get_instance():
+        if RandomService.__instance == None:
+            RandomService.__instance = RandomService()
+        return RandomService.__instance
+
+    ##
+    # Set the seed all the streams derive from
+    #
+    # @param seed : int (optional) - The seed, None to draw a seed from the system randomness source
+    #
+    # @return int - The seed
+    #
+    # @raise RainetException if the seed is not an integer between 0 and MAXIMUM_SEED
+    def set_seed( self, seed = None ):
+
+        if seed == None:
+            seed = random.SystemRandom().randint( 0, RandomService.MAXIMUM_SEED )
+        try:
+            seed = int( seed )
+        except ( TypeError, ValueError ):
+            raise RainetException( "RandomService.set_seed : The random seed must be an integer: " + str( seed ) )
+        if seed < 0 or seed > RandomService.MAXIMUM_SEED:
+            raise RainetException( "RandomService.set_seed : The random seed must be between 0 and " + str( RandomService.MAXIMUM_SEED ) + ": " + str( seed ) )
+
+        self.seed = seed
+        Logger.get_instance().info( "RandomService.set_seed : Random seed: %i" % self.seed )
+
+        return self.seed
+
+    ##
+    # @return int - The seed all the streams derive from (drawn if not set)
+    def get_seed( self ):
+
+        if self.seed == None:
+            self.set_seed()
+        return self.seed
+
+    ##
+    # @param keys : the keys of the stream (e.g. a step name and an RNA ID)
+    #
+    # @return int - The seed of the stream
+    def get_stream_seed( self, *keys ):
+
+        streamHash = hashlib.md5( "\t".join( [ str( self.get_seed() ) ] + [ str( key ) for key in keys ] ) )
+        return int( streamHash.hexdigest()[ :8 ], 16 )
+
+    ##
+    # @param keys : the keys of the stream (e.g. a step name and an RNA ID)
+    #
+    # @return numpy.random.RandomState - The NumPy stream of the given keys (for vectorized sampling)
+    def get_stream( self, *keys ):
+
+        return numpy.random.RandomState( self.get_stream_seed( *keys ) )
+
+    ##
+    # @param keys : the keys of the stream (e.g. a step name and an RNA ID)
+    #
+    # @return random.Random - The stream of the given keys, with the interface of the random module
+    def get_python_stream( self, *keys ):
+
+        return random.Random( self.get_stream_seed( *keys ) )
+
+    ##
+    # Draw several permutations at once
+    #
+    # @param stream : numpy.random.RandomState - The stream
+    # @param number : int - The number of permutations
+    # @param size : int - The size of the permutations
+    #
+    # @return numpy.array - The permutations of range( size), one per row (number x size)
+    @staticmethod
+    def permutations( stream, number, size ):
+
+        return numpy.argsort( stream.random_sample( ( number, size ) ), axis = 1 ).astype( numpy.int32 )
+
+    ##
+    # Draw a sample without replacement
+    #
+    # @param stream : numpy.random.RandomState - The stream
+    # @param population : list - The items to sample
+    # @param size : int - The size of the sample
+    #
+    # @return list - The items of the sample
+    @staticmethod
+    def sample( stream, population, size ):
+
+        return [ population[ index ] for index in stream.choice( len( population ), size, replace = False ).tolist() ]
@@ -0,0 +1,255 @@
+
+import multiprocessing
+import Queue
+
+from fr.tagc.rainet.core.util.exception.RainetException import RainetException
+from fr.tagc.rainet.core.util.log.Logger import Logger
+
+
+# Marker sent by a producer process when all its batches were sent
+PRODUCER_END = "END"
+# Marker sent by a producer process when an error occurred
+PRODUCER_ERROR = "ERROR"
+
+# Maximum number of batches waiting in the queue of a producer
+PRODUCER_QUEUE_SIZE = 2
+# Delay (in seconds) between two checks of a producer process while waiting for a batch
+PRODUCER_POLL_DELAY = 5
+
+
+##
+# Function executed by the producer processes: iterate over the given generator function
+# and send each produced batch to the queue. The end of the production (or the error that
+# stopped it) is indicated by a marker.
+#
+# @param producer : function - The generator function producing the batches
+# @param producer_arguments : list - The arguments of the generator function
+# @param queue : multiprocessing.Queue - The queue receiving the batches
+def run_producer( producer, producer_arguments, queue):
+
+    try:
+        for batch in producer( *producer_arguments):
+            queue.put( ( None, batch))
+        queue.put( ( PRODUCER_END, None))
+    except RainetException as re:
+        queue.put( ( PRODUCER_ERROR, re.to_string()))
+    except Exception as e:
+        queue.put( ( PRODUCER_ERROR, e.__class__.__name__ + " : " + str( e)))
+
+
+##
+# A step of the insertion, as declared to the InsertionScheduler
+class InsertionStep( object):
+
+    ##
+    # The constructor
+    #
+    # @param name : string - The name of the step
+    # @param dependency_list : list<string> - The names of the steps that must be done before this one
+    # @param function : function - The function doing the insertion, called with the source of batches (or None)
+    # @param producer : function - The generator function producing the batches of the step (optional)
+    # @param producer_arguments : list or function - The arguments of the producer, or a function returning them
+    # @param required_function : function - Function indicating if the step has to be done (optional).
+    #                                       If it returns False, the producer is not started.
+    # @param producer_after_dependencies : boolean - Indicates if the producer must be started only when the dependencies are done
+    def __init__( self, name, dependency_list, function, producer, producer_arguments, required_function, producer_after_dependencies = False):
+
+        self.name = name
+        self.dependencyList = dependency_list
+        self.function = function
+        self.producer = producer
+        self.producerArguments = producer_arguments
+        self.requiredFunction = required_function
+        self.producerAfterDependencies = producer_after_dependencies
+        self.process = None
+        self.queue = None
+        self.done = False
+
+    ##
+    # Indicates if the step can be executed by the writer without waiting for the producer
+    #
+    # @return True if the step has no running producer or if a batch is available
+    def has_data( self):
+
+        return self.queue == None or not self.queue.empty()
+
+    ##
+    # Iterate over the batches sent by the producer process of the step
+    #
+    # @return generator of batches
+    # @raise RainetException if the producer failed or died
+    def read_batches( self):
+
+        while True:
+            try:
+                marker, batch = self.queue.get( True, PRODUCER_POLL_DELAY)
+            except Queue.Empty:
+                if not self.process.is_alive():
+                    raise RainetException( "InsertionScheduler.read_batches : The producer process of step " + self.name + " stopped unexpectedly.")
+                continue
+            if marker == PRODUCER_END:
+                return
+            if marker == PRODUCER_ERROR:
+                raise RainetException( "InsertionScheduler.read_batches : The producer process of step " + self.name + " failed : " + batch)
+            yield batch
+
+
+##
+# This class schedules the steps of the database insertion.
+# Each step declares the steps it depends on. The reading and parsing of the data files (producers)
+# is done in parallel by worker processes, each sending its batches through a bounded queue, while
+# the main process (the single writer of the database) executes the steps whose dependencies are done,
+# preferring the ones for which a batch is already available. When the rows of a table can be built
+# without the ORM, the producer also builds them, so that the main process only inserts and commits them.
+# With one worker (default), no process is started and the steps are executed in their declaration order.
+class InsertionScheduler( object):
+
+    ##
+    # The constructor
+    #
+    # @param worker_number : int - The maximum number of producer processes running at the same time
+    def __init__( self, worker_number = 1):
+
+        self.workerNumber = worker_number
+        self.stepList = []
+        self.stepDict = {}
+
+    ##
+    # Declare a new step of the insertion
+    #
+    # @param name : string - The name of the step
+    # @param dependency_list : list<string> - The names of the steps that must be done before this one
+    # @param function : function - The function doing the insertion. It receives the iterator over the batches
+    #                              built by the producer, or None if the data must be read by the function itself
+    # @param producer : function (optional) - The generator function producing the batches of the step.
+    #                              It must not use the database.
+    # @param producer_arguments : list or function (optional) - The arguments of the producer, or a function returning them
+    #                              (called by the main process when the producer is started)
+    # @param required_function : function (optional) - Function indicating if the data of the step must be read
+    # @param producer_after_dependencies : boolean (optional) - Indicates if the producer uses data loaded by the main process
+    #                              for the dependencies (e.g. the sets of IDs of the DataManager used to build the rows).
+    #                              The producer is then started only when the dependencies are done, so that the worker
+    #                              process inherits these data.
+    #
+    # @raise RainetException if the step is already declared or if a dependency is unknown
+    def add_step( self, name, dependency_list, function, producer = None, producer_arguments = None, required_function = None, producer_after_dependencies = False):
+
+        if name in self.stepDict:
+            raise RainetException( "InsertionScheduler.add_step : Step " + name + " is declared twice.")
+        for dependency in dependency_list:
+            if dependency not in self.stepDict:
+                raise RainetException( "InsertionScheduler.add_step : Step " + name + " depends on unknown step " + dependency +
+                                       ". Dependencies must be declared before the steps that use them.")
+        if producer_arguments == None:
+            producer_arguments = []
+
+        step = InsertionStep( name, dependency_list, function, producer, producer_arguments, required_function, producer_after_dependencies)
+        self.stepList.append( step)
+        self.stepDict[ name] = step
+
+    ##
+    # Execute all the declared steps
+    #
+    # @raise RainetException if a step or a producer failed
+    def run( self):
+
+        if self.workerNumber <= 1:
+            for step in self.stepList:
+                step.function( None)
+                step.done = True
+            return
+
+        try:
+            while True:
+                self.start_producers()
+                step = self.next_step()
+                if step == None:
+                    break
+                if step.queue != None:
+                    step.function( step.read_batches())
+                    step.process.join()
+                    step.queue = None
+                else:
+                    step.function( None)
+                step.done = True
+        finally:
+            self.stop_producers()
+
+    ##
+    # Start the producer processes of the next steps, in declaration order, while workers are available
+    def start_producers( self):
+
+        running_number = len( [ step for step in self.stepList if step.queue != None and not step.done])
+        for step in self.stepList:
+            if running_number >= self.workerNumber:
+                return
+            if step.done or step.producer == None or step.process != None:
+                continue
+            if step.producerAfterDependencies and not self.dependencies_done( step):
+                continue
+            # Do not read data that will not be inserted
+            if step.requiredFunction != None and not step.requiredFunction():
+                step.producer = None
+                continue
+            Logger.get_instance().info( "InsertionScheduler.start_producers : Starting the reading of data for step " + step.name)
+            producer_arguments = step.producerArguments
+            if callable( producer_arguments):
+                producer_arguments = producer_arguments()
+            step.queue = multiprocessing.Queue( PRODUCER_QUEUE_SIZE)
+            step.process = multiprocessing.Process( target = run_producer, args = ( step.producer, producer_arguments, step.queue))
+            step.process.daemon = True
+            step.process.start()
+            running_number += 1
+
+    ##
+    # Choose the next step to execute: the first step (in declaration order) whose dependencies are done
+    # and whose data are available. If no data is available yet, the first step whose dependencies are done.
+    # A step whose producer is not started is not chosen, except if it is the first ready step: its producer
+    # is then started or, if all the workers read the data of steps still waiting for their dependencies,
+    # its data are read by the main process.
+    #
+    # @return InsertionStep - The next step to execute or None if all steps are done
+    def next_step( self):
+
+        ready_list = []
+        for step in self.stepList:
+            if step.done:
+                continue
+            if not self.dependencies_done( step):
+                continue
+            if step.producer != None and step.process == None:
+                if len( ready_list) == 0:
+                    self.start_producers()
+                    if step.process == None and step.producer != None:
+                        Logger.get_instance().info( "InsertionScheduler.next_step : No worker available, the data of step " + step.name + " are read by the main process")
+                        step.producer = None
+                else:
+                    continue
+            ready_list.append( step)
+
+        if len( ready_list) == 0:
+            return None
+
+        for step in ready_list:
+            if step.has_data():
+                return step
+        return ready_list[ 0]
+
+    ##
+    # Indicates if the steps the given step depends on are done
+    #
+    # @param step : InsertionStep - The step
+    #
+    # @return True if all the dependencies are done
+    def dependencies_done( self, step):
+
+        return len( [ dependency for dependency in step.dependencyList if not self.stepDict[ dependency].done]) == 0
+
+    ##
+    # Stop the producer processes still running (after an error)
+    def stop_producers( self):
+
+        for step in self.stepList:
+            if step.process != None and step.process.is_alive():
+                step.process.terminate()
+                step.process.join()
@@ -3,6 +3,8 @@
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
 from sqlalchemy import exc
+from sqlalchemy import event
+from sqlalchemy.pool import SingletonThreadPool
 from posix import remove
 
 from fr.tagc.rainet.core.util.log.Logger import Logger
@@ -20,6 +22,7 @@ from fr.tagc.rainet.core.data.DBParameter import DBParameter
 # The singleton is able to manage the creation of a SQLAlchemy Session to the database
 # it has been initiated with. The singleton keep the same session open until it is
 # asked to close it.
+# The SQLite connections are configured according to a performance profile (see SQLConstants.SQLITE_PROFILES)
 class SQLManager(object) :
 
     __instance = None
@@ -27,6 +30,10 @@ class SQLManager(object) :
     def __init__(self):
         self.DBPath = None
         self.session = None
+        self.engine = None
+        self.enginePath = None
+        self.profile = SQLConstants.SQLITE_PROFILE_DEFAULT
+        self.keepSessionOpen = False
 
     # # 
     # Returns the current SQLAlchemy session if it exists or create a new one
@@ -36,8 +43,8 @@ class SQLManager(object) :
     def get_session(self):
 
         if(self.session == None):
-            # Create engine to dedicated database
-            engine = self.create_engine( self.DBPath)
+            # Get the engine to dedicated database
+            engine = self.get_engine()
 
             # Open the DB session
             session = sessionmaker()
@@ -60,19 +67,123 @@ class SQLManager(object) :
         return
     
     # #
-    # Commit the actual session and close it after
+    # Commit the actual session and close it after, unless the session must be kept open.
+    # If no session is open, there is nothing to commit.
     #
     # @return None
     def commit(self):
         
+        if self.session == None:
+            return
+        
         try:
             self.session.commit()
         except exc.SQLAlchemyError as sqle:
             self.rollback_session()
             raise RainetException("SQLManager.commit : An error occurred while committing the session.", sqle)
         finally:
+            if not self.keepSessionOpen:
+                self.close_session()
+
+    # #
+    # Indicate if the session must be kept open after each commit (a single session and connection
+    # is then used until set back to False)
+    #
+    # @param keep_open : boolean - True to keep the session open between commits
+    #
+    # @return None
+    def set_keep_session_open(self, keep_open):
+        
+        self.keepSessionOpen = keep_open
+        if not keep_open and self.session != None:
             self.close_session()
 
+    # #
+    # Set the performance profile used to configure the SQLite connections
+    #
+    # @param profile : string - The name of the profile, one of SQLConstants.SQLITE_PROFILES
+    #
+    # @return None
+    # @raise RainetException if the profile is unknown
+    def set_profile(self, profile):
+        
+        if profile not in SQLConstants.SQLITE_PROFILES:
+            raise RainetException("SQLManager.set_profile : Unknown SQL performance profile '" + str( profile) + "'. Must be one of : " + str( sorted( SQLConstants.SQLITE_PROFILES.keys())))
+        
+        if profile != self.profile:
+            # Ensure the next session will use an engine built with the new profile
+            if self.session != None:
+                self.close_session()
+            self.engine = None
+            self.enginePath = None
+            self.profile = profile
+        
+        self.keepSessionOpen = SQLConstants.SQLITE_PROFILES[ self.profile][ SQLConstants.PROFILE_KEEP_SESSION_OPEN]
+        Logger.get_instance().info( "SQLManager.set_profile : Using SQL performance profile '" + self.profile + "'")
+
+    # #
+    # Returns the value of a setting of the current performance profile
+    #
+    # @param setting : string - The setting name (see SQLConstants.PROFILE_*)
+    #
+    # @return the value of the setting
+    def get_profile_setting(self, setting):
+        
+        return SQLConstants.SQLITE_PROFILES[ self.profile][ setting]
+
+    # #
+    # Drop the secondary indexes (indexes created by a SQL statement) of the given table
+    # so that large insertions do not have to maintain them
+    #
+    # @param table_name : string - The name of the table
+    #
+    # @return list<string> - The SQL statements required to rebuild the dropped indexes
+    def drop_indexes(self, table_name):
+        
+        if SQLConstants.DB_TYPE != SQLConstants.DB_TYPE_SQLITE:
+            return []
+        
+        sql_session = self.get_session()
+        index_list = sql_session.execute( "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :table_name AND sql IS NOT NULL", 
+                                          { "table_name" : table_name}).fetchall()
+        for index_name, index_sql in index_list:
+            Logger.get_instance().info( "SQLManager.drop_indexes : Dropping index " + index_name + " of table " + table_name)
+            sql_session.execute( 'DROP INDEX "' + index_name + '"')
+        self.commit()
+        
+        return [ index_sql for index_name, index_sql in index_list]
+
+    # #
+    # Rebuild indexes previously dropped by drop_indexes
+    #
+    # @param index_sql_list : list<string> - The SQL statements returned by drop_indexes
+    #
+    # @return None
+    def create_indexes(self, index_sql_list):
+        
+        if index_sql_list == None or len( index_sql_list) == 0:
+            return
+        
+        sql_session = self.get_session()
+        for index_sql in index_sql_list:
+            Logger.get_instance().info( "SQLManager.create_indexes : " + index_sql)
+            sql_session.execute( index_sql)
+        self.commit()
+
+    # #
+    # Gather the database statistics used by the SQLite query planner
+    #
+    # @return None
+    def analyze(self):
+        
+        if SQLConstants.DB_TYPE != SQLConstants.DB_TYPE_SQLITE:
+            return
+        
+        Logger.get_instance().info( "SQLManager.analyze : Running ANALYZE on " + str( self.DBPath))
+        sql_session = self.get_session()
+        sql_session.execute( "ANALYZE")
+        self.commit()
+
     # #
     # Rollback the actual session
     #
@@ -149,6 +260,9 @@ class SQLManager(object) :
             sql_session = session()
             SQLManager.check_species(sql_session, species, True)
             sql_session.close()
+        # Otherwise, create only the tables added to the class model since the database creation (if any)
+        else:
+            Base.metadata.create_all(engine)
 
         # Keep the DB path
         self.DBPath = path
@@ -198,14 +312,16 @@ class SQLManager(object) :
         return SQLManager.__instance
 
     # #
-    # Returns the SQLAlchemy engine of the DB
+    # Returns the SQLAlchemy engine of the DB. The engine is created once per database path.
     # 
     # @return the SQLAlchemy engine of the DB
     def get_engine(self):
 
         if self.DBPath != None:
-            engine = self.create_engine( self.DBPath)
-            return engine
+            if self.engine == None or self.enginePath != self.DBPath:
+                self.engine = self.create_engine( self.DBPath)
+                self.enginePath = self.DBPath
+            return self.engine
         
         return None
         
@@ -217,7 +333,13 @@ class SQLManager(object) :
 
         if SQLConstants.DB_TYPE == SQLConstants.DB_TYPE_SQLITE:
             if sqlitepath != None:
-                engine = create_engine(SQLConstants.PATH_SQLALCHEMY_SQLITE + sqlitepath)
+                pragma_list = self.get_profile_setting( SQLConstants.PROFILE_PRAGMAS)
+                if len( pragma_list) > 0:
+                    # Keep the connection (and its settings) open instead of reopening it for each session
+                    engine = create_engine(SQLConstants.PATH_SQLALCHEMY_SQLITE + sqlitepath, poolclass = SingletonThreadPool)
+                    event.listen( engine, "connect", lambda dbapi_connection, connection_record: SQLManager.set_sqlite_pragmas( dbapi_connection, pragma_list))
+                else:
+                    engine = create_engine(SQLConstants.PATH_SQLALCHEMY_SQLITE + sqlitepath)
                 return engine
             else:
                 return None
@@ -228,4 +350,17 @@ class SQLManager(object) :
 
         raise RainetException("SQLManger.create_engine: the database type is not correct: " + SQLConstants.DB_TYPE)
 
-
+    # #
+    # Set the given PRAGMA on a new SQLite connection (engine connect hook)
+    #
+    # @param dbapi_connection : the DBAPI (sqlite3) connection
+    # @param pragma_list : list<(string, string)> - The PRAGMA names and values
+    #
+    # @return None
+    @staticmethod
+    def set_sqlite_pragmas( dbapi_connection, pragma_list):
+        
+        cursor = dbapi_connection.cursor()
+        for pragma_name, pragma_value in pragma_list:
+            cursor.execute( "PRAGMA " + pragma_name + " = " + pragma_value)
+        cursor.close()
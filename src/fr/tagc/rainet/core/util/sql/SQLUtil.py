@@ -1,6 +1,10 @@
 
+import hashlib
+
 from fr.tagc.rainet.core.data.Protein import Protein
 from fr.tagc.rainet.core.data.TableStatus import TableStatus
+from fr.tagc.rainet.core.data.InsertionCheckpoint import InsertionCheckpoint
+from fr.tagc.rainet.core.data.TableFingerprint import TableFingerprint
 from fr.tagc.rainet.core.util import Constants
 from fr.tagc.rainet.core.util.exception.RainetException import RainetException
 from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
@@ -127,4 +131,103 @@ class SQLUtil( object ):
             return True
         else:
             return False
-            
+
+
+    # #
+    # Get the insertion checkpoint of the given table, i.e. the position in the source file up to which
+    # the data were committed by a previous (interrupted) insertion
+    #
+    # @param table_name : string - The name of the DB table (with its extension if any)
+    #
+    # @return InsertionCheckpoint - The checkpoint of the table or None if there is none
+    @staticmethod
+    def get_insertion_checkpoint( table_name ):
+        
+        sql_session = SQLManager.get_instance().get_session()
+        return sql_session.query( InsertionCheckpoint ).filter( InsertionCheckpoint.tableName == table_name ).first()
+    
+    # #
+    # Create or update the insertion checkpoint of the given table in the current session.
+    # The checkpoint is committed with the data of the batch.
+    #
+    # @param table_name : string - The name of the DB table (with its extension if any)
+    # @param source : string - The path of the file used to fill the table
+    # @param byte_offset : int - The byte offset in the file of the first line not yet committed
+    # @param row_number : int - The number of rows committed
+    @staticmethod
+    def save_insertion_checkpoint( table_name, source, byte_offset, row_number ):
+        
+        sql_session = SQLManager.get_instance().get_session()
+        sql_session.merge( InsertionCheckpoint( table_name, source, byte_offset, row_number ) )
+    
+    # #
+    # Remove the insertion checkpoint of the given table (when the insertion is finished or restarted)
+    #
+    # @param table_name : string - The name of the DB table (with its extension if any)
+    @staticmethod
+    def delete_insertion_checkpoint( table_name ):
+        
+        sql_session = SQLManager.get_instance().get_session()
+        sql_session.query( InsertionCheckpoint ).filter( InsertionCheckpoint.tableName == table_name ).delete()
+    
+    # #
+    # Indicate if the given table exists in the database (e.g. a table added to the model after the database was built)
+    #
+    # @param table_name : string - The name of the DB table
+    #
+    # @return boolean - True if the table exists
+    @staticmethod
+    def has_table( table_name ):
+        
+        sql_session = SQLManager.get_instance().get_session()
+        return sql_session.get_bind().dialect.has_table( sql_session.connection(), table_name )
+    
+    # #
+    # Get the state of the given tables: their TableStatus and TableFingerprint entries (including the tables with an extension)
+    # and their number of rows. A database built before the TableFingerprint table existed has no fingerprints.
+    # It is used to check that the data derived from the tables and kept next to the database are up to date.
+    #
+    # @param table_classes : list<class> - The classes of the tables
+    #
+    # @return string - The hash of the state of the tables
+    @staticmethod
+    def get_table_state( table_classes ):
+
+        sql_session = SQLManager.get_instance().get_session()
+        hasFingerprints = SQLUtil.has_table( TableFingerprint.__tablename__ )
+        state = hashlib.md5()
+        for table_class in table_classes:
+            table_name = table_class.__tablename__
+            for status in sql_session.query( TableStatus ).filter( TableStatus.tableName.like( table_name + "%" ) ).order_by( TableStatus.tableName ).all():
+                state.update( "%s\t%s\t%s\n" % ( status.tableName, status.tableStatus, status.tableSource ) )
+            if hasFingerprints:
+                for fingerprint in sql_session.query( TableFingerprint ).filter( TableFingerprint.tableName.like( table_name + "%" ) ).order_by( TableFingerprint.tableName ).all():
+                    state.update( "%s\t%s\t%s\n" % ( fingerprint.tableName, fingerprint.fileSize, fingerprint.blockHashes ) )
+            state.update( "%s\t%s\n" % ( table_name, sql_session.execute( table_class.__table__.count() ).scalar() ) )
+
+        return state.hexdigest()
+
+    # #
+    # Get the fingerprint of the source file of the given table, recorded when the table was filled
+    #
+    # @param table_name : string - The name of the DB table (with its extension if any)
+    #
+    # @return TableFingerprint - The fingerprint of the table or None if there is none
+    @staticmethod
+    def get_table_fingerprint( table_name ):
+        
+        sql_session = SQLManager.get_instance().get_session()
+        return sql_session.query( TableFingerprint ).filter( TableFingerprint.tableName == table_name ).first()
+    
+    # #
+    # Create or update the fingerprint of the source file of the given table in the current session
+    #
+    # @param table_name : string - The name of the DB table (with its extension if any)
+    # @param source : string - The path of the file used to fill the table
+    # @param fingerprint : tuple( int, float, list<string>) - The fingerprint of the file (see FileUtils.compute_fingerprint)
+    @staticmethod
+    def save_table_fingerprint( table_name, source, fingerprint ):
+        
+        sql_session = SQLManager.get_instance().get_session()
+        file_size, file_modification_time, block_hash_list = fingerprint
+        sql_session.merge( TableFingerprint( table_name, source, file_size, file_modification_time, Constants.FINGERPRINT_BLOCK_SIZE, block_hash_list ) )
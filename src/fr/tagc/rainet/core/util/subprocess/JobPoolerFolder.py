@@ -3,33 +3,20 @@ import os
 import glob
 import argparse
 
-from multiprocessing import Pool
+from fr.tagc.rainet.core.util.subprocess.JobRunner import JobRunner
 
 #===============================================================================
 # Started 13-May-2016 
 # Diogo Ribeiro
-DESC_COMMENT = "Script to run jobs in a thread pool. Processes wanted command for each folder in input folder."
+DESC_COMMENT = "Script to run jobs in a pool of processes. Processes wanted command for each folder in input folder."
 #===============================================================================
 
-# #
-# Function to be run for each parallel job. 
-# This method must be unbound (e.g. not inside a class)
-# Normally only one argument supported, here we split a string to harbour several arguments
-# @param argString : string containing several arguments separated by "||"
-def run_command_list_args( argString):
-    
-    argList = argString.split( "||")
-        
-    cmd = "sleep %s; cd %s; %s" % ( argList[0], argList[1], argList[2]) 
-    # TODO: use subprocess? SubprocessUtil.run_command( command)
-
-    os.system( cmd)
-
-    return cmd
- 
 class JobPoolerFolder( object):
     
-    def __init__(self, input_folder, command_string, num_threads, sleep_time):
+    # manifest of the jobs ended, in the input folder (see JobRunner)
+    MANIFEST_FILE = "/job_manifest.tsv"
+
+    def __init__(self, input_folder, command_string, num_threads, sleep_time, timeout = None, retries = 0):
 
         self.inputFolder = input_folder
         
@@ -38,35 +25,25 @@ class JobPoolerFolder( object):
         self.numThreads = num_threads
         
         self.sleepTime = sleep_time
+
+        self.timeout = timeout
+
+        self.retries = retries
         
     # #
-    # Function spawning jobs in a pool
+    # Function running the jobs, a job being run for each folder not done in a previous run
+    #
+    # @return dict - The result of each job run (see JobRunner.run)
     def parallel( self):
                 
         # get list of folders to be processed
-        foldersToProcess =  sorted( glob.glob( self.inputFolder + "/*"))
+        foldersToProcess = sorted( folder for folder in glob.glob( self.inputFolder + "/*") if os.path.isdir( folder))
         
-        # create sleep times list
-        # purpose is to have the first jobs start at different times, so that they get initially defased.
-        sleepTimes = {}
-        for (i, folder) in enumerate( foldersToProcess ):
-            if i < self.numThreads:
-                sleepTimes[ folder] = str( i * self.sleepTime)
-            else:
-                sleepTimes[ folder] = str( 0)
+        # the first jobs start at different times (sleepTime), so that they get initially defased.
+        runner = JobRunner( foldersToProcess, self.commandString, self.numThreads, self.inputFolder + JobPoolerFolder.MANIFEST_FILE,
+                            self.timeout, self.retries, self.sleepTime)
 
-        # create list of jobs, add arguments separated by "||"
-        runList = [ "||".join( [ sleepTimes[ folder], folder, self.commandString] ) for folder in foldersToProcess]
-        
-        # initialise pool    
-        pool = Pool( self.numThreads)
-             
-        # note that second argument needs to be iterable, and a job will be launched for each        
-        results = pool.map( run_command_list_args, runList, chunksize = 1)
-        pool.close()
-        pool.join()
-         
-        return results
+        return runner.run()
  
 if __name__ == "__main__":
     
@@ -89,11 +66,15 @@ if __name__ == "__main__":
 #     parser.add_argument('outputFolder', metavar='outputFolder', type=str, help='Folder where to write output files.')
     parser.add_argument('--sleepTime', metavar='sleepTime', type=int, default = 120,
                          help='Sleep timer for the start jobs, so that jobs get dephased from each other.')
+    parser.add_argument('--timeout', metavar='timeout', type=float, default = None,
+                         help='Maximum duration (in seconds) of a job, after which it is stopped and considered as failed. Default = no maximum.')
+    parser.add_argument('--retries', metavar='retries', type=int, default = 0,
+                         help='Number of times a failed job is run again. The jobs done are recorded in job_manifest.tsv in inputFolder, a new run only running the other jobs.')
     
     #gets the arguments
     args = parser.parse_args( ) 
 
-    pooler = JobPoolerFolder( args.inputFolder, args.commandString, args.numThreads, args.sleepTime)
+    pooler = JobPoolerFolder( args.inputFolder, args.commandString, args.numThreads, args.sleepTime, args.timeout, args.retries)
 
     results = pooler.parallel( )
     
@@ -0,0 +1,212 @@
+
+import os
+import time
+import signal
+import subprocess
+
+from fr.tagc.rainet.core.util.exception.RainetException import RainetException
+from fr.tagc.rainet.core.util.log.Logger import Logger
+
+# #
+# This class runs a command in each job folder (e.g. the catRAPID all vs all folders), with a bounded number of
+# jobs running at the same time. Each job is a subprocess run in its folder, its standard output and error being
+# written to JOB_LOG_FILE in the folder. A job that fails (exit code != 0) or that runs longer than the timeout
+# is retried up to the given number of times.
+#
+# The end of each job is recorded in a manifest (TSV file, one line per job attempt), so that a new run
+# of the same folders only executes the jobs that did not succeed yet.
+class JobRunner( object ):
+
+    # Manifest header
+    MANIFEST_HEADER = "folder\tstatus\texit_code\tattempt\tduration\n"
+
+    # Status of the jobs in the manifest
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_TIMEOUT = "timeout"
+
+    # File of the job folders with the standard output and error of the jobs
+    JOB_LOG_FILE = "job_runner.log"
+
+    # Time (in seconds) between two checks of the running jobs
+    POLL_INTERVAL = 0.1
+
+    # Time (in seconds) between two progress reports, a report being also made when all the jobs have ended
+    REPORT_INTERVAL = 60
+
+    # #
+    # The constructor
+    #
+    # @param job_folders : list<string> - The folders where the command is run, one job per folder
+    # @param command_string : string - The (shell) command run in each folder
+    # @param num_workers : int - The maximum number of jobs running at the same time
+    # @param manifest_file : string - The manifest of the jobs ended
+    # @param timeout : float (optional) - The maximum duration (in seconds) of a job, None for no maximum
+    # @param retries : int (optional) - The number of times a failed job is run again
+    # @param sleep_time : float (optional) - The delay (in seconds) between the starts of the first jobs, so that they get dephased
+    def __init__( self, job_folders, command_string, num_workers, manifest_file, timeout = None, retries = 0, sleep_time = 0 ):
+
+        if num_workers < 1:
+            raise RainetException( "JobRunner.__init__ : the number of workers must be a positive integer." )
+        if retries < 0:
+            raise RainetException( "JobRunner.__init__ : the number of retries must be a positive integer or 0." )
+
+        self.jobFolders = job_folders
+        self.commandString = command_string
+        self.numWorkers = num_workers
+        self.manifestFile = manifest_file
+        self.timeout = timeout
+        self.retries = retries
+        self.sleepTime = sleep_time
+
+    # #
+    # Read the manifest of a previous run
+    #
+    # @return set<string> - The folders whose job succeeded
+    def read_manifest( self ):
+
+        doneFolders = set()
+        if not os.path.exists( self.manifestFile ):
+            return doneFolders
+
+        with open( self.manifestFile, "r" ) as manifestHandler:
+            manifestHandler.readline()
+            for line in manifestHandler:
+                # a line being written when the previous run was interrupted is ignored
+                if not line.endswith( "\n" ):
+                    break
+                spl = line.rstrip( "\n" ).split( "\t" )
+                if spl[ 1 ] == JobRunner.STATUS_DONE:
+                    doneFolders.add( spl[ 0 ] )
+
+        return doneFolders
+
+    # #
+    # Run the jobs of the folders not done in the manifest
+    #
+    # @return dict - The result of each job run (key -> folder, value -> ( status, exit code, number of attempts ))
+    def run( self ):
+
+        doneFolders = self.read_manifest()
+        queue = [ folder for folder in self.jobFolders if folder not in doneFolders ]
+        if len( doneFolders ) > 0:
+            Logger.get_instance().info( "JobRunner.run : %i jobs already done according to %s, %i jobs to run." % ( len( self.jobFolders ) - len( queue ), self.manifestFile, len( queue ) ) )
+
+        # the first jobs start at different times
+        startTimes = {}
+        now = time.time()
+        for index, folder in enumerate( queue[ :self.numWorkers ] ):
+            startTimes[ folder ] = now + index * self.sleepTime
+
+        writeHeader = not os.path.exists( self.manifestFile )
+        manifestHandler = open( self.manifestFile, "a" )
+        if writeHeader:
+            manifestHandler.write( JobRunner.MANIFEST_HEADER )
+            manifestHandler.flush()
+
+        results = {}
+        attempts = {}
+        running = {} # key -> folder, value -> ( process, log file handler, start time )
+        self.startTime = time.time()
+        self.lastReport = self.startTime
+        self.jobNumber = len( queue )
+
+        try:
+            while len( queue ) > 0 or len( running ) > 0:
+
+                # start jobs up to the maximum number of workers
+                while len( queue ) > 0 and len( running ) < self.numWorkers and startTimes.get( queue[ 0 ], 0 ) <= time.time():
+                    folder = queue.pop( 0 )
+                    attempts[ folder ] = attempts.get( folder, 0 ) + 1
+                    running[ folder ] = self.start_job( folder )
+
+                # check the running jobs
+                for folder, ( process, logHandler, jobStart ) in running.items():
+                    duration = time.time() - jobStart
+                    if process.poll() != None:
+                        if process.returncode == 0:
+                            status = JobRunner.STATUS_DONE
+                        else:
+                            status = JobRunner.STATUS_FAILED
+                    elif self.timeout != None and duration > self.timeout:
+                        self.kill_job( process )
+                        status = JobRunner.STATUS_TIMEOUT
+                    else:
+                        continue
+
+                    logHandler.close()
+                    del running[ folder ]
+
+                    manifestHandler.write( "%s\t%s\t%s\t%i\t%.1f\n" % ( folder, status, process.returncode, attempts[ folder ], duration ) )
+                    manifestHandler.flush()
+
+                    if status != JobRunner.STATUS_DONE:
+                        Logger.get_instance().warning( "JobRunner.run : job of %s %s (exit code %s, attempt %i)." % ( folder, status, process.returncode, attempts[ folder ] ) )
+                        if attempts[ folder ] <= self.retries:
+                            queue.append( folder )
+                            continue
+
+                    results[ folder ] = ( status, process.returncode, attempts[ folder ] )
+
+                if time.time() - self.lastReport >= JobRunner.REPORT_INTERVAL:
+                    self.report( results )
+
+                time.sleep( JobRunner.POLL_INTERVAL )
+        finally:
+            # if the run is interrupted, the running jobs are stopped (and not recorded in the manifest)
+            for folder, ( process, logHandler, jobStart ) in running.items():
+                self.kill_job( process )
+                logHandler.close()
+            manifestHandler.close()
+
+        self.report( results )
+
+        return results
+
+    # #
+    # Start the job of a folder
+    #
+    # @param folder : string - The job folder
+    #
+    # @return tuple( subprocess.Popen, file, float ) - The process, the log file handler and the start time of the job
+    def start_job( self, folder ):
+
+        try:
+            logHandler = open( os.path.join( folder, JobRunner.JOB_LOG_FILE ), "w" )
+        except IOError as ioe:
+            raise RainetException( "JobRunner.start_job : Unable to open the log file of " + folder + " : " + str( ioe ), ioe )
+
+        # the job is run in its own process group, so that a timeout stops the shell and its children
+        process = subprocess.Popen( self.commandString, shell = True, cwd = folder, stdout = logHandler, stderr = subprocess.STDOUT, preexec_fn = os.setsid )
+
+        return process, logHandler, time.time()
+
+    # #
+    # Stop a job and its children
+    #
+    # @param process : subprocess.Popen - The process of the job
+    def kill_job( self, process ):
+
+        try:
+            os.killpg( process.pid, signal.SIGKILL )
+        except OSError:
+            # the job has already ended
+            pass
+        process.wait()
+
+    # #
+    # Report the progress of the run: number of jobs ended, throughput and estimated remaining time
+    #
+    # @param results : dict - The results of the jobs ended (see run)
+    def report( self, results ):
+
+        self.lastReport = time.time()
+        duration = self.lastReport - self.startTime
+        failed = len( [ result for result in results.values() if result[ 0 ] != JobRunner.STATUS_DONE ] )
+
+        if len( results ) > 0 and duration > 0:
+            throughput = len( results ) / duration
+            remaining = ( self.jobNumber - len( results ) ) / throughput
+            Logger.get_instance().info( "JobRunner.report : %i/%i jobs ended (%i failed) in %.0fs, %.2f jobs/hour, ETA %.0fs." % ( len( results ), self.jobNumber, failed, duration, throughput * 3600, remaining ) )
+        else:
+            Logger.get_instance().info( "JobRunner.report : 0/%i jobs ended in %.0fs." % ( self.jobNumber, duration ) )
@@ -17,6 +17,8 @@ class Timer( object):
         self.startTime = 0
         self.lastTime = 0
         self.currentStep = None
+        # The list of ( step message, step duration) of the finished steps
+        self.stepDurations = []
 
     ##
     # The singleton provider
@@ -37,6 +39,7 @@ class Timer( object):
         self.lastTime = self.start_time
         Logger.get_instance().info ( "\nSTART CHRONO\n")
         self.currentStep = None
+        self.stepDurations = []
     
     ##
     # This method permits to get the current duration from the last chrono start
@@ -58,9 +61,13 @@ class Timer( object):
         step_duration = current_time - self.lastTime
         total_duration = current_time - self.start_time
         Logger.get_instance().info ( "Step duration : " + Timer.format_duration( step_duration))
+        if self.currentStep != None:
+            self.stepDurations.append( ( self.currentStep, step_duration))
+        self.log_step_durations()
         Logger.get_instance().info ( "\n\nSTOP CHRONO : " + message + ". Total duration " + Timer.format_duration(total_duration))
         self.lastTime = 0
         self.start_time = 0
+        self.currentStep = None
     
     ##
     # This methods permit to indicate the duration from the last chrono start
@@ -73,11 +80,24 @@ class Timer( object):
         duration = current_time - self.lastTime
         if self.currentStep != None:
             Logger.get_instance().info ( "Step duration : " + Timer.format_duration( duration) + "\n")
+            self.stepDurations.append( ( self.currentStep, duration))
         self.lastTime = current_time
         Logger.get_instance().info ( "\n------------------------------------------------")
         Logger.get_instance().info ( "START STEP : '" + message+ "'")
         self.currentStep = message
         
+    ##
+    # This method logs the duration of each finished step since the chrono start,
+    # in seconds, so that durations can be compared between executions
+    def log_step_durations(self):
+        
+        if len( self.stepDurations) == 0:
+            return
+        
+        Logger.get_instance().info ( "\nStep durations (seconds) :")
+        for step_message, step_duration in self.stepDurations:
+            Logger.get_instance().info ( "%.1f\t%s" % ( step_duration, step_message))
+        
     ##
     # This method provide a human readable version of the duration
     @staticmethod
@@ -0,0 +1,201 @@
+
+import unittest
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+
+from fr.tagc.rainet.core.execution.AnalysisStrategy import AnalysisStrategy
+from fr.tagc.rainet.core.data.InteractingProtein import InteractingProtein
+from fr.tagc.rainet.core.data.InteractingRNA import InteractingRNA
+from fr.tagc.rainet.core.data.LncRNA import LncRNA
+from fr.tagc.rainet.core.data.MRNA import MRNA
+from fr.tagc.rainet.core.data.Protein import Protein
+from fr.tagc.rainet.core.data.RNA import RNA
+from fr.tagc.rainet.core.data.RNATissueExpression import RNATissueExpression
+from fr.tagc.rainet.core.data.Tissue import Tissue
+from fr.tagc.rainet.core.util.data.DataManager import DataManager
+from fr.tagc.rainet.core.util.option import OptionConstants
+from fr.tagc.rainet.core.util.option.OptionManager import OptionManager
+from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
+
+# Objects stored by the RNA, protein and interaction filters of the AnalysisStrategy
+FilteredRNA = namedtuple( "FilteredRNA", [ "transcriptID"])
+FilteredProtein = namedtuple( "FilteredProtein", [ "uniprotAC"])
+FilteredInteraction = namedtuple( "FilteredInteraction", [ "transcriptID", "proteinID", "interactionScore"])
+
+# #
+# Unittesting the expression filter of the AnalysisStrategy (dump_filter_PRI_expression) on a small database.
+#
+# The written files are compared to the co-presence of each pair of interacting RNA and protein, computed
+# tissue by tissue from the expression of the RNA and of the mRNAs of the protein.
+#
+class AnalysisExpressionUnittest(unittest.TestCase):
+
+    TISSUES = [ "Liver", "Lung", "Brain"]
+
+    # Expression of the transcripts in each tissue (in the order of TISSUES)
+    EXPRESSION = { "L1" : [ 5.0, 0.5, 2.0], "L2" : [ 1.0, 3.0, 0.0], "L5" : [ 9.0, 9.0, 9.0],
+                   "M1" : [ 2.0, 2.0, 0.2], "M2" : [ 0.1, 0.3, 4.0], "M3" : [ 0.9, 7.0, 1.0], "M5" : [ 3.0, 3.0, 3.0]}
+
+    # lncRNAs: L3 has no expression, L4 is not selected by the RNA filter, L5 does not interact
+    LNCRNAS = [ "L1", "L2", "L3", "L4", "L5"]
+    INTERACTING_RNAS = [ "L1", "L2", "L3", "L4"]
+    SELECTED_RNAS = [ "L1", "L2", "L3", "L5"]
+
+    # mRNAs and their protein: P1 has two mRNAs, the mRNA of P3 has no expression, P4 has no mRNA and P5 is not selected
+    MRNAS = [ ( "M1", "P1"), ( "M2", "P1"), ( "M3", "P2"), ( "M4", "P3"), ( "M5", "P5")]
+    INTERACTING_PROTEINS = [ "P1", "P2", "P3", "P4", "P5"]
+    SELECTED_PROTEINS = [ "P1", "P2", "P3", "P4"]
+
+    # Interactions after the interaction filter: ( transcriptID, proteinID)
+    INTERACTIONS = [ ( "L1", "P1"), ( "L1", "P2"), ( "L2", "P1"), ( "L2", "P2"), ( "L2", "P3"), ( "L3", "P1")]
+
+    # #
+    # Runs before each test
+    def setUp(self):
+
+        self.outputFolder = tempfile.mkdtemp()
+        self.memory = AnalysisStrategy.DUMP_EXPRESSION_FILTER_MEMORY
+        OptionManager.get_instance().set_option( OptionConstants.OPTION_SPECIES, "human")
+
+        sql_manager = SQLManager.get_instance()
+        sql_manager.commit()
+        sql_manager.build_database( os.path.join( self.outputFolder, "expression.sqlite"), False)
+        DataManager.get_instance().data = {}
+
+        sql_session = sql_manager.get_session()
+        sql_session.execute( Protein.__table__.insert(), [ { "uniprotAC" : protein_id} for protein_id in AnalysisExpressionUnittest.INTERACTING_PROTEINS])
+        sql_session.execute( Tissue.__table__.insert(), [ { "tissueName" : tissue, "sourceDB" : "GTEx"} for tissue in AnalysisExpressionUnittest.TISSUES])
+        sql_session.execute( RNA.__table__.insert(), [ { "transcriptID" : transcript_id, "type" : "LncRNA"} for transcript_id in AnalysisExpressionUnittest.LNCRNAS] +
+                                                     [ { "transcriptID" : transcript_id, "type" : "MRNA"} for transcript_id, protein_id in AnalysisExpressionUnittest.MRNAS])
+        sql_session.execute( LncRNA.__table__.insert(), [ { "transcriptID" : transcript_id} for transcript_id in AnalysisExpressionUnittest.LNCRNAS])
+        sql_session.execute( MRNA.__table__.insert(), [ { "transcriptID" : transcript_id, "proteinID" : protein_id} for transcript_id, protein_id in AnalysisExpressionUnittest.MRNAS])
+        sql_session.execute( RNATissueExpression.__table__.insert(), [ { "transcriptID" : transcript_id, "tissueName" : tissue, "expressionValue" : value}
+                                                                       for transcript_id, values in sorted( AnalysisExpressionUnittest.EXPRESSION.items())
+                                                                       for tissue, value in zip( AnalysisExpressionUnittest.TISSUES, values)])
+        sql_session.execute( InteractingRNA.__table__.insert(), [ { "transcriptID" : transcript_id} for transcript_id in AnalysisExpressionUnittest.INTERACTING_RNAS])
+        sql_session.execute( InteractingProtein.__table__.insert(), [ { "uniprotAC" : protein_id} for protein_id in AnalysisExpressionUnittest.INTERACTING_PROTEINS])
+        sql_manager.commit()
+
+    # #
+    # Build the strategy after the RNA, protein and interaction filters
+    #
+    # @param expression_cutoff : float - The minimum expression value
+    # @param tissue_cutoff : int - The minimum number of tissues where both partners are expressed
+    # @param low_memory : int - The low memory mode (the files are written by batches of RNAs)
+    #
+    # @return AnalysisStrategy - The strategy
+    def get_strategy(self, expression_cutoff, tissue_cutoff, low_memory):
+
+        strategy = AnalysisStrategy()
+        strategy.sql_session = SQLManager.get_instance().get_session()
+        strategy.outputFolderReport = self.outputFolder
+        strategy.expressionValueCutoff = expression_cutoff
+        strategy.expressionTissueCutoff = tissue_cutoff
+        strategy.lowMemory = low_memory
+
+        rnas = [ FilteredRNA( transcript_id) for transcript_id in AnalysisExpressionUnittest.SELECTED_RNAS]
+        proteins = [ FilteredProtein( protein_id) for protein_id in AnalysisExpressionUnittest.SELECTED_PROTEINS]
+        dt_manager = DataManager.get_instance()
+        dt_manager.store_data( AnalysisStrategy.RNA_FILTER_KW, rnas)
+        dt_manager.store_data( AnalysisStrategy.RNA_FILTER_KEY_KW, { rna.transcriptID : rna for rna in rnas})
+        dt_manager.store_data( AnalysisStrategy.PROT_FILTER_KW, proteins)
+        dt_manager.store_data( AnalysisStrategy.PROT_FILTER_KEY_KW, { protein.uniprotAC : protein for protein in proteins})
+        dt_manager.store_data( AnalysisStrategy.PRI_FILTER_KW, [ FilteredInteraction( transcript_id, protein_id, 10.0) for transcript_id, protein_id in AnalysisExpressionUnittest.INTERACTIONS])
+
+        return strategy
+
+    # #
+    # Compute, pair by pair, the tissues where both partners are expressed and the pair expression (minimum
+    # expression of the partners, maximum among tissues and mRNAs of the protein, 0.0 without expressed mRNA)
+    #
+    # @param expression_cutoff : float - The minimum expression value
+    #
+    # @return dict - For each ( transcriptID, proteinID) pair, the tuple ( set of co-present tissues, pair expression)
+    def get_expected_pairs(self, expression_cutoff):
+
+        expected = {}
+        for transcript_id in set( AnalysisExpressionUnittest.INTERACTING_RNAS) & set( AnalysisExpressionUnittest.SELECTED_RNAS):
+            if transcript_id not in AnalysisExpressionUnittest.EXPRESSION:
+                continue
+            for protein_id in set( AnalysisExpressionUnittest.INTERACTING_PROTEINS) & set( AnalysisExpressionUnittest.SELECTED_PROTEINS):
+                mrna_list = [ mrna_id for mrna_id, mrna_protein_id in AnalysisExpressionUnittest.MRNAS if mrna_protein_id == protein_id]
+                if len( mrna_list) == 0:
+                    continue
+                tissues = set()
+                pair_expression = 0.0
+                for mrna_id in mrna_list:
+                    if mrna_id not in AnalysisExpressionUnittest.EXPRESSION:
+                        continue
+                    for tissue, rna_value, mrna_value in zip( AnalysisExpressionUnittest.TISSUES, AnalysisExpressionUnittest.EXPRESSION[ transcript_id], AnalysisExpressionUnittest.EXPRESSION[ mrna_id]):
+                        if rna_value >= expression_cutoff and mrna_value >= expression_cutoff:
+                            tissues.add( tissue)
+                        pair_expression = max( pair_expression, min( rna_value, mrna_value))
+                expected[ ( transcript_id, protein_id)] = ( tissues, pair_expression)
+
+        return expected
+
+    # #
+    # @param file_name : string - The name of the file in the output folder
+    #
+    # @return list<list<string>> - The sorted lines of the file, split by tab
+    def read_lines(self, file_name):
+
+        with open( os.path.join( self.outputFolder, file_name)) as input_file:
+            return sorted( [ line.rstrip( "\n").split( "\t") for line in input_file])
+
+    # #
+    # Run the expression filter and compare the written files and the filtered interactions to the expected co-presence
+    #
+    # @param expression_cutoff : float - The minimum expression value
+    # @param tissue_cutoff : int - The minimum number of tissues where both partners are expressed
+    # @param low_memory : int - The low memory mode
+    def check_expression_filter(self, expression_cutoff, tissue_cutoff, low_memory):
+
+        strategy = self.get_strategy( expression_cutoff, tissue_cutoff, low_memory)
+        strategy.dump_filter_PRI_expression()
+
+        expected = self.get_expected_pairs( expression_cutoff)
+        passing = { pair : tissues for pair, ( tissues, pair_expression) in expected.iteritems() if len( tissues) >= tissue_cutoff}
+        message = "expression cutoff %s, tissue cutoff %i, low memory %i" % ( expression_cutoff, tissue_cutoff, low_memory)
+
+        self.assertEqual( self.read_lines( AnalysisStrategy.DUMP_EXPRESSION_FILTER), sorted( [ [ protein_id, transcript_id] for transcript_id, protein_id in passing]), message)
+        self.assertEqual( self.read_lines( AnalysisStrategy.DUMP_EXPRESSION),
+                          sorted( [ [ protein_id, transcript_id, "%s" % pair_expression] for ( transcript_id, protein_id), ( tissues, pair_expression) in expected.iteritems()]), message)
+
+        # in low memory mode, the co-present pairs are only written to the files
+        if low_memory == 0:
+            interactions = DataManager.get_instance().get_data( AnalysisStrategy.PRI_FILTER_KW)
+            self.assertEqual( sorted( [ ( inter.transcriptID, inter.proteinID) for inter in interactions]),
+                              sorted( [ pair for pair in AnalysisExpressionUnittest.INTERACTIONS if pair in passing]), message)
+            self.assertEqual( { tuple( pair.split( "|")) : tissues for pair, tissues in DataManager.get_instance().get_data( AnalysisStrategy.PRI_TISSUES_KW).iteritems()}, passing, message)
+
+        return passing
+
+    # #
+    # Test the expression filter with several cutoffs, in the low memory mode and with one RNA per block
+    def test_dump_filter_PRI_expression(self):
+
+        print "| test_dump_filter_PRI_expression | "
+
+        for expression_cutoff, tissue_cutoff in [ ( 1.0, 1), ( 1.0, 2), ( 2.0, 1), ( 0.0, 3)]:
+            for low_memory in [ 0, 1]:
+                self.check_expression_filter( expression_cutoff, tissue_cutoff, low_memory)
+
+        # L1-P1 (Liver with M1, Brain with M2) and L2-P2 (Lung) are co-present, not the pairs of P3 (mRNA without expression)
+        self.assertEqual( self.check_expression_filter( 1.0, 1, 0), { ( "L1", "P1") : { "Liver", "Brain"}, ( "L1", "P2") : { "Brain"}, ( "L2", "P1") : { "Liver", "Lung"}, ( "L2", "P2") : { "Lung"}})
+        self.assertEqual( set( self.check_expression_filter( 1.0, 2, 0)), { ( "L1", "P1"), ( "L2", "P1")})
+
+        AnalysisStrategy.DUMP_EXPRESSION_FILTER_MEMORY = 1
+        self.check_expression_filter( 1.0, 2, 0)
+        self.check_expression_filter( 1.0, 1, 1)
+
+    # #
+    # Runs after each test
+    def tearDown(self):
+
+        AnalysisStrategy.DUMP_EXPRESSION_FILTER_MEMORY = self.memory
+        SQLManager.get_instance().commit()
+        DataManager.get_instance().data = {}
+        shutil.rmtree( self.outputFolder)
@@ -0,0 +1,126 @@
+
+import unittest
+import os
+import shutil
+import tempfile
+
+from sqlalchemy import event
+
+from fr.tagc.rainet.core.execution.InsertionStrategy import InsertionStrategy
+from fr.tagc.rainet.core.data import DataConstants
+from fr.tagc.rainet.core.data.Gene import Gene
+from fr.tagc.rainet.core.data.Protein import Protein
+from fr.tagc.rainet.core.data.ProteinCrossReference import ProteinCrossReference
+from fr.tagc.rainet.core.data.RNA import RNA
+from fr.tagc.rainet.core.util.data.DataManager import DataManager
+from fr.tagc.rainet.core.util.factory.DataFactory import DataFactory
+from fr.tagc.rainet.core.util.option import OptionConstants
+from fr.tagc.rainet.core.util.option.OptionManager import OptionManager
+from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
+
+# #
+# Unittesting the data kept in memory by the constructors during insertion: the keys they check are
+# queried once from the database, not once per row, and are reset when their table is cleaned.
+#
+class InsertionCacheUnittest(unittest.TestCase):
+
+    # Proteins of the database: ( uniprotAC, uniprotID)
+    PROTEINS = [ ( "P00001", "PROT1_HUMAN"), ( "P00002", "PROT2_HUMAN"), ( "P00003", "PROT3_HUMAN")]
+
+    # #
+    # Runs before each test
+    def setUp(self):
+
+        self.outputFolder = tempfile.mkdtemp()
+        self.dbPath = os.path.join( self.outputFolder, "cache.sqlite")
+        OptionManager.get_instance().set_option( OptionConstants.OPTION_SPECIES, "human")
+
+        sql_manager = SQLManager.get_instance()
+        sql_manager.commit()
+        sql_manager.build_database( self.dbPath, False)
+        DataManager.get_instance().data = {}
+        sql_manager.get_session().execute( Protein.__table__.insert(), [ { "uniprotAC" : uniprot_ac, "uniprotID" : uniprot_id} for uniprot_ac, uniprot_id in InsertionCacheUnittest.PROTEINS])
+        sql_manager.commit()
+
+        # SELECT statements sent to the database
+        self.selectList = []
+        event.listen( sql_manager.get_engine(), "before_cursor_execute", self.record_statement)
+
+    # #
+    # Keep the SELECT statements sent to the database
+    def record_statement(self, connection, cursor, statement, parameters, context, executemany):
+
+        if statement.lstrip().upper().startswith( "SELECT"):
+            self.selectList.append( statement)
+
+    # #
+    # Build the values of a lncRNA, in the order of DataConstants.RNA_PARAMS
+    #
+    # @param transcript_id : string - The transcript ID
+    # @param gene_id : string - The Gene ID
+    #
+    # @return list<string> - The values
+    def get_rna_values(self, transcript_id, gene_id):
+
+        return [ transcript_id, gene_id, "", "lincRNA", "1200", "havana", "KNOWN", "tsl1", "GENCODE basic", "100", "1300", "1", "1", "45.2",
+                 "", "", "", "", ""]
+
+    # #
+    # Insert cross references and RNAs with the constructors, as done by the TSV parser
+    def insert_objects(self):
+
+        cross_reference_factory = DataFactory( DataConstants.PROTEIN_CROSS_REFERENCE_CLASS)
+        for row_number in range( 30):
+            uniprot_ac, uniprot_id = InsertionCacheUnittest.PROTEINS[ row_number % 3]
+            # by uniprotAC, by uniprotID and by isoform: each cross reference is given twice, with different accessions
+            accession = [ uniprot_ac, uniprot_id, uniprot_ac + "-2"][ row_number // 10]
+            cross_reference_factory.create_object_from_tsv( [ accession, "GeneID", str( row_number % 15)])
+
+        rna_factory = DataFactory( DataConstants.RNA_CLASS)
+        for row_number in range( 12):
+            rna_factory.create_object_from_tsv( self.get_rna_values( "ENST%08i" % row_number, "ENSG%08i" % ( row_number % 4)))
+
+        SQLManager.get_instance().commit()
+
+    # #
+    # Test that the constructors query the keys of the rows already inserted once, before the first row
+    def test_no_query_per_row(self):
+
+        print "| test_no_query_per_row | "
+
+        self.insert_objects()
+
+        # the proteins by accession, the cross reference keys and the Gene IDs
+        self.assertEqual( len( self.selectList), 3, "SELECT statements: %s" % self.selectList)
+
+        sql_session = SQLManager.get_instance().get_session()
+        self.assertEqual( sql_session.query( ProteinCrossReference).count(), 15)
+        self.assertEqual( sql_session.query( Gene).count(), 4)
+        self.assertEqual( sorted( sql_session.query( RNA.transcriptID, RNA.geneID).all()), [ ( "ENST%08i" % row_number, "ENSG%08i" % ( row_number % 4)) for row_number in range( 12)])
+
+    # #
+    # Test that the Gene IDs kept in memory are reset when the Gene table is cleaned
+    def test_clean_gene_table(self):
+
+        print "| test_clean_gene_table | "
+
+        self.insert_objects()
+        self.assertTrue( DataConstants.GENE_ALL_KW in DataManager.get_instance().data)
+
+        DataFactory( DataConstants.RNA_CLASS).clean_table()
+        DataFactory( Gene.__name__).clean_table()
+        self.assertFalse( DataConstants.GENE_ALL_KW in DataManager.get_instance().data)
+
+        # the Gene of a new RNA is inserted again
+        DataFactory( DataConstants.RNA_CLASS).create_object_from_tsv( self.get_rna_values( "ENST00000001", "ENSG00000001"))
+        SQLManager.get_instance().commit()
+        self.assertEqual( [ gene.geneID for gene in SQLManager.get_instance().get_session().query( Gene).all()], [ "ENSG00000001"])
+
+    # #
+    # Runs after each test
+    def tearDown(self):
+
+        event.remove( SQLManager.get_instance().get_engine(), "before_cursor_execute", self.record_statement)
+        SQLManager.get_instance().commit()
+        DataManager.get_instance().data = {}
+        shutil.rmtree( self.outputFolder)
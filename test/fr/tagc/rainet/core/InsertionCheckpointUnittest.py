@@ -0,0 +1,228 @@
+
+import unittest
+import os
+import shutil
+import tempfile
+import multiprocessing
+
+from fr.tagc.rainet.core.execution.InsertionStrategy import InsertionStrategy
+from fr.tagc.rainet.core.data import DataConstants
+from fr.tagc.rainet.core.data.KEGGPathway import KEGGPathway
+from fr.tagc.rainet.core.data.ReactomePathway import ReactomePathway
+from fr.tagc.rainet.core.data.InteractingProtein import InteractingProtein
+from fr.tagc.rainet.core.util import Constants
+from fr.tagc.rainet.core.util.data.DataManager import DataManager
+from fr.tagc.rainet.core.util.option import OptionConstants
+from fr.tagc.rainet.core.util.option.OptionManager import OptionManager
+from fr.tagc.rainet.core.util.scheduler.InsertionScheduler import InsertionScheduler
+from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
+from fr.tagc.rainet.core.util.sql.SQLUtil import SQLUtil
+
+# #
+# Unittesting the resume of an interrupted insertion from its last checkpoint.
+#
+# A KEGG pathway file is inserted by batches of a few lines. The insertion process is killed
+# after some batch commits, then the insertion is resumed and the final table is compared
+# to the one obtained by an uninterrupted insertion. The same is done for several tables
+# inserted by the scheduler with worker processes.
+#
+class InsertionCheckpointUnittest(unittest.TestCase):
+
+    # Test file (without header) and insertion parameters
+    KEGG_PATHWAY_FILE = os.path.join( os.path.dirname( os.path.abspath( __file__)), "../../../../data/hsa_kegg_pathways.txt")
+    REACTOME_PATHWAY_FILE = os.path.join( os.path.dirname( os.path.abspath( __file__)), "../../../../data/ReactomePathways_samples.txt")
+    BATCH_SIZE = 50
+    # Number of batch commits done before the insertion process is killed
+    COMMITS_BEFORE_KILL = 4
+
+    # #
+    # Runs before each test
+    def setUp(self):
+
+        self.outputFolder = tempfile.mkdtemp()
+        self.initialBatchSize = Constants.INSERTION_BATCH_SIZE
+        Constants.INSERTION_BATCH_SIZE = InsertionCheckpointUnittest.BATCH_SIZE
+        OptionManager.get_instance().set_option( OptionConstants.OPTION_SPECIES, "human")
+
+    # #
+    # Build the database at the given path
+    #
+    # @param db_path : string - The path to the database
+    # @param commit_limit : int - If not None, the process is killed after this number of commits (with its worker processes)
+    def build_database(self, db_path, commit_limit = None):
+
+        sql_manager = SQLManager.get_instance()
+        sql_manager.commit()
+        sql_manager.build_database( db_path, False)
+        DataManager.get_instance().data = {}
+
+        if commit_limit != None:
+            commit = sql_manager.commit
+            commit_counter = [ 0]
+            def commit_and_kill():
+                commit()
+                commit_counter[ 0] += 1
+                if commit_counter[ 0] >= commit_limit:
+                    for worker in multiprocessing.active_children():
+                        worker.terminate()
+                    os._exit( 1)
+            sql_manager.commit = commit_and_kill
+
+    # #
+    # Build the database at the given path and insert the KEGG pathway file
+    #
+    # @param db_path : string - The path to the database
+    # @param resume : boolean - Indicates if the interrupted insertion must be resumed
+    # @param commit_limit : int - If not None, the process is killed after this number of commits
+    def insert_pathways(self, db_path, resume, commit_limit = None):
+
+        self.build_database( db_path, commit_limit)
+
+        strategy = InsertionStrategy()
+        strategy.forceOverride = False
+        strategy.resume = resume
+        strategy.launch_insertion_TSV( InsertionCheckpointUnittest.KEGG_PATHWAY_FILE, False, DataConstants.KEGG_PATHWAY_HEADERS,
+                                       DataConstants.KEGG_PATHWAY_CLASS, DataConstants.KEGG_PATHWAY_PARAMS, None, DataConstants.KEGG_PATHWAY_COMMENT_CHAR)
+
+    # #
+    # Build the database at the given path and insert independent tables with the scheduler: the KEGG pathways
+    # (rows built by the worker), the Reactome pathways (objects created by the main process) and the
+    # interacting proteins (rows built by the worker from the set of protein IDs loaded by a previous step)
+    #
+    # @param db_path : string - The path to the database
+    # @param worker_number : int - The number of worker processes of the scheduler
+    # @param resume : boolean - Indicates if the interrupted insertion must be resumed
+    # @param commit_limit : int - If not None, the process is killed after this number of commits
+    #
+    # @return InsertionScheduler - The scheduler, after the execution of its steps
+    def insert_with_scheduler(self, db_path, worker_number, resume, commit_limit = None):
+
+        self.build_database( db_path, commit_limit)
+
+        strategy = InsertionStrategy()
+        strategy.forceOverride = False
+        strategy.resume = resume
+        scheduler = InsertionScheduler( worker_number)
+        strategy.add_TSV_step( scheduler, [], InsertionCheckpointUnittest.KEGG_PATHWAY_FILE, False, DataConstants.KEGG_PATHWAY_HEADERS,
+                               DataConstants.KEGG_PATHWAY_CLASS, DataConstants.KEGG_PATHWAY_PARAMS, None, DataConstants.KEGG_PATHWAY_COMMENT_CHAR,
+                               bulk_insertion = True)
+        strategy.add_TSV_step( scheduler, [], InsertionCheckpointUnittest.REACTOME_PATHWAY_FILE, False, DataConstants.REACTOME_PATHWAY_HEADERS,
+                               DataConstants.REACTOME_PATHWAY_CLASS, DataConstants.REACTOME_PATHWAY_PARAMS, None, DataConstants.REACTOME_PATHWAY_COMMENT_CHAR)
+        scheduler.add_step( DataConstants.PROT_ALL_KW, [],
+                            lambda value_source: DataManager.get_instance().store_data( DataConstants.PROT_ALL_KW, set( self.proteinIDs[ ::2])))
+        strategy.add_TSV_step( scheduler, [ DataConstants.PROT_ALL_KW], self.proteinFile, True, DataConstants.INTERACTING_PROTEIN_DEFINITION_HEADERS,
+                               DataConstants.INTERACTING_PROTEIN_DEFINITION_CLASS, DataConstants.INTERACTING_PROTEIN_DEFINITION_PARAMS, None,
+                               DataConstants.INTERACTING_PROTEIN_DEFINITION_COMMENT_CHAR, bulk_insertion = True)
+        scheduler.run()
+
+        return scheduler
+
+    # #
+    # Get the content of the KEGG pathway table of the current database
+    #
+    # @return list<tuple> - The rows of the table, ordered by ID
+    def get_pathways(self):
+
+        sql_session = SQLManager.get_instance().get_session()
+        return sql_session.query( KEGGPathway.keggID, KEGGPathway.keggName).order_by( KEGGPathway.keggID).all()
+
+    # #
+    # Get the content of the tables filled by insert_with_scheduler
+    #
+    # @return dict<string, list<tuple>> - The rows of each table, ordered by ID
+    def get_scheduler_tables(self):
+
+        sql_session = SQLManager.get_instance().get_session()
+        return { DataConstants.KEGG_PATHWAY_CLASS: self.get_pathways(),
+                 DataConstants.REACTOME_PATHWAY_CLASS: sql_session.query( ReactomePathway.reactomeID, ReactomePathway.reactomeName).order_by( ReactomePathway.reactomeID).all(),
+                 DataConstants.INTERACTING_PROTEIN_DEFINITION_CLASS: sql_session.query( InteractingProtein.uniprotAC).order_by( InteractingProtein.uniprotAC).all() }
+
+    # #
+    # Test that a killed insertion resumed from its checkpoint gives the same table as an uninterrupted insertion
+    def test_resume_killed_insertion(self):
+
+        print "| test_resume_killed_insertion | "
+
+        # Uninterrupted insertion
+        reference_db_path = os.path.join( self.outputFolder, "reference.sqlite")
+        self.insert_pathways( reference_db_path, False)
+        reference_pathways = self.get_pathways()
+        SQLManager.get_instance().commit()
+        self.assertEqual( len( reference_pathways), 294)
+
+        # Insertion killed after some batches
+        db_path = os.path.join( self.outputFolder, "resumed.sqlite")
+        process = multiprocessing.Process( target = self.insert_pathways, args = ( db_path, False, InsertionCheckpointUnittest.COMMITS_BEFORE_KILL))
+        process.start()
+        process.join()
+        self.assertNotEqual( process.exitcode, 0)
+
+        SQLManager.get_instance().set_DBpath( db_path)
+        checkpoint = SQLUtil.get_insertion_checkpoint( DataConstants.KEGG_PATHWAY_CLASS)
+        self.assertTrue( 0 < checkpoint.rowNumber < len( reference_pathways))
+        self.assertEqual( checkpoint.rowNumber % InsertionCheckpointUnittest.BATCH_SIZE, 0)
+        self.assertEqual( len( self.get_pathways()), checkpoint.rowNumber)
+        SQLManager.get_instance().commit()
+
+        # Resumed insertion
+        self.insert_pathways( db_path, True)
+        self.assertEqual( self.get_pathways(), reference_pathways)
+        self.assertEqual( SQLUtil.get_insertion_checkpoint( DataConstants.KEGG_PATHWAY_CLASS), None)
+        self.assertTrue( SQLUtil.data_already_inserted( DataConstants.KEGG_PATHWAY_CLASS))
+
+    # #
+    # Test that an insertion done by worker processes and killed after some batches is resumed from the table
+    # status and checkpoints: the tables already inserted are not read again and the final tables are the ones
+    # of a serial insertion
+    def test_resume_worker_insertion(self):
+
+        print "| test_resume_worker_insertion | "
+
+        self.proteinIDs = [ "P%05i" % index for index in range( 240)]
+        self.proteinFile = os.path.join( self.outputFolder, "interacting_proteins.txt")
+        with open( self.proteinFile, "w") as protein_file:
+            protein_file.write( "uniprotac\n" + "\n".join( self.proteinIDs) + "\n")
+        table_list = [ DataConstants.KEGG_PATHWAY_CLASS, DataConstants.REACTOME_PATHWAY_CLASS, DataConstants.INTERACTING_PROTEIN_DEFINITION_CLASS]
+
+        # Serial insertion
+        self.insert_with_scheduler( os.path.join( self.outputFolder, "reference.sqlite"), 1, False)
+        reference_tables = self.get_scheduler_tables()
+        SQLManager.get_instance().commit()
+        self.assertEqual( len( reference_tables[ DataConstants.KEGG_PATHWAY_CLASS]), 294)
+        self.assertEqual( reference_tables[ DataConstants.INTERACTING_PROTEIN_DEFINITION_CLASS], [ ( protein_id,) for protein_id in self.proteinIDs[ ::2]])
+
+        # Same tables with workers
+        self.insert_with_scheduler( os.path.join( self.outputFolder, "workers.sqlite"), 3, False)
+        self.assertEqual( self.get_scheduler_tables(), reference_tables)
+        SQLManager.get_instance().commit()
+
+        # Insertion with workers killed after some batches
+        db_path = os.path.join( self.outputFolder, "resumed.sqlite")
+        process = multiprocessing.Process( target = self.insert_with_scheduler, args = ( db_path, 3, False, InsertionCheckpointUnittest.COMMITS_BEFORE_KILL * 3))
+        process.start()
+        process.join()
+        self.assertNotEqual( process.exitcode, 0)
+
+        SQLManager.get_instance().set_DBpath( db_path)
+        inserted_tables = [ table for table in table_list if SQLUtil.data_already_inserted( table)]
+        checkpoints = [ SQLUtil.get_insertion_checkpoint( table) for table in table_list]
+        self.assertTrue( len( inserted_tables) < len( table_list))
+        self.assertTrue( len( [ checkpoint for checkpoint in checkpoints if checkpoint != None and checkpoint.rowNumber > 0]) > 0)
+        SQLManager.get_instance().commit()
+
+        # Resumed insertion with workers: the tables already inserted are not read again
+        scheduler = self.insert_with_scheduler( db_path, 3, True)
+        for table in table_list:
+            self.assertTrue( SQLUtil.data_already_inserted( table))
+            self.assertEqual( SQLUtil.get_insertion_checkpoint( table), None)
+            self.assertEqual( scheduler.stepDict[ table].process == None, table in inserted_tables)
+        self.assertEqual( self.get_scheduler_tables(), reference_tables)
+
+    # #
+    # Runs after each test
+    def tearDown(self):
+
+        SQLManager.get_instance().commit()
+        Constants.INSERTION_BATCH_SIZE = self.initialBatchSize
+        shutil.rmtree( self.outputFolder)
+
@@ -0,0 +1,152 @@
+
+import unittest
+import os
+import shutil
+import tempfile
+
+from fr.tagc.rainet.core.execution.InsertionStrategy import InsertionStrategy
+from fr.tagc.rainet.core.data import DataConstants
+from fr.tagc.rainet.core.data.ProteinCrossReference import ProteinCrossReference
+from fr.tagc.rainet.core.data.KEGGPathway import KEGGPathway
+from fr.tagc.rainet.core.util.data.DataManager import DataManager
+from fr.tagc.rainet.core.util.option import OptionConstants
+from fr.tagc.rainet.core.util.option.OptionManager import OptionManager
+from fr.tagc.rainet.core.util.scheduler.InsertionScheduler import InsertionScheduler
+from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
+
+# #
+# Unittesting the update mode of the insertion: the tables whose source file changed are updated
+# by difference when they are filled by a single file, and reloaded with all their files otherwise.
+#
+class InsertionUpdateUnittest(unittest.TestCase):
+
+    # Test file (with header) of the proteins
+    PROTEIN_FILE = os.path.join( os.path.dirname( os.path.abspath( __file__)), "../../../../data/uniprot_query_sample1.txt")
+    # Test file (without header) of the KEGG pathways
+    KEGG_PATHWAY_FILE = os.path.join( os.path.dirname( os.path.abspath( __file__)), "../../../../data/hsa_kegg_pathways.txt")
+
+    # Content of the protein cross reference files
+    CROSS_REFERENCES = [ "P62258\tGeneID\t7531\n", "P62258\tEnsembl_PRO\tENSP00000264335\n", "Q9GIY3\tGeneID\t3123\n"]
+    REDUNDANT_PROTEINS = [ "P62258-2\tP62258\n", "Q9GIY3-3\tQ9GIY3\n"]
+
+    # #
+    # Runs before each test
+    def setUp(self):
+
+        self.outputFolder = tempfile.mkdtemp()
+        self.dbPath = os.path.join( self.outputFolder, "update.sqlite")
+        self.crossReferenceFile = os.path.join( self.outputFolder, "cross_references.txt")
+        self.redundancyFile = os.path.join( self.outputFolder, "redundancy.txt")
+        self.keggPathwayFile = os.path.join( self.outputFolder, "kegg_pathways.txt")
+        self.write_file( self.crossReferenceFile, InsertionUpdateUnittest.CROSS_REFERENCES)
+        self.write_file( self.redundancyFile, InsertionUpdateUnittest.REDUNDANT_PROTEINS)
+        shutil.copy( InsertionUpdateUnittest.KEGG_PATHWAY_FILE, self.keggPathwayFile)
+        OptionManager.get_instance().set_option( OptionConstants.OPTION_SPECIES, "human")
+
+    # #
+    # Write the given lines to a file, changing its modification time
+    #
+    # @param file_path : string - The path to the file
+    # @param line_list : list<string> - The lines of the file
+    def write_file(self, file_path, line_list):
+
+        with open( file_path, "w") as output_file:
+            output_file.writelines( line_list)
+        if os.path.exists( self.dbPath):
+            os.utime( file_path, ( os.path.getatime( self.dbPath), os.path.getmtime( self.dbPath) + 10))
+
+    # #
+    # Insert the proteins, their cross references (main and redundancy files) and the KEGG pathways,
+    # as the insertion strategy declares them
+    #
+    # @param update : boolean - Indicates if the update mode is used
+    #
+    # @return InsertionStrategy - The strategy used
+    def insert_data(self, update):
+
+        sql_manager = SQLManager.get_instance()
+        sql_manager.commit()
+        sql_manager.build_database( self.dbPath, False)
+        DataManager.get_instance().data = {}
+
+        strategy = InsertionStrategy()
+        strategy.forceOverride = False
+        strategy.update = update
+        scheduler = InsertionScheduler()
+        strategy.add_TSV_step( scheduler, [], InsertionUpdateUnittest.PROTEIN_FILE, True, DataConstants.PROTEIN_HEADERS, DataConstants.PROTEIN_CLASS, DataConstants.PROTEIN_PARAMS, None, DataConstants.PROTEIN_COMMENT_CHAR)
+        strategy.add_TSV_step( scheduler, [ DataConstants.PROTEIN_CLASS], self.crossReferenceFile, False, DataConstants.PROTEIN_CROSS_REFERENCE_HEADERS, DataConstants.PROTEIN_CROSS_REFERENCE_CLASS,
+                               DataConstants.PROTEIN_CROSS_REFERENCE_PARAMS, None, DataConstants.PROTEIN_CROSS_REFERENCE_COMMENT_CHAR)
+        strategy.add_TSV_step( scheduler, [ DataConstants.PROTEIN_CROSS_REFERENCE_CLASS], self.redundancyFile, False, DataConstants.INTERACTOME_NETWORK_REDUNDANCY_DEFINITION_HEADERS,
+                               DataConstants.INTERACTOME_NETWORK_REDUNDANCY_DEFINITION_CLASS, DataConstants.INTERACTOME_NETWORK_REDUNDANCY_DEFINITION_PARAMS,
+                               [ None, os.path.basename( self.redundancyFile), None], DataConstants.INTERACTOME_NETWORK_REDUNDANCY_DEFINITION_COMMENT_CHAR, "Redundancy", False)
+        strategy.add_TSV_step( scheduler, [], self.keggPathwayFile, False, DataConstants.KEGG_PATHWAY_HEADERS, DataConstants.KEGG_PATHWAY_CLASS, DataConstants.KEGG_PATHWAY_PARAMS, None,
+                               DataConstants.KEGG_PATHWAY_COMMENT_CHAR, bulk_insertion = True)
+        scheduler.run()
+
+        return strategy
+
+    # #
+    # @return list<tuple> - The rows of the protein cross reference table
+    def get_cross_references(self):
+
+        sql_session = SQLManager.get_instance().get_session()
+        return sorted( sql_session.query( ProteinCrossReference.protein_id, ProteinCrossReference.sourceDB, ProteinCrossReference.crossReferenceID).all())
+
+    # #
+    # Test that the change of the main cross reference file reloads the table with the redundancy file too
+    def test_update_shared_table(self):
+
+        print "| test_update_shared_table | "
+
+        self.insert_data( False)
+        redundancy_rows = [ ( "P62258", "redundancy.txt", "P62258-2"), ( "Q9GIY3", "redundancy.txt", "Q9GIY3-3")]
+        self.assertEqual( [ row for row in self.get_cross_references() if row[ 1] == "redundancy.txt"], redundancy_rows)
+
+        # The main file changes, the redundancy file does not
+        self.write_file( self.crossReferenceFile, InsertionUpdateUnittest.CROSS_REFERENCES[ 1:] + [ "Q9GIY3\tGeneID\t3124\n"])
+        strategy = self.insert_data( True)
+
+        self.assertFalse( strategy.delta_supported( DataConstants.PROTEIN_CROSS_REFERENCE_CLASS, True))
+        self.assertEqual( strategy.insertionModes[ DataConstants.PROTEIN_CROSS_REFERENCE_CLASS], InsertionStrategy.INSERTION_MODE_RELOAD)
+        self.assertEqual( strategy.insertionModes[ DataConstants.PROTEIN_CROSS_REFERENCE_CLASS + "Redundancy"], InsertionStrategy.INSERTION_MODE_FULL)
+        self.assertEqual( self.get_cross_references(), sorted( [ ( "P62258", "Ensembl_PRO", "ENSP00000264335"), ( "Q9GIY3", "GeneID", "3123"), ( "Q9GIY3", "GeneID", "3124")] + redundancy_rows))
+
+        # Nothing changed
+        strategy = self.insert_data( True)
+        self.assertEqual( strategy.insertionModes[ DataConstants.PROTEIN_CROSS_REFERENCE_CLASS], None)
+        self.assertEqual( strategy.insertionModes[ DataConstants.PROTEIN_CROSS_REFERENCE_CLASS + "Redundancy"], None)
+        self.assertEqual( len( self.get_cross_references()), 5)
+
+    # #
+    # Test that the change of a file filling a table alone is applied by difference
+    def test_update_by_difference(self):
+
+        print "| test_update_by_difference | "
+
+        self.insert_data( False)
+        sql_session = SQLManager.get_instance().get_session()
+        pathways = dict( sql_session.query( KEGGPathway.keggID, KEGGPathway.keggName).all())
+        self.assertEqual( len( pathways), 294)
+
+        # One pathway removed, one renamed and one added
+        with open( self.keggPathwayFile, "r") as input_file:
+            line_list = input_file.readlines()
+        removed_id = line_list[ 0].split( "\t")[ 0]
+        renamed_id = line_list[ 1].split( "\t")[ 0]
+        self.write_file( self.keggPathwayFile, [ renamed_id + "\tRenamed pathway\n"] + line_list[ 2:] + [ "path:hsa99999\tTest pathway\n"])
+        strategy = self.insert_data( True)
+
+        self.assertEqual( strategy.insertionModes[ DataConstants.KEGG_PATHWAY_CLASS], InsertionStrategy.INSERTION_MODE_DELTA)
+        self.assertEqual( strategy.updateReport, [ ( DataConstants.KEGG_PATHWAY_CLASS, InsertionStrategy.INSERTION_MODE_DELTA, 1, 1, 1)])
+        del pathways[ removed_id]
+        pathways[ renamed_id] = "Renamed pathway"
+        pathways[ "path:hsa99999"] = "Test pathway"
+        sql_session = SQLManager.get_instance().get_session()
+        self.assertEqual( dict( sql_session.query( KEGGPathway.keggID, KEGGPathway.keggName).all()), pathways)
+
+    # #
+    # Runs after each test
+    def tearDown(self):
+
+        SQLManager.get_instance().commit()
+        shutil.rmtree( self.outputFolder)
@@ -5,6 +5,8 @@ import random
 import numpy
 import pandas as pd
 import glob
+import shutil
+import tempfile
 
 from statsmodels.sandbox.stats.multicomp import multipletests
 
@@ -526,6 +528,26 @@ class EnrichmentAnalysisStrategyUnittest(unittest.TestCase):
         SQLManager.get_instance().close_session()
 
 
+    def test_significant_only_option(self):
+        
+        print "| test_significant_only_option | "
+
+        # the results file without the non-significant tests cannot be read by FilterEnrichmentResults without the columnar report
+        optionManager = OptionManager.get_instance()
+        outputFolder = tempfile.mkdtemp()
+        optionManager.set_option(OptionConstants.OPTION_OUTPUT_FOLDER, outputFolder )
+        optionManager.set_option(OptionConstants.OPTION_ANNOTATION_TABLE, "KEGGPathway" )
+        optionManager.set_option(OptionConstants.OPTION_SIGNIFICANT_ONLY, True )
+        optionManager.set_option(OptionConstants.OPTION_COLUMN_REPORT, False )
+
+        try:
+            with self.assertRaises( RainetException):
+                self.run.execute()
+        finally:
+            optionManager.set_option(OptionConstants.OPTION_SIGNIFICANT_ONLY, False )
+            shutil.rmtree( outputFolder)
+
+
     # #
     # Runs after each test
     def tearDown(self):
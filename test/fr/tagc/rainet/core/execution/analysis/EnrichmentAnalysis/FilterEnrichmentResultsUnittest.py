@@ -4,6 +4,9 @@ import unittest
 import os
 import pandas as pd
 import glob
+import shutil
+import tempfile
+import numpy as np
 
 from fr.tagc.rainet.core.Rainet import Rainet
 from fr.tagc.rainet.core.util.log.Logger import Logger
@@ -13,6 +16,7 @@ from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
 from fr.tagc.rainet.core.util.option import OptionConstants
 
 from fr.tagc.rainet.core.execution.analysis.EnrichmentAnalysis.FilterEnrichmentResults import FilterEnrichmentResults
+from fr.tagc.rainet.core.util.data.EnrichmentReport import EnrichmentReport
 
 # #
 # Unittesting. 
@@ -300,4 +304,96 @@ class FilterEnrichmentResultsUnittest(unittest.TestCase):
        
 
 
+# #
+# Unittesting the reading of the enrichment results from their binary columns (EnrichmentAnalysis --columnReport),
+# against the reading of the enrichment results file.
+#
+class FilterEnrichmentResultsColumnsUnittest(unittest.TestCase):
+
+    RNA_IDS = [ "ENST00000001", "ENST00000002", "ENST00000003", "ENST00000004"]
+    ANNOTATION_IDS = [ "1", "2", "3", "4", "5", "6"]
+    BACKGROUND_SIZE = 300
+
+    # RNAs significantly enriched over random control
+    SIGNIFICANT_RNAS = set( [ "ENST00000001", "ENST00000003", "ENST00000004"])
+
+    # #
+    # Runs before each test
+    def setUp(self):
+
+        self.outputFolder = tempfile.mkdtemp()
+        self.run = FilterEnrichmentResults( "", "", self.outputFolder + "/filtered", 7, 1, "1.0", "OFF", "", "", 1, "Other", 0, -1, -1, -1, -1)
+
+    # #
+    # Write a report with random tests
+    #
+    # @param report_file : string - The path to the report
+    # @param significant_only : boolean - Whether only the significant tests are written to the report
+    # @param columns : boolean - Whether the tests are written to the columns as well
+    def write_report(self, report_file, significant_only, columns):
+
+        random = np.random.RandomState( 3)
+        annotationNumber = len( FilterEnrichmentResultsColumnsUnittest.ANNOTATION_IDS)
+        report = EnrichmentReport( report_file, FilterEnrichmentResultsColumnsUnittest.RNA_IDS, FilterEnrichmentResultsColumnsUnittest.ANNOTATION_IDS,
+                                   FilterEnrichmentResultsColumnsUnittest.BACKGROUND_SIZE, significant_only, columns)
+        for rnaIndex in range( len( FilterEnrichmentResultsColumnsUnittest.RNA_IDS)):
+            pvalues = random.uniform( 0, 0.1, annotationNumber) ** 2
+            significant = ( random.uniform( size = annotationNumber) < 0.6).astype( int)
+            # the last annotation has no enrichment
+            significant[ -1] = 0
+            report.write_tests( rnaIndex, random.randint( 0, 6, annotationNumber), random.randint( 5, 20, annotationNumber), 40 + rnaIndex,
+                                ( random.uniform( size = annotationNumber) < 0.2).astype( int), pvalues, np.minimum( pvalues * 10, 1.0), significant)
+        report.close()
+
+    # #
+    # Read the enrichment results of a report
+    #
+    # @param report_file : string - The path to the report
+    #
+    # @return tuple( dict, list, string) - The value of each pair, the lines of the enrichments kept and the matrix file
+    def read_report(self, report_file):
+
+        self.run.enrichmentResultsFile = report_file
+        dictPairs, filteredEnrichmentResults = self.run.read_enrichment_results_file( FilterEnrichmentResultsColumnsUnittest.SIGNIFICANT_RNAS, 0, 0)
+        with open( self.run.outputFolder + FilterEnrichmentResults.REPORT_RNA_ANNOT_RESULTS_MATRIX, "r") as matrixFile:
+            matrix = matrixFile.read()
+
+        return dictPairs, filteredEnrichmentResults, matrix
+
+    # #
+    # Test that the columns give the results of the enrichment results file with all the tests
+    def test_read_enrichment_results_columns(self):
+
+        print "| test_read_enrichment_results_columns | "
+
+        textReport = os.path.join( self.outputFolder, "enrichment_results_text.tsv")
+        self.write_report( textReport, False, False)
+
+        # the columns of a report with only the significant tests contain all the tests
+        columnReport = os.path.join( self.outputFolder, "enrichment_results.tsv")
+        self.write_report( columnReport, True, True)
+        self.assertTrue( EnrichmentReport.has_columns( columnReport))
+
+        for matrixValueColumn, filterWarningColumn, filterWarningValue, minimumProteinInteraction in [ ( 7, 1, "1.0", -1), ( 8, 1, "0", -1), ( 6, 1, "1.0", 3),
+                                                                                                        ( 2, 1, "0", 2), ( 4, 1, "0", -1), ( 7, 0, "1.0", -1), ( 1, 1, "0", -1)]:
+            self.run.matrixValueColumn = matrixValueColumn
+            self.run.filterWarningColumn = filterWarningColumn
+            self.run.filterWarningValue = filterWarningValue
+            self.run.minimumProteinInteraction = minimumProteinInteraction
+
+            textPairs, textResults, textMatrix = self.read_report( textReport)
+            columnPairs, columnResults, columnMatrix = self.read_report( columnReport)
+
+            self.assertTrue( len( textPairs) == 3 * len( FilterEnrichmentResultsColumnsUnittest.ANNOTATION_IDS))
+            self.assertTrue( columnPairs == textPairs, "asserting the values of the pairs with value column %i" % matrixValueColumn)
+            self.assertTrue( columnResults == textResults, "asserting the enrichments kept with value column %i" % matrixValueColumn)
+            self.assertTrue( columnMatrix == textMatrix, "asserting the matrix with value column %i" % matrixValueColumn)
+            if filterWarningColumn:
+                self.assertTrue( len( textResults) > 1)
+                self.assertTrue( "\t6" not in textMatrix.split( "\n")[ 0], "asserting that the annotation without enrichment is not in the matrix")
+
+    # #
+    # Runs after each test
+    def tearDown(self):
 
+        shutil.rmtree( self.outputFolder)
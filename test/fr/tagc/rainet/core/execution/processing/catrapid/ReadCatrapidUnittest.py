@@ -1,7 +1,10 @@
 
 import unittest
 import os
+import shutil
+import tempfile
 import pandas as pd
+import numpy as np
 import glob
 
 from fr.tagc.rainet.core.execution.processing.catrapid.ReadCatrapid import ReadCatrapid
@@ -280,6 +283,140 @@ class ReadCatrapidUnittest(unittest.TestCase):
                 count+=1
 
 
+    # #
+    def test_write_matrix_output_binary(self):
+
+        print "| test_write_matrix_output_binary | "
+
+        ## testing dense and sparse matrices, with scores and boolean, from which the text matrix is derived
+
+        smallCatRAPIDFile = "test_input/catRAPID_interactions_small.txt"
+        outputFolder = tempfile.mkdtemp()
+
+        # score of each interaction of the file
+        interactionScores = {}
+        with open( smallCatRAPIDFile, "r") as inFile:
+            for line in inFile:
+                spl = line.strip().split( "\t")
+                protID, rnaID = spl[ 0].split( " ")
+                interactionScores[ ( rnaID, protID)] = float( spl[ 1])
+
+        try:
+            for booleanInteraction in [ 0, 1]:
+                run = ReadCatrapid( smallCatRAPIDFile, outputFolder, "OFF", "", "", "", 1, 7, 0, 1, booleanInteraction, 0)
+                run.read_catrapid_file( set(), set(), set())
+                run.write_matrix_output()
+
+                with open( outputFolder + ReadCatrapid.INTERACTIONS_SCORE_MATRIX, "r") as out:
+                    expected = out.read()
+
+                # each score is written as the score of the file, formatted as "%s" % float
+                lines = [ line.split( "\t") for line in expected.splitlines()]
+                for line in lines[ 1:]:
+                    for protID, text in zip( lines[ 0][ 1:], line[ 1:]):
+                        score = interactionScores.get( ( line[ 0], protID))
+                        if score == None:
+                            self.assertTrue( text == [ "NA", "0"][ booleanInteraction], "asserting that missing interaction is written as NA (or 0)")
+                        else:
+                            self.assertTrue( text == [ "%s" % score, "1"][ booleanInteraction], "asserting that score is written as in the file")
+
+                for matrixFormat in [ ReadCatrapid.MATRIX_FORMAT_DENSE, ReadCatrapid.MATRIX_FORMAT_SPARSE]:
+                    run.matrixFormat = matrixFormat
+                    run.write_matrix_output()
+
+                    matrix, rnaIDs, protIDs = ReadCatrapid.load_matrix_output( outputFolder, matrixFormat)
+
+                    self.assertTrue( matrix.shape == ( 30, 6), "asserting number of rows and columns is number of RNAs and proteins")
+                    self.assertTrue( rnaIDs == sorted( set( rnaID for rnaID, protID in interactionScores)), "asserting the sorting of rows")
+                    self.assertTrue( protIDs == sorted( set( protID for rnaID, protID in interactionScores)), "asserting the sorting of columns")
+                    if booleanInteraction:
+                        self.assertTrue( matrix.dtype == np.int8, "asserting that boolean matrix is int8")
+                    else:
+                        self.assertTrue( matrix.dtype == np.float32, "asserting that score matrix is float32")
+
+                    # every pair: its score (or 1) if it interacts, NaN (or 0) otherwise
+                    if matrixFormat == ReadCatrapid.MATRIX_FORMAT_SPARSE:
+                        self.assertTrue( matrix.nnz == len( interactionScores), "asserting that only the interactions are stored")
+                        matrix = matrix.toarray()
+                        if not booleanInteraction:
+                            matrix[ matrix == 0] = np.nan
+                    missingCount = 0
+                    for row, rnaID in enumerate( rnaIDs):
+                        for column, protID in enumerate( protIDs):
+                            score = interactionScores.get( ( rnaID, protID))
+                            if score == None:
+                                missingCount += 1
+                                if booleanInteraction:
+                                    self.assertTrue( matrix[ row, column] == 0, "asserting that missing interaction is 0")
+                                else:
+                                    self.assertTrue( np.isnan( matrix[ row, column]), "asserting that missing interaction is NaN")
+                            elif booleanInteraction:
+                                self.assertTrue( matrix[ row, column] == 1, "asserting that interaction is 1")
+                            else:
+                                self.assertTrue( matrix[ row, column] == np.float32( score), "asserting that score is correct")
+                    self.assertTrue( missingCount == 30 * 6 - len( interactionScores), "asserting that there are missing interactions")
+                    self.assertTrue( missingCount > 0)
+
+                    matrix, rnaIDs, protIDs = ReadCatrapid.load_matrix_output( outputFolder, matrixFormat)
+                    ReadCatrapid.write_text_matrix( matrix, rnaIDs, protIDs, outputFolder + "/derived_matrix.tsv")
+                    with open( outputFolder + "/derived_matrix.tsv", "r") as out:
+                        self.assertTrue( out.read() == expected, "asserting that text matrix derived is the same")
+        finally:
+            shutil.rmtree( outputFolder)
+
+
+    # #
+    # Read the small catRAPID file with the given number of workers and batch size, writing all the outputs
+    #
+    # @return tuple( string, dict, dict, set) - The output folder, the mean and number of interactions of the proteins and the sampled interactions
+    def read_small_file(self, workers, batch_size, interaction_cutoff = "OFF", wanted_RNAs = set()):
+
+        outputFolder = tempfile.mkdtemp()
+        self.smallOutputFolders.append( outputFolder)
+        run = ReadCatrapid( self.smallCatRAPIDFile, outputFolder, interaction_cutoff, self.interactionFilterFile, self.rnaFilterFile, self.proteinFilterFile,
+                            1, batch_size, 1, 0, 0, 1, workers)
+
+        proteinInteractionsMean, proteinInteractionsCounter = run.read_catrapid_file( set(), wanted_RNAs, set())
+        run.write_normalised_interactions()
+
+        return outputFolder, proteinInteractionsMean, proteinInteractionsCounter, run.interactionSample
+
+    # #
+    def test_workers(self):
+
+        print "| test_workers | "
+
+        ## reading the file in parallel chunks, by small batches, gives the same outputs as reading it in one go
+
+        self.smallCatRAPIDFile = "test_input/catRAPID_interactions_small.txt"
+        self.smallOutputFolders = []
+
+        with open( self.smallCatRAPIDFile, "r") as inFile:
+            lines = inFile.readlines()
+
+        for interactionCutoff, wantedRNAs in [ ( "OFF", set()), ( -6, set( [ "ENST00000544037", "ENST00000544111", "ENST00000544185"]))]:
+            serialFolder, serialMeans, serialCounters, serialSample = self.read_small_file( 1, 1000000, interactionCutoff, wantedRNAs)
+            self.assertTrue( len( serialSample) > 0, "asserting that interactions are sampled")
+            if interactionCutoff == "OFF":
+                self.assertTrue( sum( serialCounters.values()) == len( lines), "asserting that all the interactions are kept")
+
+            for workers, batchSize in [ ( 3, 7), ( 4, 1)]:
+                parallelFolder, parallelMeans, parallelCounters, parallelSample = self.read_small_file( workers, batchSize, interactionCutoff, wantedRNAs)
+
+                self.assertTrue( parallelMeans == serialMeans and parallelCounters == serialCounters, "asserting that the protein statistics are the same")
+                self.assertTrue( parallelSample == serialSample, "asserting that the sampled interactions are the same")
+                for fileName in [ ReadCatrapid.STORED_INTERACTIONS_FILENAME, ReadCatrapid.PROTEIN_INTERACTIONS_FILENAME, ReadCatrapid.RNA_INTERACTIONS_FILENAME,
+                                  ReadCatrapid.NORMALISED_STORED_INTERACTIONS_FILENAME]:
+                    with open( serialFolder + fileName, "r") as serial:
+                        with open( parallelFolder + fileName, "r") as parallel:
+                            self.assertTrue( serial.read() == parallel.read(), "asserting that %s is the same with %i workers" % ( fileName, workers))
+                self.assertTrue( glob.glob( parallelFolder + "/temp_*") == [], "asserting that the chunk files are removed")
+                self.assertFalse( os.path.exists( parallelFolder + ReadCatrapid.INTERACTION_SCORES_FILENAME), "asserting that the interaction scores file is removed")
+
+        for outputFolder in self.smallOutputFolders:
+            shutil.rmtree( outputFolder)
+
+
     # #
     def test_params_three(self):
 
@@ -0,0 +1,153 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from fr.tagc.rainet.core.execution.EnrichmentAnalysisStategy import EnrichmentAnalysisStrategy
+from fr.tagc.rainet.core.data.KEGGPathway import KEGGPathway
+from fr.tagc.rainet.core.data.ProteinKEGGAnnotation import ProteinKEGGAnnotation
+from fr.tagc.rainet.core.data.TableStatus import TableStatus
+from fr.tagc.rainet.core.data.TableFingerprint import TableFingerprint
+from fr.tagc.rainet.core.util import Constants
+from fr.tagc.rainet.core.util.data.AnnotationMembership import AnnotationMembership
+from fr.tagc.rainet.core.util.exception.RainetException import RainetException
+from fr.tagc.rainet.core.util.option import OptionConstants
+from fr.tagc.rainet.core.util.option.OptionManager import OptionManager
+from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
+from fr.tagc.rainet.core.util.sql.SQLUtil import SQLUtil
+
+# #
+# Unittesting the cache of the protein-annotation memberships of an annotation table.
+#
+# The memberships are read through the EnrichmentAnalysisStrategy, the cache being used while the state
+# of the tables (TableStatus, TableFingerprint and number of rows) does not change.
+#
+class AnnotationMembershipUnittest(unittest.TestCase):
+
+    # Rows of the KEGGPathway and ProteinKEGGAnnotation tables
+    PATHWAYS = [ "path:hsa00010", "path:hsa00020", "path:hsa00030"]
+    ANNOTATIONS = [ ( "path:hsa00010", "P62258"), ( "path:hsa00010", "Q9GIY3"), ( "path:hsa00030", "P62258")]
+
+    # #
+    # Runs before each test
+    def setUp(self):
+
+        self.outputFolder = tempfile.mkdtemp()
+        self.dbPath = os.path.join( self.outputFolder, "annotations.sqlite")
+        OptionManager.get_instance().set_option( OptionConstants.OPTION_SPECIES, "human")
+
+        sql_manager = SQLManager.get_instance()
+        sql_manager.commit()
+        sql_manager.build_database( self.dbPath, False)
+        sql_session = sql_manager.get_session()
+        sql_session.execute( KEGGPathway.__table__.insert(), [ { "keggID" : pathway, "keggName" : pathway} for pathway in AnnotationMembershipUnittest.PATHWAYS])
+        sql_session.execute( ProteinKEGGAnnotation.__table__.insert(), [ { "keggPathway_id" : pathway, "protein_id" : protein} for pathway, protein in AnnotationMembershipUnittest.ANNOTATIONS])
+        self.save_table_status( Constants.STATUS_OK)
+
+        self.strategy = EnrichmentAnalysisStrategy()
+        self.strategy.DBPath = self.dbPath
+
+    # #
+    # Save the status of the annotation table
+    #
+    # @param status : string - The status of the table
+    def save_table_status(self, status):
+
+        SQLManager.get_instance().get_session().merge( TableStatus( ProteinKEGGAnnotation.__tablename__, status, "kegg_annotations.txt"))
+        SQLManager.get_instance().commit()
+
+    # #
+    # Change a protein of the annotation table, the number of rows (and the state of the tables) being the same
+    def change_protein(self):
+
+        SQLManager.get_instance().get_session().execute( ProteinKEGGAnnotation.__table__.update().where( ProteinKEGGAnnotation.protein_id == "Q9GIY3").values( protein_id = "P31946"))
+        SQLManager.get_instance().commit()
+
+    # #
+    # @return list<tuple( string, string)> - The annotation and protein IDs of the rows of the memberships
+    def get_membership_rows(self):
+
+        self.strategy.sql_session = SQLManager.get_instance().get_session()
+        membership = self.strategy.get_annotation_membership( "KEGGPathway", "ProteinKEGGAnnotation")
+        return [ ( membership.annotationIDs[ annot], membership.proteinIDs[ prot]) for annot, prot in zip( membership.rowAnnotations, membership.rowProteins)]
+
+    # #
+    # Test that the cache is written and then used while the tables do not change
+    def test_cache(self):
+
+        print "| test_cache | "
+
+        cache_file = AnnotationMembership.get_cache_file( self.dbPath, "ProteinKEGGAnnotation")
+        self.assertEqual( self.get_membership_rows(), AnnotationMembershipUnittest.ANNOTATIONS)
+        self.assertTrue( os.path.exists( cache_file))
+
+        self.strategy.sql_session = SQLManager.get_instance().get_session()
+        membership = self.strategy.get_annotation_membership( "KEGGPathway", "ProteinKEGGAnnotation")
+        self.assertEqual( [ membership.annotationIDs[ annot] for annot in membership.baseAnnotations], AnnotationMembershipUnittest.PATHWAYS)
+
+        # the cache is used: the changed protein is not seen
+        self.change_protein()
+        self.assertEqual( self.get_membership_rows(), AnnotationMembershipUnittest.ANNOTATIONS)
+
+    # #
+    # Test that the cache is rebuilt when the TableStatus rows change
+    def test_rebuild_on_status_change(self):
+
+        print "| test_rebuild_on_status_change | "
+
+        self.get_membership_rows()
+        self.change_protein()
+        self.save_table_status( Constants.STATUS_WARNING)
+
+        self.assertEqual( self.get_membership_rows(), [ ( "path:hsa00010", "P62258"), ( "path:hsa00010", "P31946"), ( "path:hsa00030", "P62258")])
+
+    # #
+    # Test that the cache is rebuilt when the TableFingerprint rows change
+    def test_rebuild_on_fingerprint_change(self):
+
+        print "| test_rebuild_on_fingerprint_change | "
+
+        SQLUtil.save_table_fingerprint( "KEGGPathway", "kegg_pathways.txt", ( 100, 1.0, [ "a"]))
+        SQLManager.get_instance().commit()
+        self.get_membership_rows()
+        self.change_protein()
+        SQLUtil.save_table_fingerprint( "KEGGPathway", "kegg_pathways.txt", ( 100, 2.0, [ "b"]))
+        SQLManager.get_instance().commit()
+
+        self.assertEqual( self.get_membership_rows(), [ ( "path:hsa00010", "P62258"), ( "path:hsa00010", "P31946"), ( "path:hsa00030", "P62258")])
+
+    # #
+    # Test the cache with a database built before the TableFingerprint table existed
+    def test_database_without_fingerprints(self):
+
+        print "| test_database_without_fingerprints | "
+
+        TableFingerprint.__table__.drop( SQLManager.get_instance().get_engine())
+        self.assertFalse( SQLUtil.has_table( TableFingerprint.__tablename__))
+
+        cache_file = AnnotationMembership.get_cache_file( self.dbPath, "ProteinKEGGAnnotation")
+        self.assertEqual( self.get_membership_rows(), AnnotationMembershipUnittest.ANNOTATIONS)
+        self.assertTrue( os.path.exists( cache_file))
+
+        # the cache is used while the tables do not change, and rebuilt when they change
+        self.change_protein()
+        self.assertEqual( self.get_membership_rows(), AnnotationMembershipUnittest.ANNOTATIONS)
+        self.save_table_status( Constants.STATUS_WARNING)
+        self.assertEqual( self.get_membership_rows(), [ ( "path:hsa00010", "P62258"), ( "path:hsa00010", "P31946"), ( "path:hsa00030", "P62258")])
+
+    # #
+    # Test that a name which is not a table is rejected
+    def test_table_class(self):
+
+        print "| test_table_class | "
+
+        self.assertEqual( self.strategy.get_table_class( "KEGGPathway"), KEGGPathway)
+        with self.assertRaises( RainetException):
+            self.strategy.get_table_class( "os")
+
+    # #
+    # Runs after each test
+    def tearDown(self):
+
+        SQLManager.get_instance().commit()
+        shutil.rmtree( self.outputFolder)
@@ -0,0 +1,101 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import numpy
+
+from fr.tagc.rainet.core.util.data.EnrichmentReport import EnrichmentReport
+from fr.tagc.rainet.core.util.exception.RainetException import RainetException
+
+# #
+# Unittesting the report of the enrichment tests and its columns.
+#
+class EnrichmentReportUnittest(unittest.TestCase):
+
+    RNA_IDS = [ "ENST00000001", "ENST00000002"]
+    ANNOTATION_IDS = [ "path:hsa00010", "path:hsa00020", "path:hsa00030"]
+    BACKGROUND_SIZE = 20
+
+    # #
+    # Runs before each test
+    def setUp(self):
+
+        self.outputFolder = tempfile.mkdtemp()
+        self.reportFile = os.path.join( self.outputFolder, "enrichment_results.tsv")
+
+    # #
+    # Write a report with the tests of the two RNAs
+    #
+    # @param columns : boolean - Whether the tests are written to the columns as well
+    # @param significant_only : boolean - Whether only the significant tests are written to the report
+    def write_report(self, columns, significant_only = False):
+
+        report = EnrichmentReport( self.reportFile, EnrichmentReportUnittest.RNA_IDS, EnrichmentReportUnittest.ANNOTATION_IDS, EnrichmentReportUnittest.BACKGROUND_SIZE,
+                                   significant_only, columns)
+        for rna_index in range( len( EnrichmentReportUnittest.RNA_IDS)):
+            report.write_tests( rna_index, numpy.array( [ 1, 2, 3]) + rna_index, numpy.array( [ 4, 5, 6]), 5 + rna_index, numpy.array( [ 0, 1, 0]),
+                                numpy.array( [ 0.01, 0.5, 0.001]), numpy.array( [ 0.03, 1.0, 0.003]), numpy.array( [ 1, 0, 1]))
+        report.close()
+
+    # #
+    # Test that the columns contain all the tests of the report
+    def test_columns(self):
+
+        print "| test_columns | "
+
+        self.write_report( True, True)
+
+        self.assertTrue( EnrichmentReport.has_columns( self.reportFile))
+        rna_ids, annotation_ids, background_size, columns = EnrichmentReport.read_columns( self.reportFile)
+        self.assertEqual( rna_ids, EnrichmentReportUnittest.RNA_IDS)
+        self.assertEqual( annotation_ids, EnrichmentReportUnittest.ANNOTATION_IDS)
+        self.assertEqual( background_size, EnrichmentReportUnittest.BACKGROUND_SIZE)
+        self.assertEqual( columns[ "rna"].tolist(), [ 0, 0, 0, 1, 1, 1])
+        self.assertEqual( columns[ "observed"].tolist(), [ 1, 2, 3, 2, 3, 4])
+        self.assertEqual( columns[ "pval"].tolist(), [ 0.01, 0.5, 0.001] * 2)
+
+        # the report only contains the significant tests
+        with open( self.reportFile, "r") as report:
+            self.assertEqual( len( report.readlines()), 5)
+
+    # #
+    # Test that a later run of the report without columns removes the columns of the previous run
+    def test_rerun_without_columns(self):
+
+        print "| test_rerun_without_columns | "
+
+        self.write_report( True)
+        self.write_report( False)
+
+        self.assertFalse( os.path.exists( EnrichmentReport.get_column_folder( self.reportFile)))
+        self.assertFalse( EnrichmentReport.has_columns( self.reportFile))
+
+    # #
+    # Test that columns which do not correspond to the report any more are not used
+    def test_stale_columns(self):
+
+        print "| test_stale_columns | "
+
+        self.write_report( True)
+
+        # the report is changed after its columns were written
+        with open( self.reportFile, "a") as report:
+            report.write( "ENST00000003\tpath:hsa00010\t1\t4\t5.0%\t0\t1.0e-02\t3.0e-02\t1\n")
+        self.assertFalse( EnrichmentReport.has_columns( self.reportFile))
+        with self.assertRaises( RainetException):
+            EnrichmentReport.read_columns( self.reportFile)
+
+        # a run interrupted before the report is closed
+        report = EnrichmentReport( self.reportFile, EnrichmentReportUnittest.RNA_IDS, EnrichmentReportUnittest.ANNOTATION_IDS, EnrichmentReportUnittest.BACKGROUND_SIZE,
+                                   False, True)
+        report.flush()
+        self.assertFalse( EnrichmentReport.has_columns( self.reportFile))
+        report.close()
+        self.assertTrue( EnrichmentReport.has_columns( self.reportFile))
+
+    # #
+    # Runs after each test
+    def tearDown(self):
+
+        shutil.rmtree( self.outputFolder)
@@ -0,0 +1,104 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import numpy
+from scipy import stats
+
+from fr.tagc.rainet.core.util.data.HypergeometricTable import HypergeometricTable
+from fr.tagc.rainet.core.util.exception.RainetException import RainetException
+
+# #
+# Unittesting the tables of the hypergeometric tests against scipy.stats.hypergeom.
+#
+class HypergeometricTableUnittest(unittest.TestCase):
+
+    # Grid of the distributions tested: background size N, annotation size m and number of draws k
+    BACKGROUND_SIZES = [ 1, 7, 50, 400]
+    PROPORTIONS = [ 0.0, 0.1, 0.5, 0.9, 1.0]
+
+    # #
+    # Runs before each test
+    def setUp(self):
+
+        self.outputFolder = tempfile.mkdtemp()
+
+    # #
+    # @return list<tuple( int, int, int)> - The ( N, m, k) of the grid
+    def get_grid(self):
+
+        grid = set()
+        for background in HypergeometricTableUnittest.BACKGROUND_SIZES:
+            for size_proportion in HypergeometricTableUnittest.PROPORTIONS:
+                for draw_proportion in HypergeometricTableUnittest.PROPORTIONS:
+                    grid.add( ( background, max( 1, int( size_proportion * background)), max( 1, int( draw_proportion * background))))
+        return sorted( grid)
+
+    # #
+    # Test that the tail of each distribution is the upper tail of scipy, for all the possible x
+    def test_compute_tail(self):
+
+        print "| test_compute_tail | "
+
+        for background, m, k in self.get_grid():
+            x = numpy.arange( min( m, k) + 1)
+            tail = HypergeometricTable.compute_tail( background, m, k)
+            self.assertEqual( len( tail), len( x))
+            numpy.testing.assert_allclose( tail, stats.hypergeom.sf( x, background, m, k), rtol = 1e-12, atol = 1e-300,
+                                           err_msg = "upper tail of N=%i m=%i k=%i" % ( background, m, k))
+
+    # #
+    # Test the tails of a large background, down to the smallest positive floats
+    def test_compute_tail_large(self):
+
+        print "| test_compute_tail_large | "
+
+        for background, m, k in [ ( 20000, 3000, 3000), ( 20000, 50, 15000)]:
+            x = numpy.arange( min( m, k) + 1)
+            tail = HypergeometricTable.compute_tail( background, m, k)
+            expected = stats.hypergeom.sf( x, background, m, k)
+            self.assertTrue( ( tail >= 0).all() and ( tail <= 1).all())
+            self.assertTrue( ( numpy.diff( tail) <= 0).all())
+            numpy.testing.assert_allclose( tail[ expected > 1e-290], expected[ expected > 1e-290], rtol = 1e-11,
+                                           err_msg = "upper tail of N=%i m=%i k=%i" % ( background, m, k))
+
+    # #
+    # Test the upper tail (enrichment) and lower tail (depletion, 1 - upper tail) of the tests read from the tables
+    def test_get_tails(self):
+
+        print "| test_get_tails | "
+
+        for background in HypergeometricTableUnittest.BACKGROUND_SIZES:
+            table = HypergeometricTable( background)
+            for dummy, m, k in [ pair for pair in self.get_grid() if pair[ 0] == background]:
+                x = numpy.arange( min( m, k) + 1)
+                upper_tails = table.get_tails( x, numpy.full( len( x), m), k)
+                numpy.testing.assert_allclose( upper_tails, stats.hypergeom.sf( x, background, m, k), rtol = 1e-12, atol = 1e-300)
+                numpy.testing.assert_allclose( 1 - upper_tails, stats.hypergeom.cdf( x, background, m, k), rtol = 1e-9, atol = 1e-12)
+
+    # #
+    # Test that the tables written to a file are read back and extended by a later run
+    def test_table_file(self):
+
+        print "| test_table_file | "
+
+        table_file = os.path.join( self.outputFolder, "tables", "background" + HypergeometricTable.FILE_EXTENSION)
+        table = HypergeometricTable( 50, table_file)
+        table.prepare( [ 5, 10], [ 20])
+        self.assertTrue( os.path.exists( table_file))
+
+        table = HypergeometricTable( 50, table_file)
+        self.assertEqual( len( table.pairSizes), 2)
+        tails = table.get_tails( [ 0, 3, 5, 2], [ 5, 10, 10, 30], 20)
+        numpy.testing.assert_allclose( tails, stats.hypergeom.sf( [ 0, 3, 5, 2], 50, [ 5, 10, 10, 30], 20), rtol = 1e-12)
+        self.assertEqual( len( HypergeometricTable( 50, table_file).pairSizes), 3)
+
+        with self.assertRaises( RainetException):
+            HypergeometricTable( 60, table_file)
+
+    # #
+    # Runs after each test
+    def tearDown(self):
+
+        shutil.rmtree( self.outputFolder)
@@ -0,0 +1,170 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import numpy
+
+from fr.tagc.rainet.core.data.ProteinRNAInteractionCatRAPID import ProteinRNAInteractionCatRAPID
+from fr.tagc.rainet.core.execution.EnrichmentAnalysisStategy import EnrichmentAnalysisStrategy
+from fr.tagc.rainet.core.data.TableStatus import TableStatus
+from fr.tagc.rainet.core.util import Constants
+from fr.tagc.rainet.core.util.data.DataManager import DataManager
+from fr.tagc.rainet.core.util.data.InteractionStore import InteractionStore
+from fr.tagc.rainet.core.util.factory.DataFactory import DataFactory
+from fr.tagc.rainet.core.util.option import OptionConstants
+from fr.tagc.rainet.core.util.option.OptionManager import OptionManager
+from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
+
+# #
+# Unittesting the columnar copy of the ProteinRNAInteractionCatRAPID table.
+#
+# The store is written from a small table and its content is compared to the rows of the table.
+#
+class InteractionStoreUnittest(unittest.TestCase):
+
+    # Rows of the ProteinRNAInteractionCatRAPID table: ( transcriptID, proteinID, interactionScore)
+    INTERACTIONS = [ ( "ENST00000003", "P00002", 12.5), ( "ENST00000001", "P00003", -4.25), ( "ENST00000001", "P00001", 30.1),
+                     ( "ENST00000002", "P00003", 0.3), ( "ENST00000003", "P00001", 30.1), ( "ENST00000001", "P00002", 15.75),
+                     ( "ENST00000002", "P00002", 123.456)]
+
+    # #
+    # Runs before each test
+    def setUp(self):
+
+        self.outputFolder = tempfile.mkdtemp()
+        self.dbPath = os.path.join( self.outputFolder, "interactions.sqlite")
+        OptionManager.get_instance().set_option( OptionConstants.OPTION_SPECIES, "human")
+
+        sql_manager = SQLManager.get_instance()
+        sql_manager.commit()
+        sql_manager.build_database( self.dbPath, False)
+        DataFactory( ProteinRNAInteractionCatRAPID.__name__).insert_rows( InteractionStoreUnittest.INTERACTIONS)
+        sql_manager.get_session().add( TableStatus( ProteinRNAInteractionCatRAPID.__tablename__, Constants.STATUS_OK, "catrapid.txt"))
+        sql_manager.commit()
+
+    # #
+    # Test the columns written from the table, opened as memory-mapped arrays
+    def test_write(self):
+
+        print "| test_write | "
+
+        InteractionStore.write( self.dbPath, SQLManager.get_instance().get_session())
+        store = InteractionStore( self.dbPath)
+
+        self.assertEqual( store.get_transcript_ids(), [ "ENST00000001", "ENST00000002", "ENST00000003"])
+        self.assertEqual( store.get_protein_ids(), [ "P00001", "P00002", "P00003"])
+        for column in [ store.rnaOffsets, store.rnaProteins, store.rnaScores, store.proteinOffsets, store.proteinTranscripts, store.proteinScores]:
+            self.assertTrue( isinstance( column, numpy.memmap))
+        self.assertEqual( store.rnaOffsets.tolist(), [ 0, 3, 5, 7])
+        self.assertEqual( store.proteinOffsets.tolist(), [ 0, 2, 5, 7])
+        self.assertEqual( store.count_interactions(), len( InteractionStoreUnittest.INTERACTIONS))
+
+    # #
+    # Test the interactions of a RNA and of a protein, read from their CSR slices
+    def test_slices(self):
+
+        print "| test_slices | "
+
+        InteractionStore.write( self.dbPath, SQLManager.get_instance().get_session())
+        store = InteractionStore( self.dbPath)
+
+        for transcript_id in store.get_transcript_ids():
+            protein_ids, scores = store.get_rna_interactions( transcript_id)
+            expected = sorted( [ ( interaction[ 1], interaction[ 2]) for interaction in InteractionStoreUnittest.INTERACTIONS if interaction[ 0] == transcript_id])
+            self.assertEqual( zip( protein_ids, InteractionStore.get_scores( scores).tolist()), expected)
+
+        for protein_id in store.get_protein_ids():
+            transcript_ids, scores = store.get_protein_interactions( protein_id)
+            expected = sorted( [ ( interaction[ 0], interaction[ 2]) for interaction in InteractionStoreUnittest.INTERACTIONS if interaction[ 1] == protein_id])
+            self.assertEqual( zip( transcript_ids, InteractionStore.get_scores( scores).tolist()), expected)
+
+        # unknown IDs
+        self.assertEqual( len( store.get_rna_interactions( "ENST00000009")[ 0]), 0)
+        self.assertEqual( len( store.get_protein_interactions( "P00009")[ 1]), 0)
+
+    # #
+    # Test the selection of interactions by score, RNA and protein against the same filters on the rows of the table
+    def test_get_interactions(self):
+
+        print "| test_get_interactions | "
+
+        InteractionStore.write( self.dbPath, SQLManager.get_instance().get_session())
+        store = InteractionStore( self.dbPath)
+
+        # 0.3 and 30.1 are not exact float32 values: the interactions with these scores must be kept
+        for minimum_score in [ None, -10, 0.3, 12.5, 30.1, 30.2, 200]:
+            for transcript_ids in [ None, { "ENST00000001", "ENST00000003", "ENST00000009"}]:
+                for protein_ids in [ None, { "P00001", "P00002"}]:
+                    expected = sorted( [ interaction for interaction in InteractionStoreUnittest.INTERACTIONS
+                                         if ( minimum_score == None or interaction[ 2] >= minimum_score)
+                                         and ( transcript_ids == None or interaction[ 0] in transcript_ids)
+                                         and ( protein_ids == None or interaction[ 1] in protein_ids)])
+
+                    transcript_codes, protein_codes, scores = store.get_interactions( minimum_score, transcript_ids, protein_ids)
+                    self.assertEqual( scores.dtype, numpy.float32)
+                    self.assertEqual( [ ( store.get_transcript_ids()[ transcript_code], store.get_protein_ids()[ protein_code])
+                                        for transcript_code, protein_code in zip( transcript_codes, protein_codes)],
+                                      [ interaction[ :2] for interaction in expected])
+
+                    records = store.get_records( transcript_codes, protein_codes, scores)
+                    self.assertEqual( [ ( record.transcriptID, record.proteinID, record.interactionScore) for record in records], expected)
+
+        self.assertEqual( store.count_interactions( 30.1), 3)
+        self.assertEqual( store.count_interactions( 30.2), 1)
+
+    # #
+    # Test that the enrichment analysis reads the same interactions from the store and from the table
+    def test_get_interaction_data(self):
+
+        print "| test_get_interaction_data | "
+
+        strategy = EnrichmentAnalysisStrategy()
+        strategy.DBPath = self.dbPath
+        strategy.sql_session = SQLManager.get_instance().get_session()
+
+        strategy.get_interaction_data()
+        tableInteractions = [ ( str( inter.transcriptID), str( inter.proteinID), inter.interactionScore) for inter in DataManager.get_instance().get_data( EnrichmentAnalysisStrategy.PRI_KW)]
+
+        InteractionStore.write( self.dbPath, strategy.sql_session)
+        strategy.get_interaction_data()
+        storeInteractions = [ ( str( inter.transcriptID), str( inter.proteinID), inter.interactionScore) for inter in DataManager.get_instance().get_data( EnrichmentAnalysisStrategy.PRI_KW)]
+
+        self.assertEqual( sorted( storeInteractions), sorted( tableInteractions))
+        self.assertEqual( sorted( storeInteractions), sorted( InteractionStoreUnittest.INTERACTIONS))
+
+    # #
+    # Test that the store is used only while the table is in the state recorded when the store was written
+    def test_table_state(self):
+
+        print "| test_table_state | "
+
+        self.assertFalse( InteractionStore.is_up_to_date( self.dbPath))
+
+        InteractionStore.write( self.dbPath, SQLManager.get_instance().get_session())
+        self.assertTrue( InteractionStore.is_up_to_date( self.dbPath))
+
+        # the table is filled again from another file
+        sql_session = SQLManager.get_instance().get_session()
+        sql_session.merge( TableStatus( ProteinRNAInteractionCatRAPID.__tablename__, Constants.STATUS_OK, "other_catrapid.txt"))
+        SQLManager.get_instance().commit()
+        self.assertFalse( InteractionStore.is_up_to_date( self.dbPath))
+
+        # an interaction is added
+        InteractionStore.write( self.dbPath, SQLManager.get_instance().get_session())
+        self.assertTrue( InteractionStore.is_up_to_date( self.dbPath))
+        DataFactory( ProteinRNAInteractionCatRAPID.__name__).insert_rows( [ ( "ENST00000004", "P00001", 1.0)])
+        SQLManager.get_instance().commit()
+        self.assertFalse( InteractionStore.is_up_to_date( self.dbPath))
+
+        # a store written without the state of the table
+        InteractionStore.write( self.dbPath, SQLManager.get_instance().get_session())
+        os.remove( os.path.join( InteractionStore.get_store_path( self.dbPath), InteractionStore.TABLE_STATE_FILE))
+        self.assertFalse( InteractionStore.is_up_to_date( self.dbPath))
+
+    # #
+    # Runs after each test
+    def tearDown(self):
+
+        SQLManager.get_instance().commit()
+        shutil.rmtree( self.outputFolder)
@@ -0,0 +1,163 @@
+import unittest
+
+import numpy
+
+from fr.tagc.rainet.core.util.data.ScoreHistogram import ScoreHistogram
+
+# #
+# Unittesting the score frequencies of items counted in a matrix of items x score bins.
+#
+# The statistics of each item are compared to numpy on the list of its scores.
+#
+class ScoreHistogramUnittest(unittest.TestCase):
+
+    SEED = 17
+
+    # #
+    # Runs before each test
+    def setUp(self):
+
+        self.random = numpy.random.RandomState( ScoreHistogramUnittest.SEED)
+
+    # #
+    # Draw scores rounded to one decimal, with repeated scores
+    #
+    # @param item_number : int - The number of items
+    # @param score_number : int - The number of scores
+    # @param minimum : float - The minimum score
+    # @param maximum : float - The maximum score
+    #
+    # @return tuple( list<string>, list<float>) - The item and the score of each score
+    def draw_scores(self, item_number, score_number, minimum, maximum):
+
+        items = [ "item%i" % index for index in self.random.randint( 0, item_number, score_number)]
+        scores = numpy.round( self.random.uniform( minimum, maximum, score_number), 1).tolist()
+        # repeated scores
+        scores[ score_number // 2:] = scores[ :score_number - score_number // 2]
+
+        return items, scores
+
+    # #
+    # Add scores to a histogram by batches
+    #
+    # @param histogram : ScoreHistogram - The histogram
+    # @param items : list<string> - The item of each score
+    # @param scores : list<float> - The scores
+    # @param batch_size : int - The number of scores of each batch
+    def add_scores(self, histogram, items, scores, batch_size):
+
+        for start in range( 0, len( scores), batch_size):
+            codes = numpy.array( [ histogram.get_code( item) for item in items[ start:start + batch_size]], dtype = numpy.int64)
+            histogram.add( codes, ScoreHistogram.get_bins( scores[ start:start + batch_size]))
+
+    # #
+    # Check the statistics of each item against numpy on the list of its scores
+    #
+    # @param histogram : ScoreHistogram - The histogram
+    # @param items : list<string> - The item of each score
+    # @param scores : list<float> - The scores
+    def check_statistics(self, histogram, items, scores):
+
+        itemScores = {}
+        for item, score in zip( items, scores):
+            itemScores.setdefault( item, []).append( score)
+
+        self.assertEqual( sorted( histogram.itemIDs), sorted( itemScores))
+        for item, scoreList in itemScores.iteritems():
+            mean, median, minimum, maximum, std, count = histogram.get_statistics( item)
+            self.assertEqual( count, len( scoreList))
+            self.assertEqual( minimum, numpy.min( scoreList))
+            self.assertEqual( maximum, numpy.max( scoreList))
+            self.assertEqual( median, numpy.median( scoreList))
+            self.assertAlmostEqual( mean, numpy.mean( scoreList), places = 10)
+            self.assertAlmostEqual( std, numpy.std( scoreList), places = 10)
+
+            # same floats as the list of scores recreated from a dictionary of score frequencies
+            scoreFrequencies = {}
+            for score in scoreList:
+                scoreFrequencies[ score] = scoreFrequencies.get( score, 0) + 1
+            listOfScores = numpy.repeat( scoreFrequencies.keys(), scoreFrequencies.values())
+            self.assertEqual( mean, numpy.mean( listOfScores))
+            self.assertEqual( std, numpy.std( listOfScores))
+
+        minimumBins, maximumBins = histogram.get_bin_ranges()
+        for item, scoreList in itemScores.iteritems():
+            code = histogram.itemCodes[ item]
+            self.assertEqual( ScoreHistogram.get_scores( minimumBins[ code]), min( scoreList))
+            self.assertEqual( ScoreHistogram.get_scores( maximumBins[ code]), max( scoreList))
+
+    # #
+    # Test the statistics of scores added by batches
+    def test_statistics(self):
+
+        print "| test_statistics | "
+
+        items, scores = self.draw_scores( 50, 3000, 0, 40)
+        histogram = ScoreHistogram()
+        self.add_scores( histogram, items, scores, 250)
+        self.check_statistics( histogram, items, scores)
+
+        # a single score, an even and an odd number of scores
+        items = [ "single", "even", "even", "odd", "odd", "odd"]
+        scores = [ 3.2, 1.5, 2.5, 7.1, 0.3, 7.1]
+        histogram = ScoreHistogram()
+        self.add_scores( histogram, items, scores, 4)
+        self.check_statistics( histogram, items, scores)
+        self.assertEqual( histogram.get_statistics( "even")[ 1], 2.0)
+        self.assertEqual( histogram.get_statistics( "odd")[ 1], 7.1)
+
+    # #
+    # Test the statistics of negative scores, the matrix growing on both sides of its bins and in items
+    def test_growth(self):
+
+        print "| test_growth | "
+
+        items, scores = [], []
+        # batches below, above and around the bins of the previous batches, with new items
+        for itemNumber, scoreNumber, minimum, maximum in [ ( 10, 400, -5, 5), ( 20, 400, -80, -30), ( 30, 400, 40, 90), ( 2000, 4000, -200, 200), ( 50, 400, -1, 1)]:
+            batchItems, batchScores = self.draw_scores( itemNumber, scoreNumber, minimum, maximum)
+            items.extend( batchItems)
+            scores.extend( batchScores)
+
+        histogram = ScoreHistogram()
+        self.add_scores( histogram, items, scores, 500)
+        self.assertTrue( histogram.firstBin <= -2000)
+        self.assertTrue( histogram.firstBin + histogram.counts.shape[ 1] > 2000)
+        self.assertTrue( histogram.counts.shape[ 0] >= len( histogram.itemIDs) > ScoreHistogram.INITIAL_ITEM_NUMBER)
+        self.check_statistics( histogram, items, scores)
+
+        # a single negative score
+        histogram = ScoreHistogram()
+        self.add_scores( histogram, [ "negative"], [ -12.3], 1)
+        self.assertEqual( histogram.get_statistics( "negative"), ( -12.3, -12.3, -12.3, -12.3, 0.0, 1))
+
+    # #
+    # Test that histograms of consecutive parts of the scores, merged from their cells, give the statistics of all the scores
+    def test_merge(self):
+
+        print "| test_merge | "
+
+        items, scores = self.draw_scores( 40, 3000, -20, 20)
+        histogram = ScoreHistogram()
+        self.add_scores( histogram, items, scores, 300)
+
+        for chunkNumber in [ 1, 3, 7]:
+            merged = ScoreHistogram()
+            for chunk in range( chunkNumber):
+                start, end = chunk * len( scores) // chunkNumber, ( chunk + 1) * len( scores) // chunkNumber
+                chunkHistogram = ScoreHistogram()
+                self.add_scores( chunkHistogram, items[ start:end], scores[ start:end], 200)
+                codes = merged.merge( *chunkHistogram.get_cells())
+                self.assertEqual( [ merged.itemIDs[ code] for code in codes], chunkHistogram.itemIDs)
+
+            # same items, in order of first appearance, and same statistics
+            self.assertEqual( merged.itemIDs, histogram.itemIDs)
+            for item in histogram.itemIDs:
+                self.assertEqual( merged.get_statistics( item), histogram.get_statistics( item))
+            self.check_statistics( merged, items, scores)
+
+        # an empty histogram
+        merged = ScoreHistogram()
+        self.assertEqual( len( merged.merge( *ScoreHistogram().get_cells())), 0)
+        self.assertEqual( merged.itemIDs, [])
+
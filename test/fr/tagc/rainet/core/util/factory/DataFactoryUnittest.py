@@ -0,0 +1,111 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from fr.tagc.rainet.core.execution.InsertionStrategy import InsertionStrategy
+from fr.tagc.rainet.core.data import DataConstants
+from fr.tagc.rainet.core.data.Gene import Gene
+from fr.tagc.rainet.core.data.LncRNA import LncRNA
+from fr.tagc.rainet.core.data.Protein import Protein
+from fr.tagc.rainet.core.data.ProteinCrossReference import ProteinCrossReference
+from fr.tagc.rainet.core.data.RNA import RNA
+from fr.tagc.rainet.core.util.data.DataManager import DataManager
+from fr.tagc.rainet.core.util.exception.RainetException import RainetException
+from fr.tagc.rainet.core.util.factory.DataFactory import DataFactory
+from fr.tagc.rainet.core.util.option import OptionConstants
+from fr.tagc.rainet.core.util.option.OptionManager import OptionManager
+from fr.tagc.rainet.core.util.sql.SQLManager import SQLManager
+
+# #
+# Unittesting the cleaning of a table whose rows are referenced by the rows of other tables.
+#
+# The set-based cleaning of the table is compared to the deletion of its objects with the ORM.
+#
+class DataFactoryUnittest(unittest.TestCase):
+
+    # RNAs of the database: ( transcriptID, geneID)
+    RNAS = [ ( "ENST00000001", "ENSG00000001"), ( "ENST00000002", "ENSG00000001"), ( "ENST00000003", "ENSG00000002")]
+
+    # #
+    # Runs before each test
+    def setUp(self):
+
+        self.outputFolder = tempfile.mkdtemp()
+        OptionManager.get_instance().set_option( OptionConstants.OPTION_SPECIES, "human")
+
+    # #
+    # Build a database with RNAs and their Genes, and proteins with their cross references
+    #
+    # @param db_name : string - The name of the database file
+    def build_database(self, db_name):
+
+        sql_manager = SQLManager.get_instance()
+        sql_manager.commit()
+        sql_manager.build_database( os.path.join( self.outputFolder, db_name), False)
+        DataManager.get_instance().data = {}
+
+        rna_factory = DataFactory( DataConstants.RNA_CLASS)
+        for transcript_id, gene_id in DataFactoryUnittest.RNAS:
+            rna_factory.create_object_from_tsv( [ transcript_id, gene_id, "", "lincRNA", "1200", "havana", "KNOWN", "tsl1", "GENCODE basic", "100", "1300", "1", "1", "45.2",
+                                                  "", "", "", "", ""])
+
+        sql_session = sql_manager.get_session()
+        sql_session.execute( Protein.__table__.insert(), [ { "uniprotAC" : "P00001", "uniprotID" : "PROT1_HUMAN"}])
+        sql_session.execute( ProteinCrossReference.__table__.insert(), [ { "protein_id" : "P00001", "sourceDB" : "GeneID", "crossReferenceID" : "7531"}])
+        sql_manager.commit()
+
+    # #
+    # @return list<tuple> - The ( transcriptID, geneID) of the RNAs
+    def get_rnas(self):
+
+        return sorted( SQLManager.get_instance().get_session().query( RNA.transcriptID, RNA.geneID).all())
+
+    # #
+    # Test that cleaning the Gene table clears the Gene of the RNAs, as the deletion of the Genes with the ORM does
+    def test_clean_parent_table(self):
+
+        print "| test_clean_parent_table | "
+
+        # deletion of the objects with the ORM
+        self.build_database( "orm.sqlite")
+        DataFactory( Gene.__name__).delete_objects()
+        orm_rnas = self.get_rnas()
+
+        self.build_database( "clean.sqlite")
+        self.assertEqual( self.get_rnas(), DataFactoryUnittest.RNAS)
+        DataFactory( Gene.__name__).clean_table()
+
+        sql_session = SQLManager.get_instance().get_session()
+        self.assertEqual( sql_session.query( Gene).count(), 0)
+        self.assertEqual( self.get_rnas(), [ ( transcript_id, None) for transcript_id, gene_id in DataFactoryUnittest.RNAS])
+        self.assertEqual( self.get_rnas(), orm_rnas)
+        # the RNAs keep their subclass rows
+        self.assertEqual( sql_session.query( LncRNA).count(), len( DataFactoryUnittest.RNAS))
+
+    # #
+    # Test that a table referenced by the primary key of rows of another table is not cleaned
+    def test_clean_referenced_table(self):
+
+        print "| test_clean_referenced_table | "
+
+        self.build_database( "clean.sqlite")
+
+        with self.assertRaises( RainetException):
+            DataFactory( DataConstants.PROTEIN_CLASS).clean_table()
+        sql_session = SQLManager.get_instance().get_session()
+        self.assertEqual( sql_session.query( Protein).count(), 1)
+        self.assertEqual( sql_session.query( ProteinCrossReference).count(), 1)
+
+        # once the referencing table is cleaned
+        DataFactory( DataConstants.PROTEIN_CROSS_REFERENCE_CLASS).clean_table()
+        DataFactory( DataConstants.PROTEIN_CLASS).clean_table()
+        self.assertEqual( SQLManager.get_instance().get_session().query( Protein).count(), 0)
+
+    # #
+    # Runs after each test
+    def tearDown(self):
+
+        SQLManager.get_instance().commit()
+        DataManager.get_instance().data = {}
+        shutil.rmtree( self.outputFolder)
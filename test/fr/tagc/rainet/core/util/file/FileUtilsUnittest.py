@@ -0,0 +1,102 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from fr.tagc.rainet.core.util.file.FileUtils import FileUtils
+from fr.tagc.rainet.core.util.exception.RainetException import RainetException
+
+# #
+# Unittesting the splitting of text files in chunks of lines.
+#
+class FileUtilsUnittest(unittest.TestCase):
+
+    # #
+    # Runs before each test
+    def setUp(self):
+
+        self.outputFolder = tempfile.mkdtemp()
+        self.filePath = os.path.join( self.outputFolder, "lines.txt")
+
+    # #
+    # Write a file and split it in chunks
+    #
+    # @param content : string - The content of the file
+    # @param chunk_number : int - The number of chunks wanted
+    #
+    # @return list<string> - The content of each chunk
+    def get_chunks(self, content, chunk_number):
+
+        with open( self.filePath, "wb") as outFile:
+            outFile.write( content)
+
+        offsets = FileUtils.get_line_offsets( self.filePath, chunk_number)
+
+        # the chunks follow each other and cover the file
+        self.assertTrue( len( offsets) >= 1 and len( offsets) <= chunk_number)
+        self.assertTrue( offsets[ 0][ 0] == 0 and offsets[ -1][ 1] == len( content))
+        for ( start, end), ( nextStart, nextEnd) in zip( offsets[ :-1], offsets[ 1:]):
+            self.assertTrue( start < end and end == nextStart, "asserting that the chunks are not empty and consecutive")
+
+        return [ content[ start:end] for start, end in offsets]
+
+    # #
+    def test_chunks(self):
+
+        print "| test_chunks | "
+
+        lines = [ "line %i %s\n" % ( index, "x" * ( index % 7)) for index in range( 100)]
+        for chunkNumber in [ 1, 2, 3, 7, 16, 99, 100]:
+            chunks = self.get_chunks( "".join( lines), chunkNumber)
+            # the chunks are about the same size: two nominal ends can fall in the same line when there are about as many chunks as lines
+            if chunkNumber <= 16:
+                self.assertTrue( len( chunks) == chunkNumber, "asserting the number of chunks")
+            self.assertTrue( "".join( chunks) == "".join( lines))
+            for chunk in chunks:
+                self.assertTrue( chunk.endswith( "\n"), "asserting that the chunks end with a full line")
+
+    # #
+    def test_empty_file(self):
+
+        print "| test_empty_file | "
+
+        self.assertTrue( self.get_chunks( "", 4) == [ ""], "asserting that an empty file gives a single empty chunk")
+
+    # #
+    def test_missing_final_newline(self):
+
+        print "| test_missing_final_newline | "
+
+        content = "first line\nsecond line\nthird line"
+        self.assertTrue( self.get_chunks( content, 1) == [ content])
+        self.assertTrue( self.get_chunks( content, 2) == [ "first line\nsecond line\n", "third line"])
+        self.assertTrue( self.get_chunks( content, 3) == [ "first line\n", "second line\n", "third line"], "asserting that the last line is a chunk")
+
+        self.assertTrue( self.get_chunks( "single line", 3) == [ "single line"])
+
+    # #
+    def test_more_chunks_than_lines(self):
+
+        print "| test_more_chunks_than_lines | "
+
+        content = "a\nbb\nccc\n"
+        chunks = self.get_chunks( content, 20)
+        self.assertTrue( chunks == [ "a\n", "bb\n", "ccc\n"], "asserting that there is at most one chunk per line")
+
+        # a long line containing the nominal ends of several chunks: they end after it
+        content = "short\n" + "l" * 100 + "\nend\n"
+        self.assertTrue( self.get_chunks( content, 10) == [ "short\n" + "l" * 100 + "\n", "end\n"])
+
+    # #
+    def test_missing_file(self):
+
+        print "| test_missing_file | "
+
+        with self.assertRaises( RainetException):
+            FileUtils.get_line_offsets( os.path.join( self.outputFolder, "missing.txt"), 2)
+
+    # #
+    # Runs after each test
+    def tearDown(self):
+
+        shutil.rmtree( self.outputFolder)
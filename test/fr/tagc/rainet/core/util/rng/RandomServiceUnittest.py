@@ -0,0 +1,96 @@
+import unittest
+
+import numpy
+
+from fr.tagc.rainet.core.util.rng.RandomService import RandomService
+from fr.tagc.rainet.core.util.exception.RainetException import RainetException
+
+# #
+# Unittesting the random streams derived from a single seed.
+#
+class RandomServiceUnittest(unittest.TestCase):
+
+    SEED = 1234
+
+    # Number of numbers drawn from each stream
+    DRAW_NUMBER = 10000
+
+    # #
+    # Runs before each test
+    def setUp(self):
+
+        self.service = RandomService()
+        self.service.set_seed( RandomServiceUnittest.SEED)
+
+    # #
+    # Test that the same seed gives the same draws for each stream
+    def test_same_seed(self):
+
+        print "| test_same_seed | "
+
+        other_service = RandomService()
+        other_service.set_seed( RandomServiceUnittest.SEED)
+
+        for keys in [ ( "randomization",), ( "randomization", "ENST00000001"), ( "sample", 3)]:
+            self.assertEqual( self.service.get_stream_seed( *keys), other_service.get_stream_seed( *keys))
+            self.assertEqual( self.service.get_stream( *keys).random_sample( 100).tolist(), other_service.get_stream( *keys).random_sample( 100).tolist())
+            self.assertEqual( [ self.service.get_python_stream( *keys).random() for dummy in range( 5)], [ other_service.get_python_stream( *keys).random() for dummy in range( 5)])
+
+        # the draws of a stream do not depend on the use of the other streams
+        first_draws = self.service.get_stream( "randomization", "ENST00000002").random_sample( 100)
+        self.service.get_stream( "randomization", "ENST00000001").random_sample( 1000)
+        self.assertEqual( self.service.get_stream( "randomization", "ENST00000002").random_sample( 100).tolist(), first_draws.tolist())
+
+        # another seed gives other draws
+        other_service.set_seed( RandomServiceUnittest.SEED + 1)
+        self.assertNotEqual( other_service.get_stream( "randomization").random_sample( 100).tolist(), self.service.get_stream( "randomization").random_sample( 100).tolist())
+
+    # #
+    # Test that distinct stream keys give independent streams
+    def test_independent_streams(self):
+
+        print "| test_independent_streams | "
+
+        key_list = [ ( "randomization", "ENST%011i" % index) for index in range( 20)] + [ ( "randomization",), ( "sample",), ( "sample", 1), ( "sample", "1", 0)]
+        stream_seeds = [ self.service.get_stream_seed( *keys) for keys in key_list]
+        self.assertEqual( len( set( stream_seeds)), len( key_list))
+
+        draws = numpy.array( [ self.service.get_stream( *keys).random_sample( RandomServiceUnittest.DRAW_NUMBER) for keys in key_list])
+        # no correlation between the streams (the standard deviation of the correlation of independent streams is 0.01)
+        correlations = numpy.corrcoef( draws)
+        self.assertTrue( numpy.abs( correlations[ numpy.triu_indices( len( key_list), 1)]).max() < 0.05)
+        # no shifted copies of a stream in another
+        for first in range( len( key_list)):
+            for second in range( len( key_list)):
+                if first != second:
+                    self.assertEqual( len( numpy.intersect1d( draws[ first], draws[ second])), 0)
+
+    # #
+    # Test the permutations and samples drawn from a stream
+    def test_draws(self):
+
+        print "| test_draws | "
+
+        permutations = RandomService.permutations( self.service.get_stream( "permutations"), 5, 8)
+        self.assertEqual( permutations.shape, ( 5, 8))
+        for permutation in permutations:
+            self.assertEqual( sorted( permutation.tolist()), range( 8))
+        self.assertEqual( permutations.tolist(), RandomService.permutations( self.service.get_stream( "permutations"), 5, 8).tolist())
+
+        sample = RandomService.sample( self.service.get_stream( "sample"), list( "abcdefgh"), 4)
+        self.assertEqual( len( set( sample)), 4)
+        self.assertTrue( set( sample) <= set( "abcdefgh"))
+
+    # #
+    # Test the validation of the seed
+    def test_seed(self):
+
+        print "| test_seed | "
+
+        for seed in [ -1, RandomService.MAXIMUM_SEED + 1, "seed"]:
+            with self.assertRaises( RainetException):
+                self.service.set_seed( seed)
+
+        self.assertEqual( self.service.set_seed( "42"), 42)
+        drawn_seed = RandomService().get_seed()
+        self.assertTrue( 0 <= drawn_seed <= RandomService.MAXIMUM_SEED)
@@ -0,0 +1,132 @@
+import unittest
+import os
+import time
+import shutil
+import tempfile
+
+from fr.tagc.rainet.core.util.subprocess.JobRunner import JobRunner
+
+# #
+# Unittesting the JobRunner on job folders, with stub commands standing in for catRAPID.
+#
+class JobRunnerUnittest(unittest.TestCase):
+
+    # Number of job folders
+    JOB_NUMBER = 6
+
+    # Stub command: counts its runs in the job folder and writes an output file
+    STUB_COMMAND = "echo run >> runs.txt; echo interactions > output.txt"
+
+    # #
+    # Runs before each test
+    def setUp(self):
+
+        self.outputFolder = tempfile.mkdtemp()
+        self.jobFolders = []
+        for index in range( JobRunnerUnittest.JOB_NUMBER):
+            folder = os.path.join( self.outputFolder, "run" + str( index))
+            os.mkdir( folder)
+            self.jobFolders.append( folder)
+        self.manifestFile = os.path.join( self.outputFolder, "job_manifest.tsv")
+
+    # #
+    # @param folder : string - A job folder
+    #
+    # @return int - The number of times the stub command was run in the folder
+    def get_run_count(self, folder):
+
+        if not os.path.exists( os.path.join( folder, "runs.txt")):
+            return 0
+        with open( os.path.join( folder, "runs.txt"), "r") as runs:
+            return len( runs.readlines())
+
+    # #
+    def test_run(self):
+
+        print "| test_run | "
+
+        results = JobRunner( self.jobFolders, JobRunnerUnittest.STUB_COMMAND, 2, self.manifestFile).run()
+
+        self.assertTrue( sorted( results) == self.jobFolders, "asserting that all the jobs were run")
+        for folder in self.jobFolders:
+            self.assertTrue( results[ folder] == ( JobRunner.STATUS_DONE, 0, 1), "asserting the exit code of the job")
+            self.assertTrue( self.get_run_count( folder) == 1, "asserting that the job was run once")
+            self.assertTrue( os.path.exists( os.path.join( folder, "output.txt")), "asserting that the job was run in its folder")
+
+        with open( self.manifestFile, "r") as manifest:
+            lines = manifest.readlines()
+        self.assertTrue( lines[ 0] == JobRunner.MANIFEST_HEADER)
+        self.assertTrue( sorted( line.split( "\t")[ 0] for line in lines[ 1:]) == self.jobFolders, "asserting that the manifest has all the jobs")
+
+    # #
+    def test_bounded_concurrency(self):
+
+        print "| test_bounded_concurrency | "
+
+        # each job counts the jobs running when it starts
+        command = "mkdir ../running_$(basename $PWD); ls -d ../running_* | wc -l > concurrency.txt; sleep 0.3; rmdir ../running_$(basename $PWD)"
+
+        JobRunner( self.jobFolders, command, 2, self.manifestFile).run()
+
+        concurrency = []
+        for folder in self.jobFolders:
+            with open( os.path.join( folder, "concurrency.txt"), "r") as inFile:
+                concurrency.append( int( inFile.read()))
+        self.assertTrue( max( concurrency) <= 2, "asserting that at most 2 jobs ran at the same time")
+
+    # #
+    def test_rerun_missing_jobs(self):
+
+        print "| test_rerun_missing_jobs | "
+
+        # the job of the first folder fails
+        command = "test -e fail && exit 2; " + JobRunnerUnittest.STUB_COMMAND
+        open( os.path.join( self.jobFolders[ 0], "fail"), "w").close()
+
+        results = JobRunner( self.jobFolders, command, 3, self.manifestFile).run()
+
+        self.assertTrue( results[ self.jobFolders[ 0]] == ( JobRunner.STATUS_FAILED, 2, 1), "asserting the exit code of the failed job")
+        self.assertTrue( self.get_run_count( self.jobFolders[ 0]) == 0)
+
+        # a new run only executes the failed job
+        os.remove( os.path.join( self.jobFolders[ 0], "fail"))
+        results = JobRunner( self.jobFolders, command, 3, self.manifestFile).run()
+
+        self.assertTrue( results.keys() == [ self.jobFolders[ 0]], "asserting that only the failed job was run again")
+        for folder in self.jobFolders:
+            self.assertTrue( self.get_run_count( folder) == 1, "asserting that each job succeeded once")
+
+        self.assertTrue( JobRunner( self.jobFolders, command, 3, self.manifestFile).run() == {}, "asserting that no job is run when all are done")
+
+    # #
+    def test_retries(self):
+
+        print "| test_retries | "
+
+        # the jobs fail at their first attempt
+        command = "if [ ! -e attempt ]; then touch attempt; exit 3; fi; " + JobRunnerUnittest.STUB_COMMAND
+
+        results = JobRunner( self.jobFolders, command, 2, self.manifestFile, retries = 1).run()
+
+        for folder in self.jobFolders:
+            self.assertTrue( results[ folder] == ( JobRunner.STATUS_DONE, 0, 2), "asserting that the job succeeded at its second attempt")
+            self.assertTrue( self.get_run_count( folder) == 1)
+
+    # #
+    def test_timeout(self):
+
+        print "| test_timeout | "
+
+        start = time.time()
+        results = JobRunner( self.jobFolders[ :2], "sleep 30; " + JobRunnerUnittest.STUB_COMMAND, 2, self.manifestFile, timeout = 0.5, retries = 1).run()
+
+        self.assertTrue( time.time() - start < 10, "asserting that the jobs were stopped")
+        for folder in self.jobFolders[ :2]:
+            self.assertTrue( results[ folder][ 0] == JobRunner.STATUS_TIMEOUT and results[ folder][ 2] == 2, "asserting that the job timed out twice")
+            self.assertTrue( self.get_run_count( folder) == 0)
+
+    # #
+    # Runs after each test
+    def tearDown(self):
+
+        shutil.rmtree( self.outputFolder)